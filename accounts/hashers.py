@@ -0,0 +1,67 @@
+"""
+Hacheurs de mots de passe du projet.
+
+Le premier hacheur de PASSWORD_HASHERS sert aux nouveaux mots de passe ; les
+suivants ne font que vérifier les anciens, que Django rehache avec le premier
+à la connexion suivante (`check_password` appelle `must_update`).
+
+- `Argon2Hasher` : Argon2id aux paramètres minimaux recommandés par l'OWASP
+  (19 Mio, 2 passes, 1 fil), nettement moins coûteux en CPU que les
+  1 000 000 d'itérations du PBKDF2 par défaut. Nécessite argon2-cffi.
+- `HachageRapideHasher` : PBKDF2 à une seule itération, pour les tests et les
+  bancs d'essai qui créent des milliers de comptes. Il refuse de fonctionner
+  sans `HACHAGE_RAPIDE_AUTORISE = True` dans les réglages, et la vérification
+  système `accounts.E001` signale sa présence dans PASSWORD_HASHERS sans ce
+  réglage.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher
+from django.core.checks import Error
+from django.core.exceptions import ImproperlyConfigured
+
+HACHEUR_RAPIDE = 'accounts.hashers.HachageRapideHasher'
+
+
+class Argon2Hasher(Argon2PasswordHasher):
+    """Argon2id, 19 Mio de mémoire, 2 passes, 1 fil (OWASP)"""
+
+    time_cost = 2
+    memory_cost = 19 * 1024
+    parallelism = 1
+
+
+def hachage_rapide_autorise():
+    return getattr(settings, 'HACHAGE_RAPIDE_AUTORISE', False)
+
+
+class HachageRapideHasher(PBKDF2PasswordHasher):
+    """PBKDF2 à une itération : réservé aux réglages de test et de banc d'essai"""
+
+    algorithm = 'pbkdf2_rapide'
+    iterations = 1
+
+    def _verifier_autorisation(self):
+        if not hachage_rapide_autorise():
+            raise ImproperlyConfigured(
+                f"{HACHEUR_RAPIDE} ne doit servir qu'aux tests : "
+                "définissez HACHAGE_RAPIDE_AUTORISE = True dans les réglages de test."
+            )
+
+    def encode(self, password, salt, iterations=None):
+        self._verifier_autorisation()
+        return super().encode(password, salt, iterations)
+
+    def verify(self, password, encoded):
+        self._verifier_autorisation()
+        return super().verify(password, encoded)
+
+
+def verifier_hacheurs(app_configs, **kwargs):
+    """Vérification système : pas de hachage rapide hors des réglages qui l'autorisent"""
+    if HACHEUR_RAPIDE in settings.PASSWORD_HASHERS and not hachage_rapide_autorise():
+        return [Error(
+            f"{HACHEUR_RAPIDE} figure dans PASSWORD_HASHERS sans HACHAGE_RAPIDE_AUTORISE.",
+            hint="Ce hacheur n'offre aucune protection : ne l'activez que dans des réglages de test.",
+            id='accounts.E001',
+        )]
+    return []
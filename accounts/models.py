@@ -17,5 +17,34 @@ class CustomUser(AbstractUser):
     # For example:
     # bio = models.TextField(blank=True, null=True)
     
+    ROLES = ('eleve', 'formateur')
+
     def __str__(self):
-        return self.get_full_name() or self.username
\ No newline at end of file
+        return self.get_full_name() or self.username
+
+    def resoudre_roles(self):
+        """
+        Charge les profils élève et formateur en une seule requête jointe et les
+        garde dans le cache des relations de l'instance. Un profil absent y est
+        mis en cache (None) comme un profil présent : request.user n'interroge
+        plus la base pour ses rôles pendant le reste de la requête HTTP.
+        """
+        relations = [self._meta.get_field(role) for role in self.ROLES]
+        if self.pk is None or all(relation.is_cached(self) for relation in relations):
+            return
+        charge = type(self)._default_manager.select_related(*self.ROLES).get(pk=self.pk)
+        for relation in relations:
+            if not relation.is_cached(self):
+                relation.set_cached_value(self, relation.get_cached_value(charge, default=None))
+
+    @property
+    def profil_eleve(self):
+        """Profil Eleve de l'utilisateur, ou None"""
+        self.resoudre_roles()
+        return getattr(self, 'eleve', None)
+
+    @property
+    def profil_formateur(self):
+        """Profil Formateur de l'utilisateur, ou None"""
+        self.resoudre_roles()
+        return getattr(self, 'formateur', None)
\ No newline at end of file
@@ -1,3 +1,59 @@
-from django.test import TestCase
+from django.contrib.auth.hashers import check_password, get_hasher, make_password
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from .hashers import HACHEUR_RAPIDE, verifier_hacheurs
+from formateurs.models import Formateur
+from .models import CustomUser
+
+
+class HachageTests(TestCase):
+    """Rehachage à la connexion et garde-fou du hacheur rapide"""
+
+    def test_rehachage_a_la_connexion(self):
+        utilisateur = CustomUser.objects.create(
+            username='ancien', email='ancien@example.com', is_eleve=True,
+            password=make_password('secret-123', hasher='pbkdf2_sha256'),
+        )
+        response = self.client.post(reverse('accounts:login'), {'username': 'ancien', 'password': 'secret-123'})
+        self.assertRedirects(response, reverse('eleves:dashboard'), fetch_redirect_response=False)
+        utilisateur.refresh_from_db()
+        self.assertTrue(utilisateur.password.startswith(get_hasher('default').algorithm + '$'))
+        self.assertTrue(utilisateur.check_password('secret-123'))
+
+    @override_settings(PASSWORD_HASHERS=[HACHEUR_RAPIDE], HACHAGE_RAPIDE_AUTORISE=False)
+    def test_hacheur_rapide_refuse_sans_autorisation(self):
+        with self.assertRaises(ImproperlyConfigured):
+            make_password('secret-123')
+        self.assertEqual([erreur.id for erreur in verifier_hacheurs(None)], ['accounts.E001'])
+
+    @override_settings(PASSWORD_HASHERS=[HACHEUR_RAPIDE], HACHAGE_RAPIDE_AUTORISE=True)
+    def test_hacheur_rapide_autorise(self):
+        encode = make_password('secret-123')
+        self.assertTrue(encode.startswith('pbkdf2_rapide$1$'))
+        self.assertTrue(check_password('secret-123', encode))
+        self.assertEqual(verifier_hacheurs(None), [])
+
+
+class RolesTests(TestCase):
+    """Les profils élève et formateur sont résolus une seule fois, en une requête"""
+
+    def setUp(self):
+        utilisateur = CustomUser.objects.create(username='formateur', email='formateur@example.com', is_formateur=True)
+        self.formateur = Formateur.objects.create(
+            user=utilisateur, specialite='Python', experience=5, bio='', matricule='F001'
+        )
+
+    def test_une_requete_pour_les_deux_roles(self):
+        utilisateur = CustomUser.objects.get(username='formateur')
+        with self.assertNumQueries(1):
+            self.assertEqual(utilisateur.profil_formateur, self.formateur)
+            self.assertIsNone(utilisateur.profil_eleve)
+            self.assertIsNone(utilisateur.profil_eleve)
+            self.assertFalse(hasattr(utilisateur, 'eleve'))
+
+    def test_acces_eleve_refuse_au_formateur(self):
+        self.client.force_login(self.formateur.user)
+        response = self.client.get(reverse('eleves:dashboard'))
+        self.assertEqual(response.status_code, 403)
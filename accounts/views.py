@@ -92,11 +92,11 @@ def register_formateur(request):
 def profile(request):
     user = request.user
     context = {'user': user}
-    if user.is_eleve and hasattr(user, 'eleve'):
-        context['profile'] = user.eleve
+    if user.is_eleve and user.profil_eleve is not None:
+        context['profile'] = user.profil_eleve
         context['profile_type'] = 'eleve'
-    elif user.is_formateur and hasattr(user, 'formateur'):
-        context['profile'] = user.formateur
+    elif user.is_formateur and user.profil_formateur is not None:
+        context['profile'] = user.profil_formateur
         context['profile_type'] = 'formateur'
     return render(request, 'accounts/profile.html', context)
 
@@ -111,7 +111,7 @@ class CustomLoginView(LoginView):
         if user.is_formateur:
             return reverse_lazy('formateurs:dashboard')  # à définir
         elif user.is_eleve:
-            return reverse_lazy('eleve_dashboard')  # à définir
+            return reverse_lazy('eleves:dashboard')
         return reverse_lazy('accounts:profile')  # fallback
 
 
@@ -0,0 +1,201 @@
+"""
+Générateur de jeu de données synthétique pour les mesures de performance.
+
+Tout passe par des insertions groupées (bulk_create) par lots, sans
+signaux : les bilans de présence sont recalculés une fois à la fin.
+Chaque exécution préfixe ses identifiants d'une étiquette aléatoire,
+ce qui permet de semer plusieurs fois la même base.
+"""
+import datetime
+import random
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from accounts.models import CustomUser
+from documents.models import Document, DocumentTag, Tag
+from documents.signals import actualiser_tags_texte
+from eleves.models import Eleve, Inscription
+from formateurs.models import Formateur, FormateurEleve
+from formations.models import Domaine, Formation, Module
+from planning.models import Cours, Disponibilite, Salle
+from presence.models import AttendanceSummary, Presence
+
+TAILLE_LOT = 2000
+MOT_DE_PASSE = 'bench-password'
+HEURES = (datetime.time(8), datetime.time(10), datetime.time(13), datetime.time(15), datetime.time(17))
+TAGS = ('cours', 'support', 'exercices', 'corrigé', 'python', 'django', 'sql', 'bureautique',
+        'réseau', 'sécurité', 'gestion', 'comptabilité', 'examen', 'projet', 'annexe')
+STATUTS = ('valide',) * 7 + ('en_attente', 'abandon', 'termine')
+
+
+class Tampon:
+    """Accumule des instances et les insère par lots"""
+
+    def __init__(self, modele, taille=TAILLE_LOT):
+        self.modele = modele
+        self.taille = taille
+        self.instances = []
+        self.total = 0
+
+    def ajouter(self, instance):
+        self.instances.append(instance)
+        if len(self.instances) >= self.taille:
+            self.vider()
+
+    def vider(self):
+        if self.instances:
+            self.modele.objects.bulk_create(self.instances, batch_size=self.taille)
+            self.total += len(self.instances)
+            self.instances = []
+
+
+def _creer(modele, instances):
+    """Insère une liste d'instances par lots et renvoie les objets créés (avec clés)"""
+    return modele.objects.bulk_create(instances, batch_size=TAILLE_LOT)
+
+
+def generer(eleves=2000, formateurs=50, formations=50, semaines=12, salles=30,
+            documents_par_formateur=20, graine=0, journal=None):
+    """
+    Sème un centre de formation complet et renvoie {modèle: nombre de lignes}.
+    Les cours couvrent les `semaines` précédant aujourd'hui, pour que chaque
+    cours ait ses présences.
+    """
+    aleatoire = random.Random(graine)
+    etiquette = uuid.uuid4().hex[:6]
+    hachage = make_password(MOT_DE_PASSE)
+    comptes = {}
+
+    def noter(nom, nombre):
+        comptes[nom] = nombre
+        if journal:
+            journal(f"{nom} : {nombre}")
+
+    with transaction.atomic():
+        utilisateurs = _creer(CustomUser, [
+            CustomUser(username=f'{etiquette}-f{i}', email=f'{etiquette}-f{i}@bench.local',
+                       first_name='Formateur', last_name=f'F{i:05d}', is_formateur=True, password=hachage)
+            for i in range(formateurs)
+        ] + [
+            CustomUser(username=f'{etiquette}-e{i}', email=f'{etiquette}-e{i}@bench.local',
+                       first_name='Eleve', last_name=f'E{i:07d}', is_eleve=True, password=hachage)
+            for i in range(eleves)
+        ])
+        noter('CustomUser', len(utilisateurs))
+
+        liste_formateurs = _creer(Formateur, [
+            Formateur(user=user, specialite=aleatoire.choice(['Python', 'Gestion', 'Anglais', 'Réseaux']),
+                      experience=aleatoire.randint(1, 20), bio='', matricule=f'{etiquette}{i:06d}')
+            for i, user in enumerate(utilisateurs[:formateurs])
+        ])
+        noter('Formateur', len(liste_formateurs))
+
+        liste_eleves = _creer(Eleve, [
+            Eleve(user=user, numero_etudiant=f'{etiquette}{i:08d}')
+            for i, user in enumerate(utilisateurs[formateurs:])
+        ])
+        noter('Eleve', len(liste_eleves))
+
+        domaines = _creer(Domaine, [Domaine(nom=f'{etiquette} {nom}') for nom in ('Informatique', 'Langues', 'Management')])
+        liste_formations = _creer(Formation, [
+            Formation(domaine=aleatoire.choice(domaines), reference=f'{etiquette}-{i:05d}', titre=f'Formation {i}',
+                      description='', objectifs='', public_cible='', duree_jours=aleatoire.randint(5, 30), prix=1000)
+            for i in range(formations)
+        ])
+        noter('Formation', len(liste_formations))
+
+        modules = _creer(Module, [
+            Module(formation=formation, ordre=ordre, titre=f'Module {ordre}', description='',
+                   duree_heures=aleatoire.choice([7, 14, 21]))
+            for formation in liste_formations
+            for ordre in range(1, aleatoire.randint(3, 8))
+        ])
+        noter('Module', len(modules))
+
+        liste_salles = _creer(Salle, [
+            Salle(nom=f'{etiquette}-S{i}', capacite=aleatoire.choice([12, 20, 30, 50]),
+                  batiment=f'B{i % 4}', etage=i % 3)
+            for i in range(salles)
+        ])
+        noter('Salle', len(liste_salles))
+
+        # Inscriptions : chaque élève suit de une à trois formations
+        inscrits = {formation.pk: [] for formation in liste_formations}
+        tampon = Tampon(Inscription)
+        for eleve in liste_eleves:
+            for formation in aleatoire.sample(liste_formations, min(len(liste_formations), aleatoire.randint(1, 3))):
+                statut = aleatoire.choice(STATUTS)
+                tampon.ajouter(Inscription(eleve=eleve, formation=formation, statut=statut))
+                if statut == 'valide':
+                    inscrits[formation.pk].append(eleve.pk)
+        tampon.vider()
+        noter('Inscription', tampon.total)
+
+        # Cours : deux séances hebdomadaires par formation, sans double réservation
+        aujourd_hui = datetime.date.today()
+        lundi = aujourd_hui - datetime.timedelta(days=aujourd_hui.weekday() + 7 * semaines)
+        reserve = set()
+        cours = []
+        for rang, formation in enumerate(liste_formations):
+            formateur = liste_formateurs[rang % len(liste_formateurs)]
+            for semaine in range(semaines):
+                for seance in range(2):
+                    creneau = (2 * (rang // len(liste_formateurs)) + seance) % (5 * len(HEURES))
+                    date = lundi + datetime.timedelta(weeks=semaine, days=creneau % 5)
+                    heure = HEURES[creneau // 5]
+                    if ('formateur', formateur.pk, date, heure) in reserve:
+                        continue
+                    salle = next((
+                        s for s in aleatoire.sample(liste_salles, len(liste_salles))
+                        if ('salle', s.pk, date, heure) not in reserve
+                    ), None)
+                    reserve.add(('formateur', formateur.pk, date, heure))
+                    if salle:
+                        reserve.add(('salle', salle.pk, date, heure))
+                    fin = (datetime.datetime.combine(date, heure) + datetime.timedelta(hours=2)).time()
+                    cours.append(Cours(formation=formation, formateur=formateur, salle=salle,
+                                       titre=f'{formation.titre} - séance {semaine}.{seance}',
+                                       date=date, heure_debut=heure, heure_fin=fin))
+        cours = _creer(Cours, cours)
+        noter('Cours', len(cours))
+
+        tampon = Tampon(Presence)
+        for un_cours in cours:
+            if un_cours.date >= aujourd_hui:
+                continue
+            for eleve_id in inscrits[un_cours.formation_id]:
+                tampon.ajouter(Presence(cours=un_cours, eleve_id=eleve_id, present=aleatoire.random() < 0.85))
+        tampon.vider()
+        noter('Presence', tampon.total)
+
+        tags = list(Tag.objects.pour_noms(TAGS, creer=True))
+        documents = _creer(Document, [
+            Document(formateur=formateur, titre=f'Support {i}', url='https://example.com/',
+                     type_document='LINK', description='')
+            for formateur in liste_formateurs for i in range(documents_par_formateur)
+        ])
+        noter('Document', len(documents))
+        tampon = Tampon(DocumentTag)
+        for document in documents:
+            for tag in aleatoire.sample(tags, 3):
+                tampon.ajouter(DocumentTag(document=document, tag=tag))
+        tampon.vider()
+        noter('DocumentTag', tampon.total)
+        actualiser_tags_texte([document.pk for document in documents])
+
+        tampon = Tampon(Disponibilite)
+        for formateur in liste_formateurs:
+            for semaine in range(semaines + 4):
+                debut = datetime.datetime.combine(lundi + datetime.timedelta(weeks=semaine), datetime.time(8),
+                                                  tzinfo=datetime.timezone.utc)
+                tampon.ajouter(Disponibilite(formateur=formateur, date_debut=debut,
+                                             date_fin=debut + datetime.timedelta(days=4, hours=10)))
+        tampon.vider()
+        noter('Disponibilite', tampon.total)
+
+        noter('AttendanceSummary', AttendanceSummary.objects.reconstruire())
+        ajoutes, _ = FormateurEleve.objects.synchroniser()
+        noter('FormateurEleve', ajoutes)
+    return comptes
@@ -0,0 +1,257 @@
+"""
+Banc d'essai des vues : chaque URL du projet est appelée avec le client de
+test de Django, pour chaque rôle (anonyme, élève, formateur, administrateur).
+
+Pour chaque couple (rôle, URL) on relève la latence (p50/p95), le nombre
+de requêtes SQL et le pic de mémoire Python d'une requête. Le rapport JSON
+produit peut être comparé d'un commit à l'autre (`comparer`).
+"""
+import datetime
+import json
+import logging
+import platform
+import re
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.contrib.admin.sites import site as admin_site
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, URLResolver, get_resolver
+
+from accounts.models import CustomUser
+from documents.models import Document
+from eleves.models import DocumentEleve, Eleve
+from formateurs.models import Formateur
+from formations.models import Formation, Module
+from planning.models import Cours, Disponibilite
+from presence.models import Presence
+
+ROLES = ('anonyme', 'eleve', 'formateur', 'admin')
+# Routes qui modifient l'état de la session, n'ont pas de sens en lecture
+# ou relèvent de l'administration (métriques, servies sous admin/)
+EXCLUES = {'accounts:logout', 'metriques'}
+PARAMETRE = re.compile(r'<(?:(?P<convertisseur>\w+):)?(?P<nom>\w+)>')
+
+
+def lister_routes(motifs=None, prefixe='', espace=None):
+    """Renvoie [(nom qualifié, route, classe ou fonction de vue)] sans l'admin ni les fichiers statiques"""
+    routes = []
+    for motif in get_resolver().url_patterns if motifs is None else motifs:
+        if isinstance(motif, URLResolver):
+            if motif.app_name == admin_site.name or motif.namespace == admin_site.name:
+                continue
+            sous_espace = motif.namespace or espace
+            routes += lister_routes(motif.url_patterns, prefixe + str(motif.pattern), sous_espace)
+        elif isinstance(motif, URLPattern):
+            route = prefixe + str(motif.pattern)
+            if route.startswith('^'):
+                continue
+            nom = f'{espace}:{motif.name}' if espace and motif.name else motif.name
+            if nom in EXCLUES:
+                continue
+            vue = getattr(motif.callback, 'view_class', motif.callback)
+            routes.append((nom, route, vue))
+    return routes
+
+
+class Acteurs:
+    """Utilisateurs de chaque rôle, et objets qui leur sont accessibles pour remplir les <pk>"""
+
+    def __init__(self):
+        self.eleve = Eleve.objects.filter(presences__isnull=False).select_related('user').order_by('pk').first()
+        self.formateur = Formateur.objects.filter(cours__isnull=False).select_related('user').order_by('pk').first()
+        self.admin, _ = CustomUser.objects.get_or_create(
+            username='bench-admin',
+            defaults={'email': 'bench-admin@bench.local', 'is_staff': True, 'is_superuser': True},
+        )
+
+    def utilisateur(self, role):
+        return {
+            'anonyme': None,
+            'eleve': self.eleve.user if self.eleve else None,
+            'formateur': self.formateur.user if self.formateur else None,
+            'admin': self.admin,
+        }[role]
+
+    def objet(self, role, modele):
+        """Premier objet de `modele` visible par le rôle, à défaut le premier de la table"""
+        filtres = {
+            'eleve': {
+                Eleve: {'pk': getattr(self.eleve, 'pk', None)},
+                Formation: {'inscriptions__eleve': self.eleve},
+                Cours: {'formation__inscriptions__eleve': self.eleve},
+                Presence: {'eleve': self.eleve},
+                DocumentEleve: {'eleve': self.eleve},
+            },
+            'formateur': {
+                Eleve: {'inscriptions__formation__cours__formateur': self.formateur},
+                Cours: {'formateur': self.formateur},
+                Document: {'formateur': self.formateur},
+                Disponibilite: {'formateur': self.formateur},
+            },
+        }.get(role, {})
+        queryset = modele._default_manager.order_by('pk')
+        if modele in filtres:
+            return queryset.filter(**filtres[modele]).first() or queryset.first()
+        return queryset.first()
+
+    def url(self, role, route, vue):
+        """Remplace les paramètres de la route ; None si aucun objet ne convient"""
+        manquant = False
+
+        def remplacer(correspondance):
+            nonlocal manquant
+            nom = correspondance['nom']
+            modele = {'formation_pk': Formation, 'module_pk': Module}.get(nom, getattr(vue, 'model', None))
+            objet = self.objet(role, modele) if modele else None
+            if objet is None:
+                manquant = True
+                return ''
+            return str(objet.pk)
+
+        chemin = '/' + PARAMETRE.sub(remplacer, route)
+        return None if manquant else chemin
+
+
+def centile(valeurs, rang):
+    """Centile par interpolation linéaire (rang entre 0 et 100)"""
+    valeurs = sorted(valeurs)
+    if len(valeurs) == 1:
+        return valeurs[0]
+    position = (len(valeurs) - 1) * rang / 100
+    bas = int(position)
+    haut = min(bas + 1, len(valeurs) - 1)
+    return valeurs[bas] + (valeurs[haut] - valeurs[bas]) * (position - bas)
+
+
+def appeler(client, url):
+    """
+    (réponse, taille en octets) de `url`. Une réponse en flux (export CSV,
+    FileResponse) est lue jusqu'au bout : son travail se fait pendant la lecture.
+    """
+    reponse = client.get(url)
+    if not reponse.streaming:
+        return reponse, len(reponse.content)
+    try:
+        return reponse, sum(len(morceau) for morceau in reponse.streaming_content)
+    finally:
+        reponse.close()
+
+
+def mesurer(client, url, iterations):
+    """Appelle `url` `iterations` fois (après un appel de chauffe) et renvoie les mesures"""
+    appeler(client, url)
+    durees = []
+    for _ in range(iterations):
+        # Compteur posé sur l'exécution plutôt que sur connection.queries, que
+        # Django vide au début de chaque requête (signal request_started)
+        requetes = []
+
+        def compter(execute, sql, params, many, contexte):
+            requetes.append(sql)
+            return execute(sql, params, many, contexte)
+
+        with connection.execute_wrapper(compter):
+            debut = time.perf_counter()
+            reponse, taille = appeler(client, url)
+            durees.append((time.perf_counter() - debut) * 1000)
+
+    # Mémoire mesurée à part : tracemalloc ralentit fortement l'exécution
+    tracemalloc.start()
+    try:
+        appeler(client, url)
+        _, pic = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'statut': reponse.status_code,
+        'p50_ms': round(centile(durees, 50), 3),
+        'p95_ms': round(centile(durees, 95), 3),
+        'moyenne_ms': round(statistics.fmean(durees), 3),
+        'requetes': len(requetes),
+        'memoire_pic_ko': round(pic / 1024, 1),
+        'taille_octets': taille,
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executer(iterations=20, roles=ROLES, filtre=None, journal=None):
+    """
+    Lance le banc d'essai et renvoie le rapport (dictionnaire sérialisable en JSON).
+    Tout est exécuté dans une transaction annulée : sessions et compte
+    administrateur créés pour l'occasion ne restent pas en base.
+    """
+    rapport = {
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'base': connection.vendor,
+        'iterations': iterations,
+        'volumes': {modele.__name__: modele._default_manager.count()
+                    for modele in (CustomUser, Eleve, Formateur, Formation, Cours, Presence, Document)},
+        'vues': [],
+    }
+    # Les erreurs 500 sont consignées dans le rapport, inutile de les afficher
+    journal_requetes = logging.getLogger('django.request')
+    niveau = journal_requetes.level
+    journal_requetes.setLevel(logging.CRITICAL)
+    # Un dépassement de budget est mesuré, pas transformé en erreur 500 (settings_test)
+    instrumentation = {**getattr(settings, 'INSTRUMENTATION', {}), 'DEPASSEMENT': 'log'}
+    try:
+        with override_settings(INSTRUMENTATION=instrumentation), transaction.atomic():
+            acteurs = Acteurs()
+            for role in roles:
+                client = Client(raise_request_exception=False)
+                utilisateur = acteurs.utilisateur(role)
+                if role != 'anonyme':
+                    if utilisateur is None:
+                        continue
+                    client.force_login(utilisateur)
+                for nom, route, vue in lister_routes():
+                    url = acteurs.url(role, route, vue)
+                    if url is None or (filtre and filtre not in url and filtre not in (nom or '')):
+                        continue
+                    mesure = {'role': role, 'vue': nom, 'route': route, 'url': url, **mesurer(client, url, iterations)}
+                    rapport['vues'].append(mesure)
+                    if journal:
+                        journal(mesure)
+            transaction.set_rollback(True)
+    finally:
+        journal_requetes.setLevel(niveau)
+    return rapport
+
+
+def comparer(ancien, nouveau, seuil=0.2):
+    """
+    Compare deux rapports et renvoie les régressions : latence p95 en hausse
+    de plus de `seuil` (20 % par défaut), ou nombre de requêtes en hausse.
+    """
+    precedents = {(vue['role'], vue['route']): vue for vue in ancien['vues']}
+    regressions = []
+    for vue in nouveau['vues']:
+        avant = precedents.get((vue['role'], vue['route']))
+        if avant is None:
+            continue
+        if vue['requetes'] > avant['requetes'] or vue['p95_ms'] > avant['p95_ms'] * (1 + seuil):
+            regressions.append({'avant': avant, 'apres': vue})
+    return regressions
+
+
+def charger(chemin):
+    with open(chemin, encoding='utf-8') as fichier:
+        return json.load(fichier)
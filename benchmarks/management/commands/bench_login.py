@@ -0,0 +1,75 @@
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from accounts.hashers import HACHEUR_RAPIDE
+from accounts.models import CustomUser
+from benchmarks.harnais import centile
+
+HACHEURS = {
+    'pbkdf2': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'argon2': 'accounts.hashers.Argon2Hasher',
+    'rapide': HACHEUR_RAPIDE,
+}
+MOT_DE_PASSE = 'connexion-bench'
+
+
+class Command(BaseCommand):
+    help = ("Compare le débit de connexion (POST sur accounts:login) selon le hacheur de mots de passe. "
+            "Les comptes de test sont créés dans une transaction annulée.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hacheur', action='append', choices=HACHEURS, dest='hacheurs',
+                            help="Limiter à ce hacheur (option répétable)")
+        parser.add_argument('--connexions', type=int, default=30, help="Connexions mesurées par hacheur")
+        parser.add_argument('--comptes', type=int, default=10, help="Comptes élèves créés par hacheur")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'hacheur':<8} {'hachage':>12} {'p50':>12} {'p95':>12} {'débit':>14}")
+        for nom in options['hacheurs'] or HACHEURS:
+            try:
+                mesure = self.mesurer(HACHEURS[nom], options['comptes'], options['connexions'])
+            except ValueError as e:
+                # Bibliothèque absente (argon2-cffi)
+                self.stdout.write(self.style.WARNING(f"{nom:<8} indisponible : {e}"))
+                continue
+            self.stdout.write(
+                f"{nom:<8} {mesure['hachage_ms']:>9.1f} ms {mesure['p50_ms']:>9.1f} ms "
+                f"{mesure['p95_ms']:>9.1f} ms {mesure['par_seconde']:>8.1f} conn/s"
+            )
+
+    def mesurer(self, hacheur, comptes, connexions):
+        # Un seul hacheur dans la liste : aucun rehachage ne fausse la mesure
+        with override_settings(PASSWORD_HASHERS=[hacheur], HACHAGE_RAPIDE_AUTORISE=True):
+            with transaction.atomic():
+                debut = time.perf_counter()
+                hachages = [make_password(MOT_DE_PASSE) for _ in range(comptes)]
+                hachage = (time.perf_counter() - debut) / comptes
+                utilisateurs = CustomUser.objects.bulk_create([
+                    CustomUser(username=f'bench-connexion-{i}', email=f'bench-connexion-{i}@example.com',
+                               password=mot, is_eleve=True)
+                    for i, mot in enumerate(hachages)
+                ])
+                url = reverse('accounts:login')
+                durees = []
+                for i in range(connexions):
+                    client = Client()
+                    debut = time.perf_counter()
+                    response = client.post(url, {
+                        'username': utilisateurs[i % comptes].username, 'password': MOT_DE_PASSE,
+                    })
+                    durees.append(time.perf_counter() - debut)
+                    if response.status_code != 302:
+                        raise RuntimeError(f"Connexion refusée ({response.status_code}) avec {hacheur}")
+                transaction.set_rollback(True)
+        return {
+            'hachage_ms': hachage * 1000,
+            'p50_ms': centile(durees, 50) * 1000,
+            'p95_ms': centile(durees, 95) * 1000,
+            'par_seconde': len(durees) / sum(durees),
+        }
@@ -0,0 +1,147 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from benchmarks.harnais import centile
+from formateurs.models import Formateur
+from formations.models import Domaine, Formation
+from planning import disponibilites, occupation
+from planning.conflits import detecter_conflits
+from planning.models import Cours, Salle
+
+SCENARIOS = {}
+
+
+def scenario(nom, objectif_ms):
+    """
+    Enregistre un scénario : une fonction qui prépare ses données (dans une
+    transaction annulée) et renvoie l'appel à chronométrer.
+    """
+    def enregistrer(preparer):
+        SCENARIOS[nom] = (preparer, objectif_ms)
+        return preparer
+    return enregistrer
+
+
+def creer_formateurs(nombre):
+    return Formateur.objects.bulk_create([
+        Formateur(user=user, specialite='', experience=1, bio='', matricule=f'BENCH-{user.pk}')
+        for user in CustomUser.objects.bulk_create([
+            CustomUser(username=f'bench-planning-{i}', email=f'bench-planning-{i}@example.com')
+            for i in range(nombre)
+        ])
+    ])
+
+
+@scenario('conflits', objectif_ms=500)
+def conflits_trimestre(echelle):
+    """Un trimestre de 2 000 cours sans conflit : 10 formateurs x 4 créneaux x 50 jours"""
+    debut = datetime.date(2025, 9, 1)
+    lot = [
+        Cours(formateur_id=formateur, titre='Cours', date=debut + datetime.timedelta(days=jour),
+              heure_debut=datetime.time(8 + 2 * creneau), heure_fin=datetime.time(9 + 2 * creneau))
+        for jour in range(max(1, round(50 * echelle))) for creneau in range(4) for formateur in range(10)
+    ]
+    return lambda: detecter_conflits(lot, avec_existants=False)
+
+
+@scenario('disponibilites', objectif_ms=50)
+def disponibilites_semaine(echelle):
+    """
+    Formateurs libres sur une heure, parmi 500 ayant chacun sur la semaine une
+    fenêtre DISPONIBLE par jour, une indisponibilité et 10 cours
+    """
+    lundi = datetime.date(2025, 9, 1)
+
+    def moment(heure, jours=0):
+        return timezone.make_aware(datetime.datetime.combine(lundi + datetime.timedelta(days=jours),
+                                                             datetime.time(heure)))
+
+    formateur_ids = range(max(1, round(500 * echelle)))
+    fenetres, occupes = [], []
+    for formateur_id in formateur_ids:
+        for jour in range(5):
+            fenetres.append((formateur_id, moment(8, jour), moment(18, jour), 'DISPONIBLE'))
+            occupes.append((formateur_id, moment(9 + formateur_id % 4, jour), moment(10 + formateur_id % 4, jour)))
+            occupes.append((formateur_id, moment(14, jour), moment(15, jour)))
+        fenetres.append((formateur_id, moment(16, 2), moment(20, 2), 'INDISPONIBLE'))
+
+    def rechercher():
+        agenda = disponibilites.Agenda(moment(0), moment(0, 7), formateur_ids, fenetres, occupes)
+        return [f for f in formateur_ids if agenda.est_libre(f, moment(10, 1), moment(11, 1))]
+    return rechercher
+
+
+@scenario('occupation', objectif_ms=1000)
+def occupation_annuelle(echelle):
+    """Année ISO 2025, 100 salles, trois cours par jour ouvré (78 000 cours), cache vide"""
+    if occupation.np is None:
+        raise occupation.AnalyseIndisponible("L'analyse d'occupation des salles exige NumPy.")
+    nombre = max(1, round(100 * echelle))
+    formation = Formation.objects.create(
+        domaine=Domaine.objects.create(nom='Bench planning'), reference='BENCH-PLANNING', titre='Bench',
+        description='', objectifs='', public_cible='', duree_jours=1, prix=0,
+    )
+    salles = Salle.objects.bulk_create([
+        Salle(nom=f'BENCH-{i:03d}', capacite=30, batiment=f'BENCH-{i // 20}', etage=i % 20 // 5)
+        for i in range(nombre)
+    ])
+    formateurs = creer_formateurs(nombre)
+    Cours.objects.bulk_create([
+        Cours(formation=formation, formateur=formateur, salle=salle, titre='Cours',
+              date=lundi + datetime.timedelta(days=jour),
+              heure_debut=datetime.time(debut, 30 if rang else 0),
+              heure_fin=datetime.time(debut + 2, 30 if rang else 0))
+        for lundi in occupation.semaines_iso(2025) for jour in range(5)
+        for salle, formateur in zip(salles, formateurs)
+        for rang, debut in enumerate((8, 11, 15))
+    ], batch_size=2000)
+
+    def analyser():
+        occupation.cache_occupation().clear()
+        return occupation.analyser(2025)
+    return analyser
+
+
+class Command(BaseCommand):
+    help = ("Chronomètre les calculs de planning sur des volumes réalistes (conflits, formateurs libres, "
+            "occupation des salles) et les compare à leur objectif. Les données sont créées dans une transaction annulée.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS, dest='scenarios',
+                            help="Limiter à ce scénario (option répétable)")
+        parser.add_argument('--repetitions', type=int, default=3, help="Appels mesurés par scénario")
+        parser.add_argument('--echelle', type=float, default=1.0,
+                            help="Multiplie les volumes ; les objectifs ne valent qu'à l'échelle 1")
+
+    def handle(self, *args, **options):
+        depasses = []
+        for nom in options['scenarios'] or SCENARIOS:
+            preparer, objectif = SCENARIOS[nom]
+            try:
+                with transaction.atomic():
+                    appel = preparer(options['echelle'])
+                    durees = []
+                    for _ in range(options['repetitions']):
+                        debut = time.perf_counter()
+                        appel()
+                        durees.append((time.perf_counter() - debut) * 1000)
+                    transaction.set_rollback(True)
+            except occupation.AnalyseIndisponible as e:
+                self.stdout.write(self.style.WARNING(f"{nom:<15} indisponible : {e}"))
+                continue
+            p50, maximum = centile(durees, 50), max(durees)
+            ligne = f"{nom:<15} p50 {p50:>9.1f} ms  max {maximum:>9.1f} ms  objectif {objectif:>6} ms"
+            if options['echelle'] != 1:
+                self.stdout.write(ligne)
+            elif p50 <= objectif:
+                self.stdout.write(self.style.SUCCESS(ligne))
+            else:
+                depasses.append(nom)
+                self.stdout.write(self.style.ERROR(ligne))
+        if depasses:
+            raise CommandError(f"Au-dessus de l'objectif : {', '.join(depasses)}")
@@ -0,0 +1,53 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from benchmarks.harnais import centile
+from documents.models import Document, Tag, decouper_tags, normaliser_tag
+
+
+def chronometrer(fonction, repetitions):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        resultat = fonction()
+        durees.append(time.perf_counter() - debut)
+    return resultat, centile(durees, 50) * 1000
+
+
+class Command(BaseCommand):
+    help = ("Compare, sur les documents de la base, le filtrage « documents ayant tous ces mots-clés » et "
+            "le nuage de mots-clés entre l'ancienne chaîne « a, b, c » (LIKE) et les tables normalisées.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('tags', nargs='*', help="Mots-clés à combiner (par défaut : les deux plus fréquents)")
+        parser.add_argument('--repetitions', type=int, default=5)
+
+    def handle(self, *args, **options):
+        repetitions = options['repetitions']
+        nuage, duree = chronometrer(lambda: Tag.objects.nuage(), repetitions)
+        self.stdout.write(f"{Document.objects.count()} documents, {len(nuage)} mots-clés")
+        self.stdout.write(f"nuage      normalisé {duree:10.1f} ms")
+
+        def nuage_chaine():
+            compteur = Counter()
+            for texte in Document.objects.values_list('tags_texte', flat=True).iterator(chunk_size=5000):
+                compteur.update(normaliser_tag(nom) for nom in decouper_tags(texte))
+            return compteur
+        _, duree = chronometrer(nuage_chaine, repetitions)
+        self.stdout.write(f"nuage      chaîne    {duree:10.1f} ms")
+
+        noms = options['tags'] or [tag.nom for tag in nuage[:2]]
+        for combinaison in ([noms[0]], noms):
+            libelle = ' + '.join(combinaison)
+            nombre, duree = chronometrer(lambda: Document.objects.avec_tags(combinaison).count(), repetitions)
+            self.stdout.write(f"{libelle:<25} normalisé {duree:10.1f} ms  {nombre} documents")
+
+            def chaine():
+                queryset = Document.objects.all()
+                for nom in combinaison:
+                    queryset = queryset.filter(tags_texte__icontains=nom)
+                return queryset.count()
+            nombre, duree = chronometrer(chaine, repetitions)
+            self.stdout.write(f"{libelle:<25} chaîne    {duree:10.1f} ms  {nombre} documents (faux positifs compris)")
@@ -0,0 +1,75 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from benchmarks.donnees import generer
+from benchmarks.requetes import REQUETES
+from eleves.models import Eleve
+from formateurs.models import Formateur
+from formations.models import Formation
+
+
+class Command(BaseCommand):
+    help = ("Compare les plans d'exécution (EXPLAIN) et les temps des requêtes des vues "
+            "avec et sans les index composites. Tout est annulé en fin de commande.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--eleves', type=int, default=5000,
+                            help="Élèves à semer si la base en contient moins")
+        parser.add_argument('--repetitions', type=int, default=20,
+                            help="Exécutions de chaque requête pour la mesure de temps")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if Eleve.objects.count() < options['eleves']:
+                self.stdout.write(f"Semis de {options['eleves']} élèves (annulé en fin de commande)...")
+                generer(eleves=options['eleves'], formateurs=100, formations=100, semaines=12)
+            connection.cursor().execute('ANALYZE')
+
+            echantillon = {
+                'eleve': Eleve.objects.filter(presences__isnull=False).order_by('pk').first(),
+                'formateur': Formateur.objects.filter(cours__isnull=False).order_by('pk').first(),
+                'formation': Formation.objects.filter(inscriptions__isnull=False).order_by('pk').first(),
+            }
+            # Éditeur utilisé seulement pour générer le SQL : sur SQLite, un éditeur
+            # de schéma ouvert (with) refuse de s'exécuter dans une transaction.
+            editeur = connection.SchemaEditorClass(connection, collect_sql=True)
+
+            for requete in REQUETES:
+                queryset = requete.construire(echantillon)
+                avec = self.mesurer(queryset, options['repetitions'], 'avec')
+                index = [i for i in requete.modele._meta.indexes if i.name in requete.index]
+                with connection.cursor() as curseur:
+                    for un_index in index:
+                        curseur.execute(editeur.sql_delete_index % {
+                            'table': editeur.quote_name(requete.modele._meta.db_table),
+                            'name': editeur.quote_name(un_index.name),
+                        })
+                    sans = self.mesurer(queryset, options['repetitions'], 'sans')
+                    for un_index in index:
+                        curseur.execute(str(un_index.create_sql(requete.modele, editeur)))
+
+                self.stdout.write(self.style.MIGRATE_HEADING(f"\n{requete.nom}  ({requete.origine})"))
+                self.stdout.write(f"  sans {', '.join(requete.index)} : {sans[1]:.3f} ms")
+                self.stdout.write(self.indenter(sans[0]))
+                self.stdout.write(self.style.SUCCESS(f"  avec index : {avec[1]:.3f} ms"))
+                self.stdout.write(self.indenter(avec[0]))
+
+            transaction.set_rollback(True)
+
+    def mesurer(self, queryset, repetitions, variante):
+        """Renvoie (plan, durée moyenne en ms) d'une requête"""
+        # Le commentaire rend le texte SQL unique : sqlite3 garde sinon en cache
+        # le plan préparé avant la suppression de l'index.
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as curseur:
+            curseur.execute(f'{connection.ops.explain_query_prefix()} /* {variante} */ {sql}', params)
+            plan = '\n'.join(' '.join(str(colonne) for colonne in ligne) for ligne in curseur.fetchall())
+        debut = time.perf_counter()
+        for _ in range(repetitions):
+            list(queryset.all())
+        return plan, (time.perf_counter() - debut) / repetitions * 1000
+
+    def indenter(self, texte):
+        return '\n'.join(f'    {ligne}' for ligne in texte.splitlines())
@@ -0,0 +1,50 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from benchmarks.harnais import ROLES, charger, comparer, executer
+
+
+class Command(BaseCommand):
+    help = ("Appelle chaque URL du projet pour chaque rôle avec le client de test et écrit "
+            "latences p50/p95, nombre de requêtes SQL et pic mémoire dans un rapport JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help="Appels mesurés par URL")
+        parser.add_argument('--role', action='append', choices=ROLES, dest='roles',
+                            help="Limiter à ce rôle (option répétable)")
+        parser.add_argument('--filtre', help="Ne mesurer que les URL ou noms de vue contenant ce texte")
+        parser.add_argument('--sortie', default='bench_report.json', help="Fichier du rapport JSON")
+        parser.add_argument('--comparer', metavar='RAPPORT',
+                            help="Rapport précédent : signale les vues en régression")
+        parser.add_argument('--seuil', type=float, default=0.2,
+                            help="Hausse relative de la latence p95 tolérée avant régression")
+
+    def handle(self, *args, **options):
+        def journal(mesure):
+            self.stdout.write(
+                f"{mesure['role']:<10} {mesure['statut']} {mesure['url']:<45} "
+                f"p50 {mesure['p50_ms']:>8.2f} ms  p95 {mesure['p95_ms']:>8.2f} ms  "
+                f"{mesure['requetes']:>4} req.  {mesure['memoire_pic_ko']:>8.1f} Ko"
+            )
+
+        rapport = executer(
+            iterations=options['iterations'],
+            roles=options['roles'] or ROLES,
+            filtre=options['filtre'],
+            journal=journal if options['verbosity'] else None,
+        )
+        with open(options['sortie'], 'w', encoding='utf-8') as fichier:
+            json.dump(rapport, fichier, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Rapport écrit dans {options['sortie']}"))
+
+        if options['comparer']:
+            regressions = comparer(charger(options['comparer']), rapport, options['seuil'])
+            for regression in regressions:
+                avant, apres = regression['avant'], regression['apres']
+                self.stdout.write(self.style.WARNING(
+                    f"{apres['role']} {apres['route']} : p95 {avant['p95_ms']} -> {apres['p95_ms']} ms, "
+                    f"requêtes {avant['requetes']} -> {apres['requetes']}"
+                ))
+            if not regressions:
+                self.stdout.write(self.style.SUCCESS("Aucune régression."))
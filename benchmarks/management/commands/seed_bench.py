@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from benchmarks.donnees import MOT_DE_PASSE, generer
+
+
+class Command(BaseCommand):
+    help = ("Sème un jeu de données synthétique volumineux (utilisateurs, formations, cours, "
+            "présences, documents...) par insertions groupées, pour les mesures de performance.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=2000, help="Nombre d'élèves")
+        parser.add_argument('--trainers', type=int, default=None,
+                            help="Nombre de formateurs (par défaut : un pour 40 élèves)")
+        parser.add_argument('--formations', type=int, default=50, help="Nombre de formations")
+        parser.add_argument('--weeks', type=int, default=12,
+                            help="Semaines de cours passées (deux séances par formation et par semaine)")
+        parser.add_argument('--rooms', type=int, default=30, help="Nombre de salles")
+        parser.add_argument('--documents', type=int, default=20, help="Documents par formateur")
+        parser.add_argument('--seed', type=int, default=0, help="Graine du générateur aléatoire")
+
+    def handle(self, *args, **options):
+        formateurs = options['trainers'] or max(1, options['students'] // 40)
+        comptes = generer(
+            eleves=options['students'],
+            formateurs=formateurs,
+            formations=options['formations'],
+            semaines=options['weeks'],
+            salles=options['rooms'],
+            documents_par_formateur=options['documents'],
+            graine=options['seed'],
+            journal=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(comptes.values())} lignes insérées. Mot de passe des comptes : {MOT_DE_PASSE}"
+        ))
@@ -0,0 +1,66 @@
+"""
+Formes de requêtes réellement émises par les vues, et les index qui les servent.
+
+Chaque entrée construit le queryset à partir d'un échantillon de la base
+(un élève, un formateur, une formation) pour pouvoir l'expliquer (EXPLAIN)
+avec et sans l'index correspondant.
+"""
+import datetime
+from collections import namedtuple
+
+from documents.models import Document
+from eleves.models import Inscription
+from planning.models import Cours, Disponibilite
+from presence.models import Presence
+
+RequeteIndexee = namedtuple('RequeteIndexee', ['nom', 'origine', 'modele', 'index', 'construire'])
+
+
+def _aujourd_hui():
+    return datetime.date.today()
+
+
+REQUETES = [
+    RequeteIndexee(
+        "Présences d'un élève", 'presence/views.py PresenceListView, eleves/views.py MesPresencesListView',
+        Presence, ['presence_eleve_present_idx'],
+        lambda e: Presence.objects.filter(eleve=e['eleve'], present=True).order_by(),
+    ),
+    RequeteIndexee(
+        "Cours d'un formateur sur 7 jours", 'formateurs/views.py DashboardView',
+        Cours, ['cours_formateur_date_idx'],
+        lambda e: Cours.objects.filter(
+            formateur=e['formateur'],
+            date__range=(_aujourd_hui(), _aujourd_hui() + datetime.timedelta(days=7)),
+        ).order_by('date', 'heure_debut'),
+    ),
+    RequeteIndexee(
+        "Calendrier sur 30 jours", 'planning/views.py CalendrierView',
+        Cours, ['cours_creneau_idx'],
+        lambda e: Cours.objects.filter(
+            date__range=(_aujourd_hui(), _aujourd_hui() + datetime.timedelta(days=30)),
+        ).order_by('date', 'heure_debut'),
+    ),
+    RequeteIndexee(
+        "Inscriptions validées d'un élève", 'eleves/views.py DashboardView',
+        Inscription, ['inscription_eleve_statut_idx'],
+        lambda e: Inscription.objects.filter(eleve=e['eleve'], statut='valide').order_by(),
+    ),
+    RequeteIndexee(
+        "Liste d'appel d'une formation", 'presence/views.py MarquerPresenceView',
+        Inscription, ['inscription_valide_idx', 'inscription_form_statut_idx'],
+        lambda e: Inscription.objects.filter(formation=e['formation'], statut='valide').order_by(),
+    ),
+    RequeteIndexee(
+        "Documents d'un formateur", 'documents/views.py DocumentListView',
+        Document, ['document_formateur_date_idx'],
+        lambda e: Document.objects.filter(formateur=e['formateur']).order_by('-date_ajout')[:10],
+    ),
+    RequeteIndexee(
+        "Disponibilités à venir", 'planning/views.py DisponibiliteListView',
+        Disponibilite, ['dispo_formateur_fin_idx'],
+        lambda e: Disponibilite.objects.filter(
+            formateur=e['formateur'], date_fin__gte=_aujourd_hui()
+        ).order_by('date_debut'),
+    ),
+]
@@ -0,0 +1,71 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from accounts.models import CustomUser
+from formateurs.models import FormateurEleve
+from planning.models import Cours
+from presence.models import AttendanceSummary, Presence
+
+from .donnees import generer
+from .harnais import comparer, executer, lister_routes
+
+
+class BancEssaiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.comptes = generer(eleves=40, formateurs=3, formations=4, semaines=2, salles=3,
+                              documents_par_formateur=2)
+
+    def test_generer_remplit_toutes_les_tables(self):
+        self.assertEqual(self.comptes['CustomUser'], 43)
+        self.assertEqual(self.comptes['Presence'], Presence.objects.count())
+        self.assertGreater(self.comptes['Presence'], 0)
+        self.assertEqual(self.comptes['AttendanceSummary'], AttendanceSummary.objects.count())
+        self.assertEqual(self.comptes['FormateurEleve'], FormateurEleve.objects.count())
+        self.assertGreater(self.comptes['FormateurEleve'], 0)
+
+    def test_liens_formateurs_eleves_coherents(self):
+        # Lève CommandError s'il manque des liens formateur → élève
+        call_command('liens_formateurs_eleves', '--verifier', stdout=StringIO())
+
+    def test_routes_sans_admin(self):
+        routes = [route for _, route, _ in lister_routes()]
+        self.assertIn('planning/cours/<int:pk>/', routes)
+        self.assertFalse(any(route.startswith('admin/') for route in routes))
+
+    def test_rapport_et_comparaison(self):
+        rapport = executer(iterations=2, roles=('formateur',), filtre='/planning/')
+        json.dumps(rapport)
+        self.assertTrue(rapport['vues'])
+        mesure = rapport['vues'][0]
+        for cle in ('p50_ms', 'p95_ms', 'requetes', 'memoire_pic_ko', 'statut'):
+            self.assertIn(cle, mesure)
+        # Session et utilisateur au moins : les requêtes faites pendant la réponse sont comptées
+        self.assertTrue(any(vue['requetes'] > 0 for vue in rapport['vues']))
+        # Le compte administrateur du banc d'essai n'est pas conservé
+        self.assertFalse(CustomUser.objects.filter(username='bench-admin').exists())
+
+        ancien = json.loads(json.dumps(rapport))
+        ancien['vues'][0]['requetes'] -= 1
+        regressions = comparer(ancien, rapport)
+        self.assertEqual([r['apres']['route'] for r in regressions], [mesure['route']])
+
+    def test_reponses_en_flux(self):
+        # Export CSV (StreamingHttpResponse) et fichiers servis par FileResponse
+        rapport = executer(iterations=1, roles=('formateur',), filtre='/presence/export/')
+        mesure, = rapport['vues']
+        self.assertEqual(mesure['statut'], 200)
+        self.assertGreater(mesure['taille_octets'], 0)
+        self.assertGreater(mesure['requetes'], 0)
+
+    def test_bench_planning_a_petite_echelle(self):
+        sortie = StringIO()
+        nombre = Cours.objects.count()
+        call_command('bench_planning', '--echelle', '0.02', '--repetitions', '1', stdout=sortie)
+        self.assertIn('occupation', sortie.getvalue())
+        # Données du scénario annulées
+        self.assertEqual(Cours.objects.count(), nombre)
@@ -1,12 +1,25 @@
+import os
+
 from django import forms
-from .models import Document
+from django.core.files import File
+from django.core.files.uploadedfile import UploadedFile
+from django.http import QueryDict
+from .models import Document, decouper_tags, espace_restant
 from django.utils.translation import gettext_lazy as _
+from fichiers import morceaux
 
 class DocumentForm(forms.ModelForm):
     """
     Formulaire pour la création et la modification de documents.
     Gère la validation pour s'assurer qu'un fichier ou une URL est soumis, mais pas les deux.
     """
+    # Saisie libre « a, b, c », convertie en mots-clés normalisés à l'enregistrement
+    tags = forms.CharField(
+        label=_('Mots-clés (séparés par des virgules)'),
+        required=False,
+        max_length=255,
+    )
+
     class Meta:
         model = Document
         fields = [
@@ -16,8 +29,7 @@ class DocumentForm(forms.ModelForm):
             'type_document', # Bien que auto-détecté, utile pour la sélection initiale ou la modification manuelle
             'description', 
             'formations', 
-            'visible_eleves', 
-            'tags'
+            'visible_eleves',
         ]
         widgets = {
             'description': forms.Textarea(attrs={'rows': 4}),
@@ -31,13 +43,38 @@ class DocumentForm(forms.ModelForm):
             'description': _('Description'),
             'formations': _('Formations associées'),
             'visible_eleves': _('Visible par les élèves'),
-            'tags': _('Mots-clés (séparés par des virgules)'),
         }
         help_texts = {
             'fichier': _("Téléchargez un fichier. Si vous fournissez une URL, laissez ce champ vide."),
             'url': _("Saisissez une URL. Si vous téléchargez un fichier, laissez ce champ vide."),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.initial.setdefault('tags', self.instance.tags_texte)
+
+    def clean_fichier(self):
+        """Taille maximale d'un envoi direct et quota du formateur (les gros fichiers passent par morceaux)"""
+        fichier = self.cleaned_data.get('fichier')
+        if isinstance(fichier, UploadedFile):
+            taille_max = morceaux.reglage('TAILLE_MAX_FORMULAIRE')
+            if fichier.size > taille_max:
+                raise forms.ValidationError(
+                    _("Fichier trop volumineux (%(max)s Mo au plus) : utilisez le téléversement par morceaux."),
+                    code='taille_max', params={'max': taille_max // (1024 * 1024)}
+                )
+            if self.instance.formateur_id and fichier.size > espace_restant(self.instance.formateur):
+                raise forms.ValidationError(_("Quota de stockage dépassé."), code='quota')
+        return fichier
+
+    def clean_tags(self):
+        return decouper_tags(self.cleaned_data['tags'])
+
+    def _save_m2m(self):
+        super()._save_m2m()
+        self.instance.definir_tags(self.cleaned_data['tags'])
+
     def clean(self):
         """
         Validation personnalisée pour s'assurer que soit 'fichier', soit 'url' est renseigné, mais pas les deux.
@@ -64,3 +101,47 @@ class DocumentForm(forms.ModelForm):
         # et vice versa pour l'URL. Cela est géré par la méthode save du modèle, donc pas besoin ici.
         return cleaned_data
 
+
+
+class TeleversementForm(DocumentForm):
+    """
+    Ouverture d'un téléversement par morceaux : les champs du document, plus le
+    nom et la taille du fichier à venir. Les données du formulaire sont gardées
+    dans le Televersement et revalidées pour créer le document à la fin.
+    """
+    nom_fichier = forms.CharField(label=_('Nom du fichier'), max_length=255)
+    taille = forms.IntegerField(label=_('Taille (octets)'), min_value=1)
+
+    class Meta(DocumentForm.Meta):
+        fields = ['titre', 'description', 'formations', 'visible_eleves']
+
+    @classmethod
+    def depuis_metadonnees(cls, metadonnees, **kwargs):
+        donnees = QueryDict(mutable=True)
+        for nom, valeurs in metadonnees.items():
+            donnees.setlist(nom, valeurs)
+        return cls(donnees, **kwargs)
+
+    def metadonnees(self):
+        """Données soumises, sérialisables en JSON ({champ: [valeurs]})"""
+        return {nom: self.data.getlist(nom) for nom in self.fields if nom in self.data}
+
+    def clean_nom_fichier(self):
+        nom = os.path.basename(self.cleaned_data['nom_fichier'].replace('\\', '/'))
+        for validateur in Document._meta.get_field('fichier').validators:
+            validateur(File(None, name=nom))
+        return nom
+
+    def clean_taille(self):
+        taille = self.cleaned_data['taille']
+        taille_max = morceaux.reglage('TAILLE_MAX')
+        if taille > taille_max:
+            raise forms.ValidationError(
+                _("Fichier trop volumineux (%(max)s Mo au plus)."),
+                code='taille_max', params={'max': taille_max // (1024 * 1024)}
+            )
+        return taille
+
+    def clean(self):
+        # Ni fichier ni URL à ce stade : le fichier arrive ensuite, par morceaux
+        return forms.ModelForm.clean(self)
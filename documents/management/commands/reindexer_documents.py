@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from documents import recherche
+
+
+class Command(BaseCommand):
+    help = ("(Ré)installe l'index plein texte des documents et le reconstruit à partir de la table "
+            "documents_document (après une migration SQLite qui a reconstruit la table, par exemple).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connexion = connections[options['database']]
+        with transaction.atomic(using=options['database']):
+            recherche.desinstaller(connexion)
+            recherche.installer(connexion)
+        self.stdout.write(self.style.SUCCESS(f"Index plein texte reconstruit ({connexion.vendor})."))
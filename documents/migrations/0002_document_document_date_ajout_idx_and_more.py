@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0001_initial'),
+        ('formateurs', '0001_initial'),
+        ('formations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['-date_ajout'], name='document_date_ajout_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['formateur', '-date_ajout'], name='document_formateur_date_idx'),
+        ),
+    ]
@@ -0,0 +1,71 @@
+from django.db import migrations
+
+# Index plein texte tel qu'il était à cette migration ; copié ici plutôt qu'importé
+# de documents.recherche, pour que ce que fait la migration ne change plus.
+SQL = {
+    'sqlite': [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS documents_recherche USING fts5(
+            titre, description, tags,
+            content='documents_document', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS documents_recherche_ai AFTER INSERT ON documents_document BEGIN
+            INSERT INTO documents_recherche(rowid, titre, description, tags)
+            VALUES (new.id, new.titre, new.description, new.tags);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS documents_recherche_ad AFTER DELETE ON documents_document BEGIN
+            INSERT INTO documents_recherche(documents_recherche, rowid, titre, description, tags)
+            VALUES ('delete', old.id, old.titre, old.description, old.tags);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS documents_recherche_au AFTER UPDATE OF titre, description, tags
+            ON documents_document BEGIN
+            INSERT INTO documents_recherche(documents_recherche, rowid, titre, description, tags)
+            VALUES ('delete', old.id, old.titre, old.description, old.tags);
+            INSERT INTO documents_recherche(rowid, titre, description, tags)
+            VALUES (new.id, new.titre, new.description, new.tags);
+        END""",
+        "INSERT INTO documents_recherche(documents_recherche, rank) VALUES ('rank', 'bm25(10.0, 1.0, 5.0)')",
+        "INSERT INTO documents_recherche(documents_recherche) VALUES ('rebuild')",
+    ],
+    'postgresql': [
+        """ALTER TABLE documents_document ADD COLUMN IF NOT EXISTS recherche tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('french'::regconfig, coalesce(titre, '')), 'A')
+                || setweight(to_tsvector('french'::regconfig, coalesce(tags, '')), 'B')
+                || setweight(to_tsvector('french'::regconfig, coalesce(description, '')), 'C')
+            ) STORED""",
+        'CREATE INDEX IF NOT EXISTS document_recherche_gin ON documents_document USING gin (recherche)',
+    ],
+}
+
+SQL_SUPPRESSION = {
+    'sqlite': [
+        'DROP TRIGGER IF EXISTS documents_recherche_ai',
+        'DROP TRIGGER IF EXISTS documents_recherche_ad',
+        'DROP TRIGGER IF EXISTS documents_recherche_au',
+        'DROP TABLE IF EXISTS documents_recherche',
+    ],
+    'postgresql': [
+        'DROP INDEX IF EXISTS document_recherche_gin',
+        'ALTER TABLE documents_document DROP COLUMN IF EXISTS recherche',
+    ],
+}
+
+
+def executer(instructions):
+    def operation(apps, schema_editor):
+        with schema_editor.connection.cursor() as curseur:
+            for sql in instructions.get(schema_editor.connection.vendor, []):
+                curseur.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0002_document_document_date_ajout_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(executer(SQL), executer(SQL_SUPPRESSION)),
+    ]
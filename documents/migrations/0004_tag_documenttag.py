@@ -0,0 +1,111 @@
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+TAILLE_LOT = 5000
+
+
+# Découpage et normalisation tels qu'ils étaient à cette migration ; copiés ici
+# plutôt qu'importés de documents.models, pour que la migration ne change plus.
+def normaliser_tag(nom):
+    decompose = unicodedata.normalize('NFKD', nom)
+    sans_accents = ''.join(c for c in decompose if not unicodedata.combining(c))
+    return ' '.join(sans_accents.casefold().split())
+
+
+def decouper_tags(texte):
+    noms = {}
+    for nom in (texte or '').split(','):
+        nom = ' '.join(nom.split())
+        if nom:
+            noms.setdefault(normaliser_tag(nom), nom)
+    return list(noms.values())
+
+
+def repartir_tags(apps, schema_editor):
+    """Découpe les chaînes « a, b, c » existantes en mots-clés normalisés et liaisons"""
+    Document = apps.get_model('documents', 'Document')
+    Tag = apps.get_model('documents', 'Tag')
+    DocumentTag = apps.get_model('documents', 'DocumentTag')
+
+    liens = {}
+    noms = {}
+    for document_id, texte in Document.objects.exclude(tags_texte='').values_list('id', 'tags_texte').iterator():
+        cles = []
+        for nom in decouper_tags(texte):
+            cle = normaliser_tag(nom)[:50]
+            noms.setdefault(cle, nom[:50])
+            cles.append(cle)
+        liens[document_id] = set(cles)
+
+    Tag.objects.bulk_create([Tag(nom=nom, nom_normalise=cle) for cle, nom in noms.items()],
+                            batch_size=TAILLE_LOT, ignore_conflicts=True)
+    tag_ids = dict(Tag.objects.values_list('nom_normalise', 'id'))
+    lot = []
+    for document_id, cles in liens.items():
+        lot.extend(DocumentTag(document_id=document_id, tag_id=tag_ids[cle]) for cle in cles)
+        if len(lot) >= TAILLE_LOT:
+            DocumentTag.objects.bulk_create(lot, ignore_conflicts=True)
+            lot = []
+    DocumentTag.objects.bulk_create(lot, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0003_recherche_plein_texte'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=50, verbose_name='Nom')),
+                ('nom_normalise', models.CharField(editable=False, max_length=50, unique=True, verbose_name='Nom normalisé')),
+            ],
+            options={
+                'verbose_name': 'Mot-clé',
+                'verbose_name_plural': 'Mots-clés',
+                'ordering': ['nom_normalise'],
+            },
+        ),
+        # La colonne « tags » reste en place (l'index plein texte la lit) : seul le champ est renommé
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RenameField(model_name='document', old_name='tags', new_name='tags_texte'),
+                migrations.AlterField(
+                    model_name='document',
+                    name='tags_texte',
+                    field=models.CharField(blank=True, db_column='tags', editable=False, max_length=255, verbose_name='Mots-clés (texte)'),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DocumentTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_tags', to='documents.document')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_tags', to='documents.tag')),
+            ],
+            options={
+                'verbose_name': 'Mot-clé du document',
+                'verbose_name_plural': 'Mots-clés des documents',
+                'constraints': [models.UniqueConstraint(fields=('document', 'tag'), name='document_tag_unique')],
+                'indexes': [models.Index(fields=['tag', 'document'], name='document_tag_tag_idx')],
+            },
+        ),
+        # Un ManyToManyField à table de liaison explicite n'a pas de colonne ; sous SQLite, AddField
+        # reconstruirait pourtant documents_document, ce qui supprimerait les déclencheurs de l'index plein texte
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddField(
+                    model_name='document',
+                    name='tags',
+                    field=models.ManyToManyField(blank=True, related_name='documents', through='documents.DocumentTag', to='documents.tag', verbose_name='Mots-clés'),
+                ),
+            ],
+        ),
+        migrations.RunPython(repartir_tags, migrations.RunPython.noop),
+    ]
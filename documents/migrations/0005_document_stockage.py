@@ -0,0 +1,24 @@
+import django.core.validators
+import documents.models
+import fichiers.stockage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0004_tag_documenttag'),
+    ]
+
+    operations = [
+        # Le stockage n'a pas d'effet sur le schéma ; sous SQLite, AlterField reconstruirait la table
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='document',
+                    name='fichier',
+                    field=models.FileField(blank=True, help_text='Fichier à uploader (max 20Mo)', null=True, storage=fichiers.stockage.stockage_documents, upload_to=documents.models.document_upload_path, validators=[django.core.validators.FileExtensionValidator(['pdf', 'doc', 'docx', 'xls', 'xlsx', 'ppt', 'pptx', 'jpg', 'jpeg', 'png', 'mp4', 'mp3', 'avi', 'mov'])], verbose_name='Fichier'),
+                ),
+            ],
+        ),
+    ]
@@ -1,15 +1,145 @@
+import unicodedata
+
 from django.db import models
+from django.db.models import Count, Sum
 from django.utils.translation import gettext_lazy as _
 from django.urls import reverse
 from django.core.validators import FileExtensionValidator
 from formateurs.models import Formateur
+from fichiers import morceaux
+from fichiers.models import Blob, MetadonneesFichier, Televersement
+from fichiers.stockage import stockage_documents
 from formations.models import Formation
 
+SEPARATEUR_TAGS = ','
+
+
+def normaliser_tag(nom):
+    """Forme canonique d'un mot-clé : sans accents, en minuscules, espaces réduits"""
+    decompose = unicodedata.normalize('NFKD', nom)
+    sans_accents = ''.join(c for c in decompose if not unicodedata.combining(c))
+    return ' '.join(sans_accents.casefold().split())
+
+
+def decouper_tags(texte):
+    """Mots-clés d'une saisie « a, b, c », sans doublons (au sens de normaliser_tag), dans l'ordre"""
+    noms = {}
+    for nom in (texte or '').split(SEPARATEUR_TAGS):
+        nom = ' '.join(nom.split())
+        if nom:
+            noms.setdefault(normaliser_tag(nom), nom)
+    return list(noms.values())
+
+
+class TagQuerySet(models.QuerySet):
+
+    def pour_noms(self, noms, creer=False):
+        """Mots-clés correspondant à `noms` (normalisés), créés au besoin si `creer`"""
+        longueur = self.model._meta.get_field('nom_normalise').max_length
+        normalises = {normaliser_tag(nom)[:longueur]: nom[:longueur] for nom in noms}
+        normalises.pop('', None)
+        if creer and normalises:
+            self.bulk_create(
+                [self.model(nom=nom, nom_normalise=cle) for cle, nom in normalises.items()],
+                ignore_conflicts=True,
+            )
+        return self.filter(nom_normalise__in=list(normalises))
+
+    def nuage(self, documents=None):
+        """
+        Mots-clés annotés de leur nombre de documents (`nombre`), du plus au moins
+        fréquent : un GROUP BY sur la table de liaison, limité à `documents` si fourni.
+        """
+        liens = DocumentTag.objects.order_by()
+        if documents is not None:
+            liens = liens.filter(document__in=documents)
+        nombres = dict(liens.values('tag_id').annotate(nombre=Count('document_id')).values_list('tag_id', 'nombre'))
+        tags = list(self.filter(pk__in=nombres))
+        for tag in tags:
+            tag.nombre = nombres[tag.pk]
+        return sorted(tags, key=lambda tag: (-tag.nombre, tag.nom_normalise))
+
+
+class Tag(models.Model):
+    """Mot-clé de document, unique à la casse et aux accents près"""
+    nom = models.CharField(_('Nom'), max_length=50)
+    nom_normalise = models.CharField(_('Nom normalisé'), max_length=50, unique=True, editable=False)
+
+    objects = TagQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('Mot-clé')
+        verbose_name_plural = _('Mots-clés')
+        ordering = ['nom_normalise']
+
+    def __str__(self):
+        return self.nom
+
+    def save(self, *args, **kwargs):
+        self.nom_normalise = normaliser_tag(self.nom)
+        super().save(*args, **kwargs)
+
+
+class DocumentQuerySet(models.QuerySet):
+
+    def avec_tags(self, noms):
+        """
+        Documents portant tous les mots-clés `noms` : division relationnelle
+        (GROUP BY document HAVING COUNT = nombre de mots-clés) sur l'index (tag, document).
+        """
+        attendus = {normaliser_tag(nom) for nom in noms} - {''}
+        if not attendus:
+            return self
+        tag_ids = list(Tag.objects.pour_noms(noms).values_list('pk', flat=True))
+        if len(tag_ids) < len(attendus):
+            return self.none()
+        if len(tag_ids) == 1:
+            return self.filter(pk__in=DocumentTag.objects.filter(tag_id=tag_ids[0]).values('document_id'))
+        return self.filter(pk__in=DocumentTag.objects.filter(tag_id__in=tag_ids).order_by().values(
+            'document_id').annotate(nombre=Count('tag_id')).filter(nombre=len(tag_ids)).values('document_id'))
+
+    def accessibles_par(self, user):
+        """
+        Documents que `user` peut consulter, en une requête : les siens pour un
+        formateur ; pour un élève, ceux visibles et sans formation, ou liés à
+        une formation où son inscription est validée. Tout pour le personnel.
+        """
+        if not user.is_authenticated:
+            return self.none()
+        if user.is_superuser or user.is_staff:
+            return self
+        condition = models.Q(pk__in=[])
+        if user.profil_formateur is not None:
+            condition |= models.Q(formateur=user.profil_formateur)
+        if user.profil_eleve is not None:
+            liaisons = Document.formations.through.objects.filter(document_id=models.OuterRef('pk'))
+            condition |= models.Q(visible_eleves=True) & (
+                ~models.Exists(liaisons)
+                | models.Exists(liaisons.filter(
+                    formation__inscriptions__eleve=user.profil_eleve,
+                    formation__inscriptions__statut='valide',
+                ))
+            )
+        return self.filter(condition)
+
+    def volume(self):
+        """Octets occupés sur disque par les fichiers de ces documents, chaque contenu comptant une fois"""
+        return Blob.objects.filter(chemin__in=self.exclude(fichier='').values('fichier')).aggregate(
+            total=Sum('taille'))['total'] or 0
+
+
+def espace_restant(formateur):
+    """Octets encore disponibles pour `formateur` : quota, moins ses documents et ses téléversements en cours"""
+    en_cours = Televersement.objects.filter(proprietaire_id=formateur.user_id).aggregate(
+        total=Sum('taille'))['total'] or 0
+    return morceaux.reglage('QUOTA_FORMATEUR') - formateur.documents.volume() - en_cours
+
+
 def document_upload_path(instance, filename):
     """Chemin de stockage personnalisé pour les documents"""
     return f'documents/formateur_{instance.formateur.id}/{filename}'
 
-class Document(models.Model):
+class Document(MetadonneesFichier):
     DOCUMENT_TYPES = [
         ('PDF', 'PDF'),
         ('DOC', 'Document Word'),
@@ -36,6 +166,7 @@ class Document(models.Model):
     fichier = models.FileField(
         _('Fichier'),
         upload_to=document_upload_path,
+        storage=stockage_documents,
         validators=[
             FileExtensionValidator([
                 'pdf', 'doc', 'docx', 'xls', 'xlsx', 
@@ -84,17 +215,33 @@ class Document(models.Model):
         _('Dernière modification'),
         auto_now=True
     )
-    tags = models.CharField(
-        _('Mots-clés'),
+    tags = models.ManyToManyField(
+        Tag,
+        through='DocumentTag',
+        related_name='documents',
+        verbose_name=_('Mots-clés'),
+        blank=True,
+    )
+    # Copie dénormalisée des mots-clés (« a, b, c »), tenue à jour depuis `tags`
+    # par documents.signals ; sert à l'index plein texte et à l'affichage.
+    tags_texte = models.CharField(
+        _('Mots-clés (texte)'),
         max_length=255,
         blank=True,
-        help_text=_("Mots-clés séparés par des virgules pour faciliter la recherche")
+        editable=False,
+        db_column='tags',
     )
 
+    objects = DocumentQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('Document')
         verbose_name_plural = _('Documents')
         ordering = ['-date_ajout']
+        indexes = [
+            models.Index(fields=['-date_ajout'], name='document_date_ajout_idx'),
+            models.Index(fields=['formateur', '-date_ajout'], name='document_formateur_date_idx'),
+        ]
         permissions = [
             ('can_share_document', _('Peut partager des documents avec les élèves')),
             ('can_manage_all_documents', _('Peut gérer tous les documents')),
@@ -129,6 +276,12 @@ class Document(models.Model):
         
         super().save(*args, **kwargs)
 
+    def definir_tags(self, noms):
+        """Remplace les mots-clés du document (liste de noms ou saisie « a, b, c »)"""
+        if isinstance(noms, str):
+            noms = decouper_tags(noms)
+        self.tags.set(Tag.objects.pour_noms(noms, creer=True))
+
     def get_icon_class(self):
         """Renvoie la classe Font Awesome correspondant au type de document"""
         icons = {
@@ -145,9 +298,9 @@ class Document(models.Model):
         return icons.get(self.type_document, 'fa-file')
 
     def get_file_size(self):
-        """Renvoie la taille du fichier formatée"""
-        if self.fichier and self.fichier.size:
-            size = self.fichier.size
+        """Renvoie la taille du fichier formatée (relevée au dépôt : le stockage n'est pas interrogé)"""
+        if self.fichier and self.taille:
+            size = self.taille
             if size < 1024:
                 return f"{size} octets"
             elif size < 1024 * 1024:
@@ -158,13 +311,26 @@ class Document(models.Model):
 
     def is_accessible_by(self, user):
         """Vérifie si l'utilisateur a accès à ce document"""
-        if hasattr(user, 'formateur') and user.formateur == self.formateur:
-            return True
-        if hasattr(user, 'eleve') and self.visible_eleves:
-            if self.formations.exists():
-                return user.eleve.inscription_set.filter(
-                    formation__in=self.formations.all(),
-                    statut='valide'
-                ).exists()
+        if user.is_authenticated and user.profil_formateur is not None \
+                and user.profil_formateur.pk == self.formateur_id:
             return True
-        return False
\ No newline at end of file
+        return Document.objects.accessibles_par(user).filter(pk=self.pk).exists()
+
+class DocumentTag(models.Model):
+    """Liaison document / mot-clé"""
+    document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='document_tags')
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE, related_name='document_tags')
+
+    class Meta:
+        verbose_name = _('Mot-clé du document')
+        verbose_name_plural = _('Mots-clés des documents')
+        constraints = [
+            models.UniqueConstraint(fields=['document', 'tag'], name='document_tag_unique'),
+        ]
+        indexes = [
+            # « Documents ayant ce mot-clé » : l'index unique (document, tag) sert le sens inverse
+            models.Index(fields=['tag', 'document'], name='document_tag_tag_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.document_id} - {self.tag_id}'
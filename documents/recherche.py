@@ -0,0 +1,154 @@
+"""
+Recherche plein texte dans les documents (titre, mots-clés, description).
+
+L'index inversé est tenu par la base elle-même, donc à jour quelle que soit
+la façon dont un document est écrit (save, delete, bulk_create, update) :
+
+- SQLite : table virtuelle FTS5 `documents_recherche` à contenu externe
+  (elle n'indexe que les colonnes de documents_document, sans les copier),
+  synchronisée par trois déclencheurs. Classement bm25, le titre pesant plus
+  que les mots-clés, eux-mêmes plus que la description.
+- PostgreSQL : colonne générée `recherche` (tsvector pondéré A/B/C, config
+  « french ») sur documents_document, avec un index GIN. Classement
+  ts_rank_cd.
+
+Les mots-clés sont indexés par leur copie texte (colonne « tags » de
+Document.tags_texte, tenue à jour depuis les Tag par documents.signals).
+Sur les autres bases, la recherche se rabat sur des `icontains`.
+
+Si une migration reconstruit la table documents_document sous SQLite
+(ce qui supprime ses déclencheurs), réinstaller avec
+`python manage.py reindexer_documents`.
+"""
+import re
+
+from django.db import connections
+from django.db.models import Q
+
+from .models import Tag
+
+TABLE_FTS = 'documents_recherche'
+# Poids bm25 des colonnes de la table FTS5 (titre, description, tags)
+POIDS_SQLITE = (10.0, 1.0, 5.0)
+CONFIG_PG = 'french'
+FACETTES_ECHANTILLON = 1000
+MOT = re.compile(r'\w+', re.UNICODE)
+
+SQL_SQLITE = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE_FTS} USING fts5(
+        titre, description, tags,
+        content='documents_document', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE_FTS}_ai AFTER INSERT ON documents_document BEGIN
+        INSERT INTO {TABLE_FTS}(rowid, titre, description, tags)
+        VALUES (new.id, new.titre, new.description, new.tags);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE_FTS}_ad AFTER DELETE ON documents_document BEGIN
+        INSERT INTO {TABLE_FTS}({TABLE_FTS}, rowid, titre, description, tags)
+        VALUES ('delete', old.id, old.titre, old.description, old.tags);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLE_FTS}_au AFTER UPDATE OF titre, description, tags
+        ON documents_document BEGIN
+        INSERT INTO {TABLE_FTS}({TABLE_FTS}, rowid, titre, description, tags)
+        VALUES ('delete', old.id, old.titre, old.description, old.tags);
+        INSERT INTO {TABLE_FTS}(rowid, titre, description, tags)
+        VALUES (new.id, new.titre, new.description, new.tags);
+    END""",
+    f"INSERT INTO {TABLE_FTS}({TABLE_FTS}, rank) VALUES ('rank', 'bm25({', '.join(map(str, POIDS_SQLITE))})')",
+    f"INSERT INTO {TABLE_FTS}({TABLE_FTS}) VALUES ('rebuild')",
+]
+SQL_SQLITE_SUPPRESSION = [
+    f'DROP TRIGGER IF EXISTS {TABLE_FTS}_ai',
+    f'DROP TRIGGER IF EXISTS {TABLE_FTS}_ad',
+    f'DROP TRIGGER IF EXISTS {TABLE_FTS}_au',
+    f'DROP TABLE IF EXISTS {TABLE_FTS}',
+]
+
+SQL_POSTGRESQL = [
+    f"""ALTER TABLE documents_document ADD COLUMN IF NOT EXISTS recherche tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('{CONFIG_PG}'::regconfig, coalesce(titre, '')), 'A')
+            || setweight(to_tsvector('{CONFIG_PG}'::regconfig, coalesce(tags, '')), 'B')
+            || setweight(to_tsvector('{CONFIG_PG}'::regconfig, coalesce(description, '')), 'C')
+        ) STORED""",
+    'CREATE INDEX IF NOT EXISTS document_recherche_gin ON documents_document USING gin (recherche)',
+]
+SQL_POSTGRESQL_SUPPRESSION = [
+    'DROP INDEX IF EXISTS document_recherche_gin',
+    'ALTER TABLE documents_document DROP COLUMN IF EXISTS recherche',
+]
+
+
+def installer(connexion):
+    """Crée l'index plein texte et le remplit à partir des documents existants"""
+    instructions = {'sqlite': SQL_SQLITE, 'postgresql': SQL_POSTGRESQL}.get(connexion.vendor, [])
+    with connexion.cursor() as curseur:
+        for sql in instructions:
+            curseur.execute(sql)
+
+
+def desinstaller(connexion):
+    instructions = {'sqlite': SQL_SQLITE_SUPPRESSION, 'postgresql': SQL_POSTGRESQL_SUPPRESSION}.get(
+        connexion.vendor, [])
+    with connexion.cursor() as curseur:
+        for sql in instructions:
+            curseur.execute(sql)
+
+
+def mots(texte):
+    return MOT.findall(texte or '')
+
+
+def expression_fts5(texte):
+    """Requête FTS5 : chaque mot, entre guillemets (aucun opérateur ne passe), en préfixe, tous requis"""
+    return ' '.join(f'"{mot}"*' for mot in mots(texte))
+
+
+def expression_tsquery(texte):
+    """Requête to_tsquery : chaque mot en préfixe, tous requis"""
+    return ' & '.join(f'{mot}:*' for mot in mots(texte))
+
+
+def rechercher(queryset, texte):
+    """
+    Restreint `queryset` (de Document) aux documents correspondant à `texte`,
+    annotés d'un attribut `rang` et triés du plus pertinent au moins pertinent.
+    """
+    if not mots(texte):
+        return queryset.none()
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        # Jointure sur la table FTS5 : un seul passage dans l'index, dont le rang (bm25, plus petit = meilleur)
+        return queryset.extra(
+            tables=[TABLE_FTS],
+            where=[f'{TABLE_FTS}.rowid = documents_document.id', f'{TABLE_FTS} MATCH %s'],
+            params=[expression_fts5(texte)],
+            select={'rang': f'{TABLE_FTS}.rank'},
+            order_by=['rang'],
+        )
+    if vendor == 'postgresql':
+        requete = f"to_tsquery('{CONFIG_PG}'::regconfig, %s)"
+        return queryset.extra(
+            where=[f'documents_document.recherche @@ {requete}'],
+            params=[expression_tsquery(texte)],
+            select={'rang': f'ts_rank_cd(documents_document.recherche, {requete})'},
+            select_params=[expression_tsquery(texte)],
+            order_by=['-rang'],
+        )
+    condition = Q()
+    for mot in mots(texte):
+        condition &= Q(titre__icontains=mot) | Q(description__icontains=mot) | Q(tags_texte__icontains=mot)
+    return queryset.filter(condition).extra(select={'rang': '0'})
+
+
+def facettes(queryset, limite=20, echantillon=FACETTES_ECHANTILLON):
+    """
+    [(mot-clé, nombre de documents)] les plus fréquents parmi les résultats,
+    comptés sur les `echantillon` premiers pour rester rapide sur les recherches très larges.
+    """
+    # Les identifiants sont matérialisés : la jointure FTS (extra) ne peut pas servir de sous-requête
+    ids = list(queryset.values_list('pk', flat=True)[:echantillon])
+    if not ids:
+        return []
+    return [(tag.nom, tag.nombre) for tag in Tag.objects.nuage(documents=ids)[:limite]]
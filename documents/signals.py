@@ -0,0 +1,49 @@
+from django.db.models.signals import m2m_changed, post_delete, pre_delete
+from django.dispatch import receiver
+
+from fichiers.references import suivre
+from .models import Document, DocumentTag, SEPARATEUR_TAGS, Tag
+
+
+def actualiser_tags_texte(document_ids):
+    """Recopie les mots-clés normalisés dans Document.tags_texte (lu par l'index plein texte)"""
+    noms = {document_id: [] for document_id in document_ids}
+    for document_id, nom in DocumentTag.objects.filter(document_id__in=noms).order_by(
+            'document_id', 'tag__nom_normalise').values_list('document_id', 'tag__nom'):
+        noms[document_id].append(nom)
+    longueur = Document._meta.get_field('tags_texte').max_length
+    par_texte = {}
+    for document_id, liste in noms.items():
+        par_texte.setdefault(f'{SEPARATEUR_TAGS} '.join(liste)[:longueur], []).append(document_id)
+    # Une mise à jour par texte distinct ; les déclencheurs de l'index plein texte suivent
+    for texte, ids in par_texte.items():
+        Document.objects.filter(pk__in=ids).exclude(tags_texte=texte).update(tags_texte=texte)
+
+
+@receiver(m2m_changed, sender=DocumentTag)
+def _tags_modifies(sender, instance, action, reverse, pk_set, **kwargs):
+    # tag.documents.clear() ne transmet pas les documents (pk_set vaut None) :
+    # on les relève avant, comme pour la suppression d'un mot-clé
+    if action == 'pre_clear' and reverse:
+        instance._documents_concernes = list(instance.document_tags.values_list('document_id', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        actualiser_tags_texte([instance.pk])
+    elif action == 'post_clear':
+        actualiser_tags_texte(getattr(instance, '_documents_concernes', []))
+    elif pk_set:
+        actualiser_tags_texte(pk_set)
+
+
+@receiver(pre_delete, sender=Tag)
+def _tag_a_supprimer(sender, instance, **kwargs):
+    instance._documents_concernes = list(instance.document_tags.values_list('document_id', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def _tag_supprime(sender, instance, **kwargs):
+    actualiser_tags_texte(getattr(instance, '_documents_concernes', []))
+
+
+suivre(Document, 'fichier')
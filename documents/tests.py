@@ -1,3 +1,272 @@
-from django.test import TestCase
+import base64
+import hashlib
+import importlib
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from formateurs.models import Formateur
+from eleves.models import Eleve, Inscription
+from fichiers.models import Televersement
+from formations.models import Domaine, Formation
+from .models import Document, DocumentTag, Tag
+
+
+class DocumentsTestCase(TestCase):
+    """Un formateur connecté et trois documents à mots-clés"""
+
+    def setUp(self):
+        self.formateur = self.creer_formateur('formateur', 'F001')
+        self.client.force_login(self.formateur.user)
+        self.pandas = self.creer('Analyse de données avec Pandas', 'python, data', 'Séries et DataFrame.')
+        self.django = self.creer('Django avancé', 'python, web', 'Vues génériques et ORM ; un mot sur Pandas.')
+        self.excel = self.creer('Tableaux croisés', 'bureautique', 'Excel pour les données.')
+
+    def creer_formateur(self, username, matricule):
+        user = CustomUser.objects.create(username=username, email=f'{username}@example.com', is_formateur=True)
+        return Formateur.objects.create(user=user, specialite='Python', experience=5, bio='', matricule=matricule)
+
+    def creer(self, titre, tags, description, formateur=None):
+        document = Document.objects.create(
+            formateur=formateur or self.formateur, titre=titre, description=description,
+            url='https://example.com/',
+        )
+        document.definir_tags(tags)
+        return document
+
+
+class RechercheDocumentsTests(DocumentsTestCase):
+    """Index plein texte tenu à jour par la base, résultats classés et facettes de mots-clés"""
+
+    def rechercher(self, **params):
+        response = self.client.get(reverse('documents:recherche'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_classement_prefixe_et_accents(self):
+        resultats = self.rechercher(q='pand')['resultats']
+        # Le titre pèse plus que la description
+        self.assertEqual([r['id'] for r in resultats], [self.pandas.pk, self.django.pk])
+        self.assertEqual([r['id'] for r in self.rechercher(q='donnees')['resultats']],
+                         [self.pandas.pk, self.excel.pk])
+        self.assertEqual(self.rechercher(q='pandas")*')['resultats'][0]['id'], self.pandas.pk)
+
+    def test_index_synchronise(self):
+        self.excel.titre = 'Excel et Pandas'
+        self.excel.save()
+        self.pandas.delete()
+        Document.objects.filter(pk=self.django.pk).update(description='Rien à voir.')
+        self.assertEqual([r['id'] for r in self.rechercher(q='pandas')['resultats']], [self.excel.pk])
+
+    def test_facettes_filtre_et_droits(self):
+        autre = self.creer_formateur('autre', 'F002')
+        self.creer('Pandas pour tous', 'python', '', formateur=autre)
+        donnees = self.rechercher(q='pandas')
+        self.assertEqual(len(donnees['resultats']), 2)
+        self.assertEqual(donnees['facettes'][0], {'tag': 'python', 'nombre': 2})
+        self.assertEqual([r['id'] for r in self.rechercher(q='pandas', tag='Web')['resultats']], [self.django.pk])
+
+        response = self.client.get(reverse('documents:list'), {'q': 'python'})
+        self.assertEqual([d.pk for d in response.context['documents']], [self.pandas.pk, self.django.pk])
+        self.assertIn(('python', 2), response.context['facettes'])
+
+
+class TagsTests(DocumentsTestCase):
+    """Mots-clés normalisés : unicité, nuage, documents portant tous les mots-clés"""
+
+    def test_normalisation_et_texte_denormalise(self):
+        self.creer('Réseaux', ' Python ,PYTHON, Sécurité ', '')
+        self.assertEqual(Tag.objects.filter(nom_normalise='python').count(), 1)
+        self.assertTrue(Tag.objects.filter(nom_normalise='securite').exists())
+        document = Document.objects.get(titre='Réseaux')
+        self.assertEqual(document.tags_texte, 'python, Sécurité')
+        document.tags.remove(Tag.objects.get(nom_normalise='python'))
+        document.refresh_from_db()
+        self.assertEqual(document.tags_texte, 'Sécurité')
+        Tag.objects.get(nom_normalise='securite').delete()
+        document.refresh_from_db()
+        self.assertEqual(document.tags_texte, '')
+
+    def test_retrait_d_un_mot_cle_de_tous_ses_documents(self):
+        Tag.objects.get(nom_normalise='python').documents.clear()
+        self.pandas.refresh_from_db()
+        self.django.refresh_from_db()
+        self.assertEqual((self.pandas.tags_texte, self.django.tags_texte), ('data', 'web'))
+
+    def test_documents_avec_tous_les_tags(self):
+        self.assertEqual(set(Document.objects.avec_tags(['python'])), {self.pandas, self.django})
+        self.assertEqual(list(Document.objects.avec_tags(['Python', 'WEB'])), [self.django])
+        self.assertEqual(list(Document.objects.avec_tags(['python', 'inconnu'])), [])
+
+    def test_nuage(self):
+        nuage = [(tag.nom, tag.nombre) for tag in Tag.objects.nuage()]
+        self.assertEqual(nuage[0], ('python', 2))
+        self.assertEqual(len(nuage), 4)
+        nuage = [(tag.nom, tag.nombre) for tag in Tag.objects.nuage(documents=[self.excel.pk])]
+        self.assertEqual(nuage, [('bureautique', 1)])
+
+    def test_migration_des_chaines(self):
+        migration = importlib.import_module('documents.migrations.0004_tag_documenttag')
+        DocumentTag.objects.all().delete()
+        Document.objects.filter(pk=self.pandas.pk).update(tags_texte='Data, python,  data ,Débutant')
+        migration.repartir_tags(apps, None)
+        self.assertEqual(
+            sorted(self.pandas.tags.values_list('nom_normalise', flat=True)), ['data', 'debutant', 'python'])
+
+    def test_formulaire(self):
+        response = self.client.post(reverse('documents:create'), {
+            'titre': 'Nouveau', 'url': 'https://example.com/', 'type_document': 'LINK',
+            'description': '', 'visible_eleves': 'on', 'tags': 'Python, Nouveau',
+        })
+        self.assertEqual(response.status_code, 302)
+        document = Document.objects.get(titre='Nouveau')
+        self.assertEqual(set(document.tags.values_list('nom_normalise', flat=True)), {'python', 'nouveau'})
+
+
+class TeleversementTests(DocumentsTestCase):
+    """Téléversement reprenable par morceaux : reprise, empreintes, quota, document créé à la fin"""
+
+    VIDEO = bytes(range(256)) * 10
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        reglages = override_settings(MEDIA_ROOT=self.media, TELEVERSEMENTS={
+            'TAILLE_MORCEAU': 1024, 'TAILLE_MAX_FORMULAIRE': 1024, 'QUOTA_FORMATEUR': 4096})
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.addCleanup(shutil.rmtree, self.media)
+
+    def ouvrir(self, taille=None, **donnees):
+        donnees = {'titre': 'Captation', 'description': '', 'tags': 'vidéo', 'nom_fichier': 'Cours.MP4',
+                   'taille': len(self.VIDEO) if taille is None else taille, **donnees}
+        return self.client.post(reverse('documents:televersements'), donnees)
+
+    def envoyer(self, url, decalage, morceau, empreinte=None):
+        headers = {'Upload-Offset': str(decalage)}
+        if empreinte is not None:
+            headers['Upload-Checksum'] = 'sha256 ' + base64.b64encode(empreinte).decode()
+        return self.client.patch(url, morceau, content_type='application/offset+octet-stream', headers=headers)
+
+    def test_reprise_et_creation_du_document(self):
+        response = self.ouvrir()
+        self.assertEqual(response.status_code, 201)
+        url = response['Location']
+        self.assertEqual(response.json()['taille_morceau'], 1024)
+
+        response = self.envoyer(url, 0, self.VIDEO[:1024], hashlib.sha256(self.VIDEO[:1024]).digest())
+        self.assertEqual(response['Upload-Offset'], '1024')
+        # Morceau corrompu : refusé, rien n'est gardé
+        response = self.envoyer(url, 1024, self.VIDEO[1024:2048], hashlib.sha256(b'autre').digest())
+        self.assertEqual(response.status_code, 400)
+        # Reprise au mauvais endroit : le serveur indique où reprendre
+        response = self.envoyer(url, 0, self.VIDEO[:1024])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.client.get(url).json()['recu'], 1024)
+        self.assertEqual(self.envoyer(url, 1024, self.VIDEO[1024:2048]).status_code, 200)
+        self.assertFalse(Document.objects.filter(titre='Captation').exists())
+
+        response = self.envoyer(url, 2048, self.VIDEO[2048:])
+        self.assertEqual(response.status_code, 201)
+        document = Document.objects.get(pk=response.json()['document'])
+        self.assertEqual(document.type_document, 'VID')
+        self.assertEqual(document.fichier.name.rsplit('/', 1)[1], hashlib.sha256(self.VIDEO).hexdigest() + '.mp4')
+        with document.fichier.open('rb') as fichier:
+            self.assertEqual(fichier.read(), self.VIDEO)
+        self.assertEqual(document.tags_texte, 'vidéo')
+        self.assertFalse(Televersement.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media, '.televersements')), [])
+
+    def test_morceau_trop_grand_et_abandon(self):
+        url = self.ouvrir()['Location']
+        self.assertEqual(self.envoyer(url, 0, self.VIDEO[:2048]).status_code, 413)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(Televersement.objects.exists())
+        self.assertEqual(os.listdir(os.path.join(self.media, '.televersements')), [])
+
+    def test_quota_et_validation(self):
+        self.assertEqual(self.ouvrir(nom_fichier='script.exe').status_code, 400)
+        self.assertEqual(self.ouvrir(taille=3000).status_code, 201)
+        # 3000 octets réservés sur 4096 : le téléversement en cours compte dans le quota
+        self.assertEqual(self.ouvrir(taille=2000).status_code, 413)
+
+        response = self.client.post(reverse('documents:create'), {
+            'titre': 'Gros', 'type_document': 'VID', 'description': '',
+            'fichier': SimpleUploadedFile('gros.mp4', self.VIDEO),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Document.objects.filter(titre='Gros').exists())
+
+
+class TelechargementTests(DocumentsTestCase):
+    """Fichier servi après contrôle d'accès en une requête, avec plages et validateurs"""
+
+    CONTENU = bytes(range(256)) * 4
+
+    def setUp(self):
+        super().setUp()
+        self.media = tempfile.mkdtemp()
+        reglages = override_settings(MEDIA_ROOT=self.media)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.addCleanup(shutil.rmtree, self.media)
+        self.formation = Formation.objects.create(
+            domaine=Domaine.objects.create(nom='Informatique'), reference='PY', titre='Python',
+            description='', objectifs='', public_cible='', duree_jours=1, prix=0,
+        )
+        self.video = Document.objects.create(
+            formateur=self.formateur, titre='Séance 1', visible_eleves=True,
+            fichier=ContentFile(self.CONTENU, name='seance.mp4'),
+        )
+        self.video.formations.add(self.formation)
+        self.url = reverse('documents:fichier', kwargs={'pk': self.video.pk})
+
+    def creer_eleve(self, username, statut):
+        user = CustomUser.objects.create(username=username, email=f'{username}@example.com')
+        eleve = Eleve.objects.create(user=user, numero_etudiant=username)
+        Inscription.objects.create(eleve=eleve, formation=self.formation, statut=statut)
+        return eleve
+
+    def test_acces(self):
+        inscrit, en_attente = self.creer_eleve('inscrit', 'valide'), self.creer_eleve('attente', 'en_attente')
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.client.force_login(en_attente.user)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_login(inscrit.user)
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENU)
+        self.assertEqual(response['Content-Type'], 'video/mp4')
+        self.assertEqual(response['Content-Disposition'], 'inline; filename="seance-1.mp4"')
+
+        inscrit.user.resoudre_roles()
+        with self.assertNumQueries(1):
+            self.assertTrue(self.video.is_accessible_by(inscrit.user))
+
+    def test_plages_et_validateurs(self):
+        response = self.client.get(self.url, headers={'Range': 'bytes=1000-'})
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 1000-1023/1024')
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENU[1000:])
+        response = self.client.get(self.url, headers={'Range': 'bytes=-4'})
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENU[-4:])
+        self.assertEqual(self.client.get(self.url, headers={'Range': 'bytes=2000-'}).status_code, 416)
+
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(etag, '"%s"' % hashlib.sha256(self.CONTENU).hexdigest())
+        self.assertEqual(self.client.get(self.url, headers={'If-None-Match': etag}).status_code, 304)
+        # Fichier changé depuis le début du téléchargement : tout le fichier, pas la plage
+        response = self.client.get(self.url, headers={'Range': 'bytes=0-9', 'If-Range': '"autre"'})
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(TELECHARGEMENTS={'MODE': 'x-accel-redirect'})
+    def test_delegation_au_serveur_frontal(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/media-protege/' + self.video.fichier.name)
+        self.assertEqual(response.content, b'')
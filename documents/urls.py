@@ -6,7 +6,12 @@ app_name = 'documents'  # Nom de votre application
 
 urlpatterns = [
     path('', views.DocumentListView.as_view(), name='list'),
+    path('recherche/', views.DocumentRechercheView.as_view(), name='recherche'),
     path('ajouter/', views.DocumentCreateView.as_view(), name='create'),
+    path('televersements/', views.TeleversementCreateView.as_view(), name='televersements'),
+    path('televersements/<uuid:pk>/', views.TeleversementView.as_view(), name='televersement'),
     path('<int:pk>/', views.DocumentDetailView.as_view(), name='detail'),
+    path('<int:pk>/fichier/', views.DocumentTelechargementView.as_view(), name='fichier'),
+    path('<int:pk>/apercu/', views.DocumentApercuView.as_view(), name='apercu'),
     # ... autres paths
 ]
\ No newline at end of file
@@ -1,13 +1,23 @@
+import os
+
 from django.shortcuts import render, get_object_or_404, redirect
+from django.db import transaction
+from django.http import Http404, HttpResponse, JsonResponse
+from django.views import View
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
 
-from .models import Document
-from .forms import DocumentForm
+from . import recherche
+from .models import Document, decouper_tags, espace_restant
+from .forms import DocumentForm, TeleversementForm
+from django.utils.text import slugify
+from fichiers import apercus, morceaux, telechargement
+from fichiers.models import Televersement
 from formateurs.models import Formateur # Assurez-vous d'importer Formateur pour les checks
+from gestion_formation.pagination import KeysetPaginationMixin
 
 # Mixin personnalisé pour restreindre l'accès aux formateurs
 class FormateurRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
@@ -16,15 +26,35 @@ class FormateurRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
     """
     def test_func(self):
         # Vérifie si l'utilisateur est authentifié et a un profil de formateur
-        return self.request.user.is_authenticated and hasattr(self.request.user, 'formateur')
+        return self.request.user.is_authenticated and self.request.user.profil_formateur is not None
 
     def handle_no_permission(self):
         messages.error(self.request, _("Vous n'avez pas la permission d'accéder à cette page."))
         return redirect(reverse_lazy('accueil')) # Redirige vers une page d'accueil ou d'accès refusé
 
 
+class RechercheDocumentsMixin:
+    """Documents visibles par l'utilisateur, filtrés par `?q=` (plein texte, classé) et `?tag=`"""
+
+    def documents_accessibles(self):
+        if self.request.user.is_superuser or self.request.user.is_staff:
+            return Document.objects.all()
+        return Document.objects.filter(formateur=self.request.user.profil_formateur)
+
+    def get_recherche(self):
+        return self.request.GET.get('q', '').strip(), self.request.GET.get('tag', '').strip()
+
+    def filtrer(self, queryset):
+        texte, tag = self.get_recherche()
+        if tag:
+            queryset = queryset.avec_tags([tag])
+        if texte:
+            queryset = recherche.rechercher(queryset, texte)
+        return queryset
+
+
 # Vues pour le modèle Document
-class DocumentListView(FormateurRequiredMixin, ListView):
+class DocumentListView(FormateurRequiredMixin, RechercheDocumentsMixin, KeysetPaginationMixin, ListView):
     model = Document
     template_name = 'documents/document_list.html' # Créez ce template
     context_object_name = 'documents'
@@ -35,9 +65,55 @@ class DocumentListView(FormateurRequiredMixin, ListView):
         Retourne uniquement les documents associés au formateur connecté.
         Les super-utilisateurs et staff peuvent voir tous les documents.
         """
-        if self.request.user.is_superuser or self.request.user.is_staff:
-            return Document.objects.all().order_by('-date_ajout')
-        return Document.objects.filter(formateur=self.request.user.formateur).order_by('-date_ajout')
+        return self.filtrer(self.documents_accessibles().order_by('-date_ajout'))
+
+    def paginate_queryset(self, queryset, page_size):
+        # Les résultats d'une recherche sont triés par pertinence : pagination par numéro de page
+        if self.get_recherche()[0]:
+            return ListView.paginate_queryset(self, queryset, page_size)
+        return super().paginate_queryset(queryset, page_size)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['q'], context['tag'] = self.get_recherche()
+        context['facettes'] = recherche.facettes(self.object_list)
+        vignettes = apercus.pour_fichiers(document.fichier.name for document in context['documents'])
+        for document in context['documents']:
+            document.apercu = vignettes.get(document.fichier.name)
+        return context
+
+
+class DocumentRechercheView(FormateurRequiredMixin, RechercheDocumentsMixin, View):
+    """Recherche au format JSON : `?q=texte&tag=mot-clé&limite=20`"""
+    limite_max = 50
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limite = min(max(int(request.GET.get('limite', 20)), 1), self.limite_max)
+        except ValueError:
+            limite = 20
+        texte, tag = self.get_recherche()
+        if not texte and not tag:
+            return JsonResponse({'q': texte, 'tag': tag, 'resultats': [], 'facettes': []})
+        queryset = self.filtrer(self.documents_accessibles())
+        if not texte:
+            queryset = queryset.order_by('-date_ajout')
+        return JsonResponse({
+            'q': texte,
+            'tag': tag,
+            'resultats': [
+                {
+                    'id': document.pk,
+                    'titre': document.titre,
+                    'type': document.type_document,
+                    'tags': decouper_tags(document.tags_texte),
+                    'url': document.get_absolute_url(),
+                    'rang': getattr(document, 'rang', None),
+                }
+                for document in queryset.only('titre', 'type_document', 'tags_texte')[:limite]
+            ],
+            'facettes': [{'tag': nom, 'nombre': nombre} for nom, nombre in recherche.facettes(queryset)],
+        })
 
 
 class DocumentDetailView(FormateurRequiredMixin, DetailView):
@@ -51,7 +127,35 @@ class DocumentDetailView(FormateurRequiredMixin, DetailView):
         """
         if self.request.user.is_superuser or self.request.user.is_staff:
             return Document.objects.all()
-        return Document.objects.filter(formateur=self.request.user.formateur)
+        return Document.objects.filter(formateur=self.request.user.profil_formateur)
+
+
+class DocumentTelechargementView(LoginRequiredMixin, View):
+    """
+    Fichier d'un document, pour quiconque y a accès (Document.objects.accessibles_par).
+    Affiché dans le navigateur (lecture vidéo avec plages) ; `?telecharger=1` pour l'enregistrer.
+    """
+
+    def get(self, request, *args, **kwargs):
+        document = get_object_or_404(
+            Document.objects.accessibles_par(request.user).only('titre', 'fichier'), pk=self.kwargs['pk'])
+        extension = os.path.splitext(document.fichier.name or '')[1]
+        return telechargement.servir(
+            request, document.fichier, f"{slugify(document.titre) or 'document'}{extension}",
+            en_piece_jointe=bool(request.GET.get('telecharger')),
+        )
+
+
+class DocumentApercuView(LoginRequiredMixin, View):
+    """Vignette d'un document (fichiers.apercus), aux mêmes conditions d'accès que le fichier"""
+
+    def get(self, request, *args, **kwargs):
+        document = get_object_or_404(
+            Document.objects.accessibles_par(request.user).only('fichier'), pk=self.kwargs['pk'])
+        apercu = apercus.pour_fichiers([document.fichier.name]).get(document.fichier.name)
+        if apercu is None:
+            raise Http404
+        return telechargement.servir(request, apercu.vignette, f'apercu-{document.pk}.jpg')
 
 
 class DocumentCreateView(FormateurRequiredMixin, CreateView):
@@ -60,15 +164,119 @@ class DocumentCreateView(FormateurRequiredMixin, CreateView):
     template_name = 'documents/document_form.html' # Créez ce template
     success_url = reverse_lazy('documents:list') # Redirige vers la liste des documents après succès
 
+    def get_form_kwargs(self):
+        # Formateur connu dès la validation, pour le contrôle du quota
+        kwargs = super().get_form_kwargs()
+        kwargs['instance'] = Document(formateur=self.request.user.profil_formateur)
+        return kwargs
+
     def form_valid(self, form):
         """
         Associe automatiquement le document au formateur connecté avant de sauvegarder.
         """
-        form.instance.formateur = self.request.user.formateur
+        form.instance.formateur = self.request.user.profil_formateur
         messages.success(self.request, _("Le document a été ajouté avec succès !"))
         return super().form_valid(form)
 
 
+class TeleversementCreateView(FormateurRequiredMixin, View):
+    """
+    Ouvre un téléversement par morceaux : POST des champs du document, de
+    `nom_fichier` et de `taille`. La taille est réservée sur le quota du
+    formateur ; la réponse (201) indique où envoyer les morceaux.
+    """
+
+    def post(self, request, *args, **kwargs):
+        form = TeleversementForm(request.POST)
+        if not form.is_valid():
+            return JsonResponse({'erreurs': form.errors.get_json_data()}, status=400)
+        formateur = request.user.profil_formateur
+        with transaction.atomic():
+            # Verrou sur le formateur : deux ouvertures simultanées ne dépassent pas le quota à elles deux
+            Formateur.objects.select_for_update().filter(pk=formateur.pk).first()
+            if form.cleaned_data['taille'] > espace_restant(formateur):
+                return JsonResponse({'erreurs': {'taille': [
+                    {'message': str(_("Quota de stockage dépassé.")), 'code': 'quota'}]}}, status=413)
+            televersement = morceaux.ouvrir(
+                request.user, form.cleaned_data['nom_fichier'], form.cleaned_data['taille'],
+                metadonnees=form.metadonnees(),
+            )
+        response = TeleversementView.etat(televersement, status=201)
+        response['Location'] = reverse('documents:televersement', kwargs={'pk': televersement.pk})
+        return response
+
+
+class TeleversementView(FormateurRequiredMixin, View):
+    """
+    Un téléversement en cours :
+
+    - GET / HEAD : état (`Upload-Offset` = octets reçus, d'où reprendre) ;
+    - PATCH : un morceau, corps brut, en-tête `Upload-Offset` (et facultatif
+      `Upload-Checksum: sha256 <base64>`). Le dernier morceau crée le document
+      (201) ; un décalage inattendu répond 409 avec le bon décalage ;
+    - DELETE : abandon.
+    """
+
+    @staticmethod
+    def etat(televersement, status=200):
+        response = JsonResponse({
+            'id': str(televersement.pk),
+            'nom': televersement.nom,
+            'taille': televersement.taille,
+            'recu': televersement.recu,
+            'taille_morceau': televersement.taille_morceau,
+            'url': reverse('documents:televersement', kwargs={'pk': televersement.pk}),
+        }, status=status)
+        response['Upload-Offset'] = televersement.recu
+        response['Upload-Length'] = televersement.taille
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    def get_object(self):
+        return get_object_or_404(Televersement, pk=self.kwargs['pk'], proprietaire=self.request.user)
+
+    def get(self, request, *args, **kwargs):
+        return self.etat(self.get_object())
+
+    def patch(self, request, *args, **kwargs):
+        televersement = self.get_object()
+        try:
+            decalage = int(request.headers['Upload-Offset'])
+            longueur = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            return JsonResponse({'erreur': "En-têtes Upload-Offset et Content-Length requis"}, status=400)
+        try:
+            empreinte = morceaux.lire_empreinte(request.headers.get('Upload-Checksum'))
+            # Le corps est lu directement depuis la requête, bloc par bloc
+            morceaux.ecrire_morceau(televersement, decalage, request, longueur, empreinte)
+        except morceaux.DecalageInvalide as erreur:
+            televersement.recu = erreur.recu
+            return self.etat(televersement, status=409)
+        except morceaux.ErreurMorceau as erreur:
+            return JsonResponse({'erreur': str(erreur)}, status=erreur.statut)
+        if not televersement.termine:
+            return self.etat(televersement)
+        return self.terminer(televersement)
+
+    def terminer(self, televersement):
+        """Fichier complet : création du document, dont le fichier rejoint le stockage"""
+        form = TeleversementForm.depuis_metadonnees(
+            televersement.metadonnees, instance=Document(formateur=self.request.user.profil_formateur))
+        if not form.is_valid():
+            # Par exemple une formation supprimée entre-temps
+            morceaux.abandonner(televersement)
+            return JsonResponse({'erreurs': form.errors.get_json_data()}, status=400)
+        with transaction.atomic(), morceaux.fichier_assemble(televersement) as fichier:
+            form.instance.fichier = fichier
+            document = form.save()
+            televersement.delete()
+        return JsonResponse({'document': document.pk, 'url': document.get_absolute_url()}, status=201)
+
+    def delete(self, request, *args, **kwargs):
+        morceaux.abandonner(self.get_object())
+        return HttpResponse(status=204)
+
+
 class DocumentUpdateView(FormateurRequiredMixin, UpdateView):
     model = Document
     form_class = DocumentForm
@@ -80,7 +288,7 @@ class DocumentUpdateView(FormateurRequiredMixin, UpdateView):
         """
         if self.request.user.is_superuser or self.request.user.is_staff:
             return Document.objects.all()
-        return Document.objects.filter(formateur=self.request.user.formateur)
+        return Document.objects.filter(formateur=self.request.user.profil_formateur)
 
     def get_success_url(self):
         messages.success(self.request, _("Le document a été mis à jour avec succès !"))
@@ -98,7 +306,7 @@ class DocumentDeleteView(FormateurRequiredMixin, DeleteView):
         """
         if self.request.user.is_superuser or self.request.user.is_staff:
             return Document.objects.all()
-        return Document.objects.filter(formateur=self.request.user.formateur)
+        return Document.objects.filter(formateur=self.request.user.profil_formateur)
 
     def delete(self, request, *args, **kwargs):
         messages.success(self.request, _("Le document a été supprimé avec succès !"))
@@ -1,3 +1,78 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.translation import gettext_lazy as _
+
+from .forms import ImportElevesForm
+from .importation import ImportEleves, ouvrir
+from .models import Eleve, Inscription
 
 # Register your models here.
+
+# Erreurs affichées dans la page d'import (le rapport complet reste téléchargeable par la commande)
+ERREURS_AFFICHEES = 200
+
+
+class InscriptionInline(admin.TabularInline):
+    model = Inscription
+    extra = 0
+    autocomplete_fields = ['formation']
+
+
+@admin.register(Eleve)
+class EleveAdmin(admin.ModelAdmin):
+    list_display = ('numero_etudiant', 'nom_complet', 'email', 'ville', 'created_at')
+    list_select_related = ('user',)
+    search_fields = ('numero_etudiant', 'user__last_name', 'user__first_name', 'user__email')
+    raw_id_fields = ('user',)
+    inlines = [InscriptionInline]
+    change_list_template = 'admin/eleves/eleve/change_list.html'
+
+    def get_urls(self):
+        return [
+            path('importer/', self.admin_site.admin_view(self.importer_view), name='eleves_eleve_importer'),
+        ] + super().get_urls()
+
+    def importer_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = ImportElevesForm(request.POST or None, request.FILES or None)
+        rapport = fichier = None
+        if request.method == 'POST' and form.is_valid():
+            try:
+                fichier = ouvrir(form.cleaned_data['fichier'].file)
+            except UnicodeDecodeError:
+                form.add_error('fichier', _("Encodage non reconnu : enregistrez le fichier en CSV UTF-8."))
+        if fichier is not None:
+            # Pas de pool de processus dans un processus web : hachage sur place
+            # (la commande import_eleves garde le pool pour les gros fichiers)
+            rapport = ImportEleves(
+                simulation=form.cleaned_data['simulation'], statut=form.cleaned_data['statut'], processus=1,
+            ).importer(fichier)
+            resume = _("%(lignes)s lignes lues, %(eleves)s élèves et %(inscriptions)s inscriptions %(action)s, "
+                       "%(rejetees)s lignes rejetées.") % {
+                'lignes': rapport.lignes, 'eleves': rapport.eleves, 'inscriptions': rapport.inscriptions,
+                'action': _("valides (simulation)") if rapport.simulation else _("créés"),
+                'rejetees': rapport.lignes_rejetees,
+            }
+            self.message_user(request, resume, messages.WARNING if rapport.erreurs else messages.SUCCESS)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': _("Importer des élèves"),
+            'form': form,
+            'rapport': rapport,
+            'erreurs': rapport.erreurs[:ERREURS_AFFICHEES] if rapport else [],
+        }
+        return TemplateResponse(request, 'admin/eleves/eleve/importer.html', context)
+
+
+@admin.register(Inscription)
+class InscriptionAdmin(admin.ModelAdmin):
+    list_display = ('eleve', 'formation', 'statut', 'date_inscription')
+    list_filter = ('statut', 'formation')
+    list_select_related = ('eleve__user', 'formation')
+    raw_id_fields = ('eleve',)
+    autocomplete_fields = ['formation']
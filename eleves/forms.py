@@ -2,7 +2,7 @@ from django import forms
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import FileExtensionValidator
 
-from .models import Eleve, DocumentEleve
+from .models import Eleve, DocumentEleve, Inscription
 
 class EleveUpdateForm(forms.ModelForm):
     class Meta:
@@ -46,4 +46,18 @@ class DocumentEleveForm(forms.ModelForm):
                 allowed_extensions=['pdf', 'doc', 'docx', 'jpg', 'jpeg', 'png'],
                 message=_("Seuls les fichiers PDF, Word et images sont acceptés")
             )
-        )
\ No newline at end of file
+        )
+
+
+class ImportElevesForm(forms.Form):
+    """Dépôt d'un export CSV d'élèves dans l'admin"""
+    fichier = forms.FileField(
+        label=_('Fichier CSV'),
+        validators=[FileExtensionValidator(allowed_extensions=['csv', 'txt'])],
+        help_text=_("Colonnes : email, nom, prenom, numero_etudiant, date_naissance, telephone, "
+                    "mot_de_passe, formations (références séparées par « | »), statut."),
+    )
+    statut = forms.ChoiceField(label=_("Statut des inscriptions"), choices=Inscription.STATUT_CHOICES,
+                               initial='valide', help_text=_("Quand la colonne « statut » est vide ou absente."))
+    simulation = forms.BooleanField(label=_('Simulation'), required=False, initial=True,
+                                    help_text=_("Valider le fichier sans rien enregistrer."))
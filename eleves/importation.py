@@ -0,0 +1,314 @@
+"""
+Import en masse d'élèves et de leurs inscriptions depuis un export CSV.
+
+Le fichier est lu au fil de l'eau et traité par lots : chaque lot est validé
+(champs, doublons dans le fichier et en base, formations connues), puis les
+mots de passe sont hachés dans un pool de processus (le PBKDF2 de Django est
+le goulot d'étranglement CPU), enfin CustomUser, Eleve et Inscription sont
+insérés par bulk_create dans une transaction par lot. Une ligne invalide est
+écartée et consignée dans le rapport, sans bloquer les autres.
+
+Colonnes reconnues (en-têtes français ou anglais) : email (obligatoire),
+nom, prenom, numero_etudiant, identifiant, date_naissance, telephone,
+mot_de_passe, formations (références séparées par « | »), statut.
+Sans mot de passe, le compte reçoit un mot de passe inutilisable : l'élève
+passe par la réinitialisation de mot de passe.
+"""
+import codecs
+import csv
+import io
+import datetime
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from accounts.models import CustomUser
+from formations.models import Formation
+from .models import Eleve, Inscription, inscriptions_importees
+
+TAILLE_LOT = 1000
+SEPARATEUR_FORMATIONS = '|'
+FORMATS_DATE = ('%Y-%m-%d', '%d/%m/%Y')
+# Essayés dans l'ordre quand l'encodage n'est pas imposé : UTF-8 (avec ou sans
+# BOM), puis Windows-1252, celui des exports Excel français
+ENCODAGES = ('utf-8-sig', 'cp1252')
+
+COLONNES = {
+    'email': ('email', 'e-mail', 'courriel', 'mail'),
+    'nom': ('nom', 'last_name', 'nom de famille'),
+    'prenom': ('prenom', 'prénom', 'first_name'),
+    'numero_etudiant': ('numero_etudiant', 'numéro étudiant', 'numero', 'student_id'),
+    'identifiant': ('identifiant', 'username', 'login'),
+    'date_naissance': ('date_naissance', 'date de naissance', 'birth_date'),
+    'telephone': ('telephone', 'téléphone', 'phone'),
+    'mot_de_passe': ('mot_de_passe', 'mot de passe', 'password'),
+    'formations': ('formations', 'formation', 'references'),
+    'statut': ('statut', 'status'),
+}
+
+
+class ErreurLigne:
+    """Erreur de validation d'une ligne du fichier (numérotée comme dans un tableur)"""
+
+    def __init__(self, ligne, champ, message, valeurs=None):
+        self.ligne = ligne
+        self.champ = champ
+        self.message = str(message)
+        self.valeurs = valeurs or {}
+
+    def __repr__(self):
+        return f'<ErreurLigne {self.ligne} {self.champ}: {self.message}>'
+
+
+class RapportImport:
+    def __init__(self, simulation=False):
+        self.simulation = simulation
+        self.lignes = 0
+        self.eleves = 0
+        self.inscriptions = 0
+        self.erreurs = []
+
+    @property
+    def lignes_rejetees(self):
+        return len({erreur.ligne for erreur in self.erreurs})
+
+    def ecrire_erreurs(self, fichier):
+        """Rapport d'erreurs CSV, une ligne par erreur"""
+        writer = csv.writer(fichier)
+        writer.writerow(['ligne', 'champ', 'erreur', 'email'])
+        for erreur in self.erreurs:
+            writer.writerow([erreur.ligne, erreur.champ, erreur.message, erreur.valeurs.get('email', '')])
+
+
+def _normaliser_entetes(entetes):
+    """{nom de colonne du fichier: champ reconnu}"""
+    alias = {nom: champ for champ, noms in COLONNES.items() for nom in noms}
+    return {entete: alias[entete.strip().lower()] for entete in entetes if entete and entete.strip().lower() in alias}
+
+
+def _date(valeur):
+    for format_ in FORMATS_DATE:
+        try:
+            return datetime.datetime.strptime(valeur, format_).date()
+        except ValueError:
+            pass
+    raise ValidationError(f"Date invalide : {valeur} (AAAA-MM-JJ ou JJ/MM/AAAA attendu)")
+
+
+def _initialiser_processus():
+    # Nécessaire quand les processus sont lancés par « spawn » (macOS, Windows)
+    django.setup()
+
+
+def _verifier_encodage(binaire, encodage):
+    decodeur = codecs.getincrementaldecoder(encodage)()
+    binaire.seek(0)
+    try:
+        for bloc in iter(lambda: binaire.read(1 << 16), b''):
+            decodeur.decode(bloc)
+        decodeur.decode(b'', final=True)
+    finally:
+        binaire.seek(0)
+
+
+def ouvrir(binaire, encodage=None):
+    """
+    Enveloppe un fichier binaire (rembobinable) pour ImportEleves.importer.
+
+    Le fichier est décodé en entier avant l'import : les lots étant enregistrés
+    au fil de l'eau, une erreur de décodage en cours de route laisserait un
+    import partiel. Lève UnicodeDecodeError si aucun encodage ne convient et
+    LookupError si `encodage` est inconnu.
+    """
+    encodages = (encodage,) if encodage else ENCODAGES
+    for encodage in encodages:
+        try:
+            _verifier_encodage(binaire, encodage)
+        except UnicodeDecodeError:
+            if encodage == encodages[-1]:
+                raise
+        else:
+            return io.TextIOWrapper(binaire, encoding=encodage, newline='')
+
+
+class ImportEleves:
+    """
+    Usage : `ImportEleves(simulation=True).importer(fichier_texte)` renvoie un
+    RapportImport. En simulation, tout est validé mais rien n'est haché ni écrit.
+    """
+
+    def __init__(self, simulation=False, taille_lot=TAILLE_LOT, processus=None, statut='valide',
+                 delimiteur=None):
+        self.simulation = simulation
+        self.taille_lot = taille_lot
+        self.processus = processus
+        self.statut = statut
+        self.delimiteur = delimiteur
+        self.statuts = {code for code, _ in Inscription.STATUT_CHOICES}
+        self.formations = dict(Formation.objects.values_list('reference', 'id'))
+        self.telephone = Eleve._meta.get_field('telephone')
+        # Doublons à l'intérieur du fichier
+        self.vus = {'email': set(), 'identifiant': set(), 'numero_etudiant': set()}
+
+    def importer(self, fichier):
+        rapport = RapportImport(self.simulation)
+        lecteur = self._lecteur(fichier)
+        entetes = _normaliser_entetes(lecteur.fieldnames or [])
+        if 'email' not in entetes.values():
+            rapport.erreurs.append(ErreurLigne(1, 'email', "Colonne « email » absente de l'en-tête."))
+            return rapport
+
+        pool = None
+        if not self.simulation and self.processus != 1:
+            pool = ProcessPoolExecutor(self.processus, initializer=_initialiser_processus)
+        try:
+            lot = []
+            for numero, brute in enumerate(lecteur, start=2):
+                rapport.lignes += 1
+                lot.append((numero, {champ: (brute.get(entete) or '').strip() for entete, champ in entetes.items()}))
+                if len(lot) >= self.taille_lot:
+                    self._traiter_lot(lot, rapport, pool)
+                    lot = []
+            if lot:
+                self._traiter_lot(lot, rapport, pool)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return rapport
+
+    def _lecteur(self, fichier):
+        # Sans délimiteur imposé, on le devine sur l'en-tête : les tableurs français exportent avec « ; »
+        entete = fichier.readline()
+        delimiteur = self.delimiteur or (';' if entete.count(';') > entete.count(',') else ',')
+        return csv.DictReader(itertools.chain([entete], fichier), delimiter=delimiteur)
+
+    def _traiter_lot(self, lot, rapport, pool):
+        valides = self._valider(lot, rapport)
+        if self.simulation:
+            rapport.eleves += len(valides)
+            rapport.inscriptions += sum(len(ligne['formation_ids']) for _, ligne in valides)
+            return
+
+        mots_de_passe = [ligne.get('mot_de_passe') or None for _, ligne in valides]
+        a_hacher = [mot for mot in mots_de_passe if mot]
+        if pool is not None and a_hacher:
+            hachages = iter(pool.map(make_password, a_hacher, chunksize=max(1, len(a_hacher) // 32)))
+        else:
+            hachages = iter(map(make_password, a_hacher))
+        hachages = [next(hachages) if mot else make_password(None) for mot in mots_de_passe]
+
+        with transaction.atomic():
+            utilisateurs = CustomUser.objects.bulk_create([
+                CustomUser(
+                    username=ligne['identifiant'], email=ligne['email'], first_name=ligne.get('prenom', ''),
+                    last_name=ligne.get('nom', ''), password=hachage, is_eleve=True,
+                )
+                for (_, ligne), hachage in zip(valides, hachages)
+            ], batch_size=self.taille_lot)
+            eleves = Eleve.objects.bulk_create([
+                Eleve(
+                    user=utilisateur, numero_etudiant=ligne['numero_etudiant'],
+                    date_naissance=ligne.get('date_naissance'), telephone=ligne.get('telephone') or None,
+                )
+                for utilisateur, (_, ligne) in zip(utilisateurs, valides)
+            ], batch_size=self.taille_lot)
+            inscriptions = Inscription.objects.bulk_create([
+                Inscription(eleve=eleve, formation_id=formation_id, statut=ligne['statut'])
+                for eleve, (_, ligne) in zip(eleves, valides)
+                for formation_id in ligne['formation_ids']
+            ], batch_size=self.taille_lot)
+            formation_ids = {inscription.formation_id for inscription in inscriptions}
+            if formation_ids:
+                # bulk_create n'émet pas post_save : on prévient les caches qui en dépendent
+                inscriptions_importees.send(sender=Inscription, formation_ids=formation_ids)
+        rapport.eleves += len(eleves)
+        rapport.inscriptions += len(inscriptions)
+
+    def _valider(self, lot, rapport):
+        """Renvoie [(numéro, ligne nettoyée)] des lignes valides ; consigne les erreurs des autres"""
+        nettoyees = []
+        for numero, ligne in lot:
+            erreurs = self._valider_ligne(numero, ligne)
+            if erreurs:
+                rapport.erreurs.extend(erreurs)
+            else:
+                nettoyees.append((numero, ligne))
+
+        # Doublons en base, en une requête par champ pour tout le lot ;
+        # adresses comparées en minuscules, comme celles du fichier
+        existants = {
+            'email': set(CustomUser.objects.annotate(email_minuscules=Lower('email')).filter(
+                email_minuscules__in=[ligne['email'] for _, ligne in nettoyees]
+            ).values_list('email_minuscules', flat=True)),
+            'identifiant': set(CustomUser.objects.filter(
+                username__in=[ligne['identifiant'] for _, ligne in nettoyees]).values_list('username', flat=True)),
+            'numero_etudiant': set(Eleve.objects.filter(
+                numero_etudiant__in=[ligne['numero_etudiant'] for _, ligne in nettoyees]
+            ).values_list('numero_etudiant', flat=True)),
+        }
+        valides = []
+        for numero, ligne in nettoyees:
+            doublons = [champ for champ, valeurs in existants.items() if ligne[champ] in valeurs]
+            for champ in doublons:
+                rapport.erreurs.append(ErreurLigne(numero, champ, f"Existe déjà en base : {ligne[champ]}", ligne))
+            if not doublons:
+                valides.append((numero, ligne))
+        return valides
+
+    def _valider_ligne(self, numero, ligne):
+        erreurs = []
+
+        def erreur(champ, message):
+            erreurs.append(ErreurLigne(numero, champ, message, ligne))
+
+        ligne['email'] = ligne.get('email', '').lower()
+        try:
+            validate_email(ligne['email'])
+        except ValidationError:
+            erreur('email', f"Adresse e-mail invalide : {ligne['email'] or '(vide)'}")
+        ligne['identifiant'] = ligne.get('identifiant') or ligne['email']
+        if len(ligne['identifiant']) > CustomUser._meta.get_field('username').max_length:
+            erreur('identifiant', "Identifiant trop long.")
+        ligne['numero_etudiant'] = (ligne.get('numero_etudiant') or '').upper()
+        if not ligne['numero_etudiant']:
+            erreur('numero_etudiant', "Numéro étudiant manquant.")
+        elif len(ligne['numero_etudiant']) > Eleve._meta.get_field('numero_etudiant').max_length:
+            erreur('numero_etudiant', "Numéro étudiant trop long.")
+
+        if ligne.get('date_naissance'):
+            try:
+                ligne['date_naissance'] = _date(ligne['date_naissance'])
+            except ValidationError as e:
+                erreur('date_naissance', e.messages[0])
+        else:
+            ligne['date_naissance'] = None
+        if ligne.get('telephone'):
+            try:
+                self.telephone.run_validators(ligne['telephone'])
+            except ValidationError as e:
+                erreur('telephone', e.messages[0])
+
+        ligne['statut'] = ligne.get('statut') or self.statut
+        if ligne['statut'] not in self.statuts:
+            erreur('statut', f"Statut inconnu : {ligne['statut']}")
+        references = [ref.strip() for ref in ligne.get('formations', '').split(SEPARATEUR_FORMATIONS) if ref.strip()]
+        inconnues = [ref for ref in references if ref not in self.formations]
+        if inconnues:
+            erreur('formations', f"Formation(s) inconnue(s) : {', '.join(inconnues)}")
+        ligne['formation_ids'] = list(dict.fromkeys(self.formations[ref] for ref in references if ref in self.formations))
+
+        for champ in self.vus:
+            valeur = ligne[champ]
+            if valeur and valeur in self.vus[champ]:
+                erreur(champ, f"En double dans le fichier : {valeur}")
+        if not erreurs:
+            for champ in self.vus:
+                self.vus[champ].add(ligne[champ])
+        return erreurs
+
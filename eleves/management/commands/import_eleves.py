@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from eleves.importation import TAILLE_LOT, ImportEleves, ouvrir
+from eleves.models import Inscription
+
+
+class Command(BaseCommand):
+    help = ("Importe des élèves et leurs inscriptions depuis un CSV (export de la scolarité) : "
+            "lecture en flux, validation et insertion par lots, hachage des mots de passe en parallèle.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', help="Fichier CSV (UTF-8 ou Windows-1252, séparateur « , » ou « ; »)")
+        parser.add_argument('--dry-run', action='store_true', dest='simulation',
+                            help="Valider le fichier sans rien enregistrer")
+        parser.add_argument('--rapport', help="Fichier CSV où écrire les erreurs ligne par ligne")
+        parser.add_argument('--lot', type=int, default=TAILLE_LOT, help="Lignes par lot")
+        parser.add_argument('--processus', type=int, default=None,
+                            help="Processus de hachage (par défaut : un par cœur ; 1 pour ne pas en lancer)")
+        parser.add_argument('--statut', default='valide',
+                            choices=[code for code, _ in Inscription.STATUT_CHOICES],
+                            help="Statut des inscriptions quand la colonne « statut » est vide")
+        parser.add_argument('--delimiteur', help="Séparateur de colonnes (deviné par défaut)")
+        parser.add_argument('--encodage',
+                            help="Encodage du fichier (par défaut : UTF-8, sinon Windows-1252)")
+
+    def handle(self, *args, **options):
+        importation = ImportEleves(
+            simulation=options['simulation'], taille_lot=options['lot'], processus=options['processus'],
+            statut=options['statut'], delimiteur=options['delimiteur'],
+        )
+        debut = time.perf_counter()
+        try:
+            with open(options['fichier'], 'rb') as binaire:
+                rapport = importation.importer(ouvrir(binaire, options['encodage']))
+        except OSError as e:
+            raise CommandError(str(e))
+        except LookupError:
+            raise CommandError(f"Encodage inconnu : {options['encodage']}")
+        except UnicodeDecodeError as e:
+            raise CommandError(f"Fichier illisible en {e.encoding} : enregistrez-le en UTF-8 "
+                               f"ou précisez son encodage avec --encodage.")
+        duree = time.perf_counter() - debut
+
+        if options['rapport']:
+            with open(options['rapport'], 'w', encoding='utf-8', newline='') as fichier:
+                rapport.ecrire_erreurs(fichier)
+        elif rapport.erreurs:
+            for erreur in rapport.erreurs[:20]:
+                self.stderr.write(f"ligne {erreur.ligne} [{erreur.champ}] {erreur.message}")
+            if len(rapport.erreurs) > 20:
+                self.stderr.write(f"... {len(rapport.erreurs) - 20} autres erreurs (voir --rapport)")
+
+        action = "validés (simulation)" if rapport.simulation else "créés"
+        style = self.style.WARNING if rapport.erreurs else self.style.SUCCESS
+        self.stdout.write(style(
+            f"{rapport.lignes} lignes lues en {duree:.1f} s : {rapport.eleves} élèves et "
+            f"{rapport.inscriptions} inscriptions {action}, {rapport.lignes_rejetees} lignes rejetées."
+        ))
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eleves', '0001_initial'),
+        ('formations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inscription',
+            index=models.Index(fields=['eleve', 'statut'], name='inscription_eleve_statut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inscription',
+            index=models.Index(fields=['formation', 'statut'], name='inscription_form_statut_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inscription',
+            index=models.Index(condition=models.Q(('statut', 'valide')), fields=['formation'], name='inscription_valide_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+import fichiers.stockage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eleves', '0002_inscription_indexes'),
+    ]
+
+    operations = [
+        # Le stockage n'a pas d'effet sur le schéma ; sous SQLite, AlterField reconstruirait la table
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name='documenteleve',
+                    name='fichier',
+                    field=models.FileField(storage=fichiers.stockage.stockage_documents, upload_to='eleves/documents/', verbose_name='Fichier'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eleves', '0003_documenteleve_stockage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documenteleve',
+            name='duree_televersement',
+            field=models.DurationField(blank=True, editable=False, null=True, verbose_name='Durée du téléversement'),
+        ),
+        migrations.AddField(
+            model_name='documenteleve',
+            name='empreinte',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, verbose_name='Empreinte SHA-256'),
+        ),
+        migrations.AddField(
+            model_name='documenteleve',
+            name='taille',
+            field=models.BigIntegerField(blank=True, editable=False, null=True, verbose_name='Taille (octets)'),
+        ),
+        migrations.AddField(
+            model_name='documenteleve',
+            name='type_mime',
+            field=models.CharField(blank=True, editable=False, max_length=100, null=True, verbose_name='Type MIME'),
+        ),
+    ]
@@ -4,6 +4,9 @@ from django.conf import settings  # Importe les paramètres de Django
 from django.utils.translation import gettext_lazy as _
 from django.urls import reverse
 from django.core.validators import RegexValidator
+from django.dispatch import Signal
+from fichiers.models import MetadonneesFichier
+from fichiers.stockage import stockage_documents
 from formations.models import Formation
 import uuid
 
@@ -81,6 +84,10 @@ class Eleve(models.Model):
         )
 
 
+# Émis par l'import en masse (eleves.importation), dont bulk_create ne déclenche pas post_save
+inscriptions_importees = Signal()
+
+
 class Inscription(models.Model):
     """
     Modèle pour gérer les inscriptions aux formations
@@ -110,6 +117,13 @@ class Inscription(models.Model):
         verbose_name_plural = _('Inscriptions')
         unique_together = ('eleve', 'formation')
         ordering = ['-date_inscription']
+        indexes = [
+            models.Index(fields=['eleve', 'statut'], name='inscription_eleve_statut_idx'),
+            models.Index(fields=['formation', 'statut'], name='inscription_form_statut_idx'),
+            # Index partiel : les listes d'appel et effectifs ne lisent que les inscriptions validées
+            models.Index(fields=['formation'], condition=models.Q(statut='valide'),
+                         name='inscription_valide_idx'),
+        ]
 
     def __str__(self):
         return f"{self.eleve} - {self.formation} ({self.get_statut_display()})"
@@ -149,7 +163,31 @@ class SuiviPedagogique(models.Model):
         return f"Suivi de {self.eleve} par {self.formateur}"
 
 
-class DocumentEleve(models.Model):
+class DocumentEleveQuerySet(models.QuerySet):
+
+    def accessibles_par(self, user):
+        """
+        Documents d'élèves que `user` peut consulter, en une requête : les siens
+        pour un élève ; pour un formateur, ceux des élèves inscrits (validés)
+        à une formation dont il anime des cours. Tout pour le personnel.
+        """
+        if not user.is_authenticated:
+            return self.none()
+        if user.is_superuser or user.is_staff:
+            return self
+        condition = models.Q(pk__in=[])
+        if user.profil_eleve is not None:
+            condition |= models.Q(eleve=user.profil_eleve)
+        if user.profil_formateur is not None:
+            condition |= models.Exists(Inscription.objects.filter(
+                eleve=models.OuterRef('eleve_id'),
+                statut='valide',
+                formation__cours__formateur=user.profil_formateur,
+            ))
+        return self.filter(condition)
+
+
+class DocumentEleve(MetadonneesFichier):
     """
     Modèle pour les documents spécifiques à un élève
     (CV, lettre de motivation, etc.)
@@ -163,10 +201,13 @@ class DocumentEleve(models.Model):
         ('autre', _('Autre')),
     ]
     )
-    fichier = models.FileField(_('Fichier'),  upload_to='eleves/documents/')
+    fichier = models.FileField(_('Fichier'),  upload_to='eleves/documents/',
+                               storage=stockage_documents)
     date_depot = models.DateTimeField(_('Date de dépôt'),  auto_now_add=True)
     valide = models.BooleanField(_('Validé'),  default=False)
 
+    objects = DocumentEleveQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('Document élève')
         verbose_name_plural = _('Documents élèves')
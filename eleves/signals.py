@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from fichiers.references import suivre
+from presence.models import Presence, presences_marquees
+from . import tableau_de_bord
+from .models import DocumentEleve, Inscription
+
+suivre(DocumentEleve, 'fichier')
+
+
+@receiver(post_save, sender=Presence)
+@receiver(post_delete, sender=Presence)
+@receiver(post_save, sender=Inscription)
+@receiver(post_delete, sender=Inscription)
+@receiver(post_save, sender=DocumentEleve)
+@receiver(post_delete, sender=DocumentEleve)
+def invalider_tableau_de_bord(sender, instance, raw=False, **kwargs):
+    if not raw:
+        tableau_de_bord.invalider(instance.eleve_id)
+
+
+@receiver(presences_marquees)
+def invalider_appel(sender, cours, eleve_ids=(), **kwargs):
+    tableau_de_bord.invalider(*eleve_ids)
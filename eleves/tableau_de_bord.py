@@ -0,0 +1,87 @@
+"""
+Tableau de bord élève, gardé dans le cache de Django.
+
+C'est la page d'arrivée de chaque élève à chaque connexion : le contenu est
+calculé en trois requêtes (formations en cours, derniers documents,
+présences), puis servi depuis le cache sans aucune requête.
+
+La clé du cache contient un numéro de version propre à l'élève, augmenté
+(par `eleves.signals`) à chaque écriture d'une présence, d'une inscription
+ou d'un document qui le concerne. Un contenu périmé n'est jamais supprimé :
+il n'est simplement plus lu, et un calcul concurrent qui finirait après
+l'invalidation écrit sous l'ancienne version.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+
+from presence.models import AttendanceSummary, calculer_taux
+from .models import DocumentEleve, Inscription
+
+DUREE_CACHE = 24 * 60 * 60
+NB_FORMATIONS = 3
+NB_DOCUMENTS = 5
+
+
+def cle_version(eleve_id):
+    return f'eleves:tableau-de-bord:version:{eleve_id}'
+
+
+def version(eleve_id):
+    cle = cle_version(eleve_id)
+    numero = cache.get(cle)
+    if numero is None:
+        # Départ horodaté : une version perdue (éviction) ne retombe jamais sur un ancien contenu
+        cache.add(cle, time.time_ns(), None)
+        numero = cache.get(cle)
+    return numero
+
+
+def calculer(eleve_id):
+    """Contenu du tableau de bord (trois requêtes), en valeurs simples"""
+    inscriptions = list(Inscription.objects.filter(eleve_id=eleve_id, statut='valide').values(
+        'date_debut', 'date_fin', formation_pk=F('formation_id'), formation_titre=F('formation__titre'),
+    )[:NB_FORMATIONS])
+    documents = list(DocumentEleve.objects.filter(eleve_id=eleve_id).order_by('-date_depot').values(
+        'id', 'type_document', 'date_depot', 'valide', 'taille',
+    )[:NB_DOCUMENTS])
+    libelles = dict(DocumentEleve._meta.get_field('type_document').choices)
+    for document in documents:
+        document['type_libelle'] = str(libelles.get(document['type_document'], document['type_document']))
+    # Total et présents en un seul agrégat, sur les bilans tenus à jour à chaque appel
+    total, presents = AttendanceSummary.objects.filter(eleve_id=eleve_id).totaux()
+    return {
+        'inscriptions': inscriptions,
+        'documents': documents,
+        'presence_count': total,
+        'presence_present': presents,
+        'presence_rate': calculer_taux(total, presents),
+    }
+
+
+def instantane(eleve_id):
+    """Tableau de bord de l'élève, depuis le cache ou recalculé"""
+    cle = f'eleves:tableau-de-bord:{eleve_id}:{version(eleve_id)}'
+    donnees = cache.get(cle)
+    if donnees is None:
+        donnees = calculer(eleve_id)
+        cache.set(cle, donnees, DUREE_CACHE)
+    return donnees
+
+
+def invalider(*eleve_ids):
+    """Passe les élèves indiqués à une nouvelle version, une fois la transaction validée"""
+    ids = set(eleve_ids) - {None}
+    if ids:
+        transaction.on_commit(lambda: _nouvelle_version(ids))
+
+
+def _nouvelle_version(eleve_ids):
+    for eleve_id in eleve_ids:
+        try:
+            cache.incr(cle_version(eleve_id))
+        except ValueError:
+            # Pas de version en cache : la prochaine lecture en crée une neuve
+            pass
@@ -1,3 +1,218 @@
-from django.test import TestCase
+import datetime
+import io
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from formateurs.models import Formateur
+from formations.models import Domaine, Formation
+from planning.models import Cours
+from presence.models import Presence
+from presence.tests import PresenceTestCase
+from . import tableau_de_bord
+from .importation import ImportEleves
+from .models import DocumentEleve, Eleve, Inscription
+
+
+def csv_eleves(*lignes, entete='email;nom;prenom;numero_etudiant;date_naissance;mot_de_passe;formations'):
+    return io.StringIO('\n'.join((entete,) + lignes) + '\n')
+
+
+class ImportElevesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        domaine = Domaine.objects.create(nom='Informatique')
+        for reference in ('PY', 'JS'):
+            Formation.objects.create(
+                domaine=domaine, reference=reference, titre=reference,
+                description='', objectifs='', public_cible='', duree_jours=1, prix=0
+            )
+        user = CustomUser.objects.create(username='deja@ecole.fr', email='deja@ecole.fr')
+        Eleve.objects.create(user=user, numero_etudiant='E000')
+
+    def test_import_et_rapport_d_erreurs(self):
+        fichier = csv_eleves(
+            'ana@ecole.fr;Martin;Ana;e001;2003-02-01;;PY|JS',
+            'BOB@ecole.fr;Durand;Bob;E002;01/02/2003;;PY',
+            'ana@ecole.fr;Doublon;Ana;E003;;;',              # en double dans le fichier
+            'deja@ecole.fr;Deja;Inscrit;E004;;;',             # déjà en base
+            'pas-un-email;X;Y;E005;31/02/2003;;NOPE',         # plusieurs erreurs sur la ligne
+        )
+        rapport = ImportEleves(taille_lot=2, processus=1).importer(fichier)
+
+        self.assertEqual((rapport.lignes, rapport.eleves, rapport.inscriptions), (5, 2, 3))
+        self.assertEqual(rapport.lignes_rejetees, 3)
+        self.assertEqual(
+            sorted((erreur.ligne, erreur.champ) for erreur in rapport.erreurs),
+            [(4, 'email'), (4, 'identifiant'), (5, 'email'), (5, 'identifiant'),
+             (6, 'date_naissance'), (6, 'email'), (6, 'formations')],
+        )
+        ana = Eleve.objects.select_related('user').get(numero_etudiant='E001')
+        self.assertEqual(ana.user.username, 'ana@ecole.fr')
+        self.assertTrue(ana.user.is_eleve)
+        self.assertFalse(ana.user.has_usable_password())
+        self.assertEqual(
+            sorted(ana.inscriptions.values_list('formation__reference', 'statut')),
+            [('JS', 'valide'), ('PY', 'valide')],
+        )
+        self.assertEqual(Eleve.objects.get(numero_etudiant='E002').user.email, 'bob@ecole.fr')
+
+    def test_simulation_n_ecrit_rien(self):
+        rapport = ImportEleves(simulation=True).importer(csv_eleves('ana@ecole.fr;Martin;Ana;E001;;secret;PY'))
+        self.assertEqual((rapport.eleves, rapport.inscriptions, rapport.erreurs), (1, 1, []))
+        self.assertFalse(CustomUser.objects.filter(email='ana@ecole.fr').exists())
+
+    def test_mots_de_passe_haches_en_parallele(self):
+        fichier = csv_eleves(
+            'ana@ecole.fr,Martin,Ana,E001,,secret-ana,PY',
+            'bob@ecole.fr,Durand,Bob,E002,,,',
+            'cyd@ecole.fr,Petit,Cyd,E003,,secret-cyd,',
+            entete='email,nom,prenom,numero_etudiant,date_naissance,mot_de_passe,formations',
+        )
+        ImportEleves(processus=2).importer(fichier)
+        self.assertTrue(CustomUser.objects.get(email='ana@ecole.fr').check_password('secret-ana'))
+        self.assertFalse(CustomUser.objects.get(email='bob@ecole.fr').has_usable_password())
+        self.assertTrue(CustomUser.objects.get(email='cyd@ecole.fr').check_password('secret-cyd'))
+
+    def test_entete_sans_email(self):
+        rapport = ImportEleves().importer(io.StringIO('nom;prenom\nMartin;Ana\n'))
+        self.assertEqual([erreur.champ for erreur in rapport.erreurs], ['email'])
+
+    def test_import_depuis_l_admin(self):
+        admin = CustomUser.objects.create_superuser('admin', 'admin@ecole.fr', 'x')
+        self.client.force_login(admin)
+        contenu = 'email;nom;prenom;numero_etudiant;formations\nana@ecole.fr;Martin;Ana;E001;PY\n'
+        response = self.client.post(reverse('admin:eleves_eleve_importer'), {
+            'fichier': SimpleUploadedFile('eleves.csv', ('\ufeff' + contenu).encode()),
+            'statut': 'en_attente',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Inscription.objects.get(eleve__numero_etudiant='E001').statut, 'en_attente')
+
+    def test_admin_sans_pool_de_processus(self):
+        self.client.force_login(CustomUser.objects.create_superuser('admin', 'admin@ecole.fr', 'x'))
+        contenu = 'email;nom;prenom;numero_etudiant;mot_de_passe\nana@ecole.fr;Martin;Ana;E001;secret-ana\n'
+        with mock.patch('eleves.importation.ProcessPoolExecutor') as pool:
+            self.client.post(reverse('admin:eleves_eleve_importer'), {
+                'fichier': SimpleUploadedFile('eleves.csv', contenu.encode()), 'statut': 'valide',
+            })
+        pool.assert_not_called()
+        self.assertTrue(CustomUser.objects.get(email='ana@ecole.fr').check_password('secret-ana'))
+
+    def test_fichier_latin1(self):
+        # Export Excel « CSV (séparateur : point-virgule) » : Windows-1252, pas UTF-8
+        contenu = 'email;nom;prenom;numero_etudiant\nana@ecole.fr;Hélène;Zoé;E001\n'.encode('latin-1')
+        with tempfile.NamedTemporaryFile(suffix='.csv') as fichier:
+            fichier.write(contenu)
+            fichier.flush()
+            call_command('import_eleves', fichier.name, '--processus', '1', stdout=io.StringIO())
+            with self.assertRaisesMessage(CommandError, 'utf-8'):
+                call_command('import_eleves', fichier.name, '--encodage', 'utf-8', stdout=io.StringIO())
+        eleve = Eleve.objects.select_related('user').get(numero_etudiant='E001')
+        self.assertEqual((eleve.user.last_name, eleve.user.first_name), ('Hélène', 'Zoé'))
+
+    def test_fichier_illisible_dans_l_admin(self):
+        self.client.force_login(CustomUser.objects.create_superuser('admin', 'admin@ecole.fr', 'x'))
+        # 0x81 n'existe ni en UTF-8 ni en Windows-1252
+        contenu = 'email;nom\nana@ecole.fr;Martin\n'.encode() + b'\x81\n'
+        response = self.client.post(reverse('admin:eleves_eleve_importer'), {
+            'fichier': SimpleUploadedFile('eleves.csv', contenu), 'statut': 'valide',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertFormError(response.context['form'], 'fichier',
+                             "Encodage non reconnu : enregistrez le fichier en CSV UTF-8.")
+        self.assertFalse(CustomUser.objects.filter(email='ana@ecole.fr').exists())
+
+    def test_email_deja_en_base_sans_tenir_compte_de_la_casse(self):
+        CustomUser.objects.create(username='majuscules', email='Foo@Ecole.fr')
+        rapport = ImportEleves(processus=1).importer(csv_eleves('foo@ecole.fr;Foo;Bar;E010;;;'))
+        self.assertEqual([(erreur.ligne, erreur.champ) for erreur in rapport.erreurs], [(2, 'email')])
+        self.assertEqual(CustomUser.objects.filter(email__iexact='foo@ecole.fr').count(), 1)
+
+
+class DocumentEleveTelechargementTests(TestCase):
+    """Le fichier d'un élève est servi à lui-même et aux formateurs qui lui font cours"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        reglages = override_settings(MEDIA_ROOT=self.media)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.addCleanup(shutil.rmtree, self.media)
+        formation = Formation.objects.create(
+            domaine=Domaine.objects.create(nom='Informatique'), reference='PY', titre='Python',
+            description='', objectifs='', public_cible='', duree_jours=1, prix=0,
+        )
+        self.eleve = Eleve.objects.create(
+            user=CustomUser.objects.create(username='eleve', email='eleve@example.com'), numero_etudiant='E001')
+        Inscription.objects.create(eleve=self.eleve, formation=formation, statut='valide')
+        self.formateurs = [
+            Formateur.objects.create(
+                user=CustomUser.objects.create(username=nom, email=f'{nom}@example.com', is_formateur=True),
+                specialite='Python', experience=1, bio='', matricule=nom,
+            )
+            for nom in ('referent', 'autre')
+        ]
+        Cours.objects.create(formation=formation, formateur=self.formateurs[0], titre='Intro',
+                             date=datetime.date(2026, 1, 5), heure_debut=datetime.time(9),
+                             heure_fin=datetime.time(12))
+        document = DocumentEleve.objects.create(
+            eleve=self.eleve, type_document='cv', fichier=ContentFile(b'%PDF-1.4 CV', name='cv.pdf'))
+        self.url = reverse('eleves:document_fichier', kwargs={'pk': document.pk})
+
+    def test_acces(self):
+        for user, statut in ((self.eleve.user, 200), (self.formateurs[0].user, 200), (self.formateurs[1].user, 404)):
+            with self.subTest(user.username):
+                self.client.force_login(user)
+                self.assertEqual(self.client.get(self.url).status_code, statut)
+
+
+class TableauDeBordTests(PresenceTestCase):
+    """Tableau de bord élève : trois requêtes à froid, aucune depuis le cache, version augmentée par les écritures"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.cours, eleves = self.creer_cours('PY', 2)
+        self.eleve, self.autre = eleves
+
+    def test_budget_de_requetes(self):
+        with self.assertNumQueries(3):
+            donnees = tableau_de_bord.instantane(self.eleve.pk)
+        self.assertEqual([i['formation_titre'] for i in donnees['inscriptions']], ['PY'])
+        with self.assertNumQueries(0):
+            tableau_de_bord.instantane(self.eleve.pk)
+
+        self.client.force_login(self.eleve.user)
+        response = self.client.get(reverse('eleves:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['presence_count'], 0)
+
+    def test_invalidation_par_les_ecritures(self):
+        tableau_de_bord.instantane(self.eleve.pk)
+        tableau_de_bord.instantane(self.autre.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Presence.objects.marquer(self.cours, {self.eleve.pk: True})
+        donnees = tableau_de_bord.instantane(self.eleve.pk)
+        self.assertEqual((donnees['presence_count'], donnees['presence_rate']), (1, 100.0))
+        # Les autres élèves gardent leur contenu en cache
+        with self.assertNumQueries(0):
+            tableau_de_bord.instantane(self.autre.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            DocumentEleve.objects.create(eleve=self.eleve, type_document='cv', fichier='eleves/documents/cv.pdf')
+        self.assertEqual([d['type_libelle'] for d in tableau_de_bord.instantane(self.eleve.pk)['documents']], ['CV'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Inscription.objects.filter(eleve=self.eleve).get().delete()
+        self.assertEqual(tableau_de_bord.instantane(self.eleve.pk)['inscriptions'], [])
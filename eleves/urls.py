@@ -21,6 +21,7 @@ urlpatterns = [
     path('mes-documents/', views.MesDocumentsListView.as_view(), name='mes_documents'),
     path('document/ajouter/', views.DocumentCreateView.as_view(), name='document_create'),
     path('document/<int:pk>/', views.DocumentDetailView.as_view(), name='document_detail'),
+    path('document/<int:pk>/fichier/', views.DocumentEleveTelechargementView.as_view(), name='document_fichier'),
     
     # Présences
     path('mes-presences/', views.MesPresencesListView.as_view(), name='mes_presences'),
@@ -1,19 +1,26 @@
+import os
+
+from django.views import View
 from django.views.generic import ListView, DetailView, UpdateView, CreateView, TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from django.contrib import messages
 from django.db.models import Count, Q
+from django.shortcuts import get_object_or_404
 
+from . import tableau_de_bord
 from .models import Eleve, DocumentEleve, Inscription
 from .forms import EleveUpdateForm, DocumentEleveForm
+from fichiers import telechargement
 from formations.models import Formation
-from presence.models import Presence
+from presence.models import AttendanceSummary, Presence, calculer_taux
+from gestion_formation.pagination import KeysetPaginationMixin
 
 class EleveRequiredMixin(LoginRequiredMixin):
     """Vérifie que l'utilisateur est un élève"""
     def dispatch(self, request, *args, **kwargs):
-        if not hasattr(request.user, 'eleve'):
+        if not request.user.is_authenticated or request.user.profil_eleve is None:
             messages.error(request, _("Accès réservé aux élèves"))
             return self.handle_no_permission()
         return super().dispatch(request, *args, **kwargs)
@@ -23,26 +30,10 @@ class DashboardView(EleveRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        eleve = self.request.user.eleve
-        
-        # Prochaines formations
-        context['inscriptions'] = Inscription.objects.filter(
-            eleve=eleve,
-            statut='valide'
-        ).select_related('formation')[:3]
-        
-        # Derniers documents
-        context['documents'] = DocumentEleve.objects.filter(
-            eleve=eleve
-        ).order_by('-date_depot')[:5]
-        
-        # Statistiques de présence
-        presences = Presence.objects.filter(eleve=eleve)
-        context['presence_count'] = presences.count()
-        context['presence_rate'] = round(
-            presences.filter(present=True).count() / context['presence_count'] * 100, 1
-        ) if context['presence_count'] > 0 else 0
-        
+        eleve = self.request.user.profil_eleve
+        context['eleve'] = eleve
+        # Formations, derniers documents et présences : instantané en cache (voir tableau_de_bord.py)
+        context.update(tableau_de_bord.instantane(eleve.pk))
         return context
 
 class ProfilView(EleveRequiredMixin, DetailView):
@@ -50,7 +41,7 @@ class ProfilView(EleveRequiredMixin, DetailView):
     template_name = 'eleves/profil/detail.html'
     
     def get_object(self):
-        return self.request.user.eleve
+        return self.request.user.profil_eleve
 
 class ProfilUpdateView(EleveRequiredMixin, UpdateView):
     form_class = EleveUpdateForm
@@ -58,7 +49,7 @@ class ProfilUpdateView(EleveRequiredMixin, UpdateView):
     success_url = reverse_lazy('eleves:profil')
     
     def get_object(self):
-        return self.request.user.eleve
+        return self.request.user.profil_eleve
     
     def form_valid(self, form):
         messages.success(self.request, _("Profil mis à jour avec succès"))
@@ -71,7 +62,7 @@ class MesFormationsListView(EleveRequiredMixin, ListView):
     
     def get_queryset(self):
         return Inscription.objects.filter(
-            eleve=self.request.user.eleve
+            eleve=self.request.user.profil_eleve
         ).select_related('formation').order_by('-date_inscription')
 
 class FormationDetailView(EleveRequiredMixin, DetailView):
@@ -81,14 +72,14 @@ class FormationDetailView(EleveRequiredMixin, DetailView):
     
     def get_queryset(self):
         return Formation.objects.filter(
-            inscriptions__eleve=self.request.user.eleve
+            inscriptions__eleve=self.request.user.profil_eleve
         )
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['inscription'] = Inscription.objects.get(
             formation=self.object,
-            eleve=self.request.user.eleve
+            eleve=self.request.user.profil_eleve
         )
         return context
 
@@ -99,7 +90,7 @@ class MesDocumentsListView(EleveRequiredMixin, ListView):
     
     def get_queryset(self):
         return DocumentEleve.objects.filter(
-            eleve=self.request.user.eleve
+            eleve=self.request.user.profil_eleve
         ).order_by('-date_depot')
 
 class DocumentCreateView(EleveRequiredMixin, CreateView):
@@ -109,7 +100,7 @@ class DocumentCreateView(EleveRequiredMixin, CreateView):
     success_url = reverse_lazy('eleves:mes_documents')
     
     def form_valid(self, form):
-        form.instance.eleve = self.request.user.eleve
+        form.instance.eleve = self.request.user.profil_eleve
         messages.success(self.request, _("Document ajouté avec succès"))
         return super().form_valid(form)
 
@@ -119,10 +110,23 @@ class DocumentDetailView(EleveRequiredMixin, DetailView):
     
     def get_queryset(self):
         return DocumentEleve.objects.filter(
-            eleve=self.request.user.eleve
+            eleve=self.request.user.profil_eleve
         )
 
-class MesPresencesListView(EleveRequiredMixin, ListView):
+class DocumentEleveTelechargementView(LoginRequiredMixin, View):
+    """Fichier d'un document d'élève, pour l'élève et ses formateurs"""
+
+    def get(self, request, *args, **kwargs):
+        document = get_object_or_404(
+            DocumentEleve.objects.accessibles_par(request.user).only('eleve', 'type_document', 'fichier'),
+            pk=self.kwargs['pk'],
+        )
+        extension = os.path.splitext(document.fichier.name)[1]
+        return telechargement.servir(
+            request, document.fichier, f'{document.type_document}-{document.eleve_id}{extension}')
+
+
+class MesPresencesListView(EleveRequiredMixin, KeysetPaginationMixin, ListView):
     model = Presence
     template_name = 'eleves/presences/list.html'
     context_object_name = 'presences'
@@ -130,7 +134,7 @@ class MesPresencesListView(EleveRequiredMixin, ListView):
     
     def get_queryset(self):
         return Presence.objects.filter(
-            eleve=self.request.user.eleve
+            eleve=self.request.user.profil_eleve
         ).select_related('cours', 'cours__formation').order_by('-cours__date')
 
 class PresenceStatsView(EleveRequiredMixin, TemplateView):
@@ -138,35 +142,37 @@ class PresenceStatsView(EleveRequiredMixin, TemplateView):
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        eleve = self.request.user.eleve
+        eleve = self.request.user.profil_eleve
         
+        # Bilans précalculés par formation
+        bilans = {
+            bilan.formation_id: bilan
+            for bilan in AttendanceSummary.objects.filter(eleve=eleve)
+        }
+
         # Statistiques globales
-        presences = Presence.objects.filter(eleve=eleve)
-        total = presences.count()
-        present = presences.filter(present=True).count()
-        
+        total = sum(bilan.total for bilan in bilans.values())
+        present = sum(bilan.presents for bilan in bilans.values())
+
         context['total'] = total
         context['present'] = present
         context['absent'] = total - present
-        context['rate'] = round(present / total * 100, 1) if total > 0 else 0
-        
+        context['rate'] = calculer_taux(total, present)
+
         # Par formation
         formations_data = []
         for formation in Formation.objects.filter(inscriptions__eleve=eleve):
-            p = Presence.objects.filter(
-                eleve=eleve,
-                cours__formation=formation
-            )
-            total_f = p.count()
-            present_f = p.filter(present=True).count()
-            
+            bilan = bilans.get(formation.pk)
+            total_f = bilan.total if bilan else 0
+            present_f = bilan.presents if bilan else 0
+
             formations_data.append({
                 'formation': formation,
                 'total': total_f,
                 'present': present_f,
-                'rate': round(present_f / total_f * 100, 1) if total_f > 0 else 0
+                'rate': calculer_taux(total_f, present_f)
             })
-        
+
         context['formations_data'] = sorted(
             formations_data, 
             key=lambda x: x['rate'], 
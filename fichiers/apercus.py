@@ -0,0 +1,167 @@
+"""
+Aperçus (vignettes, pages, dimensions) générés en arrière-plan.
+
+Un aperçu dépend du seul contenu : il est demandé à la création de chaque
+Blob (donc au premier dépôt d'un contenu, par Document comme par
+DocumentEleve), calculé une fois et partagé par tous les fichiers qui le
+désignent. La table fichiers.Apercu sert de file d'attente ; une requête web
+n'y fait qu'une insertion.
+
+Le travail est fait par `python manage.py generer_apercus`, qui réserve les
+aperçus en attente et les confie à un pool de processus de taille bornée
+(fichiers.generateurs). Les vignettes sont rangées à côté des fichiers, dans
+le même stockage, sous `apercus/ab/cd/<sha256>.jpg`.
+"""
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import generateurs
+from .models import Apercu, Blob
+from .stockage import stockage_documents
+
+PREFIXE = 'apercus'
+
+REGLAGES_PAR_DEFAUT = {
+    # Processus de génération en parallèle
+    'PROCESSUS': 2,
+    # Tentatives avant de marquer un aperçu en échec
+    'TENTATIVES': 3,
+    # Secondes après lesquelles un aperçu « en cours » (worker arrêté) est repris
+    'DELAI_RESERVATION': 15 * 60,
+}
+
+
+def reglage(nom):
+    return getattr(settings, 'APERCUS', {}).get(nom, REGLAGES_PAR_DEFAUT[nom])
+
+
+def nom_vignette(blob):
+    return f'{PREFIXE}/{blob.empreinte[:2]}/{blob.empreinte[2:4]}/{blob.empreinte}.jpg'
+
+
+def demander(blobs=None):
+    """Met en file les contenus sans aperçu (tous, ou seulement `blobs`) ; renvoie leur nombre"""
+    sans_apercu = Blob.objects.filter(apercu__isnull=True)
+    if blobs is not None:
+        sans_apercu = sans_apercu.filter(pk__in=[blob.pk for blob in blobs])
+    nouveaux = [Apercu(blob_id=pk) for pk in sans_apercu.values_list('pk', flat=True).iterator()]
+    Apercu.objects.bulk_create(nouveaux, batch_size=500, ignore_conflicts=True)
+    return len(nouveaux)
+
+
+def pour_fichiers(noms):
+    """{nom de fichier: Apercu terminé}, en une requête, pour afficher une liste"""
+    noms = {nom for nom in noms if nom}
+    if not noms:
+        return {}
+    return {
+        apercu.blob.chemin: apercu
+        for apercu in Apercu.objects.filter(blob__chemin__in=noms, statut='termine').select_related('blob')
+    }
+
+
+def a_traiter():
+    limite = timezone.now() - timedelta(seconds=reglage('DELAI_RESERVATION'))
+    return Q(statut='en_attente') | Q(statut='en_cours', date_reservation__lt=limite)
+
+
+def reserver(nombre):
+    """Prend jusqu'à `nombre` aperçus de la file ; chaque ligne n'est prise que par un seul worker"""
+    reserves = []
+    candidats = Apercu.objects.filter(a_traiter()).order_by('date_creation').values_list('pk', flat=True)
+    for pk in candidats[:nombre]:
+        if Apercu.objects.filter(a_traiter(), pk=pk).update(
+                statut='en_cours', date_reservation=timezone.now(), tentatives=F('tentatives') + 1):
+            reserves.append(pk)
+    return list(Apercu.objects.filter(pk__in=reserves).select_related('blob'))
+
+
+def enregistrer(apercu, caracteristiques=None, erreur=None):
+    """Résultat d'une génération : aperçu terminé, indisponible, ou remis en file après une erreur"""
+    if isinstance(erreur, generateurs.OutilManquant):
+        apercu.statut, apercu.erreur = 'indisponible', f'Outil manquant : {erreur}'
+    elif erreur is not None:
+        apercu.statut = 'echec' if apercu.tentatives >= reglage('TENTATIVES') else 'en_attente'
+        apercu.erreur = f'{type(erreur).__name__} : {erreur}'
+    elif caracteristiques is None:
+        apercu.statut, apercu.erreur = 'indisponible', 'Format sans aperçu'
+    else:
+        apercu.statut, apercu.erreur = 'termine', ''
+        apercu.vignette.name = nom_vignette(apercu.blob)
+        for champ in ('largeur', 'hauteur', 'pages', 'duree'):
+            setattr(apercu, champ, caracteristiques.get(champ))
+    apercu.save(update_fields=['statut', 'erreur', 'vignette', 'largeur', 'hauteur', 'pages', 'duree'])
+
+
+def conclure(apercu, calcul, stockage):
+    """
+    Enregistre le résultat de `calcul()`, ou son erreur. Un aperçu supprimé
+    pendant la génération (Blob effacé, suppression en cascade) est ignoré et
+    la vignette tout juste écrite effacée ; renvoie faux dans ce cas.
+    """
+    try:
+        caracteristiques, erreur = calcul(), None
+    except Exception as e:
+        caracteristiques, erreur = None, e
+    try:
+        # Point de sauvegarde : l'échec ne compromet pas une transaction englobante
+        with transaction.atomic():
+            enregistrer(apercu, caracteristiques, erreur)
+    except DatabaseError:
+        # save(update_fields=...) n'a touché aucune ligne : l'aperçu n'existe plus
+        if Apercu.objects.filter(pk=apercu.pk).exists():
+            raise
+        stockage.delete(nom_vignette(apercu.blob))
+        return False
+    return True
+
+
+def taches(apercus, stockage):
+    for apercu in apercus:
+        yield apercu, stockage.path(apercu.blob.chemin), stockage.path(nom_vignette(apercu.blob))
+
+
+def traiter(processus=None, arret=None):
+    """
+    Vide la file et renvoie le nombre d'aperçus traités. `processus=0` génère
+    dans le processus courant (tests, mise au point). Quand `arret()` devient
+    vrai, plus rien n'est réservé et les générations en vol sont terminées.
+    """
+    processus = reglage('PROCESSUS') if processus is None else processus
+    stockage = stockage_documents()
+    traites = 0
+    if not processus:
+        while not (arret and arret()):
+            lot = reserver(1)
+            if not lot:
+                break
+            for apercu, source, destination in taches(lot, stockage):
+                traites += conclure(apercu, lambda: generateurs.generer(source, destination), stockage)
+        return traites
+
+    # Processus neufs (spawn) : rien de l'état Django ni des connexions n'est partagé
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=processus, mp_context=multiprocessing.get_context('spawn')) as pool:
+        en_vol = {}
+        while True:
+            # La file est relue dès qu'un processus se libère, sans jamais dépasser `processus` en vol
+            if not (arret and arret()):
+                for apercu, source, destination in taches(reserver(processus - len(en_vol)), stockage):
+                    en_vol[pool.submit(generateurs.generer, source, destination)] = apercu
+            if not en_vol:
+                break
+            termines, _ = wait(en_vol, return_when=FIRST_COMPLETED)
+            for futur in termines:
+                traites += conclure(en_vol.pop(futur), futur.result, stockage)
+    return traites
+
+
+def supprimer_vignette(apercu):
+    if apercu.vignette:
+        apercu.vignette.storage.delete(apercu.vignette.name)
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class FichiersConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'fichiers'
+    verbose_name = 'Fichiers'
+
+    def ready(self):
+        from . import signals  # noqa: F401
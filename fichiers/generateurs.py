@@ -0,0 +1,110 @@
+"""
+Générateurs d'aperçus, exécutés dans les processus du pool de
+fichiers.apercus. Ce module n'importe rien de Django : il est chargé tel
+quel par les processus lancés en « spawn ».
+
+Chaque générateur écrit une vignette JPEG dans `destination` et renvoie les
+caractéristiques du fichier source (largeur, hauteur, pages, durée). Les
+outils sont facultatifs : Pillow pour les images, poppler-utils (pdfinfo,
+pdftoppm) pour les PDF, ffmpeg (ffprobe, ffmpeg) pour les vidéos. Sans
+eux, OutilManquant est levée et l'aperçu est marqué indisponible.
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = ImageOps = None
+
+TAILLE_VIGNETTE = 320
+# Secondes accordées à un outil externe avant abandon
+DELAI_OUTIL = 60
+
+
+class OutilManquant(Exception):
+    pass
+
+
+def outil(nom):
+    chemin = shutil.which(nom)
+    if chemin is None:
+        raise OutilManquant(nom)
+    return chemin
+
+
+def executer(*arguments):
+    return subprocess.run(arguments, capture_output=True, text=True, timeout=DELAI_OUTIL, check=True).stdout
+
+
+def apercu_image(source, destination):
+    if Image is None:
+        raise OutilManquant('Pillow')
+    with Image.open(source) as image:
+        largeur, hauteur = image.size
+        vignette = ImageOps.exif_transpose(image)
+        vignette.thumbnail((TAILLE_VIGNETTE, TAILLE_VIGNETTE))
+        vignette.convert('RGB').save(destination, 'JPEG', quality=80, optimize=True)
+    return {'largeur': largeur, 'hauteur': hauteur, 'pages': 1}
+
+
+def apercu_pdf(source, destination):
+    infos = executer(outil('pdfinfo'), source)
+    pages = re.search(r'^Pages:\s+(\d+)', infos, re.MULTILINE)
+    # Format de la première page, en points
+    format_page = re.search(r'^Page size:\s+([\d.]+) x ([\d.]+)', infos, re.MULTILINE)
+    racine = os.path.splitext(destination)[0]
+    executer(outil('pdftoppm'), '-f', '1', '-l', '1', '-singlefile', '-jpeg',
+             '-scale-to', str(TAILLE_VIGNETTE), source, racine)
+    os.replace(racine + '.jpg', destination)
+    return {
+        'pages': int(pages.group(1)) if pages else None,
+        'largeur': round(float(format_page.group(1))) if format_page else None,
+        'hauteur': round(float(format_page.group(2))) if format_page else None,
+    }
+
+
+def apercu_video(source, destination):
+    infos = json.loads(executer(
+        outil('ffprobe'), '-v', 'error', '-select_streams', 'v:0',
+        '-show_entries', 'stream=width,height:format=duration', '-of', 'json', source,
+    ))
+    flux = (infos.get('streams') or [{}])[0]
+    duree = float(infos.get('format', {}).get('duration') or 0)
+    # Image de couverture : une seconde après le début, ou au milieu d'une vidéo plus courte
+    executer(outil('ffmpeg'), '-v', 'error', '-y', '-ss', f'{min(1.0, duree / 2):.2f}', '-i', source,
+             '-frames:v', '1', '-vf', f"scale='min({TAILLE_VIGNETTE},iw)':-2", '-f', 'image2', destination)
+    return {'largeur': flux.get('width'), 'hauteur': flux.get('height'), 'duree': duree or None}
+
+
+GENERATEURS = {
+    '.jpg': apercu_image,
+    '.jpeg': apercu_image,
+    '.png': apercu_image,
+    '.pdf': apercu_pdf,
+    '.mp4': apercu_video,
+    '.mov': apercu_video,
+    '.avi': apercu_video,
+}
+
+
+def generer(source, destination):
+    """
+    Écrit la vignette de `source` dans `destination` (par un temporaire, renommé
+    à la fin) et renvoie ses caractéristiques ; None si le format n'a pas d'aperçu.
+    """
+    generateur = GENERATEURS.get(os.path.splitext(source)[1].lower())
+    if generateur is None:
+        return None
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    temporaire = destination + '.tmp.jpg'
+    try:
+        caracteristiques = generateur(source, temporaire)
+        os.replace(temporaire, destination)
+    finally:
+        if os.path.exists(temporaire):
+            os.unlink(temporaire)
+    return caracteristiques
@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand
+
+from fichiers import metadonnees
+from fichiers.models import MetadonneesFichier
+from fichiers.references import CHAMPS_SUIVIS
+
+TAILLE_LOT = 500
+
+
+class Command(BaseCommand):
+    help = ("Relève la taille, le type MIME et l'empreinte des fichiers déposés avant que ces "
+            "métadonnées ne soient enregistrées au dépôt (Document, DocumentEleve).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tout', action='store_true',
+                            help="Relever aussi les fichiers déjà décrits")
+
+    def handle(self, *args, **options):
+        for modele, nom_champ in CHAMPS_SUIVIS:
+            if not issubclass(modele, MetadonneesFichier) or nom_champ != modele.champ_fichier:
+                continue
+            decrits, manquants = self.decrire(modele, nom_champ, options['tout'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{modele._meta.label} : {decrits} fichiers décrits, {manquants} introuvables."))
+
+    def decrire(self, modele, nom_champ, tout):
+        stockage = modele._meta.get_field(nom_champ).storage
+        lignes = modele._default_manager.exclude(**{nom_champ: ''}).exclude(**{nom_champ: None})
+        if not tout:
+            lignes = lignes.filter(taille__isnull=True)
+        lot, decrits, manquants = [], 0, 0
+        # Un même contenu (stockage dédupliqué) n'est lu qu'une fois
+        deja_lus = {}
+        for ligne in lignes.only('pk', nom_champ).iterator(chunk_size=TAILLE_LOT):
+            nom = getattr(ligne, nom_champ).name
+            if nom not in deja_lus:
+                try:
+                    deja_lus[nom] = metadonnees.lire_stocke(stockage, nom)
+                except OSError:
+                    deja_lus[nom] = None
+            if deja_lus[nom] is None:
+                manquants += 1
+                continue
+            for champ, valeur in deja_lus[nom].items():
+                if champ != 'duree_televersement':
+                    setattr(ligne, champ, valeur)
+            lot.append(ligne)
+            if len(lot) == TAILLE_LOT:
+                decrits += self.enregistrer(modele, lot)
+        return decrits + self.enregistrer(modele, lot), manquants
+
+    def enregistrer(self, modele, lot):
+        modele._default_manager.bulk_update(lot, ['taille', 'type_mime', 'empreinte'])
+        nombre = len(lot)
+        lot.clear()
+        return nombre
@@ -0,0 +1,105 @@
+import os
+import shutil
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from fichiers.models import Blob
+from fichiers.references import CHAMPS_SUIVIS
+from fichiers.stockage import PREFIXE, StockageDedupliquant, empreinte_fichier
+
+
+class Command(BaseCommand):
+    help = ("Range les fichiers existants de Document et DocumentEleve dans le stockage dédupliqué "
+            "(un fichier par contenu) et recalcule les compteurs de références.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Calculer le gain sans rien modifier")
+        parser.add_argument('--recompter', action='store_true',
+                            help="Recalculer aussi les références depuis les lignes et purger les blobs orphelins")
+
+    def handle(self, *args, **options):
+        self.simulation = options['dry_run']
+        self.convertis = self.doublons = self.manquants = self.liberes = 0
+        for modele, nom_champ in CHAMPS_SUIVIS:
+            stockage = modele._meta.get_field(nom_champ).storage
+            if isinstance(stockage, StockageDedupliquant):
+                self.convertir(modele, nom_champ, stockage)
+        if options['recompter'] and not self.simulation:
+            self.recompter()
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Simulation : ' if self.simulation else ''}{self.convertis} fichiers rangés par empreinte, "
+            f"{self.doublons} doublons, {self.liberes / 1024 / 1024:.1f} Mo libérés, "
+            f"{self.manquants} fichiers introuvables."
+        ))
+
+    def convertir(self, modele, nom_champ, stockage):
+        """Déplace chaque fichier « ancien » vers son blob et met la ligne à jour"""
+        lignes = modele._default_manager.exclude(**{nom_champ: ''}).exclude(**{nom_champ: None}).exclude(
+            **{f'{nom_champ}__startswith': PREFIXE + '/'}).values_list('pk', nom_champ)
+        blobs = {}
+        anciens = set()
+        for pk, nom in lignes.iterator():
+            if nom not in blobs:
+                chemin = stockage.path(nom)
+                if not os.path.exists(chemin):
+                    self.manquants += 1
+                    self.stderr.write(f"Introuvable : {nom} ({modele._meta.label} {pk})")
+                    continue
+                with open(chemin, 'rb') as fichier:
+                    empreinte, taille = empreinte_fichier(fichier)
+                blob = stockage.nom_blob(empreinte, nom)
+                if os.path.exists(stockage.path(blob)) or Blob.objects.filter(chemin=blob).exists():
+                    self.doublons += 1
+                    self.liberes += taille
+                elif not self.simulation:
+                    self.lier(chemin, stockage.path(blob))
+                blobs[nom] = (blob, empreinte, taille)
+                anciens.add(chemin)
+            blob, empreinte, taille = blobs[nom]
+            self.convertis += 1
+            if not self.simulation:
+                with transaction.atomic():
+                    modele._default_manager.filter(pk=pk).update(**{nom_champ: blob})
+                    stockage.referencer(blob, empreinte, taille)
+        if not self.simulation:
+            for chemin in anciens:
+                os.unlink(chemin)
+
+    def lier(self, source, destination):
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        try:
+            os.link(source, destination)
+        except OSError:
+            shutil.copyfile(source, destination)
+
+    def recompter(self):
+        """Références recalculées depuis les lignes ; blobs sans référence supprimés"""
+        compteur = Counter()
+        stockages = {}
+        for modele, nom_champ in CHAMPS_SUIVIS:
+            stockage = modele._meta.get_field(nom_champ).storage
+            if not isinstance(stockage, StockageDedupliquant):
+                continue
+            stockages[stockage.location] = stockage
+            compteur.update(modele._default_manager.filter(
+                **{f'{nom_champ}__startswith': PREFIXE + '/'}).values_list(nom_champ, flat=True).iterator())
+        with transaction.atomic():
+            for blob in Blob.objects.select_for_update():
+                references = compteur.pop(blob.chemin, 0)
+                if references != blob.references:
+                    Blob.objects.filter(pk=blob.pk).update(references=references)
+            for stockage in stockages.values():
+                for chemin, references in list(compteur.items()):
+                    if os.path.exists(stockage.path(chemin)):
+                        empreinte = os.path.splitext(os.path.basename(chemin))[0]
+                        Blob.objects.create(chemin=chemin, empreinte=empreinte, references=references,
+                                            taille=os.path.getsize(stockage.path(chemin)))
+                        del compteur[chemin]
+        for blob in Blob.objects.filter(references=0):
+            for stockage in stockages.values():
+                if os.path.exists(stockage.path(blob.chemin)):
+                    self.liberes += blob.taille
+                    stockage.delete(blob.chemin)
+            Blob.objects.filter(pk=blob.pk, references=0).delete()
@@ -0,0 +1,38 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from fichiers import apercus
+
+
+class Command(BaseCommand):
+    help = ("Génère en arrière-plan les aperçus en attente (vignettes d'images, première page des PDF, "
+            "image de couverture des vidéos) dans un pool de processus.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processus', type=int, default=None,
+                            help="Générations en parallèle (APERCUS['PROCESSUS'] par défaut ; 0 : sans pool)")
+        parser.add_argument('--continu', action='store_true',
+                            help="Ne pas s'arrêter quand la file est vide : la relire régulièrement")
+        parser.add_argument('--intervalle', type=float, default=5.0,
+                            help="Secondes entre deux lectures de la file vide, avec --continu")
+        parser.add_argument('--rattraper', action='store_true',
+                            help="Mettre d'abord en file les contenus déposés sans aperçu")
+
+    def handle(self, *args, **options):
+        self.arrete = False
+        # Arrêt propre (SIGTERM du superviseur) : les générations en vol sont terminées et enregistrées
+        signal.signal(signal.SIGTERM, self.arreter)
+        if options['rattraper']:
+            self.stdout.write(f"{apercus.demander()} contenus mis en file.")
+        total = 0
+        while True:
+            total += apercus.traiter(options['processus'], arret=lambda: self.arrete)
+            if not options['continu'] or self.arrete:
+                break
+            time.sleep(options['intervalle'])
+        self.stdout.write(self.style.SUCCESS(f"{total} aperçus traités."))
+
+    def arreter(self, *args):
+        self.arrete = True
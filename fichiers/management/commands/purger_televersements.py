@@ -0,0 +1,30 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from fichiers import morceaux
+from fichiers.models import Televersement
+
+
+class Command(BaseCommand):
+    help = ("Supprime les téléversements par morceaux restés sans nouveau morceau au-delà de "
+            "TELEVERSEMENTS['EXPIRATION'], ainsi que les fichiers partiels orphelins.")
+
+    def handle(self, *args, **options):
+        expires = 0
+        for televersement in morceaux.expires().iterator():
+            morceaux.abandonner(televersement)
+            expires += 1
+
+        orphelins = 0
+        dossier = morceaux.dossier_partiels()
+        if os.path.isdir(dossier):
+            en_cours = {f'{pk}.part' for pk in Televersement.objects.values_list('pk', flat=True).iterator()}
+            limite = time.time() - morceaux.reglage('EXPIRATION')
+            for entree in os.scandir(dossier):
+                if entree.name not in en_cours and entree.stat().st_mtime < limite:
+                    os.unlink(entree.path)
+                    orphelins += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"{expires} téléversements expirés supprimés, {orphelins} fichiers partiels orphelins."))
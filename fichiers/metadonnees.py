@@ -0,0 +1,98 @@
+"""
+Métadonnées des fichiers déposés (taille, type MIME, empreinte, durée de
+réception), relevées une fois au dépôt, avant l'écriture dans le stockage,
+et gardées en base : une liste de documents n'interroge jamais le stockage.
+
+Le type MIME est reconnu d'après les premiers octets du contenu (signatures
+des formats acceptés), l'extension ne servant qu'à départager les
+conteneurs (zip des fichiers Office récents, OLE des anciens). Si
+python-magic est installé, il est utilisé à la place.
+"""
+import mimetypes
+import os
+
+try:
+    import magic
+except ImportError:
+    magic = None
+
+from .stockage import StockageDedupliquant, empreinte_fichier
+
+TAILLE_ENTETE = 2048
+
+# (décalage, signature, type MIME)
+SIGNATURES = [
+    (0, b'%PDF-', 'application/pdf'),
+    (0, b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (0, b'\xff\xd8\xff', 'image/jpeg'),
+    (0, b'GIF87a', 'image/gif'),
+    (0, b'GIF89a', 'image/gif'),
+    (0, b'ID3', 'audio/mpeg'),
+    (0, b'\xff\xfb', 'audio/mpeg'),
+    (0, b'\xff\xf3', 'audio/mpeg'),
+    (0, b'\xff\xf2', 'audio/mpeg'),
+    (8, b'AVI ', 'video/x-msvideo'),
+    (8, b'WAVE', 'audio/wav'),
+    (4, b'ftypqt', 'video/quicktime'),
+    (4, b'ftypM4A', 'audio/mp4'),
+    (4, b'ftyp', 'video/mp4'),
+]
+CONTENEURS = {
+    b'PK\x03\x04': ('application/zip', ('.docx', '.xlsx', '.pptx')),
+    b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1': ('application/x-ole-storage', ('.doc', '.xls', '.ppt')),
+}
+
+
+def detecter_type(entete, nom=''):
+    """Type MIME d'après les premiers octets du contenu (`entete`)"""
+    if magic is not None:
+        return magic.from_buffer(entete, mime=True)
+    for decalage, signature, type_mime in SIGNATURES:
+        if entete[decalage:decalage + len(signature)] == signature:
+            return type_mime
+    for signature, (type_mime, extensions) in CONTENEURS.items():
+        if entete.startswith(signature):
+            extension = os.path.splitext(nom)[1].lower()
+            return mimetypes.guess_type(nom)[0] if extension in extensions else type_mime
+    return 'application/octet-stream'
+
+
+def lire(contenu, nom=''):
+    """
+    {taille, type_mime, empreinte, duree_televersement} d'un fichier pas encore
+    enregistré. L'empreinte calculée ici est posée sur le fichier (`sha256`)
+    pour que StockageDedupliquant ne relise pas le contenu.
+    """
+    if getattr(contenu, 'sha256', None) is None:
+        contenu.seek(0)
+        contenu.sha256 = empreinte_fichier(contenu)[0]
+    contenu.seek(0)
+    entete = contenu.read(TAILLE_ENTETE)
+    contenu.seek(0)
+    if isinstance(entete, str):
+        entete = entete.encode()
+    return {
+        'taille': contenu.size,
+        'type_mime': detecter_type(entete, nom or getattr(contenu, 'name', '') or ''),
+        'empreinte': contenu.sha256,
+        'duree_televersement': getattr(contenu, 'duree_reception', None),
+    }
+
+
+def lire_stocke(stockage, nom):
+    """Mêmes métadonnées pour un fichier déjà stocké (rattrapage) ; sans durée de réception"""
+    with stockage.open(nom, 'rb') as fichier:
+        entete = fichier.read(TAILLE_ENTETE)
+        if isinstance(stockage, StockageDedupliquant) and stockage.est_blob(nom):
+            # Le nom d'un blob est son empreinte : seul l'en-tête est lu
+            empreinte = os.path.splitext(os.path.basename(nom))[0]
+            taille = stockage.size(nom)
+        else:
+            fichier.seek(0)
+            empreinte, taille = empreinte_fichier(fichier)
+    return {
+        'taille': taille,
+        'type_mime': detecter_type(entete, nom),
+        'empreinte': empreinte,
+        'duree_televersement': None,
+    }
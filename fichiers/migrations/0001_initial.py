@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Blob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chemin', models.CharField(max_length=255, unique=True, verbose_name='Chemin')),
+                ('empreinte', models.CharField(db_index=True, max_length=64, verbose_name='Empreinte SHA-256')),
+                ('taille', models.BigIntegerField(verbose_name='Taille (octets)')),
+                ('references', models.PositiveIntegerField(default=0, verbose_name='Références')),
+                ('date_creation', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+            ],
+            options={
+                'verbose_name': 'Contenu stocké',
+                'verbose_name_plural': 'Contenus stockés',
+            },
+        ),
+    ]
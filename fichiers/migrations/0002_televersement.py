@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 18:51
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fichiers', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Televersement',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('nom', models.CharField(max_length=255, verbose_name='Nom du fichier')),
+                ('taille', models.BigIntegerField(verbose_name='Taille totale (octets)')),
+                ('taille_morceau', models.PositiveIntegerField(verbose_name='Taille des morceaux (octets)')),
+                ('recu', models.BigIntegerField(default=0, verbose_name='Octets reçus')),
+                ('metadonnees', models.JSONField(blank=True, default=dict, verbose_name='Métadonnées')),
+                ('date_creation', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('date_maj', models.DateTimeField(auto_now=True, verbose_name='Dernier morceau reçu')),
+                ('proprietaire', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='televersements', to=settings.AUTH_USER_MODEL, verbose_name='Propriétaire')),
+            ],
+            options={
+                'verbose_name': 'Téléversement en cours',
+                'verbose_name_plural': 'Téléversements en cours',
+            },
+        ),
+    ]
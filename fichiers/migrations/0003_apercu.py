@@ -0,0 +1,37 @@
+# Generated by Django 5.2 on 2026-10-18 18:57
+
+import django.db.models.deletion
+import fichiers.stockage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fichiers', '0002_televersement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Apercu',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('statut', models.CharField(choices=[('en_attente', 'En attente'), ('en_cours', 'En cours'), ('termine', 'Terminé'), ('indisponible', 'Indisponible'), ('echec', 'Échec')], default='en_attente', max_length=20, verbose_name='Statut')),
+                ('vignette', models.FileField(blank=True, storage=fichiers.stockage.stockage_documents, upload_to='', verbose_name='Vignette')),
+                ('largeur', models.PositiveIntegerField(blank=True, null=True, verbose_name='Largeur')),
+                ('hauteur', models.PositiveIntegerField(blank=True, null=True, verbose_name='Hauteur')),
+                ('pages', models.PositiveIntegerField(blank=True, null=True, verbose_name='Pages')),
+                ('duree', models.FloatField(blank=True, null=True, verbose_name='Durée (secondes)')),
+                ('tentatives', models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')),
+                ('erreur', models.TextField(blank=True, verbose_name='Erreur')),
+                ('date_creation', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('date_reservation', models.DateTimeField(blank=True, null=True, verbose_name='Pris en charge le')),
+                ('blob', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='apercu', to='fichiers.blob', verbose_name='Contenu')),
+            ],
+            options={
+                'verbose_name': 'Aperçu',
+                'verbose_name_plural': 'Aperçus',
+                'indexes': [models.Index(fields=['statut', 'date_creation'], name='apercu_file_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,133 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from . import metadonnees
+from .stockage import stockage_documents
+
+
+class Blob(models.Model):
+    """
+    Contenu stocké une seule fois par le StockageDedupliquant, sous un nom
+    dérivé de son empreinte SHA-256. `references` compte les champs FileField
+    qui le désignent ; le fichier est supprimé quand il tombe à zéro.
+    """
+    chemin = models.CharField(_('Chemin'), max_length=255, unique=True)
+    empreinte = models.CharField(_('Empreinte SHA-256'), max_length=64, db_index=True)
+    taille = models.BigIntegerField(_('Taille (octets)'))
+    references = models.PositiveIntegerField(_('Références'), default=0)
+    date_creation = models.DateTimeField(_('Date de création'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Contenu stocké')
+        verbose_name_plural = _('Contenus stockés')
+
+    def __str__(self):
+        return f'{self.chemin} ({self.references})'
+
+
+class Televersement(models.Model):
+    """
+    Téléversement par morceaux en cours (voir fichiers.morceaux). Les octets
+    reçus s'accumulent dans un fichier partiel ; `recu` est le décalage à
+    partir duquel le client doit reprendre. `metadonnees` garde ce qu'il faut
+    pour créer l'objet final une fois le fichier complet.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    proprietaire = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='televersements',
+        verbose_name=_('Propriétaire')
+    )
+    nom = models.CharField(_('Nom du fichier'), max_length=255)
+    taille = models.BigIntegerField(_('Taille totale (octets)'))
+    taille_morceau = models.PositiveIntegerField(_('Taille des morceaux (octets)'))
+    recu = models.BigIntegerField(_('Octets reçus'), default=0)
+    metadonnees = models.JSONField(_('Métadonnées'), default=dict, blank=True)
+    date_creation = models.DateTimeField(_('Date de création'), auto_now_add=True)
+    date_maj = models.DateTimeField(_('Dernier morceau reçu'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Téléversement en cours')
+        verbose_name_plural = _('Téléversements en cours')
+
+    def __str__(self):
+        return f'{self.nom} ({self.recu}/{self.taille})'
+
+    @property
+    def termine(self):
+        return self.recu >= self.taille
+
+
+class Apercu(models.Model):
+    """
+    Vignette et caractéristiques (dimensions, pages, durée) d'un contenu
+    stocké. Calculé une fois par contenu, en arrière-plan : la ligne sert
+    aussi de file d'attente (voir fichiers.apercus).
+    """
+    STATUTS = [
+        ('en_attente', _('En attente')),
+        ('en_cours', _('En cours')),
+        ('termine', _('Terminé')),
+        ('indisponible', _('Indisponible')),
+        ('echec', _('Échec')),
+    ]
+
+    blob = models.OneToOneField(Blob, on_delete=models.CASCADE, related_name='apercu', verbose_name=_('Contenu'))
+    statut = models.CharField(_('Statut'), max_length=20, choices=STATUTS, default='en_attente')
+    vignette = models.FileField(_('Vignette'), storage=stockage_documents, blank=True)
+    largeur = models.PositiveIntegerField(_('Largeur'), null=True, blank=True)
+    hauteur = models.PositiveIntegerField(_('Hauteur'), null=True, blank=True)
+    pages = models.PositiveIntegerField(_('Pages'), null=True, blank=True)
+    duree = models.FloatField(_('Durée (secondes)'), null=True, blank=True)
+    tentatives = models.PositiveSmallIntegerField(_('Tentatives'), default=0)
+    erreur = models.TextField(_('Erreur'), blank=True)
+    date_creation = models.DateTimeField(_('Date de création'), auto_now_add=True)
+    date_reservation = models.DateTimeField(_('Pris en charge le'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('Aperçu')
+        verbose_name_plural = _('Aperçus')
+        indexes = [
+            # La file : aperçus en attente, les plus anciens d'abord
+            models.Index(fields=['statut', 'date_creation'], name='apercu_file_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.blob.chemin} ({self.get_statut_display()})'
+
+
+class MetadonneesFichier(models.Model):
+    """
+    Description du fichier (champ `champ_fichier`) d'un modèle, relevée à
+    chaque dépôt d'un nouveau fichier (voir fichiers.metadonnees) : taille,
+    type MIME reconnu d'après le contenu, empreinte et durée de réception.
+    """
+    champ_fichier = 'fichier'
+
+    # Colonnes NULL sans défaut : ajoutées par ALTER TABLE ADD COLUMN, sans reconstruire la table
+    taille = models.BigIntegerField(_('Taille (octets)'), null=True, blank=True, editable=False)
+    type_mime = models.CharField(_('Type MIME'), max_length=100, null=True, blank=True, editable=False)
+    empreinte = models.CharField(_('Empreinte SHA-256'), max_length=64, null=True, blank=True, editable=False)
+    duree_televersement = models.DurationField(
+        _('Durée du téléversement'), null=True, blank=True, editable=False)
+
+    CHAMPS_METADONNEES = ('taille', 'type_mime', 'empreinte', 'duree_televersement')
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        fichier = getattr(self, self.champ_fichier)
+        if fichier and not fichier._committed:
+            for nom, valeur in metadonnees.lire(fichier.file, fichier.name).items():
+                setattr(self, nom, valeur)
+        elif not fichier:
+            for nom in self.CHAMPS_METADONNEES:
+                setattr(self, nom, None)
+        if kwargs.get('update_fields') is not None and self.champ_fichier in kwargs['update_fields']:
+            kwargs['update_fields'] = {*kwargs['update_fields'], *self.CHAMPS_METADONNEES}
+        super().save(*args, **kwargs)
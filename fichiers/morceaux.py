@@ -0,0 +1,188 @@
+"""
+Téléversement par morceaux, reprenable.
+
+Le client ouvre un Televersement (nom, taille totale), puis envoie le
+fichier morceau par morceau, chacun à son décalage (`Upload-Offset`, comme
+le protocole tus). Les morceaux sont écrits à la suite dans un fichier
+partiel ; si la connexion tombe, le client redemande `recu` et reprend à
+partir de là, sans renvoyer ce qui est déjà arrivé.
+
+Le corps de la requête est lu par blocs de TAILLE_BLOC : un worker ne tient
+jamais plus d'un morceau en mémoire (en pratique, un bloc). Chaque morceau
+peut porter sa propre empreinte (`Upload-Checksum: sha256 <base64>`),
+vérifiée au fil de l'écriture.
+
+Une fois le fichier complet, `fichier_assemble()` le présente comme un
+fichier temporaire : il est lu une fois pour son empreinte, puis déplacé
+dans le stockage (même système de fichiers, simple renommage).
+
+Réglages dans settings.TELEVERSEMENTS (valeurs par défaut ci-dessous).
+"""
+import base64
+import hashlib
+import os
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File, locks
+from django.utils import timezone
+
+from .models import Televersement
+
+TAILLE_BLOC = 64 * 1024
+
+REGLAGES_PAR_DEFAUT = {
+    # Taille maximale d'un morceau
+    'TAILLE_MORCEAU': 8 * 1024 * 1024,
+    # Taille maximale d'un fichier téléversé par morceaux
+    'TAILLE_MAX': 2 * 1024 ** 3,
+    # Taille maximale d'un fichier envoyé d'un bloc par formulaire
+    'TAILLE_MAX_FORMULAIRE': 20 * 1024 * 1024,
+    # Espace disque par formateur (documents déposés et téléversements en cours)
+    'QUOTA_FORMATEUR': 10 * 1024 ** 3,
+    # Délai (secondes) sans nouveau morceau après lequel un téléversement est purgé
+    'EXPIRATION': 24 * 3600,
+    # Dossier des fichiers partiels (par défaut MEDIA_ROOT/.televersements)
+    'DOSSIER': None,
+}
+
+
+class ErreurMorceau(Exception):
+    """Morceau refusé ; le fichier partiel est laissé tel qu'avant la requête"""
+    statut = 400
+
+
+class DecalageInvalide(ErreurMorceau):
+    """Le morceau ne commence pas là où le serveur attend la suite"""
+    statut = 409
+
+    def __init__(self, recu):
+        super().__init__(f'Décalage attendu : {recu}')
+        self.recu = recu
+
+
+class MorceauTropGrand(ErreurMorceau):
+    statut = 413
+
+
+def reglage(nom):
+    return getattr(settings, 'TELEVERSEMENTS', {}).get(nom, REGLAGES_PAR_DEFAUT[nom])
+
+
+def dossier_partiels():
+    return reglage('DOSSIER') or os.path.join(settings.MEDIA_ROOT, '.televersements')
+
+
+def chemin_partiel(televersement):
+    return os.path.join(dossier_partiels(), f'{televersement.pk}.part')
+
+
+def ouvrir(proprietaire, nom, taille, metadonnees=None):
+    """Crée un téléversement vide et son fichier partiel"""
+    televersement = Televersement.objects.create(
+        proprietaire=proprietaire, nom=nom, taille=taille,
+        taille_morceau=reglage('TAILLE_MORCEAU'), metadonnees=metadonnees or {},
+    )
+    os.makedirs(dossier_partiels(), exist_ok=True)
+    open(chemin_partiel(televersement), 'xb').close()
+    return televersement
+
+
+def lire_empreinte(entete):
+    """`sha256 <base64>` → empreinte binaire ; None si l'en-tête est absent"""
+    if not entete:
+        return None
+    algorithme, _, valeur = entete.partition(' ')
+    if algorithme.lower() != 'sha256':
+        raise ErreurMorceau(f'Algorithme non pris en charge : {algorithme}')
+    try:
+        return base64.b64decode(valeur.strip(), validate=True)
+    except ValueError:
+        raise ErreurMorceau('Empreinte illisible')
+
+
+def ecrire_morceau(televersement, decalage, flux, longueur, empreinte=None):
+    """
+    Écrit `longueur` octets lus dans `flux` à la position `decalage` et
+    renvoie le nouveau nombre d'octets reçus. Un morceau incomplet ou dont
+    l'empreinte ne correspond pas est retiré du fichier partiel.
+    """
+    if longueur > televersement.taille_morceau:
+        raise MorceauTropGrand(f'Morceau limité à {televersement.taille_morceau} octets')
+    if longueur <= 0 or decalage + longueur > televersement.taille:
+        raise ErreurMorceau('Le morceau dépasse la taille annoncée')
+    sha = hashlib.sha256() if empreinte is not None else None
+    with open(chemin_partiel(televersement), 'r+b') as sortie:
+        # Verrou exclusif : deux envois concurrents du même morceau ne s'entremêlent pas
+        locks.lock(sortie, locks.LOCK_EX)
+        try:
+            recu = Televersement.objects.filter(pk=televersement.pk).values_list('recu', flat=True).first()
+            if recu is None:
+                raise ErreurMorceau('Téléversement abandonné')
+            if decalage != recu:
+                raise DecalageInvalide(recu)
+            sortie.seek(decalage)
+            # Reste éventuel d'un envoi interrompu avant la mise à jour de `recu`
+            sortie.truncate()
+            reste = longueur
+            while reste:
+                bloc = flux.read(min(TAILLE_BLOC, reste))
+                if not bloc:
+                    break
+                sortie.write(bloc)
+                if sha is not None:
+                    sha.update(bloc)
+                reste -= len(bloc)
+            if reste:
+                sortie.truncate(decalage)
+                raise ErreurMorceau('Morceau incomplet')
+            if sha is not None and sha.digest() != empreinte:
+                sortie.truncate(decalage)
+                raise ErreurMorceau('Empreinte du morceau invalide')
+            sortie.flush()
+            os.fsync(sortie.fileno())
+            Televersement.objects.filter(pk=televersement.pk, recu=decalage).update(
+                recu=decalage + longueur, date_maj=timezone.now())
+        finally:
+            locks.unlock(sortie)
+    televersement.recu = decalage + longueur
+    return televersement.recu
+
+
+class FichierAssemble(File):
+    """Fichier partiel complet, présenté comme un fichier temporaire à déplacer"""
+
+    def __init__(self, chemin, nom):
+        super().__init__(open(chemin, 'rb'), name=nom)
+        self.chemin = chemin
+
+    def temporary_file_path(self):
+        return self.chemin
+
+
+@contextmanager
+def fichier_assemble(televersement):
+    """Le fichier complet, à enregistrer dans un FileField ; supprimé à la sortie s'il n'a pas été déplacé"""
+    chemin = chemin_partiel(televersement)
+    fichier = FichierAssemble(chemin, televersement.nom)
+    fichier.duree_reception = timezone.now() - televersement.date_creation
+    try:
+        yield fichier
+    finally:
+        fichier.close()
+        if os.path.exists(chemin):
+            os.unlink(chemin)
+
+
+def abandonner(televersement):
+    """Supprime le téléversement et son fichier partiel"""
+    chemin = chemin_partiel(televersement)
+    televersement.delete()
+    if os.path.exists(chemin):
+        os.unlink(chemin)
+
+
+def expires():
+    limite = timezone.now() - timedelta(seconds=reglage('EXPIRATION'))
+    return Televersement.objects.filter(date_maj__lt=limite)
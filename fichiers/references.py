@@ -0,0 +1,45 @@
+"""
+Suivi des références aux fichiers : quand une ligne est supprimée ou que
+son fichier est remplacé, l'ancien fichier est rendu au stockage (qui, s'il
+déduplique, ne décrémente que son compteur de références), une fois la
+transaction validée.
+
+    suivre(Document, 'fichier')
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+
+# [(modèle, nom du champ)] : parcourus par la commande dedupliquer_medias
+CHAMPS_SUIVIS = []
+
+
+def _liberer(champ, nom):
+    if nom:
+        transaction.on_commit(lambda: champ.storage.delete(nom))
+
+
+def suivre(modele, nom_champ):
+    champ = modele._meta.get_field(nom_champ)
+    CHAMPS_SUIVIS.append((modele, nom_champ))
+
+    def avant_enregistrement(sender, instance, raw=False, **kwargs):
+        fichier = getattr(instance, nom_champ)
+        if raw or instance.pk is None or (fichier and getattr(fichier, '_committed', True)):
+            return
+        # Nouveau fichier ou fichier retiré : on retient l'ancien nom pour le libérer ensuite
+        instance._fichiers_remplaces = getattr(instance, '_fichiers_remplaces', {})
+        instance._fichiers_remplaces[nom_champ] = sender._default_manager.filter(
+            pk=instance.pk).values_list(nom_champ, flat=True).first()
+
+    def apres_enregistrement(sender, instance, **kwargs):
+        ancien = getattr(instance, '_fichiers_remplaces', {}).pop(nom_champ, None)
+        if ancien and ancien != getattr(instance, nom_champ).name:
+            _liberer(champ, ancien)
+
+    def apres_suppression(sender, instance, **kwargs):
+        _liberer(champ, getattr(instance, nom_champ).name)
+
+    uid = f'fichiers.references:{modele._meta.label}.{nom_champ}'
+    pre_save.connect(avant_enregistrement, sender=modele, weak=False, dispatch_uid=uid)
+    post_save.connect(apres_enregistrement, sender=modele, weak=False, dispatch_uid=uid)
+    post_delete.connect(apres_suppression, sender=modele, weak=False, dispatch_uid=uid)
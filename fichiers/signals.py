@@ -0,0 +1,18 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import apercus
+from .models import Apercu, Blob
+
+
+@receiver(post_save, sender=Blob)
+def _blob_cree(sender, instance, created, raw=False, **kwargs):
+    # Nouveau contenu : son aperçu entre en file, dans la même transaction que le dépôt
+    if created and not raw:
+        Apercu.objects.create(blob=instance)
+
+
+@receiver(post_delete, sender=Apercu)
+def _apercu_supprime(sender, instance, **kwargs):
+    transaction.on_commit(lambda: apercus.supprimer_vignette(instance))
@@ -0,0 +1,156 @@
+"""
+Stockage dédupliquant, adressé par le contenu.
+
+Chaque fichier est rangé sous `blobs/ab/cd/<sha256><.ext>` : deux dépôts
+identiques (le même support de cours pour plusieurs formations, un CV déposé
+deux fois) partagent un seul fichier sur disque. La table fichiers.Blob
+compte les références ; `delete()` décrémente et ne supprime le fichier
+qu'à la disparition de la dernière.
+
+L'empreinte est calculée pendant l'écriture, morceau par morceau ; quand
+le fichier vient d'un formulaire, les gestionnaires de
+fichiers.televersement l'ont déjà calculée au fil de la réception et le
+fichier temporaire est simplement déplacé : le contenu n'est jamais relu.
+Un fichier assemblé par fichiers.morceaux est lu une fois, puis déplacé.
+
+Les noms qui ne commencent pas par `blobs/` (fichiers déposés avant ce
+stockage) sont traités comme par FileSystemStorage ;
+`python manage.py dedupliquer_medias` les convertit.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+PREFIXE = 'blobs'
+TAILLE_MORCEAU = 64 * 1024
+
+
+def stockage_documents():
+    """Stockage des fichiers de Document et DocumentEleve (STORAGES['documents'])"""
+    return storages['documents']
+
+
+def empreinte_fichier(fichier, taille_morceau=TAILLE_MORCEAU):
+    """SHA-256 et taille d'un fichier ouvert en binaire, lu par morceaux"""
+    sha = hashlib.sha256()
+    taille = 0
+    for morceau in iter(lambda: fichier.read(taille_morceau), b''):
+        sha.update(morceau)
+        taille += len(morceau)
+    return sha.hexdigest(), taille
+
+
+@deconstructible(path='fichiers.stockage.StockageDedupliquant')
+class StockageDedupliquant(FileSystemStorage):
+
+    def nom_blob(self, empreinte, nom):
+        extension = os.path.splitext(nom)[1].lower()
+        return f'{PREFIXE}/{empreinte[:2]}/{empreinte[2:4]}/{empreinte}{extension}'
+
+    def est_blob(self, nom):
+        return (nom or '').startswith(PREFIXE + '/')
+
+    def _save(self, name, content):
+        empreinte = getattr(content, 'sha256', None)
+        temporaire = None
+        if empreinte is None and hasattr(content, 'temporary_file_path'):
+            # Fichier déjà sur disque (téléversement par morceaux) : une lecture, puis un simple déplacement
+            with open(content.temporary_file_path(), 'rb') as fichier:
+                empreinte = empreinte_fichier(fichier)[0]
+        elif empreinte is None:
+            empreinte, temporaire = self._ecrire_temporaire(content)
+        nom = self.nom_blob(empreinte, name)
+        chemin = self.path(nom)
+        try:
+            if not os.path.exists(chemin):
+                os.makedirs(os.path.dirname(chemin), exist_ok=True)
+                if temporaire:
+                    os.replace(temporaire, chemin)
+                    temporaire = None
+                elif hasattr(content, 'temporary_file_path'):
+                    file_move_safe(content.temporary_file_path(), chemin, allow_overwrite=True)
+                else:
+                    self._ecrire(content, chemin)
+                if self.file_permissions_mode is not None:
+                    os.chmod(chemin, self.file_permissions_mode)
+        finally:
+            if temporaire:
+                os.unlink(temporaire)
+        self.referencer(nom, empreinte, os.path.getsize(chemin))
+        return nom
+
+    def _ecrire_temporaire(self, content):
+        """Copie `content` dans un fichier temporaire du stockage en calculant son empreinte au passage"""
+        dossier = self.path(PREFIXE)
+        os.makedirs(dossier, exist_ok=True)
+        descripteur, temporaire = tempfile.mkstemp(dir=dossier, prefix='.televersement-')
+        sha = hashlib.sha256()
+        try:
+            with os.fdopen(descripteur, 'wb') as sortie:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for morceau in content.chunks(TAILLE_MORCEAU):
+                    if isinstance(morceau, str):
+                        morceau = morceau.encode()
+                    sha.update(morceau)
+                    sortie.write(morceau)
+        except BaseException:
+            os.unlink(temporaire)
+            raise
+        return sha.hexdigest(), temporaire
+
+    def _ecrire(self, content, chemin):
+        # Écriture dans un temporaire voisin puis renommage : un lecteur ne voit jamais de blob partiel
+        descripteur, temporaire = tempfile.mkstemp(dir=os.path.dirname(chemin), prefix='.televersement-')
+        try:
+            with os.fdopen(descripteur, 'wb') as sortie:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for morceau in content.chunks(TAILLE_MORCEAU):
+                    sortie.write(morceau.encode() if isinstance(morceau, str) else morceau)
+            os.replace(temporaire, chemin)
+        except BaseException:
+            if os.path.exists(temporaire):
+                os.unlink(temporaire)
+            raise
+
+    def referencer(self, nom, empreinte, taille):
+        """Ajoute une référence au blob `nom`, en créant sa ligne au besoin"""
+        from .models import Blob
+
+        if Blob.objects.filter(chemin=nom).update(references=F('references') + 1):
+            return
+        try:
+            with transaction.atomic():
+                Blob.objects.create(chemin=nom, empreinte=empreinte, taille=taille, references=1)
+        except IntegrityError:
+            # Créé entre-temps par un dépôt concurrent du même contenu
+            Blob.objects.filter(chemin=nom).update(references=F('references') + 1)
+
+    def delete(self, name):
+        if not self.est_blob(name):
+            return super().delete(name)
+        from .models import Blob
+
+        with transaction.atomic():
+            blob = Blob.objects.select_for_update().filter(chemin=name).first()
+            if blob is None:
+                return super().delete(name)
+            if blob.references > 1:
+                Blob.objects.filter(pk=blob.pk).update(references=F('references') - 1)
+                return
+            blob.delete()
+            # Le fichier ne disparaît qu'une fois la suppression validée, et s'il n'a pas été re-déposé entre-temps
+            transaction.on_commit(lambda: self._supprimer_orphelin(name))
+
+    def _supprimer_orphelin(self, name):
+        from .models import Blob
+
+        if not Blob.objects.filter(chemin=name).exists():
+            super().delete(name)
@@ -0,0 +1,163 @@
+"""
+Envoi des fichiers protégés (Document, DocumentEleve), après contrôle
+d'accès par la vue appelante.
+
+- Validateurs : ETag (l'empreinte SHA-256 pour les blobs du stockage
+  dédupliqué, sinon date et taille) et Last-Modified ; `If-None-Match` /
+  `If-Modified-Since` répondent 304 sans ouvrir le fichier.
+- Plages : `Range: bytes=…` (une seule plage, pour la lecture vidéo et la
+  reprise des téléchargements), 206 ou 416, avec `If-Range`.
+- Le fichier entier part par FileResponse : le serveur WSGI le transmet
+  par son wsgi.file_wrapper (os.sendfile, sans copie, pour gunicorn). Une
+  plage est lue par blocs.
+- TELECHARGEMENTS['MODE'] = 'x-accel-redirect' (nginx) ou 'x-sendfile'
+  (Apache, lighttpd) : Django ne fait que le contrôle d'accès et délègue
+  l'envoi, plages comprises, au serveur frontal.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+from .stockage import PREFIXE
+
+REGLAGES_PAR_DEFAUT = {
+    # 'django', 'x-accel-redirect' ou 'x-sendfile'
+    'MODE': 'django',
+    # Emplacement interne nginx (location … { internal; alias MEDIA_ROOT/; })
+    'PREFIXE_INTERNE': '/media-protege/',
+}
+PLAGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+TAILLE_BLOC = 64 * 1024
+
+
+def reglage(nom):
+    return getattr(settings, 'TELECHARGEMENTS', {}).get(nom, REGLAGES_PAR_DEFAUT[nom])
+
+
+class PlageNonSatisfiable(Exception):
+    pass
+
+
+def lire_plage(entete, taille):
+    """
+    (début, fin incluse) demandés par l'en-tête Range ; None pour le fichier
+    entier (en-tête absent, illisible, ou plusieurs plages).
+    """
+    correspondance = PLAGE.match(entete.strip()) if entete else None
+    if correspondance is None or correspondance.groups() == ('', ''):
+        return None
+    debut, fin = correspondance.groups()
+    if not debut:
+        # `bytes=-N` : les N derniers octets
+        if int(fin) == 0 or taille == 0:
+            raise PlageNonSatisfiable
+        return max(taille - int(fin), 0), taille - 1
+    debut = int(debut)
+    if fin and int(fin) < debut:
+        return None
+    if debut >= taille:
+        raise PlageNonSatisfiable
+    return debut, min(int(fin), taille - 1) if fin else taille - 1
+
+
+class PlageFichier:
+    """Lecture bornée à une plage ; sans fileno(), le serveur ne l'envoie jamais au-delà"""
+
+    def __init__(self, fichier, debut, longueur):
+        fichier.seek(debut)
+        self.fichier = fichier
+        self.reste = longueur
+
+    def read(self, taille=-1):
+        if taille < 0 or taille > self.reste:
+            taille = self.reste
+        morceau = self.fichier.read(taille) if taille else b''
+        self.reste -= len(morceau)
+        return morceau
+
+    def close(self):
+        self.fichier.close()
+
+
+def etiquette(nom, etat):
+    nom_base = os.path.splitext(os.path.basename(nom))[0]
+    if nom.startswith(PREFIXE + '/') and len(nom_base) == 64:
+        # Le nom d'un blob est l'empreinte de son contenu : un ETag fort, sans calcul
+        return f'"{nom_base}"'
+    return f'"{etat.st_mtime_ns:x}-{etat.st_size:x}"'
+
+
+def servir(request, champ, nom_telechargement=None, en_piece_jointe=False):
+    """Réponse HTTP pour le FieldFile `champ` (404 si le fichier manque)"""
+    if not champ:
+        raise Http404
+    try:
+        chemin = champ.storage.path(champ.name)
+        etat = os.stat(chemin)
+    except (NotImplementedError, OSError):
+        raise Http404
+    etag = etiquette(champ.name, etat)
+    derniere_modification = int(etat.st_mtime)
+    nom_telechargement = nom_telechargement or os.path.basename(champ.name)
+
+    response = get_conditional_response(request, etag=etag, last_modified=derniere_modification)
+    if response is None:
+        mode = reglage('MODE')
+        if mode == 'x-accel-redirect':
+            response = deleguer('X-Accel-Redirect', reglage('PREFIXE_INTERNE') + quote(champ.name))
+        elif mode == 'x-sendfile':
+            response = deleguer('X-Sendfile', chemin)
+        else:
+            response = envoyer(request, chemin, etat.st_size, etag, derniere_modification)
+        if response.status_code != 416:
+            type_mime = mimetypes.guess_type(nom_telechargement)[0]
+            response['Content-Type'] = type_mime or 'application/octet-stream'
+            response['Content-Disposition'] = content_disposition_header(en_piece_jointe, nom_telechargement)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(derniere_modification)
+    response['Accept-Ranges'] = 'bytes'
+    # Fichier protégé : jamais dans un cache partagé, toujours revalidé (304 si inchangé)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def deleguer(entete, valeur):
+    response = HttpResponse()
+    response[entete] = valeur
+    return response
+
+
+def envoyer(request, chemin, taille, etag, derniere_modification):
+    plage = None
+    if request.method in ('GET', 'HEAD') and plage_applicable(request, etag, derniere_modification):
+        try:
+            plage = lire_plage(request.headers.get('Range'), taille)
+        except PlageNonSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{taille}'
+            return response
+    fichier = open(chemin, 'rb')
+    if plage is None:
+        return FileResponse(fichier)
+    debut, fin = plage
+    response = FileResponse(PlageFichier(fichier, debut, fin - debut + 1), status=206)
+    response.block_size = TAILLE_BLOC
+    response['Content-Length'] = fin - debut + 1
+    response['Content-Range'] = f'bytes {debut}-{fin}/{taille}'
+    return response
+
+
+def plage_applicable(request, etag, derniere_modification):
+    """If-Range : la plage ne vaut que si le fichier est toujours celui que le client a commencé"""
+    condition = request.headers.get('If-Range')
+    if not condition:
+        return True
+    if condition.startswith(('"', 'W/')):
+        return condition == etag
+    return parse_http_date_safe(condition) == derniere_modification
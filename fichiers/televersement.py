@@ -0,0 +1,42 @@
+"""
+Gestionnaires de téléversement qui calculent l'empreinte SHA-256 des
+fichiers au fil de la réception, morceau par morceau. Le fichier reçu porte
+l'empreinte dans son attribut `sha256`, que StockageDedupliquant utilise
+sans relire le contenu, et la durée de sa réception dans `duree_reception`.
+"""
+import hashlib
+import time
+from datetime import timedelta
+
+from django.core.files.uploadhandler import MemoryFileUploadHandler, TemporaryFileUploadHandler
+
+
+class EmpreinteMixin:
+
+    def new_file(self, *args, **kwargs):
+        # Avant super() : MemoryFileUploadHandler.new_file lève StopFutureHandlers quand il prend le fichier
+        self.sha256 = hashlib.sha256()
+        self.debut = time.monotonic()
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        reste = super().receive_data_chunk(raw_data, start)
+        if reste is None:
+            # Morceau consommé par ce gestionnaire (et non transmis au suivant)
+            self.sha256.update(raw_data)
+        return reste
+
+    def file_complete(self, file_size):
+        fichier = super().file_complete(file_size)
+        if fichier is not None:
+            fichier.sha256 = self.sha256.hexdigest()
+            fichier.duree_reception = timedelta(seconds=time.monotonic() - self.debut)
+        return fichier
+
+
+class MemoireEmpreinteUploadHandler(EmpreinteMixin, MemoryFileUploadHandler):
+    pass
+
+
+class TemporaireEmpreinteUploadHandler(EmpreinteMixin, TemporaryFileUploadHandler):
+    pass
@@ -0,0 +1,234 @@
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from documents.models import Document
+from formateurs.models import Formateur
+from . import apercus, generateurs, metadonnees, morceaux
+from .models import Apercu, Blob, Televersement
+from .stockage import StockageDedupliquant
+
+CONTENU = b'%PDF-1.4 support de cours\n' * 100
+
+
+class StockageDedupliquantTests(TestCase):
+    """Un fichier par contenu, compteur de références, libération au dernier retrait"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        reglages = override_settings(MEDIA_ROOT=self.media)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.addCleanup(shutil.rmtree, self.media)
+        user = CustomUser.objects.create(username='formateur', email='formateur@example.com', is_formateur=True)
+        self.formateur = Formateur.objects.create(user=user, specialite='Python', experience=5, bio='', matricule='F1')
+
+    def creer(self, nom='cours.pdf', contenu=CONTENU):
+        return Document.objects.create(formateur=self.formateur, titre=nom, fichier=ContentFile(contenu, name=nom))
+
+    def chemin(self, nom):
+        return os.path.join(self.media, nom)
+
+    def test_deduplication_et_references(self):
+        premier, second = self.creer(), self.creer('copie.PDF')
+        empreinte = hashlib.sha256(CONTENU).hexdigest()
+        self.assertEqual(premier.fichier.name, f'blobs/{empreinte[:2]}/{empreinte[2:4]}/{empreinte}.pdf')
+        self.assertEqual(second.fichier.name, premier.fichier.name)
+        self.assertEqual(Blob.objects.get().references, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            premier.delete()
+        self.assertTrue(os.path.exists(self.chemin(second.fichier.name)))
+        self.assertEqual(Blob.objects.get().references, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(os.path.exists(self.chemin(second.fichier.name)))
+        self.assertFalse(Blob.objects.exists())
+
+    def test_remplacement_libere_l_ancien_fichier(self):
+        document = self.creer()
+        ancien = document.fichier.name
+        with self.captureOnCommitCallbacks(execute=True):
+            document.fichier = ContentFile(b'nouvelle version', name='cours.pdf')
+            document.save()
+        self.assertFalse(os.path.exists(self.chemin(ancien)))
+        self.assertEqual(list(Blob.objects.values_list('chemin', flat=True)), [document.fichier.name])
+
+    def test_empreinte_calculee_a_la_reception(self):
+        self.client.force_login(self.formateur.user)
+        # En mémoire, puis dans un fichier temporaire (déplacé tel quel dans le stockage)
+        for titre, taille_memoire in (('En mémoire', 2621440), ('Temporaire', 100)):
+            with self.subTest(titre), override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=taille_memoire):
+                response = self.client.post(reverse('documents:create'), {
+                    'titre': titre, 'type_document': 'PDF', 'description': '', 'visible_eleves': 'on',
+                    'fichier': SimpleUploadedFile('support.pdf', CONTENU, content_type='application/pdf'),
+                })
+                self.assertEqual(response.status_code, 302)
+                document = Document.objects.get(titre=titre)
+                self.assertIn(hashlib.sha256(CONTENU).hexdigest(), document.fichier.name)
+        self.assertEqual(Blob.objects.get().references, 2)
+
+    def test_metadonnees_relevees_au_depot(self):
+        document = self.creer()
+        self.assertEqual((document.taille, document.type_mime), (len(CONTENU), 'application/pdf'))
+        self.assertEqual(document.empreinte, hashlib.sha256(CONTENU).hexdigest())
+        self.client.force_login(self.formateur.user)
+        self.client.post(reverse('documents:create'), {
+            'titre': 'Reçu', 'type_document': 'PDF', 'description': '',
+            'fichier': SimpleUploadedFile('support.pdf', CONTENU),
+        })
+        self.assertIsNotNone(Document.objects.get(titre='Reçu').duree_televersement)
+
+        # La liste n'interroge plus le stockage pour afficher la taille
+        with mock.patch.object(StockageDedupliquant, 'size', side_effect=AssertionError):
+            self.assertEqual(Document.objects.get(pk=document.pk).get_file_size(), '2.5 Ko')
+            self.client.get(reverse('documents:list'))
+
+        Document.objects.update(taille=None, type_mime=None, empreinte=None)
+        call_command('decrire_fichiers', stdout=open(os.devnull, 'w'))
+        document.refresh_from_db()
+        self.assertEqual((document.taille, document.type_mime), (len(CONTENU), 'application/pdf'))
+
+    @unittest.skipIf(metadonnees.magic, "python-magic installé : signatures intégrées non utilisées")
+    def test_type_reconnu_au_contenu(self):
+        self.assertEqual(metadonnees.detecter_type(b'PK\x03\x04...', 'cours.docx'),
+                         'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+        self.assertEqual(metadonnees.detecter_type(b'PK\x03\x04...', 'cours.pdf'), 'application/zip')
+        self.assertEqual(metadonnees.detecter_type(b'\x00\x00\x00\x18ftypmp42', 'x.mov'), 'video/mp4')
+
+    def test_commande_de_deduplication(self):
+        for nom in ('documents/formateur_1/a.pdf', 'documents/formateur_2/b.pdf'):
+            os.makedirs(os.path.dirname(self.chemin(nom)), exist_ok=True)
+            with open(self.chemin(nom), 'wb') as fichier:
+                fichier.write(CONTENU)
+            Document.objects.filter(pk=self.creer(nom, b'autre').pk).update(fichier=nom)
+        call_command('dedupliquer_medias', '--recompter', stdout=open(os.devnull, 'w'))
+
+        noms = set(Document.objects.values_list('fichier', flat=True))
+        self.assertEqual(len(noms), 1)
+        self.assertTrue(os.path.exists(self.chemin(noms.pop())))
+        self.assertFalse(os.path.exists(self.chemin('documents/formateur_1/a.pdf')))
+        # Le contenu « autre », qui n'est plus référencé, a été purgé
+        self.assertEqual(list(Blob.objects.values_list('references', flat=True)), [2])
+
+
+class MorceauxTests(TestCase):
+    """Fichier partiel : un morceau interrompu est retiré, les téléversements expirés sont purgés"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        reglages = override_settings(MEDIA_ROOT=self.media, TELEVERSEMENTS={'TAILLE_MORCEAU': 10})
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.addCleanup(shutil.rmtree, self.media)
+        self.user = CustomUser.objects.create(username='formateur', email='formateur@example.com')
+
+    def test_morceau_interrompu(self):
+        televersement = morceaux.ouvrir(self.user, 'cours.mp3', 25)
+        self.assertEqual(morceaux.ecrire_morceau(televersement, 0, io.BytesIO(b'a' * 10), 10), 10)
+        with self.assertRaises(morceaux.ErreurMorceau):
+            # Connexion coupée après 4 octets sur 10
+            morceaux.ecrire_morceau(televersement, 10, io.BytesIO(b'b' * 4), 10)
+        self.assertEqual(os.path.getsize(morceaux.chemin_partiel(televersement)), 10)
+        with self.assertRaises(morceaux.DecalageInvalide) as erreur:
+            morceaux.ecrire_morceau(televersement, 14, io.BytesIO(b'b' * 10), 10)
+        self.assertEqual(erreur.exception.recu, 10)
+
+    def test_purge(self):
+        ancien = morceaux.ouvrir(self.user, 'ancien.mp4', 20)
+        recent = morceaux.ouvrir(self.user, 'recent.mp4', 20)
+        Televersement.objects.filter(pk=ancien.pk).update(date_maj=ancien.date_maj - timedelta(days=2))
+        call_command('purger_televersements', stdout=open(os.devnull, 'w'))
+        self.assertEqual(list(Televersement.objects.values_list('pk', flat=True)), [recent.pk])
+        self.assertFalse(os.path.exists(morceaux.chemin_partiel(ancien)))
+
+
+def vignette_factice(source, destination):
+    with open(destination, 'wb') as sortie:
+        sortie.write(b'JPEG')
+    return {'largeur': 595, 'hauteur': 842, 'pages': 12}
+
+
+class ApercusTests(TestCase):
+    """File d'aperçus : une entrée par contenu, traitée hors requête, vignette rangée avec le fichier"""
+
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        reglages = override_settings(MEDIA_ROOT=self.media)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.addCleanup(shutil.rmtree, self.media)
+        user = CustomUser.objects.create(username='formateur', email='formateur@example.com', is_formateur=True)
+        self.formateur = Formateur.objects.create(user=user, specialite='Python', experience=5, bio='', matricule='F1')
+
+    def creer(self, nom, contenu=CONTENU):
+        return Document.objects.create(formateur=self.formateur, titre=nom, fichier=ContentFile(contenu, name=nom))
+
+    @mock.patch.dict(generateurs.GENERATEURS, {'.pdf': vignette_factice})
+    def test_file_et_vignette(self):
+        document = self.creer('cours.pdf')
+        self.creer('copie.pdf')
+        apercu = Apercu.objects.get()
+        self.assertEqual(apercu.statut, 'en_attente')
+
+        self.assertEqual(apercus.traiter(processus=0), 1)
+        apercu.refresh_from_db()
+        self.assertEqual((apercu.statut, apercu.pages, apercu.largeur), ('termine', 12, 595))
+        self.assertTrue(os.path.exists(os.path.join(self.media, apercu.vignette.name)))
+
+        self.client.force_login(self.formateur.user)
+        response = self.client.get(reverse('documents:list'))
+        self.assertEqual(response.context['documents'][0].apercu, apercu)
+        response = self.client.get(reverse('documents:apercu', kwargs={'pk': document.pk}))
+        self.assertEqual(b''.join(response.streaming_content), b'JPEG')
+
+        # Dernier fichier retiré : contenu, aperçu et vignette disparaissent ensemble
+        with self.captureOnCommitCallbacks(execute=True):
+            for document in Document.objects.all():
+                document.delete()
+        self.assertFalse(Apercu.objects.exists())
+        self.assertFalse(os.path.exists(os.path.join(self.media, apercu.vignette.name)))
+
+    def test_contenu_supprime_pendant_la_generation(self):
+        document = self.creer('cours.pdf')
+
+        def generer_puis_supprimer(source, destination):
+            caracteristiques = vignette_factice(source, destination)
+            if document.pk:
+                with self.captureOnCommitCallbacks(execute=True):
+                    document.delete()
+            return caracteristiques
+
+        self.creer('autre.pdf', b'autre contenu')
+        with mock.patch.dict(generateurs.GENERATEURS, {'.pdf': generer_puis_supprimer}):
+            self.assertEqual(apercus.traiter(processus=0), 1)
+        self.assertEqual(Apercu.objects.get().statut, 'termine')
+        vignettes = [nom for _, _, noms in os.walk(os.path.join(self.media, apercus.PREFIXE)) for nom in noms]
+        self.assertEqual(len(vignettes), 1)
+
+    def test_pool_de_processus_et_formats_sans_apercu(self):
+        self.creer('podcast.mp3')
+        self.assertEqual(apercus.traiter(processus=1), 1)
+        self.assertEqual(Apercu.objects.get().statut, 'indisponible')
+
+    @unittest.skipUnless(generateurs.Image, "Pillow n'est pas installé")
+    def test_vignette_d_image(self):
+        from io import BytesIO
+        image = BytesIO()
+        generateurs.Image.new('RGB', (1200, 600), 'red').save(image, 'PNG')
+        self.creer('schema.png', image.getvalue())
+        apercus.traiter(processus=0)
+        apercu = Apercu.objects.get()
+        self.assertEqual((apercu.statut, apercu.largeur, apercu.hauteur), ('termine', 1200, 600))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from formateurs.models import FormateurEleve
+
+
+class Command(BaseCommand):
+    help = ("Vérifie ou recalcule les liens formateur → élèves (FormateurEleve) "
+            "à partir des cours et des inscriptions")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verifier', action='store_true',
+                            help="Signale les écarts sans rien modifier (code de sortie non nul s'il y en a)")
+
+    def handle(self, *args, **options):
+        if options['verifier']:
+            manquants, en_trop = FormateurEleve.objects.ecarts()
+            for formateur_id, eleve_id in sorted(manquants):
+                self.stdout.write(f"Manquant : formateur {formateur_id} → élève {eleve_id}")
+            for formateur_id, eleve_id in sorted(en_trop):
+                self.stdout.write(f"En trop : formateur {formateur_id} → élève {eleve_id}")
+            if manquants or en_trop:
+                raise CommandError(f"{len(manquants)} liens manquants, {len(en_trop)} liens en trop.")
+            self.stdout.write(self.style.SUCCESS("Liens formateurs → élèves cohérents."))
+            return
+        ajoutes, retires = FormateurEleve.objects.synchroniser()
+        self.stdout.write(self.style.SUCCESS(
+            f"{FormateurEleve.objects.count()} liens formateurs → élèves ({ajoutes} ajoutés, {retires} retirés)."
+        ))
@@ -0,0 +1,42 @@
+# Generated by Django 5.2 on 2026-10-18 19:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def remplir_liens(apps, schema_editor):
+    Inscription = apps.get_model('eleves', 'Inscription')
+    FormateurEleve = apps.get_model('formateurs', 'FormateurEleve')
+    couples = Inscription.objects.filter(formation__cours__isnull=False).order_by().values_list(
+        'formation__cours__formateur_id', 'eleve_id'
+    ).distinct()
+    FormateurEleve.objects.bulk_create(
+        (FormateurEleve(formateur_id=f, eleve_id=e) for f, e in couples.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eleves', '0004_documenteleve_metadonnees_fichier'),
+        ('formateurs', '0001_initial'),
+        ('planning', '0004_disponibilite_dispo_formateur_fin_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FormateurEleve',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('eleve', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='liens_formateurs', to='eleves.eleve', verbose_name='Élève')),
+                ('formateur', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='liens_eleves', to='formateurs.formateur', verbose_name='Formateur')),
+            ],
+            options={
+                'verbose_name': 'Élève suivi',
+                'verbose_name_plural': 'Élèves suivis',
+                'constraints': [models.UniqueConstraint(fields=('formateur', 'eleve'), name='unique_formateur_eleve')],
+            },
+        ),
+        migrations.RunPython(remplir_liens, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils.translation import gettext_lazy as _
 
 # Create your models here.
 from accounts.models import CustomUser
@@ -15,4 +16,79 @@ class Formateur(models.Model):
     matricule = models.CharField( max_length=20, unique=True, help_text="Matricule unique du formateur.")
 
     def __str__(self):
-        return f"{self.user.get_full_name()} ({self.user.username}) - {self.specialite}"
\ No newline at end of file
+        return f"{self.user.get_full_name()} ({self.user.username}) - {self.specialite}"
+
+class FormateurEleveQuerySet(models.QuerySet):
+    """
+    Maintenance du lien matérialisé formateur → élèves. Un élève est suivi
+    par un formateur dès qu'il est inscrit (quel que soit le statut) à une
+    formation dont le formateur anime au moins un cours.
+    """
+
+    def attendus(self, formateur_ids=None, eleve_ids=None):
+        """Couples (formateur_id, eleve_id) calculés depuis les cours et les inscriptions"""
+        from eleves.models import Inscription
+
+        inscriptions = Inscription.objects.filter(formation__cours__isnull=False)
+        if formateur_ids is not None:
+            inscriptions = inscriptions.filter(formation__cours__formateur_id__in=formateur_ids)
+        if eleve_ids is not None:
+            inscriptions = inscriptions.filter(eleve_id__in=eleve_ids)
+        return set(inscriptions.order_by().values_list('formation__cours__formateur_id', 'eleve_id').distinct())
+
+    def ecarts(self, formateur_ids=None, eleve_ids=None):
+        """(liens manquants, liens en trop) parmi les couples désignés ; None désigne tout"""
+        liens = self.all()
+        if formateur_ids is not None:
+            liens = liens.filter(formateur_id__in=formateur_ids)
+        if eleve_ids is not None:
+            liens = liens.filter(eleve_id__in=eleve_ids)
+        existants = set(liens.values_list('formateur_id', 'eleve_id'))
+        attendus = self.attendus(formateur_ids, eleve_ids)
+        return attendus - existants, existants - attendus
+
+    def synchroniser(self, formateur_ids=None, eleve_ids=None):
+        """
+        Recalcule les liens entre `formateur_ids` et `eleve_ids` (None : tous) ;
+        renvoie (ajoutés, retirés). Trois requêtes, plus les écritures.
+        """
+        formateur_ids = None if formateur_ids is None else set(formateur_ids) - {None}
+        eleve_ids = None if eleve_ids is None else set(eleve_ids) - {None}
+        if formateur_ids == set() or eleve_ids == set():
+            return 0, 0
+        with transaction.atomic():
+            manquants, en_trop = self.ecarts(formateur_ids, eleve_ids)
+            retires = {}
+            for formateur_id, eleve_id in en_trop:
+                retires.setdefault(formateur_id, []).append(eleve_id)
+            for formateur_id, eleves in retires.items():
+                self.filter(formateur_id=formateur_id, eleve_id__in=eleves).delete()
+            self.bulk_create(
+                [self.model(formateur_id=f, eleve_id=e) for f, e in manquants],
+                batch_size=1000, ignore_conflicts=True,
+            )
+        return len(manquants), len(en_trop)
+
+
+class FormateurEleve(models.Model):
+    """
+    Lien matérialisé « élève suivi par un formateur », pour lister ses élèves
+    par une simple lecture d'index au lieu de la jointure inscriptions →
+    formations → cours suivie d'un DISTINCT. Tenu à jour par les signaux de
+    Cours et d'Inscription (voir formateurs.signals), vérifiable et
+    reconstructible par la commande `liens_formateurs_eleves`.
+    """
+    formateur = models.ForeignKey(Formateur, on_delete=models.CASCADE, related_name='liens_eleves', verbose_name=_('Formateur'))
+    eleve = models.ForeignKey('eleves.Eleve', on_delete=models.CASCADE, related_name='liens_formateurs', verbose_name=_('Élève'))
+
+    objects = FormateurEleveQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('Élève suivi')
+        verbose_name_plural = _('Élèves suivis')
+        constraints = [
+            models.UniqueConstraint(fields=['formateur', 'eleve'], name='unique_formateur_eleve'),
+        ]
+
+    def __str__(self):
+        return f"{self.formateur} → {self.eleve}"
@@ -0,0 +1,102 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from eleves.models import Inscription, inscriptions_importees
+from planning.models import Cours
+from presence.models import Presence, presences_marquees
+from . import tableau_de_bord
+from .models import FormateurEleve
+
+
+def _formateurs_des_cours(**filtres):
+    return Cours.objects.filter(**filtres).order_by().values_list('formateur_id', flat=True).distinct()
+
+
+@receiver(post_save, sender=Cours)
+@receiver(post_delete, sender=Cours)
+def invalider_cours(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Ancienne affectation mémorisée par presence.signals avant la sauvegarde
+    ancienne = getattr(instance, '_affectation_enregistree', None)
+    tableau_de_bord.invalider(instance.formateur_id, ancienne[1] if ancienne else None)
+
+
+@receiver(post_save, sender=Cours)
+@receiver(post_delete, sender=Cours)
+def lier_eleves_cours(sender, instance, created=False, raw=False, **kwargs):
+    """Un cours créé, supprimé ou réaffecté peut lier ou délier les inscrits de sa formation"""
+    if raw:
+        return
+    ancienne = getattr(instance, '_affectation_enregistree', None)
+    affectations = {(instance.formation_id, instance.formateur_id)}
+    if kwargs['signal'] is post_save and not created:
+        if ancienne is None or ancienne in affectations:
+            return
+        affectations.add(ancienne)
+    formations = {formation_id for formation_id, _ in affectations}
+    FormateurEleve.objects.synchroniser(
+        formateur_ids={formateur_id for _, formateur_id in affectations},
+        eleve_ids=Inscription.objects.filter(formation_id__in=formations).values_list('eleve_id', flat=True),
+    )
+
+
+@receiver(post_save, sender=Presence)
+@receiver(post_delete, sender=Presence)
+def invalider_presence(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    cours_ids = {instance.cours_id}
+    # État enregistré mémorisé par presence.signals : la présence a pu changer de cours
+    ancien = getattr(instance, '_etat_enregistre', None)
+    if ancien:
+        cours_ids.add(ancien[0])
+    tableau_de_bord.invalider(*_formateurs_des_cours(pk__in=cours_ids))
+
+
+@receiver(presences_marquees)
+def invalider_appel(sender, cours, **kwargs):
+    tableau_de_bord.invalider(cours.formateur_id)
+
+
+@receiver(pre_save, sender=Inscription)
+def memoriser_formation_inscription(sender, instance, raw=False, **kwargs):
+    instance._formation_enregistree = None
+    if instance.pk and not raw:
+        instance._formation_enregistree = Inscription.objects.filter(pk=instance.pk).values_list(
+            'formation_id', flat=True
+        ).first()
+
+
+@receiver(post_save, sender=Inscription)
+@receiver(post_delete, sender=Inscription)
+def invalider_inscription(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    formations = {instance.formation_id, getattr(instance, '_formation_enregistree', None)} - {None}
+    tableau_de_bord.invalider(*_formateurs_des_cours(formation_id__in=formations))
+
+
+@receiver(post_save, sender=Inscription)
+@receiver(post_delete, sender=Inscription)
+def lier_eleves_inscription(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    ancienne = getattr(instance, '_formation_enregistree', None)
+    if kwargs['signal'] is post_save and not created and ancienne == instance.formation_id:
+        return
+    formations = {instance.formation_id, ancienne} - {None}
+    FormateurEleve.objects.synchroniser(
+        formateur_ids=_formateurs_des_cours(formation_id__in=formations),
+        eleve_ids={instance.eleve_id},
+    )
+
+
+@receiver(inscriptions_importees)
+def invalider_import(sender, formation_ids, **kwargs):
+    tableau_de_bord.invalider(*_formateurs_des_cours(formation_id__in=formation_ids))
+
+
+@receiver(inscriptions_importees)
+def lier_eleves_import(sender, formation_ids, **kwargs):
+    FormateurEleve.objects.synchroniser(formateur_ids=_formateurs_des_cours(formation_id__in=formation_ids))
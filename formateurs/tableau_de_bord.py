@@ -0,0 +1,122 @@
+"""
+Instantané du tableau de bord formateur, gardé dans le cache de Django.
+
+L'instantané ne contient que des valeurs simples (dictionnaires, nombres,
+dates) : une fois en cache, l'affichage du tableau de bord n'exécute plus
+aucune requête d'agrégat.
+
+Comme pour le tableau de bord élève (eleves.tableau_de_bord), la clé
+contient un numéro de version propre au formateur, augmenté par les
+signaux de `formateurs.signals` (et par le solveur, qui enregistre ses
+cours sans signaux) dès qu'un cours, une présence ou une inscription qui
+le concerne change : un calcul concurrent qui finirait après
+l'invalidation écrit sous l'ancienne version et n'est plus lu. La date du
+jour fait aussi partie de la clé, puisque les « 7 prochains jours »
+avancent avec elle.
+"""
+import datetime
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from eleves.models import Eleve, Inscription
+from planning.models import Cours
+from presence.models import AttendanceSummary, Presence
+
+DUREE_CACHE = 24 * 60 * 60
+NB_ELEVES_AFFICHES = 5
+
+
+def cle_version(formateur_id):
+    return f'formateurs:tableau-de-bord:version:{formateur_id}'
+
+
+def version(formateur_id):
+    cle = cle_version(formateur_id)
+    numero = cache.get(cle)
+    if numero is None:
+        # Départ horodaté : une version perdue (éviction) ne retombe jamais sur un ancien contenu
+        cache.add(cle, time.time_ns(), None)
+        numero = cache.get(cle)
+    return numero
+
+
+def cle_cache(formateur_id, jour=None):
+    jour = jour or timezone.localdate()
+    return f'formateurs:tableau-de-bord:{formateur_id}:{jour.isoformat()}:{version(formateur_id)}'
+
+
+def calculer(formateur_id, jour):
+    """Calcule l'instantané (six requêtes)"""
+    cours = Cours.objects.filter(formateur_id=formateur_id).order_by()
+    a_venir = list(cours.filter(
+        date__range=[jour, jour + datetime.timedelta(days=7)]
+    ).order_by('date', 'heure_debut').values(
+        'id', 'titre', 'date', 'heure_debut', 'heure_fin',
+        formation_titre=F('formation__titre'), salle_nom=F('salle__nom'),
+    ))
+
+    # Cours passés sans aucune présence enregistrée
+    a_completer = list(cours.filter(date__lt=jour, presences__isnull=True).order_by('-date').values(
+        'id', 'titre', 'date',
+    ))
+
+    formations = cours.values('formation_id')
+    eleves = Eleve.objects.filter(liens_formateurs__formateur_id=formateur_id)
+    nb_eleves = eleves.count()
+    presences = Presence.objects.filter(
+        eleve=OuterRef('pk'), cours__formateur_id=formateur_id
+    ).order_by().values('eleve').annotate(nombre=Count('pk')).values('nombre')
+    premiere_formation = Inscription.objects.filter(
+        eleve=OuterRef('pk'), formation__in=formations
+    ).order_by('-date_inscription').values('formation__titre')[:1]
+    eleves_recents = list(eleves.annotate(
+        nb_cours=Coalesce(Subquery(presences), 0),
+        formation_titre=Subquery(premiere_formation),
+    ).values(
+        'id', 'nb_cours', 'formation_titre',
+        prenom=F('user__first_name'), nom=F('user__last_name'),
+    )[:NB_ELEVES_AFFICHES])
+
+    return {
+        'upcoming_courses': a_venir,
+        'next_course': a_venir[0] if a_venir else None,
+        'upcoming_count': len(a_venir),
+        'incomplete_courses': a_completer,
+        'total_courses': cours.count(),
+        'students': eleves_recents,
+        'students_count': nb_eleves,
+        'attendance_rate': round(AttendanceSummary.objects.filter(formateur_id=formateur_id).taux(), 1),
+        'today': jour,
+    }
+
+
+def instantane(formateur_id):
+    """Instantané du jour, depuis le cache ou recalculé"""
+    jour = timezone.localdate()
+    cle = cle_cache(formateur_id, jour)
+    donnees = cache.get(cle)
+    if donnees is None:
+        donnees = calculer(formateur_id, jour)
+        cache.set(cle, donnees, DUREE_CACHE)
+    return donnees
+
+
+def invalider(*formateur_ids):
+    """Passe les formateurs indiqués à une nouvelle version, une fois la transaction validée"""
+    ids = set(formateur_ids) - {None}
+    if ids:
+        transaction.on_commit(lambda: _nouvelle_version(ids))
+
+
+def _nouvelle_version(formateur_ids):
+    for formateur_id in formateur_ids:
+        try:
+            cache.incr(cle_version(formateur_id))
+        except ValueError:
+            # Pas de version en cache : la prochaine lecture en crée une neuve
+            pass
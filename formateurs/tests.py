@@ -1,3 +1,160 @@
-from django.test import TestCase
+import datetime
+import io
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from eleves.models import Inscription
+from formateurs import tableau_de_bord
+from formateurs.models import Formateur, FormateurEleve
+from planning import solveur
+from planning.models import Cours
+from presence.models import Presence
+from presence.tests import PresenceTestCase
+
+
+class TableauDeBordTests(PresenceTestCase):
+    """Le tableau de bord est servi depuis le cache et invalidé par les signaux"""
+
+    TABLES_AGREGEES = ('planning_cours', 'presence_', 'eleves_')
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.cours, self.eleves = self.creer_cours('PY', 4)
+
+    def afficher(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('formateurs:dashboard'))
+        self.assertEqual(response.status_code, 200)
+        # La résolution des rôles de l'utilisateur (jointure sur eleves_eleve) n'est pas un agrégat
+        agregats = [q['sql'] for q in ctx.captured_queries
+                    if any(table in q['sql'] for table in self.TABLES_AGREGEES)
+                    and 'FROM "accounts_customuser"' not in q['sql']]
+        return response.context, agregats
+
+    def test_cache_chaud_sans_requete_d_agregat(self):
+        _, agregats = self.afficher()
+        self.assertLessEqual(len(agregats), 6)
+        contexte, agregats = self.afficher()
+        self.assertEqual(agregats, [])
+        self.assertEqual(contexte['students_count'], 4)
+        self.assertEqual([c['id'] for c in contexte['incomplete_courses']], [self.cours.pk])
+
+    def test_invalidation_par_l_appel(self):
+        self.afficher()
+        with self.captureOnCommitCallbacks(execute=True):
+            Presence.objects.marquer(self.cours, {eleve.pk: i < 3 for i, eleve in enumerate(self.eleves)})
+        contexte, _ = self.afficher()
+        self.assertEqual(contexte['attendance_rate'], 75.0)
+        self.assertEqual(contexte['incomplete_courses'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Presence.objects.get(eleve=self.eleves[3]).delete()
+        contexte, _ = self.afficher()
+        self.assertEqual(contexte['attendance_rate'], 100.0)
+
+    def test_invalidation_par_cours_et_inscription(self):
+        self.afficher()
+        demain = timezone.localdate() + datetime.timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Cours.objects.create(
+                formation=self.cours.formation, formateur=self.formateur, titre='Demain',
+                date=demain, heure_debut=datetime.time(9), heure_fin=datetime.time(12),
+            )
+        contexte, _ = self.afficher()
+        self.assertEqual(contexte['upcoming_count'], 1)
+        self.assertEqual(contexte['next_course']['titre'], 'Demain')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Inscription.objects.filter(eleve=self.eleves[0]).delete()
+        contexte, _ = self.afficher()
+        self.assertEqual(contexte['students_count'], 3)
+
+
+    def test_calcul_concurrent_perime_ignore(self):
+        # Un calcul lancé avant l'appel écrit son résultat après l'invalidation
+        cle, perime = tableau_de_bord.cle_cache(self.formateur.pk), self.afficher()[0]['attendance_rate']
+        with self.captureOnCommitCallbacks(execute=True):
+            Presence.objects.marquer(self.cours, {eleve.pk: i < 2 for i, eleve in enumerate(self.eleves)})
+        cache.set(cle, {'attendance_rate': perime}, tableau_de_bord.DUREE_CACHE)
+        self.assertEqual(tableau_de_bord.instantane(self.formateur.pk)['attendance_rate'], 50.0)
+
+    def test_invalidation_par_le_solveur(self):
+        self.afficher()
+        with self.captureOnCommitCallbacks(execute=True):
+            solveur.enregistrer([Cours(
+                formation=self.cours.formation, formateur=self.formateur, titre='Planifié',
+                date=timezone.localdate() + datetime.timedelta(days=2),
+                heure_debut=datetime.time(9), heure_fin=datetime.time(12),
+            )])
+        self.assertEqual(self.afficher()[0]['upcoming_count'], 1)
+
+class LiensFormateurElevesTests(PresenceTestCase):
+    """Le lien FormateurEleve suit les cours et les inscriptions"""
+
+    def setUp(self):
+        super().setUp()
+        self.cours, self.eleves = self.creer_cours('PY', 3)
+        self.autre_cours, self.autres_eleves = self.creer_cours('JS', 2, jour=2)
+
+    def eleves_lies(self, formateur=None):
+        return set(FormateurEleve.objects.filter(formateur=formateur or self.formateur).values_list('eleve_id', flat=True))
+
+    def test_inscriptions(self):
+        self.assertEqual(self.eleves_lies(), {e.pk for e in self.eleves + self.autres_eleves})
+        inscription = Inscription.objects.get(eleve=self.eleves[0])
+        inscription.formation = self.autre_cours.formation
+        inscription.save()
+        self.assertIn(self.eleves[0].pk, self.eleves_lies())
+        inscription.delete()
+        self.assertNotIn(self.eleves[0].pk, self.eleves_lies())
+        Inscription.objects.create(eleve=self.eleves[0], formation=self.cours.formation)
+        self.assertIn(self.eleves[0].pk, self.eleves_lies())
+
+    def test_cours_reaffecte(self):
+        autre = Formateur.objects.create(
+            user=CustomUser.objects.create(username='autre', email='autre@example.com', is_formateur=True),
+            specialite='JS', experience=1, bio='', matricule='F002',
+        )
+        self.autre_cours.formateur = autre
+        self.autre_cours.save()
+        self.assertEqual(self.eleves_lies(), {e.pk for e in self.eleves})
+        self.assertEqual(self.eleves_lies(autre), {e.pk for e in self.autres_eleves})
+        self.cours.delete()
+        self.assertEqual(self.eleves_lies(), set())
+
+    def test_mes_eleves_sans_jointure_sur_les_cours(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('formateurs:mes_eleves'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['eleves_list']), 5)
+        requetes = [q['sql'] for q in ctx.captured_queries if 'FROM "eleves_eleve"' in q['sql']]
+        self.assertTrue(requetes)
+        self.assertFalse(any('planning_cours' in sql or 'DISTINCT' in sql for sql in requetes))
+
+    def test_verification_et_reconstruction(self):
+        FormateurEleve.objects.filter(eleve=self.eleves[0]).delete()
+        with self.assertRaises(CommandError):
+            call_command('liens_formateurs_eleves', '--verifier', stdout=io.StringIO())
+        call_command('liens_formateurs_eleves', stdout=io.StringIO())
+        call_command('liens_formateurs_eleves', '--verifier', stdout=io.StringIO())
+        self.assertEqual(len(self.eleves_lies()), 5)
+
+    def test_cours_du_planning_automatique(self):
+        autre = Formateur.objects.create(
+            user=CustomUser.objects.create(username='autre', email='autre@example.com', is_formateur=True),
+            specialite='JS', experience=1, bio='', matricule='F002',
+        )
+        solveur.enregistrer([Cours(
+            formation=self.cours.formation, formateur=autre, titre='Planifié',
+            date=datetime.date(2025, 9, 10), heure_debut=datetime.time(9), heure_fin=datetime.time(12),
+        )])
+        self.assertEqual(self.eleves_lies(autre), {e.pk for e in self.eleves})
+        call_command('liens_formateurs_eleves', '--verifier', stdout=io.StringIO())
@@ -1,12 +1,10 @@
 # Importez le formulaire de l'app documents
-from datetime import datetime, timezone
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib import messages
 from django.utils.translation import gettext_lazy as _
-from django.db.models import Count, Q
 
 # Importez tous les modèles nécessaires
 # Assurez-vous d'avoir Inscription ici aussi
@@ -16,7 +14,8 @@ from eleves.models import Eleve, SuiviPedagogique, DocumentEleve, Inscription
 from planning.models import Cours, Formation
 # Pour la gestion des documents du formateur
 from documents.models import Document
-from presence.models import Presence
+from gestion_formation.pagination import KeysetPaginationMixin
+from . import tableau_de_bord
 
 # Mixin personnalisé pour restreindre l'accès aux formateurs (réutilisé de documents-views ou planning-views)
 
@@ -28,7 +27,7 @@ class FormateurRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
 
     def test_func(self):
         # Vérifie si l'utilisateur est authentifié et a un profil de formateur
-        return self.request.user.is_authenticated and hasattr(self.request.user, 'formateur')
+        return self.request.user.is_authenticated and self.request.user.profil_formateur is not None
 
     def handle_no_permission(self):
         # Redirige vers une page d'accès refusé ou affiche un message d'erreur
@@ -43,73 +42,16 @@ class DashboardView(FormateurRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-
-        formateur = self.request.user.formateur
-
-        # Cours à venir (7 prochains jours)
-        today = timezone.now().date()
-        seven_days = today + datetime.timedelta(days=7)
-        upcoming_courses = Cours.objects.filter(
-            formateur=formateur,
-            date__range=[today, seven_days]
-        ).order_by('date', 'heure_debut')
-
-        # Cours passés non complétés (présences)
-        incomplete_courses = Cours.objects.filter(
-            formateur=formateur,
-            date__lt=today,
-            # Cela suppose qu'un cours est "incomplet" s'il n'a AUCUN enregistrement de présence.
-            # Si la logique est plus complexe (ex: vérifier si tous les élèves n'ont pas été marqués),
-            # elle nécessitera une requête plus sophistiquée.
-            presence__isnull=True
-        ).distinct()
-
-        # Statistiques
-        total_courses = Cours.objects.filter(formateur=formateur).count()
-        upcoming_count = upcoming_courses.count()
-
-        # Élèves suivis - Requête Corrigée
-        # Filtre les élèves qui sont inscrits à des Formations ayant des Cours dispensés par ce Formateur.
-        students = Eleve.objects.filter(
-            inscription__formation__cours__formateur=formateur
-        ).distinct().annotate(
-            # Compte les enregistrements de Présence pour les cours de ce formateur spécifiques à l'élève
-            course_count=Count('presence', filter=Q(
-                presence__cours__formateur=formateur))
-        )
-
-        # Prochain cours (pour la carte en haut)
-        next_course = upcoming_courses.first()
-
-        # Taux de présence global
-        total_presences = Presence.objects.filter(
-            cours__formateur=formateur
-        ).count()
-        present_count = Presence.objects.filter(
-            cours__formateur=formateur,
-            present=True
-        ).count()
-
-        attendance_rate = (present_count / total_presences *
-                           100) if total_presences > 0 else 0
-
-        context.update({
-            'upcoming_courses': upcoming_courses,
-            'incomplete_courses': incomplete_courses,
-            'next_course': next_course,
-            'total_courses': total_courses,
-            'upcoming_count': upcoming_count,
-            'students': students[:5],  # 5 premiers seulement
-            'attendance_rate': round(attendance_rate, 1),
-            'today': today,
-        })
-
+        # Cours à venir, cours à compléter, élèves suivis et taux de présence :
+        # instantané en cache, invalidé par les signaux (voir tableau_de_bord.py)
+        context.update(tableau_de_bord.instantane(self.request.user.profil_formateur.pk))
         return context
 
+
 # --- Vues pour la Gestion des Élèves (Mes Eleves) ---
 
 
-class MesElevesListView(FormateurRequiredMixin, ListView):
+class MesElevesListView(FormateurRequiredMixin, KeysetPaginationMixin, ListView):
     model = Eleve
     template_name = 'formateurs/mes_eleves_list.html'  # Créez ce template
     context_object_name = 'eleves_list'
@@ -120,11 +62,11 @@ class MesElevesListView(FormateurRequiredMixin, ListView):
         Retourne les élèves qui sont inscrits à des formations où le formateur connecté
         dispense des cours.
         """
-        formateur = self.request.user.formateur
-        # Cette requête est similaire à celle du tableau de bord
+        formateur = self.request.user.profil_formateur
+        # Lien matérialisé (FormateurEleve) : une lecture d'index, sans jointure sur les cours ni DISTINCT
         return Eleve.objects.filter(
-            inscription__formation__cours__formateur=formateur
-        ).distinct().order_by('user__last_name', 'user__first_name')
+            liens_formateurs__formateur=formateur
+        ).select_related('user').order_by('user__last_name', 'user__first_name')
 
 
 class EleveDetailView(FormateurRequiredMixin, DetailView):
@@ -136,23 +78,20 @@ class EleveDetailView(FormateurRequiredMixin, DetailView):
         """
         S'assure que le formateur ne peut voir les détails que de ses propres élèves (ceux de ses formations).
         """
-        formateur = self.request.user.formateur
-        return Eleve.objects.filter(
-            inscription__formation__cours__formateur=formateur,
-            # Filtre aussi par PK pour s'assurer que c'est le bon élève
-            pk=self.kwargs['pk']
-        ).distinct()
+        formateur = self.request.user.profil_formateur
+        return Eleve.objects.filter(liens_formateurs__formateur=formateur).select_related('user')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        eleve = self.get_object()
-        formateur = self.request.user.formateur
+        eleve = self.object
+        formateur = self.request.user.profil_formateur
 
         # Récupérer les inscriptions de l'élève pour les formations du formateur
+        # (semi-jointure sur les cours du formateur : une ligne par inscription, sans DISTINCT)
         context['inscriptions_du_formateur'] = Inscription.objects.filter(
             eleve=eleve,
-            formation__cours__formateur=formateur
-        ).distinct()
+            formation__in=Cours.objects.filter(formateur=formateur).values('formation_id'),
+        ).select_related('formation')
 
         # Récupérer les suivis pédagogiques de cet élève par ce formateur
         context['suivis_pedagogiques'] = SuiviPedagogique.objects.filter(
@@ -172,7 +111,7 @@ class EleveDetailView(FormateurRequiredMixin, DetailView):
 # Assurez-vous que vous avez un `documents/forms.py` avec `DocumentForm`
 
 
-class DocumentListView(FormateurRequiredMixin, ListView):
+class DocumentListView(FormateurRequiredMixin, KeysetPaginationMixin, ListView):
     model = Document
     template_name = 'formateurs/document_list.html'  # Créez ce template
     context_object_name = 'documents'
@@ -185,7 +124,7 @@ class DocumentListView(FormateurRequiredMixin, ListView):
         """
         if self.request.user.is_superuser or self.request.user.is_staff:
             return Document.objects.all().order_by('-date_ajout')
-        return Document.objects.filter(formateur=self.request.user.formateur).order_by('-date_ajout')
+        return Document.objects.filter(formateur=self.request.user.profil_formateur).order_by('-date_ajout')
 
 
 class DocumentCreateView(FormateurRequiredMixin, CreateView):
@@ -199,7 +138,7 @@ class DocumentCreateView(FormateurRequiredMixin, CreateView):
         """
         Associe automatiquement le document au formateur connecté avant de sauvegarder.
         """
-        form.instance.formateur = self.request.user.formateur
+        form.instance.formateur = self.request.user.profil_formateur
         messages.success(self.request, _(
             "Le document a été ajouté avec succès !"))
         return super().form_valid(form)
@@ -216,7 +155,7 @@ class DocumentDetailView(FormateurRequiredMixin, DetailView):
         """
         if self.request.user.is_superuser or self.request.user.is_staff:
             return Document.objects.all()
-        return Document.objects.filter(formateur=self.request.user.formateur)
+        return Document.objects.filter(formateur=self.request.user.profil_formateur)
 
 
 class DocumentDeleteView(FormateurRequiredMixin, DeleteView):
@@ -231,7 +170,7 @@ class DocumentDeleteView(FormateurRequiredMixin, DeleteView):
         """
         if self.request.user.is_superuser or self.request.user.is_staff:
             return Document.objects.all()
-        return Document.objects.filter(formateur=self.request.user.formateur)
+        return Document.objects.filter(formateur=self.request.user.profil_formateur)
 
     def delete(self, request, *args, **kwargs):
         messages.success(self.request, _(
@@ -245,7 +184,7 @@ class StatistiquesView(FormateurRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        formateur = self.request.user.formateur
+        formateur = self.request.user.profil_formateur
 
         # Exemple: Récupération de données pour les statistiques
         # Vous devrez ajouter ici la logique de calcul de vos statistiques
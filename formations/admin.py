@@ -1,3 +1,48 @@
-from django.contrib import admin
+import datetime
+
+from django.contrib import admin, messages
+from django.utils.translation import gettext_lazy as _
+
+from planning.solveur import planifier
+from .models import Domaine, Formation, Module
 
 # Register your models here.
+
+# Durée de la période couverte par le planning brouillon généré depuis l'admin
+SEMAINES_PLANNING = 13
+
+
+class ModuleInline(admin.TabularInline):
+    model = Module
+    extra = 0
+
+
+@admin.register(Formation)
+class FormationAdmin(admin.ModelAdmin):
+    list_display = ('reference', 'titre', 'domaine', 'duree_jours', 'actif')
+    list_filter = ('domaine', 'actif')
+    search_fields = ('reference', 'titre')
+    inlines = [ModuleInline]
+    actions = ['generer_planning']
+
+    @admin.action(description=_("Générer un planning brouillon (%(semaines)s semaines)") % {
+        'semaines': SEMAINES_PLANNING})
+    def generer_planning(self, request, queryset):
+        aujourd_hui = datetime.date.today()
+        debut = aujourd_hui + datetime.timedelta(days=7 - aujourd_hui.weekday())
+        fin = debut + datetime.timedelta(weeks=SEMAINES_PLANNING, days=-1)
+        try:
+            probleme, solution, cours = planifier(queryset, debut, fin, sauvegarder=True)
+        except ValueError as erreur:
+            self.message_user(request, str(erreur), messages.ERROR)
+            return
+        non_planifiees = solution.non_planifiees(probleme)
+        self.message_user(
+            request,
+            _("%(cours)s cours créés du %(debut)s au %(fin)s, %(restant)s séances non planifiées.") % {
+                'cours': len(cours), 'debut': debut, 'fin': fin, 'restant': non_planifiees},
+            messages.WARNING if non_planifiees else messages.SUCCESS,
+        )
+
+
+admin.site.register(Domaine)
@@ -12,13 +12,16 @@ from eleves.models import Eleve
 
 from .models import Formation, Domaine, Module
 from .forms import FormationForm, ModuleForm
+from gestion_formation.pagination import KeysetPaginationMixin
 
 
-class FormationListView(ListView):
+class FormationListView(KeysetPaginationMixin, ListView):
     model = Formation
     template_name = 'formations/formation_list.html'
     context_object_name = 'formations'
     paginate_by = 10
+    # Meta.ordering trie sur 'domaine', c'est-à-dire sur le nom du domaine
+    keyset_ordering = ('domaine__nom', 'titre')
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -0,0 +1,200 @@
+"""
+Instrumentation des requêtes HTTP : pour chaque vue résolue, nombre et durée
+des requêtes SQL, requêtes répétées (signe d'un N+1), temps de rendu du
+gabarit et taille de la réponse.
+
+Les mesures sont gardées dans un tampon circulaire en mémoire (par processus)
+et exportées au format texte de Prometheus par la vue `metriques`, réservée
+aux administrateurs. Réglages, tous facultatifs :
+
+    INSTRUMENTATION = {
+        'TAILLE_TAMPON': 2000,          # mesures conservées
+        'BUDGET_DEFAUT': None,          # requêtes SQL max. par vue (None : pas de limite)
+        'BUDGETS': {'eleves:presence_stats': 10},
+        'DEPASSEMENT': 'log',           # 'log' ou 'raise'
+    }
+
+'raise' est réservé aux tests : l'exception est levée une fois la vue
+exécutée (et ses écritures validées), la réponse devient alors une erreur.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque, namedtuple
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connections
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+Mesure = namedtuple('Mesure', [
+    'vue', 'statut', 'duree', 'requetes', 'duree_sql', 'doublons', 'duree_rendu', 'taille', 'depassement',
+])
+
+LISTE_PARAMETRES = re.compile(r'\((?:%s|\?)(?:\s*,\s*(?:%s|\?))*\)')
+ESPACES = re.compile(r'\s+')
+
+
+class BudgetRequetesDepasse(Exception):
+    """Une vue a exécuté plus de requêtes SQL que son budget"""
+
+
+def reglage(nom, defaut=None):
+    return getattr(settings, 'INSTRUMENTATION', {}).get(nom, defaut)
+
+
+def empreinte(sql):
+    """Forme normalisée d'une requête : les listes IN (%s, %s, ...) de longueur variable sont ramenées à une seule"""
+    return LISTE_PARAMETRES.sub('(...)', ESPACES.sub(' ', sql).strip())
+
+
+class TamponMesures:
+    """Tampon circulaire des dernières mesures, partagé par les fils d'exécution du processus"""
+
+    def __init__(self, taille):
+        self.mesures = deque(maxlen=taille)
+        self.verrou = threading.Lock()
+
+    def ajouter(self, mesure):
+        with self.verrou:
+            self.mesures.append(mesure)
+
+    def vider(self):
+        with self.verrou:
+            self.mesures.clear()
+
+    def instantane(self):
+        with self.verrou:
+            return list(self.mesures)
+
+    def agreger(self):
+        """{vue: {indicateur: valeur}} sur le contenu du tampon"""
+        vues = {}
+        for mesure in self.instantane():
+            totaux = vues.setdefault(mesure.vue, Counter())
+            totaux['appels'] += 1
+            totaux['requetes'] += mesure.requetes
+            totaux['duree'] += mesure.duree
+            totaux['duree_sql'] += mesure.duree_sql
+            totaux['doublons'] += mesure.doublons
+            totaux['duree_rendu'] += mesure.duree_rendu
+            totaux['taille'] += mesure.taille or 0
+            totaux['depassements'] += mesure.depassement
+            totaux['requetes_max'] = max(totaux['requetes_max'], mesure.requetes)
+            if mesure.statut >= 500:
+                totaux['erreurs'] += 1
+        return vues
+
+
+tampon = TamponMesures(reglage('TAILLE_TAMPON', 2000))
+
+
+class CollecteurRequetes:
+    """Enveloppe d'exécution SQL (connection.execute_wrapper) : compte, chronomètre et empreintes"""
+
+    def __init__(self):
+        self.nombre = 0
+        self.duree = 0.0
+        self.empreintes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        debut = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duree += time.perf_counter() - debut
+            self.nombre += 1
+            self.empreintes[empreinte(sql)] += 1
+
+    def doublons(self):
+        """Exécutions répétées d'une même requête (au-delà de la première)"""
+        return sum(nombre - 1 for nombre in self.empreintes.values() if nombre > 1)
+
+
+class InstrumentationMiddleware:
+    """À placer en tête de MIDDLEWARE pour compter aussi les requêtes de session et d'authentification"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        collecteur = CollecteurRequetes()
+        request._instrumentation_rendu = 0.0
+        debut = time.perf_counter()
+        with ExitStack() as pile:
+            for connexion in connections.all():
+                pile.enter_context(connexion.execute_wrapper(collecteur))
+            response = self.get_response(request)
+        duree = time.perf_counter() - debut
+
+        correspondance = getattr(request, 'resolver_match', None)
+        if correspondance is None:
+            return response
+        vue = correspondance.view_name
+        budget = reglage('BUDGETS', {}).get(vue, reglage('BUDGET_DEFAUT'))
+        depassement = budget is not None and collecteur.nombre > budget
+        tampon.ajouter(Mesure(
+            vue=vue,
+            statut=response.status_code,
+            duree=duree,
+            requetes=collecteur.nombre,
+            duree_sql=collecteur.duree,
+            doublons=collecteur.doublons(),
+            duree_rendu=request._instrumentation_rendu,
+            taille=None if response.streaming else len(response.content),
+            depassement=depassement,
+        ))
+        if depassement:
+            repetee, nombre = collecteur.empreintes.most_common(1)[0]
+            message = (f"{vue} : {collecteur.nombre} requêtes SQL pour un budget de {budget} "
+                       f"(la plus répétée, {nombre} fois : {repetee[:200]})")
+            if reglage('DEPASSEMENT', 'log') == 'raise':
+                raise BudgetRequetesDepasse(message)
+            logger.warning(message)
+        return response
+
+    def process_template_response(self, request, response):
+        """Chronomètre le rendu différé des TemplateResponse"""
+        debut = time.perf_counter()
+
+        def fin_rendu(reponse):
+            request._instrumentation_rendu += time.perf_counter() - debut
+
+        response.add_post_render_callback(fin_rendu)
+        return response
+
+
+INDICATEURS = (
+    ('appels', 'gp_vue_appels', "Réponses mesurées"),
+    ('erreurs', 'gp_vue_erreurs', "Réponses en erreur 5xx"),
+    ('duree', 'gp_vue_duree_secondes', "Durée cumulée de traitement"),
+    ('requetes', 'gp_vue_requetes_sql', "Requêtes SQL cumulées"),
+    ('requetes_max', 'gp_vue_requetes_sql_max', "Requêtes SQL maximales pour une réponse"),
+    ('duree_sql', 'gp_vue_duree_sql_secondes', "Durée SQL cumulée"),
+    ('doublons', 'gp_vue_requetes_sql_doublons', "Requêtes SQL répétées (N+1) cumulées"),
+    ('duree_rendu', 'gp_vue_duree_rendu_secondes', "Durée cumulée de rendu des gabarits"),
+    ('taille', 'gp_vue_taille_octets', "Taille cumulée des réponses"),
+    ('depassements', 'gp_vue_depassements_budget', "Réponses au-delà du budget de requêtes"),
+)
+
+
+def exporter_prometheus(vues):
+    """Format d'exposition texte de Prometheus ; des jauges, car le tampon est une fenêtre glissante"""
+    lignes = []
+    for cle, nom, aide in INDICATEURS:
+        lignes.append(f'# HELP {nom} {aide} (dernières réponses en mémoire).')
+        lignes.append(f'# TYPE {nom} gauge')
+        for vue, totaux in sorted(vues.items()):
+            etiquette = vue.replace('\\', '\\\\').replace('"', '\\"')
+            lignes.append(f'{nom}{{vue="{etiquette}"}} {totaux[cle]:g}')
+    return '\n'.join(lignes) + '\n'
+
+
+@staff_member_required
+def metriques(request):
+    return HttpResponse(exporter_prometheus(tampon.agreger()),
+                        content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,183 @@
+"""
+Pagination par curseur (keyset) pour les vues de liste.
+
+Au lieu de `LIMIT ... OFFSET n`, dont le coût croît avec le numéro de page,
+chaque page reprend après la dernière ligne de la précédente :
+`WHERE (date, heure_debut, id) > (...) ORDER BY date, heure_debut, id LIMIT n`.
+Avec un index sur les colonnes de tri, la page 500 coûte autant que la page 1,
+et aucun COUNT(*) n'est exécuté sauf si on le demande (`keyset_total`).
+
+Les curseurs sont opaques : valeurs de tri de la ligne frontière, sérialisées
+puis signées, pour qu'on ne puisse pas les forger.
+"""
+import datetime
+import hashlib
+import json
+
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import F, Q
+from django.http import Http404
+from django.utils.translation import gettext as _
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """Conserve les microsecondes, que DjangoJSONEncoder tronque"""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class CursorSerializer:
+    """Sérialiseur JSON compact acceptant dates, heures et décimaux"""
+
+    def dumps(self, obj):
+        return json.dumps(obj, cls=CursorEncoder, separators=(',', ':')).encode('latin-1')
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'))
+
+
+def encoder_curseur(valeurs):
+    return signing.dumps(valeurs, salt='keyset-pagination', serializer=CursorSerializer, compress=True)
+
+
+def decoder_curseur(jeton):
+    return signing.loads(jeton, salt='keyset-pagination', serializer=CursorSerializer)
+
+
+class KeysetPage:
+    """Page de résultats, compatible avec l'usage de `page_obj` dans les gabarits"""
+
+    def __init__(self, object_list, has_next, has_previous, premier=None, dernier=None, total=None):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.previous_cursor = encoder_curseur(premier) if has_previous and premier else None
+        self.next_cursor = encoder_curseur(dernier) if has_next and dernier else None
+        self.total = total
+
+    def __repr__(self):
+        return f'<KeysetPage ({len(self.object_list)} objets)>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class KeysetPaginationMixin:
+    """
+    À placer avant ListView. Les colonnes de tri viennent de `keyset_ordering`,
+    à défaut de l'order_by du queryset ou du Meta.ordering du modèle ; la clé
+    primaire est ajoutée pour départager les ex æquo.
+
+    `keyset_total` : None (pas de total), 'exact' (COUNT), ou 'estime'
+    (estimation du planificateur sur PostgreSQL, COUNT mis en cache ailleurs).
+    """
+    keyset_ordering = None
+    keyset_total = None
+    keyset_total_timeout = 300
+    cursor_after_kwarg = 'apres'
+    cursor_before_kwarg = 'avant'
+
+    def get_keyset_ordering(self, queryset):
+        ordering = list(self.keyset_ordering or queryset.query.order_by or queryset.model._meta.ordering)
+        colonnes = []
+        for champ in ordering:
+            if not isinstance(champ, str):
+                raise ImproperlyConfigured(
+                    f"{self.__class__.__name__} : la pagination par curseur exige un tri par noms de champs."
+                )
+            colonnes.append((champ.lstrip('-'), champ.startswith('-')))
+        if not any(nom in ('pk', 'id') for nom, _ in colonnes):
+            colonnes.append(('pk', colonnes[0][1] if colonnes else False))
+        return colonnes
+
+    def paginate_queryset(self, queryset, page_size):
+        colonnes = self.get_keyset_ordering(queryset)
+        alias = [f'keyset_{rang}' for rang in range(len(colonnes))]
+        queryset = queryset.annotate(**{
+            nom: F(champ) for nom, (champ, _) in zip(alias, colonnes)
+        })
+        total = self.get_keyset_total(queryset) if self.keyset_total else None
+
+        apres = self.request.GET.get(self.cursor_after_kwarg)
+        avant = self.request.GET.get(self.cursor_before_kwarg)
+        jeton = avant or apres
+        en_arriere = bool(avant)
+        if jeton:
+            try:
+                valeurs = decoder_curseur(jeton)
+            except signing.BadSignature:
+                raise Http404(_("Curseur de pagination invalide."))
+            if len(valeurs) != len(colonnes):
+                raise Http404(_("Curseur de pagination invalide."))
+            queryset = queryset.filter(self._condition_keyset(alias, colonnes, valeurs, en_arriere))
+
+        sens = [(nom, desc != en_arriere) for nom, (_, desc) in zip(alias, colonnes)]
+        queryset = queryset.order_by(*[f'-{nom}' if desc else nom for nom, desc in sens])
+        objets = list(queryset[:page_size + 1])
+        encore = len(objets) > page_size
+        objets = objets[:page_size]
+        if en_arriere:
+            objets.reverse()
+
+        def cle(objet):
+            return [getattr(objet, nom) for nom in alias]
+
+        page = KeysetPage(
+            objets,
+            has_next=encore if not en_arriere else True,
+            has_previous=encore if en_arriere else bool(apres),
+            premier=cle(objets[0]) if objets else None,
+            dernier=cle(objets[-1]) if objets else None,
+            total=total,
+        )
+        return (None, page, page.object_list, page.has_other_pages())
+
+    def _condition_keyset(self, alias, colonnes, valeurs, en_arriere):
+        """(c1, c2, ...) > (v1, v2, ...) développé colonne par colonne, selon le sens de chaque tri"""
+        condition = Q()
+        egalites = Q()
+        for nom, (_, desc), valeur in zip(alias, colonnes, valeurs):
+            lookup = 'lt' if desc != en_arriere else 'gt'
+            condition |= egalites & Q(**{f'{nom}__{lookup}': valeur})
+            egalites &= Q(**{nom: valeur})
+        # Borne sur la première colonne seule : permet un parcours d'intervalle de l'index
+        premier = 'lte' if colonnes[0][1] != en_arriere else 'gte'
+        return Q(**{f'{alias[0]}__{premier}': valeurs[0]}) & condition
+
+    def get_keyset_total(self, queryset):
+        queryset = queryset.order_by()
+        if self.keyset_total == 'exact':
+            return queryset.count()
+        connexion = connections[queryset.db]
+        if connexion.vendor == 'postgresql':
+            plan = json.loads(queryset.explain(format='json'))
+            return plan[0]['Plan']['Plan Rows']
+        sql, params = queryset.query.sql_with_params()
+        cle = 'keyset-total:' + hashlib.md5(f'{sql}{params}'.encode()).hexdigest()
+        total = cache.get(cle)
+        if total is None:
+            total = queryset.count()
+            cache.set(cle, total, self.keyset_total_timeout)
+        return total
@@ -48,9 +48,12 @@ INSTALLED_APPS = [
     'planning',
     'presence',
     'documents',
+    'fichiers',
+    'benchmarks',
 ]
 
 MIDDLEWARE = [
+    'gestion_formation.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -62,6 +65,36 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'gestion_formation.urls'
 
+# Cache (tableau de bord formateur, totaux de pagination...). En production
+# multi-processus, préférer un cache partagé, par exemple
+# 'django.core.cache.backends.filebased.FileBasedCache' avec 'LOCATION'.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'gestion-formation',
+    },
+    # Occupation des salles : une entrée par (salle, semaine ISO), 53 par salle
+    # et par an, dans un cache à part pour ne pas évincer les autres entrées
+    'occupation': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'occupation-salles',
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    },
+}
+
+# Mesures par vue (requêtes SQL, durées, taille) exportées sur /admin/metriques/
+INSTRUMENTATION = {
+    'TAILLE_TAMPON': 2000,
+    'BUDGET_DEFAUT': 50,
+    'BUDGETS': {
+        'eleves:dashboard': 10,
+        'eleves:presence_stats': 10,
+        'presence:marquer': 15,
+    },
+    # 'raise' n'est activé que par settings_test : l'erreur arrive après l'exécution de la vue
+    'DEPASSEMENT': 'log',
+}
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -111,6 +144,26 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Hachage des mots de passe
+# Le premier hacheur sert aux nouveaux mots de passe ; les suivants vérifient les
+# anciens, rehachés avec le premier à la connexion suivante (voir accounts/hashers.py).
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+try:
+    import argon2  # noqa: F401
+except ImportError:
+    pass
+else:
+    PASSWORD_HASHERS.insert(0, 'accounts.hashers.Argon2Hasher')
+
+# Hacheur sans coût (accounts.hashers.HachageRapideHasher) : réservé à settings_test
+HACHAGE_RAPIDE_AUTORISE = False
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -135,3 +188,47 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # settings.py
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Fichiers de Document et DocumentEleve : stockage dédupliqué par empreinte (voir fichiers/stockage.py)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'documents': {'BACKEND': 'fichiers.stockage.StockageDedupliquant'},
+}
+# Empreinte SHA-256 calculée pendant la réception des fichiers
+FILE_UPLOAD_HANDLERS = [
+    'fichiers.televersement.MemoireEmpreinteUploadHandler',
+    'fichiers.televersement.TemporaireEmpreinteUploadHandler',
+]
+
+# Téléversement reprenable par morceaux (voir fichiers/morceaux.py pour toutes les clés et leurs défauts)
+TELEVERSEMENTS = {
+    'TAILLE_MORCEAU': 8 * 1024 * 1024,
+    'TAILLE_MAX_FORMULAIRE': 20 * 1024 * 1024,
+    'QUOTA_FORMATEUR': 10 * 1024 ** 3,
+}
+
+# Envoi des fichiers protégés (voir fichiers/telechargement.py) : par Django ('django'),
+# ou délégué au serveur frontal ('x-accel-redirect' pour nginx, 'x-sendfile')
+TELECHARGEMENTS = {
+    'MODE': 'django',
+}
+
+# Aperçus générés en arrière-plan par `python manage.py generer_apercus` (voir fichiers/apercus.py)
+APERCUS = {
+    'PROCESSUS': 2,
+}
+
+# Flux iCalendar des cours (voir planning/calendrier.py) : jours passés et à venir publiés
+CALENDRIER = {
+    'ICS_PASSE': 90,
+    'ICS_FUTUR': 365,
+}
+
+# Analyse d'occupation des salles (voir planning/occupation.py, exige NumPy) : heures d'ouverture
+OCCUPATION = {
+    'CACHE': 'occupation',
+    'HEURE_OUVERTURE': 8,
+    'HEURE_FERMETURE': 20,
+    'JOURS_OUVRES': 5,
+}
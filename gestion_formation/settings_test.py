@@ -0,0 +1,16 @@
+"""
+Réglages des tests et des bancs d'essai :
+
+    python manage.py test --settings=gestion_formation.settings_test
+    DJANGO_SETTINGS_MODULE=gestion_formation.settings_test python manage.py seed_bench
+
+Les mots de passe y sont hachés sans coût (une itération de PBKDF2) : la
+création de milliers de comptes n'est plus limitée par le CPU, et une vue
+qui dépasse son budget de requêtes SQL fait échouer le test.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import INSTRUMENTATION, PASSWORD_HASHERS
+
+HACHAGE_RAPIDE_AUTORISE = True
+PASSWORD_HASHERS = ['accounts.hashers.HachageRapideHasher', *PASSWORD_HASHERS]
+INSTRUMENTATION = {**INSTRUMENTATION, 'DEPASSEMENT': 'raise'}
@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.template import engines
+from django.template.response import TemplateResponse
+from django.test import TestCase, override_settings
+from django.urls import path
+
+from gestion_formation.urls import urlpatterns as urlpatterns_projet
+
+from .instrumentation import BudgetRequetesDepasse, empreinte, tampon
+
+
+def vue_n_plus_un(request):
+    utilisateurs = get_user_model().objects
+    for pk in utilisateurs.values_list('pk', flat=True):
+        utilisateurs.filter(pk=pk).exists()
+    gabarit = engines['django'].from_string('{{ nombre }} utilisateurs')
+    return TemplateResponse(request, gabarit, {'nombre': utilisateurs.count()})
+
+
+urlpatterns = urlpatterns_projet + [path('n-plus-un/', vue_n_plus_un, name='n_plus_un')]
+
+
+@override_settings(ROOT_URLCONF='gestion_formation.tests')
+class InstrumentationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        modele = get_user_model()
+        cls.admin = modele.objects.create_superuser('admin', 'admin@example.com', 'x')
+        for i in range(5):
+            modele.objects.create_user(f'u{i}', f'u{i}@example.com', 'x')
+
+    def setUp(self):
+        tampon.vider()
+
+    def test_empreinte_regroupe_les_listes_in(self):
+        self.assertEqual(
+            empreinte('SELECT * FROM t WHERE id IN (%s, %s,  %s)'),
+            empreinte('SELECT * FROM t WHERE id IN (%s)'),
+        )
+
+    @override_settings(INSTRUMENTATION={'DEPASSEMENT': 'log'})
+    def test_mesures_par_vue(self):
+        reponse = self.client.get('/n-plus-un/')
+        self.assertEqual(reponse.status_code, 200)
+        [mesure] = tampon.instantane()
+        self.assertEqual(mesure.vue, 'n_plus_un')
+        # 1 liste + 6 exists + 1 count
+        self.assertEqual(mesure.requetes, 8)
+        self.assertEqual(mesure.doublons, 5)
+        self.assertEqual(mesure.taille, len(reponse.content))
+        self.assertGreater(mesure.duree_rendu, 0)
+        self.assertFalse(mesure.depassement)
+
+    @override_settings(INSTRUMENTATION={'BUDGETS': {'n_plus_un': 3}, 'DEPASSEMENT': 'raise'})
+    def test_budget_depasse_leve(self):
+        with self.assertRaises(BudgetRequetesDepasse):
+            self.client.get('/n-plus-un/')
+
+    @override_settings(INSTRUMENTATION={'BUDGETS': {'n_plus_un': 3}, 'DEPASSEMENT': 'log'})
+    def test_budget_depasse_journalise(self):
+        with self.assertLogs('gestion_formation.instrumentation', 'WARNING'):
+            self.client.get('/n-plus-un/')
+        self.assertTrue(tampon.instantane()[0].depassement)
+
+    @override_settings(INSTRUMENTATION={'DEPASSEMENT': 'log'})
+    def test_export_prometheus_reserve_aux_administrateurs(self):
+        self.client.get('/n-plus-un/')
+        self.assertEqual(self.client.get('/admin/metriques/').status_code, 302)
+
+        self.client.force_login(self.admin)
+        reponse = self.client.get('/admin/metriques/')
+        self.assertEqual(reponse['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        texte = reponse.content.decode()
+        self.assertIn('# TYPE gp_vue_requetes_sql gauge', texte)
+        self.assertIn('gp_vue_requetes_sql{vue="n_plus_un"} 8', texte)
+        self.assertIn('gp_vue_requetes_sql_doublons{vue="n_plus_un"} 5', texte)
@@ -18,7 +18,11 @@ from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
+
+from gestion_formation.instrumentation import metriques
+
 urlpatterns = [
+    path('admin/metriques/', metriques, name='metriques'),
     path('admin/', admin.site.urls),
     # Inclusions de vos applications avec leurs namespaces
     path('', include('formations.urls', namespace='formations')),
@@ -30,8 +34,8 @@ urlpatterns = [
     path('documents/', include('documents.urls', namespace='documents')),
     path('formations/', include('formations.urls', namespace='formations')),
 ]
+# Pas de service direct de MEDIA_ROOT, même en DEBUG : les fichiers des documents passent
+# par les vues protégées documents:fichier et eleves:document_fichier (fichiers/telechargement.py)
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL,
-                          document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL,
                           document_root=settings.STATIC_ROOT)
@@ -0,0 +1,252 @@
+"""
+Calendrier des cours : fenêtres semaine / mois, flux JSON et iCalendar.
+
+Une fenêtre est toujours bornée (une semaine ISO ou un mois civil) et ses
+cours sont lus en une requête, formation, formateur, salle compris
+(select_related) : l'affichage n'exécute plus une requête par cours.
+
+Les flux iCalendar (un par formateur, par salle ou par élève) sont publiés
+sous une URL signée, lisible sans session par les clients de calendrier.
+Ils sont écrits au fil de la lecture (`.iterator()`, StreamingHttpResponse)
+et portent un ETag calculé par un seul agrégat (nombre de cours, dernières
+modifications des cours et de leurs formations, version des salles et des
+formateurs) et par les bornes de la fenêtre, qui glisse chaque jour : un client qui interroge toutes les cinq minutes reçoit un 304
+sans que le flux soit regénéré.
+
+Réglages dans settings.CALENDRIER (valeurs par défaut ci-dessous).
+"""
+import calendar
+import datetime
+import hashlib
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Cours
+
+VUES = ('semaine', 'mois')
+SEL = 'planning.calendrier'
+CLE_VERSION = 'planning:calendrier:version'
+TAILLE_LOT = 500
+
+REGLAGES_PAR_DEFAUT = {
+    # Jours passés et à venir publiés dans un flux iCalendar
+    'ICS_PASSE': 90,
+    'ICS_FUTUR': 365,
+}
+
+# Cours d'une source de flux : formateur, salle ou élève (inscriptions validées)
+SOURCES = {
+    'formateur': lambda pk: Cours.objects.filter(formateur_id=pk),
+    'salle': lambda pk: Cours.objects.filter(salle_id=pk),
+    'eleve': lambda pk: Cours.objects.filter(
+        formation__inscriptions__eleve_id=pk, formation__inscriptions__statut='valide'),
+}
+
+
+def reglage(nom):
+    return getattr(settings, 'CALENDRIER', {}).get(nom, REGLAGES_PAR_DEFAUT[nom])
+
+
+# --- Fenêtres ---
+
+def fenetre(vue, jour):
+    """(premier jour, dernier jour) de la semaine ISO ou du mois contenant `jour`"""
+    if vue == 'mois':
+        return jour.replace(day=1), jour.replace(day=calendar.monthrange(jour.year, jour.month)[1])
+    debut = jour - datetime.timedelta(days=jour.weekday())
+    return debut, debut + datetime.timedelta(days=6)
+
+
+def voisines(vue, debut, fin):
+    """Premiers jours des fenêtres précédente et suivante"""
+    if vue == 'mois':
+        return (debut - datetime.timedelta(days=1)).replace(day=1), fin + datetime.timedelta(days=1)
+    return debut - datetime.timedelta(days=7), fin + datetime.timedelta(days=1)
+
+
+def lire_fenetre(parametres):
+    """
+    (vue, debut, fin) d'après les paramètres `vue` et `date` (AAAA-MM-JJ) de
+    la requête ; une valeur absente ou illisible donne la semaine en cours.
+    """
+    vue = parametres.get('vue')
+    if vue not in VUES:
+        vue = VUES[0]
+    try:
+        jour = datetime.date.fromisoformat(parametres.get('date', ''))
+    except ValueError:
+        jour = timezone.localdate()
+    return (vue, *fenetre(vue, jour))
+
+
+def cours_de(queryset, debut, fin):
+    """Cours de la fenêtre, avec tout ce que l'affichage et les flux lisent"""
+    return queryset.filter(date__range=(debut, fin)).select_related(
+        'formation', 'formateur__user', 'salle',
+    ).order_by('date', 'heure_debut', 'pk')
+
+
+def par_jour(cours, debut, fin):
+    """[(jour, [cours du jour])] pour chaque jour de la fenêtre, vides compris"""
+    jours = {}
+    for element in cours:
+        jours.setdefault(element.date, []).append(element)
+    return [
+        (jour, jours.get(jour, []))
+        for jour in (debut + datetime.timedelta(days=n) for n in range((fin - debut).days + 1))
+    ]
+
+
+# --- Validateurs HTTP ---
+
+def version():
+    """Version des données affichées dans un flux mais absentes des cours (salles, formateurs)"""
+    valeur = cache.get(CLE_VERSION)
+    if valeur is None:
+        # Jamais en deçà d'une version déjà servie, même après éviction du cache
+        valeur = time.time_ns()
+        cache.add(CLE_VERSION, valeur, None)
+        valeur = cache.get(CLE_VERSION, valeur)
+    return valeur
+
+
+def invalider():
+    def incrementer():
+        try:
+            cache.incr(CLE_VERSION)
+        except ValueError:
+            version()
+    transaction.on_commit(incrementer)
+
+
+def etiquette(queryset, debut, fin):
+    """
+    ETag des cours de la fenêtre [debut, fin], en une requête d'agrégat ; les
+    bornes en font partie : un cours qui sort de la fenêtre le jour où un autre
+    y entre laisse nombre et dernières modifications inchangés.
+    """
+    etat = queryset.order_by().aggregate(
+        nombre=Count('pk'), cours=Max('updated_at'), formations=Max('formation__updated_at'),
+    )
+    empreinte = hashlib.md5(
+        f"{debut}|{fin}|{etat['nombre']}|{etat['cours']}|{etat['formations']}|{version()}".encode()
+    ).hexdigest()
+    return f'"{empreinte}"'
+
+
+# --- Flux signés ---
+
+def jeton(source, pk):
+    return signing.Signer(salt=SEL).sign(f'{source}-{pk}')
+
+
+def lire_jeton(valeur):
+    """(source, pk) d'un jeton de flux ; None s'il est invalide"""
+    try:
+        source, _, pk = signing.Signer(salt=SEL).unsign(valeur).partition('-')
+    except signing.BadSignature:
+        return None
+    if source not in SOURCES or not pk.isdigit():
+        return None
+    return source, int(pk)
+
+
+def fenetre_du_flux():
+    """(premier jour, dernier jour) publiés dans un flux, autour d'aujourd'hui"""
+    aujourd_hui = timezone.localdate()
+    return (
+        aujourd_hui - datetime.timedelta(days=reglage('ICS_PASSE')),
+        aujourd_hui + datetime.timedelta(days=reglage('ICS_FUTUR')),
+    )
+
+
+def cours_du_flux(source, pk, debut, fin):
+    return cours_de(SOURCES[source](pk), debut, fin)
+
+
+# --- Formats ---
+
+def bornes(cours):
+    """Début et fin du cours, datés dans le fuseau courant"""
+    return (
+        timezone.make_aware(datetime.datetime.combine(cours.date, cours.heure_debut)),
+        timezone.make_aware(datetime.datetime.combine(cours.date, cours.heure_fin)),
+    )
+
+
+def nom_formateur(cours):
+    user = cours.formateur.user
+    return user.get_full_name() or user.username
+
+
+def evenement(cours):
+    """Cours au format attendu par les calendriers côté client (FullCalendar et semblables)"""
+    debut, fin = bornes(cours)
+    return {
+        'id': cours.pk,
+        'title': cours.titre,
+        'start': debut.isoformat(),
+        'end': fin.isoformat(),
+        'url': cours.get_absolute_url(),
+        'formation': cours.formation.titre,
+        'formateur': nom_formateur(cours),
+        'salle': cours.salle.nom if cours.salle else None,
+    }
+
+
+def echapper(texte):
+    return (texte.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def plier(ligne):
+    """Ligne de contenu iCalendar, repliée à 75 octets (RFC 5545, 3.1)"""
+    octets = ligne.encode()
+    if len(octets) <= 75:
+        return ligne + '\r\n'
+    morceaux, courant, limite = [], '', 75
+    for caractere in ligne:
+        if len((courant + caractere).encode()) > limite:
+            morceaux.append(courant)
+            courant, limite = '', 74
+        courant += caractere
+    morceaux.append(courant)
+    return '\r\n '.join(morceaux) + '\r\n'
+
+
+def utc(moment):
+    return moment.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def vevent(cours, domaine):
+    debut, fin = bornes(cours)
+    proprietes = [
+        ('UID', f'cours-{cours.pk}@{domaine}'),
+        ('DTSTAMP', utc(cours.updated_at)),
+        ('LAST-MODIFIED', utc(cours.updated_at)),
+        ('DTSTART', utc(debut)),
+        ('DTEND', utc(fin)),
+        ('SUMMARY', echapper(cours.titre)),
+        ('DESCRIPTION', echapper(f'{cours.formation.titre} — {nom_formateur(cours)}')),
+    ]
+    if cours.salle:
+        proprietes.append(('LOCATION', echapper(f'{cours.salle.nom} ({cours.salle.batiment}, {cours.salle.etage})')))
+    return ''.join(plier(f'{nom}:{valeur}') for nom, valeur in [('BEGIN', 'VEVENT'), *proprietes, ('END', 'VEVENT')])
+
+
+def flux_ics(queryset, nom, domaine):
+    """Calendrier iCalendar écrit au fil de la lecture des cours, par lots"""
+    yield plier('BEGIN:VCALENDAR')
+    yield plier('VERSION:2.0')
+    yield plier(f'PRODID:-//{domaine}//Planning des cours//FR')
+    yield plier('CALSCALE:GREGORIAN')
+    yield plier(f'X-WR-CALNAME:{echapper(nom)}')
+    for cours in queryset.iterator(chunk_size=TAILLE_LOT):
+        yield vevent(cours, domaine)
+    yield plier('END:VCALENDAR')
@@ -0,0 +1,113 @@
+"""
+Détection des chevauchements de cours (salle ou formateur).
+
+`Cours.objects.overlapping` répond à une question ponctuelle en base.
+Pour valider un lot entier (import d'un trimestre, planning généré),
+`detecter_conflits` charge les cours existants de la période en une
+requête et confronte chaque cours à un index d'intervalles en mémoire,
+en O(n log n) au lieu de comparer toutes les paires.
+"""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from django.db.models import Q
+
+from .models import Cours
+
+
+class IndexIntervalles:
+    """
+    Index statique d'intervalles semi-ouverts [debut, fin) regroupés par clé.
+
+    Pour chaque clé, les intervalles sont triés par début et accompagnés du
+    maximum cumulé des fins : une recherche ne parcourt que les intervalles
+    qui commencent avant la fin demandée et dont le préfixe peut encore
+    déborder sur le début demandé.
+    """
+
+    def __init__(self, elements=()):
+        self._brut = defaultdict(list)
+        self._index = None
+        for cle, debut, fin, valeur in elements:
+            self.ajouter(cle, debut, fin, valeur)
+
+    def ajouter(self, cle, debut, fin, valeur):
+        self._brut[cle].append((debut, fin, valeur))
+        self._index = None
+
+    def _construire(self):
+        self._index = {}
+        for cle, intervalles in self._brut.items():
+            intervalles.sort(key=lambda intervalle: intervalle[0])
+            debuts = [debut for debut, _, _ in intervalles]
+            max_fins = []
+            for _, fin, _ in intervalles:
+                max_fins.append(fin if not max_fins or fin > max_fins[-1] else max_fins[-1])
+            self._index[cle] = (debuts, max_fins, intervalles)
+
+    def chevauchements(self, cle, debut, fin):
+        """Valeurs dont l'intervalle chevauche [debut, fin) pour cette clé"""
+        if self._index is None:
+            self._construire()
+        if cle not in self._index:
+            return []
+        debuts, max_fins, intervalles = self._index[cle]
+        # Au-delà de `stop`, les intervalles commencent après la fin demandée ;
+        # avant `start`, aucun ne se termine après le début demandé.
+        stop = bisect_left(debuts, fin)
+        start = bisect_right(max_fins, debut, 0, stop)
+        return [
+            valeur for d, f, valeur in intervalles[start:stop]
+            if f > debut
+        ]
+
+
+def _cles(cours):
+    """Ressources occupées par un cours : son formateur et, le cas échéant, sa salle"""
+    cles = [('formateur', cours.formateur_id, cours.date)]
+    if cours.salle_id:
+        cles.append(('salle', cours.salle_id, cours.date))
+    return cles
+
+
+def detecter_conflits(cours_list, avec_existants=True):
+    """
+    Renvoie la liste des conflits d'un lot de cours (enregistrés ou non),
+    sous la forme (cours, cours_en_conflit, ressource) où ressource vaut
+    'salle' ou 'formateur'. Chaque paire n'est signalée qu'une fois.
+    Si `avec_existants` est vrai, les cours déjà en base sur la même
+    période sont lus en une seule requête et pris en compte.
+    """
+    cours_list = list(cours_list)
+    if not cours_list:
+        return []
+
+    index = IndexIntervalles()
+    for rang, cours in enumerate(cours_list):
+        for cle in _cles(cours):
+            index.ajouter(cle, cours.heure_debut, cours.heure_fin, (rang, cours))
+
+    if avec_existants:
+        deja_dans_le_lot = {cours.pk for cours in cours_list if cours.pk}
+        existants = Cours.objects.filter(
+            Q(formateur_id__in={cours.formateur_id for cours in cours_list})
+            | Q(salle_id__in={cours.salle_id for cours in cours_list if cours.salle_id}),
+            date__range=(
+                min(cours.date for cours in cours_list),
+                max(cours.date for cours in cours_list),
+            ),
+        ).exclude(pk__in=deja_dans_le_lot).only(
+            'id', 'date', 'heure_debut', 'heure_fin', 'salle_id', 'formateur_id', 'titre'
+        ).order_by()
+        for cours in existants.iterator(chunk_size=2000):
+            for cle in _cles(cours):
+                index.ajouter(cle, cours.heure_debut, cours.heure_fin, (None, cours))
+
+    conflits = []
+    for rang, cours in enumerate(cours_list):
+        for cle in _cles(cours):
+            for autre_rang, autre in index.chevauchements(cle, cours.heure_debut, cours.heure_fin):
+                # Les paires internes au lot ne sont signalées que depuis leur second membre
+                if autre_rang is None or autre_rang < rang:
+                    conflits.append((cours, autre, cle[0]))
+    return conflits
@@ -0,0 +1,248 @@
+"""
+Disponibilités des formateurs : qui est libre sur un créneau, quels sont
+les créneaux libres d'un formateur sur une période.
+
+Une seule règle, partagée avec le solveur (planning.solveur, qui tire ses
+créneaux autorisés d'un Agenda) et appliquée jour par jour : un formateur
+qui a déclaré des fenêtres DISPONIBLE pour une journée n'est libre, ce
+jour-là, qu'à l'intérieur de celles-ci (un jour sans déclaration, il l'est
+tout le temps) ; ses fenêtres INDISPONIBLE et ses cours sont toujours
+retirés.
+
+Fenêtres et cours de la période sont lus en deux requêtes pour tous les
+formateurs concernés, puis ramenés, formateur par formateur, à une liste
+triée d'intervalles libres disjoints (fusion puis soustraction, en un
+balayage). Savoir si [debut, fin) est libre n'est plus qu'une recherche
+dichotomique (bisect) dans cette liste.
+"""
+import datetime
+from bisect import bisect_right
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from formateurs.models import Formateur
+from . import occupation
+from .models import Cours, Disponibilite
+
+# Période la plus longue acceptée par lire_periode
+PERIODE_MAX = datetime.timedelta(days=92)
+UNE_MICROSECONDE = datetime.timedelta(microseconds=1)
+
+
+def fusionner(intervalles):
+    """Intervalles [debut, fin) triés, les chevauchants ou contigus réunis"""
+    fusionnes = []
+    for debut, fin in sorted(intervalles):
+        if fusionnes and debut <= fusionnes[-1][1]:
+            if fin > fusionnes[-1][1]:
+                fusionnes[-1][1] = fin
+        elif debut < fin:
+            fusionnes.append([debut, fin])
+    return [tuple(intervalle) for intervalle in fusionnes]
+
+
+def soustraire(intervalles, a_retirer):
+    """`intervalles` privés de `a_retirer` ; deux listes triées et disjointes, un seul balayage"""
+    resultat, rang = [], 0
+    for debut, fin in intervalles:
+        # Retraits qui finissent avant cet intervalle : ils ne servent plus
+        while rang < len(a_retirer) and a_retirer[rang][1] <= debut:
+            rang += 1
+        curseur, suivant = debut, rang
+        while suivant < len(a_retirer) and a_retirer[suivant][0] < fin:
+            if a_retirer[suivant][0] > curseur:
+                resultat.append((curseur, a_retirer[suivant][0]))
+            curseur = max(curseur, a_retirer[suivant][1])
+            suivant += 1
+        if curseur < fin:
+            resultat.append((curseur, fin))
+    return resultat
+
+
+def intersecter(intervalles, autres):
+    """Parties communes de deux listes triées et disjointes"""
+    resultat, i, j = [], 0, 0
+    while i < len(intervalles) and j < len(autres):
+        debut = max(intervalles[i][0], autres[j][0])
+        fin = min(intervalles[i][1], autres[j][1])
+        if debut < fin:
+            resultat.append((debut, fin))
+        if intervalles[i][1] < autres[j][1]:
+            i += 1
+        else:
+            j += 1
+    return resultat
+
+
+def bornes_cours(date, heure_debut, heure_fin, fuseau=None):
+    fuseau = fuseau or timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.datetime.combine(date, heure_debut), fuseau),
+        timezone.make_aware(datetime.datetime.combine(date, heure_fin), fuseau),
+    )
+
+
+def minuit(jour, fuseau):
+    return timezone.make_aware(datetime.datetime.combine(jour, datetime.time()), fuseau)
+
+
+def jours_couverts(debut, fin, fuseau):
+    """Jours locaux que touche [debut, fin)"""
+    jour = debut.astimezone(fuseau).date()
+    dernier = (fin - UNE_MICROSECONDE).astimezone(fuseau).date()
+    return [jour + datetime.timedelta(days=n) for n in range((dernier - jour).days + 1)]
+
+
+def journees_locales(debut, fin):
+    """[(jour, début du jour, début du lendemain)] des jours locaux que touche [debut, fin)"""
+    fuseau = timezone.get_current_timezone()
+    return [
+        (jour, minuit(jour, fuseau), minuit(jour + datetime.timedelta(days=1), fuseau))
+        for jour in jours_couverts(debut, fin, fuseau)
+    ]
+
+
+def heures_ouvrees(debut, fin):
+    """Plages d'ouverture (settings.OCCUPATION) des jours ouvrés de [debut, fin)"""
+    fuseau = timezone.get_current_timezone()
+    ouverture = datetime.time(occupation.reglage('HEURE_OUVERTURE'))
+    fermeture = datetime.time(occupation.reglage('HEURE_FERMETURE'))
+    jour, dernier = timezone.localtime(debut, fuseau).date(), timezone.localtime(fin, fuseau).date()
+    plages = []
+    while jour <= dernier:
+        if jour.weekday() < occupation.reglage('JOURS_OUVRES'):
+            plages.append(bornes_cours(jour, ouverture, fermeture, fuseau))
+        jour += datetime.timedelta(days=1)
+    return intersecter(plages, [(debut, fin)])
+
+
+def lire_periode(parametres):
+    """
+    [debut, fin) d'après `debut` et `fin` (dates et heures ISO), ou d'après
+    `mois` (AAAA-MM, par défaut le mois en cours) ; ValueError si illisible
+    ou trop proche des bornes de datetime (9999-12, par exemple).
+    """
+    try:
+        if parametres.get('debut') or parametres.get('fin'):
+            debut, fin = (parse_datetime(parametres.get(nom, '')) for nom in ('debut', 'fin'))
+            if debut is None or fin is None:
+                raise ValueError("Dates attendues au format AAAA-MM-JJTHH:MM.")
+            debut, fin = (timezone.make_aware(d) if timezone.is_naive(d) else d for d in (debut, fin))
+        else:
+            mois = parametres.get('mois')
+            premier = datetime.date.fromisoformat(f'{mois}-01') if mois else timezone.localdate().replace(day=1)
+            suivant = (premier + datetime.timedelta(days=31)).replace(day=1)
+            debut, fin = (timezone.make_aware(datetime.datetime.combine(jour, datetime.time()))
+                          for jour in (premier, suivant))
+        if not debut < fin <= debut + PERIODE_MAX:
+            raise ValueError("La période doit être non vide et durer au plus 92 jours.")
+    except OverflowError:
+        raise ValueError("Période hors des dates prises en charge.") from None
+    return debut, fin
+
+
+def lire_duree(parametres):
+    """Durée minimale `duree` en minutes (None si absente), au plus PERIODE_MAX ; ValueError sinon"""
+    duree = parametres.get('duree', '')
+    if not duree:
+        return None
+    minutes = int(duree)
+    if not 0 <= minutes <= PERIODE_MAX.total_seconds() // 60:
+        raise ValueError("La durée doit être comprise entre 0 et 92 jours.")
+    return datetime.timedelta(minutes=minutes)
+
+
+def lire_fenetres(debut, fin, formateur_ids=None):
+    """
+    (formateur_id, date_debut, date_fin, type) des Disponibilite touchant les
+    journées locales de [debut, fin) : une déclaration du jour compte, même
+    hors de la période. Tous les formateurs si `formateur_ids` est None.
+    """
+    journees = journees_locales(debut, fin)
+    fenetres = Disponibilite.objects.filter(date_debut__lt=journees[-1][2], date_fin__gt=journees[0][1])
+    if formateur_ids is not None:
+        fenetres = fenetres.filter(formateur_id__in=formateur_ids)
+    return fenetres.order_by().values_list('formateur_id', 'date_debut', 'date_fin', 'type')
+
+
+class Agenda:
+    """
+    Intervalles libres de plusieurs formateurs sur la période [debut, fin).
+
+    `fenetres` : (formateur_id, date_debut, date_fin, type) des Disponibilite ;
+    `occupes` : (formateur_id, debut, fin) des cours. `charger()` les lit en base.
+    """
+
+    def __init__(self, debut, fin, formateur_ids, fenetres=(), occupes=()):
+        self.debut, self.fin = debut, fin
+        disponibles, retraits = {}, {}
+        for formateur_id, date_debut, date_fin, nature in fenetres:
+            cible = disponibles if nature == 'DISPONIBLE' else retraits
+            cible.setdefault(formateur_id, []).append((date_debut, date_fin))
+        for formateur_id, date_debut, date_fin in occupes:
+            retraits.setdefault(formateur_id, []).append((date_debut, date_fin))
+
+        journees = journees_locales(debut, fin)
+        fuseau = timezone.get_current_timezone()
+        self._libres = {}
+        for formateur_id in formateur_ids:
+            base = [(debut, fin)]
+            if formateur_id in disponibles:
+                # Jours couverts par une déclaration : libres seulement dans les fenêtres
+                declares = {jour for d, f in disponibles[formateur_id] for jour in jours_couverts(d, f, fuseau)}
+                base = intersecter(fusionner(disponibles[formateur_id] + [
+                    (debut_jour, fin_jour) for jour, debut_jour, fin_jour in journees if jour not in declares
+                ]), base)
+            libres = soustraire(base, fusionner(retraits.get(formateur_id, ())))
+            # Débuts à part, pour la recherche dichotomique
+            self._libres[formateur_id] = ([d for d, _ in libres], libres)
+
+    @classmethod
+    def charger(cls, debut, fin, formateur_ids, sauf_cours=None):
+        """Agenda lu en base : deux requêtes, quel que soit le nombre de formateurs"""
+        formateur_ids = list(formateur_ids)
+        fenetres = lire_fenetres(debut, fin, formateur_ids)
+        cours = Cours.objects.filter(
+            formateur_id__in=formateur_ids,
+            # Un jour de marge de part et d'autre : les dates des cours sont locales
+            date__range=(debut.date() - datetime.timedelta(days=1), fin.date() + datetime.timedelta(days=1)),
+        ).exclude(pk=sauf_cours).order_by().values_list('formateur_id', 'date', 'heure_debut', 'heure_fin')
+        fuseau = timezone.get_current_timezone()
+        occupes = [
+            (formateur_id, *bornes_cours(date, heure_debut, heure_fin, fuseau))
+            for formateur_id, date, heure_debut, heure_fin in cours
+        ]
+        return cls(debut, fin, formateur_ids, fenetres, occupes)
+
+    def est_libre(self, formateur_id, debut, fin):
+        """Vrai si [debut, fin) tient dans un seul intervalle libre du formateur"""
+        debuts, libres = self._libres.get(formateur_id, ((), ()))
+        rang = bisect_right(debuts, debut) - 1
+        return rang >= 0 and libres[rang][1] >= fin
+
+    def libres(self, formateur_id):
+        return list(self._libres.get(formateur_id, ((), ()))[1])
+
+
+def formateurs_libres(debut, fin, specialite=None):
+    """Formateurs (de la spécialité, si indiquée) libres sur tout [debut, fin)"""
+    formateurs = Formateur.objects.select_related('user').order_by('user__last_name', 'user__first_name', 'pk')
+    if specialite:
+        formateurs = formateurs.filter(specialite__iexact=specialite)
+    formateurs = list(formateurs)
+    agenda = Agenda.charger(debut, fin, [formateur.pk for formateur in formateurs])
+    return [formateur for formateur in formateurs if agenda.est_libre(formateur.pk, debut, fin)]
+
+
+def creneaux_libres(formateur_id, debut, fin, duree_min=None, ouvrees=True):
+    """
+    Intervalles libres du formateur sur [debut, fin), limités aux heures
+    ouvrées si `ouvrees`, et d'au moins `duree_min` (timedelta) si indiqué.
+    """
+    libres = Agenda.charger(debut, fin, [formateur_id]).libres(formateur_id)
+    if ouvrees:
+        libres = intersecter(libres, heures_ouvrees(debut, fin))
+    if duree_min:
+        libres = [(d, f) for d, f in libres if f - d >= duree_min]
+    return libres
@@ -1,15 +1,62 @@
 from django import forms
 from django.utils.translation import gettext_lazy as _
+from . import disponibilites
 from .models import Cours, Disponibilite
 
 class CoursForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         formateur = kwargs.pop('formateur', None)
         super().__init__(*args, **kwargs)
+        self.formateur = formateur or getattr(self.instance, 'formateur', None)
         
         if formateur:
             self.fields['formation'].queryset = formateur.formations.all()
 
+    def clean(self):
+        """Refuse un créneau qui chevauche un autre cours de la salle ou du formateur"""
+        cleaned_data = super().clean()
+        date = cleaned_data.get('date')
+        heure_debut = cleaned_data.get('heure_debut')
+        heure_fin = cleaned_data.get('heure_fin')
+        if not (date and heure_debut and heure_fin):
+            return cleaned_data
+
+        if heure_fin <= heure_debut:
+            raise forms.ValidationError(
+                _("L'heure de fin doit être postérieure à l'heure de début."),
+                code='horaire_invalide'
+            )
+
+        salle = cleaned_data.get('salle')
+        if salle is None and self.formateur is None:
+            return cleaned_data
+        conflits = Cours.objects.overlapping(
+            date, heure_debut, heure_fin, salle=salle, formateur=self.formateur
+        ).exclude(pk=self.instance.pk).select_related('salle')
+        for cours in conflits[:1]:
+            if salle is not None and cours.salle_id == salle.pk:
+                message = _("La salle %(salle)s est déjà occupée par « %(cours)s » de %(debut)s à %(fin)s.")
+            else:
+                message = _("Vous avez déjà « %(cours)s » de %(debut)s à %(fin)s.")
+            raise forms.ValidationError(message, code='chevauchement', params={
+                'salle': cours.salle,
+                'cours': cours.titre,
+                'debut': cours.heure_debut.strftime('%H:%M'),
+                'fin': cours.heure_fin.strftime('%H:%M'),
+            })
+
+        if self.formateur is not None:
+            # Fenêtres DISPONIBLE / INDISPONIBLE déclarées par le formateur
+            debut, fin = disponibilites.bornes_cours(date, heure_debut, heure_fin)
+            agenda = disponibilites.Agenda.charger(debut, fin, [self.formateur.pk], sauf_cours=self.instance.pk)
+            if not agenda.est_libre(self.formateur.pk, debut, fin):
+                raise forms.ValidationError(
+                    _("Ce créneau sort de vos disponibilités (%(debut)s à %(fin)s)."),
+                    code='indisponible',
+                    params={'debut': heure_debut.strftime('%H:%M'), 'fin': heure_fin.strftime('%H:%M')},
+                )
+        return cleaned_data
+
     class Meta:
         model = Cours
         fields = [
@@ -0,0 +1,62 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from formations.models import Formation
+from planning.solveur import planifier
+
+
+class Command(BaseCommand):
+    help = ("Génère un planning brouillon sans conflit pour les formations d'une période, "
+            "à partir des modules, des disponibilités des formateurs et des salles")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--debut', type=datetime.date.fromisoformat, required=True,
+                            help="Premier jour de la période (AAAA-MM-JJ)")
+        parser.add_argument('--fin', type=datetime.date.fromisoformat, required=True,
+                            help="Dernier jour de la période (AAAA-MM-JJ)")
+        parser.add_argument('--formation', type=int, action='append', dest='formations',
+                            help="Identifiant d'une formation à planifier (répétable, défaut : formations actives)")
+        parser.add_argument('--redemarrages', type=int, default=4,
+                            help="Nombre de redémarrages (graines) de la recherche locale")
+        parser.add_argument('--processus', type=int, default=1,
+                            help="Nombre de processus pour exécuter les redémarrages en parallèle")
+        parser.add_argument('--iterations', type=int, default=500,
+                            help="Itérations de recherche locale par redémarrage")
+        parser.add_argument('--temps-max', type=float, default=None,
+                            help="Durée maximale (secondes) de chaque redémarrage")
+        parser.add_argument('--enregistrer', action='store_true',
+                            help="Enregistre les cours générés (sinon simple simulation)")
+
+    def handle(self, *args, **options):
+        if options['fin'] < options['debut']:
+            raise CommandError("La date de fin doit être postérieure à la date de début.")
+
+        formations = Formation.objects.filter(actif=True)
+        if options['formations']:
+            formations = Formation.objects.filter(pk__in=options['formations'])
+
+        debut = time.perf_counter()
+        try:
+            probleme, solution, cours = planifier(
+                formations, options['debut'], options['fin'],
+                redemarrages=options['redemarrages'],
+                processus=options['processus'],
+                sauvegarder=options['enregistrer'],
+                iterations=options['iterations'],
+                temps_max=options['temps_max'],
+            )
+        except ValueError as erreur:
+            raise CommandError(str(erreur))
+        duree = time.perf_counter() - debut
+
+        non_planifiees = solution.non_planifiees(probleme)
+        self.stdout.write(
+            f"{len(probleme.formations)} formations, {len(cours)} séances planifiées, "
+            f"{non_planifiees} non planifiées (coût {solution.cout}, {duree:.1f} s)."
+        )
+        if options['enregistrer']:
+            self.stdout.write(self.style.SUCCESS(f"{len(cours)} cours enregistrés."))
+        else:
+            self.stdout.write("Simulation : relancez avec --enregistrer pour créer les cours.")
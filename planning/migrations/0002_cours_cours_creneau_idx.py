@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formateurs', '0001_initial'),
+        ('formations', '0001_initial'),
+        ('planning', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cours',
+            index=models.Index(fields=['date', 'heure_debut', 'heure_fin'], name='cours_creneau_idx'),
+        ),
+    ]
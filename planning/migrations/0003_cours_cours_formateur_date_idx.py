@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formateurs', '0001_initial'),
+        ('formations', '0001_initial'),
+        ('planning', '0002_cours_cours_creneau_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cours',
+            index=models.Index(fields=['formateur', 'date', 'heure_debut'], name='cours_formateur_date_idx'),
+        ),
+    ]
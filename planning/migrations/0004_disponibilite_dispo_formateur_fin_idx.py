@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('formateurs', '0001_initial'),
+        ('planning', '0003_cours_cours_formateur_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='disponibilite',
+            index=models.Index(fields=['formateur', 'date_fin'], name='dispo_formateur_fin_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 import datetime
 from django.db import models
+from django.db.models import Q
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator, MaxValueValidator
 from formations.models import Formation
@@ -22,6 +23,25 @@ class Salle(models.Model):
     def __str__(self):
         return f"{self.nom} ({self.batiment} - {self.etage})"
 
+class CoursQuerySet(models.QuerySet):
+    def overlapping(self, date, heure_debut, heure_fin, salle=None, formateur=None):
+        """
+        Cours qui chevauchent le créneau [heure_debut, heure_fin) du jour donné,
+        dans la salle et/ou pour le formateur indiqués.
+        Requête de plage servie par l'index (date, heure_debut, heure_fin).
+        """
+        ressources = Q()
+        if salle is not None:
+            ressources |= Q(salle=salle)
+        if formateur is not None:
+            ressources |= Q(formateur=formateur)
+        return self.filter(
+            ressources,
+            date=date,
+            heure_debut__lt=heure_fin,
+            heure_fin__gt=heure_debut,
+        )
+
 class Cours(models.Model):
     """Modèle principal pour les cours"""
     formation = models.ForeignKey( Formation, on_delete=models.CASCADE, verbose_name=_('Formation'))
@@ -38,10 +58,16 @@ class Cours(models.Model):
     created_at = models.DateTimeField(_('Date de création'), auto_now_add=True)
     updated_at = models.DateTimeField(_('Dernière modification'), auto_now=True)
 
+    objects = CoursQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('Cours')
         verbose_name_plural = _('Cours')
         ordering = ['date', 'heure_debut']
+        indexes = [
+            models.Index(fields=['date', 'heure_debut', 'heure_fin'], name='cours_creneau_idx'),
+            models.Index(fields=['formateur', 'date', 'heure_debut'], name='cours_formateur_date_idx'),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['salle', 'date', 'heure_debut'],
@@ -62,7 +88,7 @@ class Cours(models.Model):
     @property
     def duree(self):
         """Calcule la durée du cours en heures"""
-        delta = datetime.combine(self.date, self.heure_fin) - datetime.combine(self.date, self.heure_debut)
+        delta = datetime.datetime.combine(self.date, self.heure_fin) - datetime.datetime.combine(self.date, self.heure_debut)
         return delta.total_seconds() / 3600
 
 class Disponibilite(models.Model):
@@ -82,6 +108,9 @@ class Disponibilite(models.Model):
         verbose_name = _('Disponibilité')
         verbose_name_plural = _('Disponibilités')
         ordering = ['date_debut']
+        indexes = [
+            models.Index(fields=['formateur', 'date_fin'], name='dispo_formateur_fin_idx'),
+        ]
 
     def __str__(self):
         return f"{self.formateur} - {self.date_debut} à {self.date_fin}"
\ No newline at end of file
@@ -0,0 +1,246 @@
+"""
+Occupation et taux d'utilisation des salles.
+
+Les cours d'une période sont lus en une requête, au fil de l'eau, puis
+accumulés dans des tableaux NumPy de créneaux horaires : pour chaque
+(salle, semaine ISO), 168 créneaux (7 jours × 24 heures) portant les
+minutes occupées et les places-minutes occupées (minutes × élèves
+présents). Un cours de 9 h 30 à 11 h compte 30 minutes dans le créneau de
+9 h et 60 dans celui de 10 h : chaque intervalle est posé sur un tableau de
+différences (np.add.at), dont la somme cumulée donne tous les créneaux
+d'un coup, sans boucle Python par cours ni par heure.
+
+Les tableaux sont gardés en cache par (salle, semaine ISO), dans l'alias
+OCCUPATION['CACHE'] de settings.CACHES, et oubliés dès qu'un cours de la
+semaine ou ses présences changent (planning.signals) : une analyse ne relit
+en base que les semaines manquantes.
+
+NumPy est une dépendance facultative, nécessaire à ce seul module.
+Réglages dans settings.OCCUPATION (valeurs par défaut ci-dessous).
+"""
+import datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .models import Cours, Salle
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    np = None
+
+CRENEAUX = 7 * 24
+DUREE_CACHE = 7 * 24 * 60 * 60
+TAILLE_LOT = 5000
+
+REGLAGES_PAR_DEFAUT = {
+    # Alias de settings.CACHES où ranger les (salle, semaine)
+    'CACHE': 'default',
+    # Heures d'ouverture des salles (taux d'utilisation) : [ouverture, fermeture)
+    'HEURE_OUVERTURE': 8,
+    'HEURE_FERMETURE': 20,
+    # Jours ouvrés par semaine, à partir du lundi
+    'JOURS_OUVRES': 5,
+}
+
+
+class AnalyseIndisponible(Exception):
+    """L'analyse d'occupation exige NumPy"""
+
+
+def reglage(nom):
+    return getattr(settings, 'OCCUPATION', {}).get(nom, REGLAGES_PAR_DEFAUT[nom])
+
+
+def lundi(jour):
+    return jour - datetime.timedelta(days=jour.weekday())
+
+
+def semaines_iso(annee):
+    """Lundis des semaines de l'année ISO `annee` (52 ou 53)"""
+    premier = datetime.date.fromisocalendar(annee, 1, 1)
+    dernier = lundi(datetime.date(annee, 12, 28))
+    return [premier + datetime.timedelta(weeks=n) for n in range((dernier - premier).days // 7 + 1)]
+
+
+def cache_occupation():
+    return caches[reglage('CACHE')]
+
+
+def cle_cache(salle_id, lundi_semaine):
+    annee, semaine, _ = lundi_semaine.isocalendar()
+    return f'planning:occupation:{salle_id}:{annee}-W{semaine:02d}'
+
+
+def invalider(*creneaux):
+    """Oublie les semaines des (salle_id, date) indiqués, une fois la transaction validée"""
+    cles = {cle_cache(salle_id, lundi(date)) for salle_id, date in creneaux if salle_id and date}
+    if cles:
+        transaction.on_commit(lambda: cache_occupation().delete_many(cles))
+
+
+def lignes_cours(salle_ids, debut, fin):
+    """(salle, date, début, fin, présents) des cours de la période, en une requête lue par lots"""
+    return Cours.objects.filter(
+        salle_id__in=salle_ids, date__range=(debut, fin), heure_fin__gt=F('heure_debut'),
+    ).annotate(
+        presents=Count('presences', filter=Q(presences__present=True)),
+    ).order_by().values_list(
+        'salle_id', 'date', 'heure_debut', 'heure_fin', 'presents',
+    ).iterator(chunk_size=TAILLE_LOT)
+
+
+def minutes_de(heures):
+    return np.fromiter((heure.hour * 60 + heure.minute for heure in heures), dtype=np.int32, count=len(heures))
+
+
+def accumuler(lignes, rangs_salles, premier_lundi, nb_semaines):
+    """
+    Tableau (salles, semaines, 2, 168) des minutes occupées ([..., 0, :]) et
+    des places-minutes occupées ([..., 1, :]) par créneau horaire.
+    `rangs_salles` associe l'id de chaque salle à sa ligne.
+    """
+    lignes_par_couche = len(rangs_salles) * nb_semaines * 2
+    occupation = np.zeros((lignes_par_couche, CRENEAUX), dtype=np.int32)
+    donnees = list(lignes)
+    if donnees:
+        salles, dates, heures_debut, heures_fin, presents = zip(*donnees)
+        jours = (np.array(dates, dtype='datetime64[D]') - np.datetime64(premier_lundi, 'D')).astype(np.int32)
+        # Minutes depuis le lundi 0 h de la semaine du cours
+        debut = jours % 7 * 1440 + minutes_de(heures_debut)
+        fin = jours % 7 * 1440 + minutes_de(heures_fin)
+        rangs = np.fromiter((rangs_salles[salle] for salle in salles), dtype=np.int32, count=len(salles))
+        ligne = (rangs * nb_semaines + jours // 7) * 2
+        premier, dernier = debut // 60, (fin - 1) // 60
+
+        # Créneaux entièrement couverts, du premier au dernier : différences puis somme cumulée
+        differences = np.zeros((lignes_par_couche, CRENEAUX + 1), dtype=np.int32)
+        for couche, poids in ((0, 1), (1, np.array(presents, dtype=np.int32))):
+            np.add.at(differences, (ligne + couche, premier), 60 * poids)
+            np.add.at(differences, (ligne + couche, dernier + 1), -60 * poids)
+        occupation += np.cumsum(differences, axis=1, dtype=np.int32)[:, :CRENEAUX]
+        # Moins les minutes du premier créneau avant le début et du dernier après la fin
+        for couche, poids in ((0, 1), (1, np.array(presents, dtype=np.int32))):
+            np.add.at(occupation, (ligne + couche, premier), -(debut - premier * 60) * poids)
+            np.add.at(occupation, (ligne + couche, dernier), -((dernier + 1) * 60 - fin) * poids)
+    return occupation.reshape(len(rangs_salles), nb_semaines, 2, CRENEAUX)
+
+
+def occupations(salles, lundis):
+    """
+    Tableau (salles, semaines, 2, 168) des semaines `lundis`, lu dans le cache ;
+    les (salle, semaine) absents sont calculés en une requête et mis en cache.
+    """
+    if np is None:
+        raise AnalyseIndisponible("L'analyse d'occupation des salles exige NumPy.")
+    cache = cache_occupation()
+    cles = [[cle_cache(salle.pk, jour) for jour in lundis] for salle in salles]
+    en_cache = cache.get_many([cle for ligne in cles for cle in ligne])
+    resultat = np.zeros((len(salles), len(lundis), 2, CRENEAUX), dtype=np.int32)
+    manquants = []
+    for i, ligne in enumerate(cles):
+        for j, cle in enumerate(ligne):
+            valeur = en_cache.get(cle)
+            if valeur is None:
+                manquants.append((i, j))
+            elif valeur:
+                resultat[i, j] = np.frombuffer(valeur, dtype=np.int32).reshape(2, CRENEAUX)
+
+    if manquants:
+        rangs = {i: rang for rang, i in enumerate(sorted({i for i, _ in manquants}))}
+        j0, j1 = min(j for _, j in manquants), max(j for _, j in manquants)
+        calcul = accumuler(
+            lignes_cours([salles[i].pk for i in rangs], lundis[j0], lundis[j1] + datetime.timedelta(days=6)),
+            {salles[i].pk: rang for i, rang in rangs.items()},
+            lundis[j0], j1 - j0 + 1,
+        )
+        a_ecrire = {}
+        for i, j in manquants:
+            bloc = calcul[rangs[i], j - j0]
+            resultat[i, j] = bloc
+            # Semaine vide : b'' (None signifierait « absent du cache »)
+            a_ecrire[cles[i][j]] = bloc.tobytes() if bloc.any() else b''
+        cache.set_many(a_ecrire, DUREE_CACHE)
+    return resultat
+
+
+def creneaux_ouverts():
+    """Masque des 168 créneaux de la semaine compris dans les heures d'ouverture"""
+    jours, heures = np.divmod(np.arange(CRENEAUX), 24)
+    return ((jours < reglage('JOURS_OUVRES'))
+            & (heures >= reglage('HEURE_OUVERTURE')) & (heures < reglage('HEURE_FERMETURE')))
+
+
+def ratio(numerateur, denominateur):
+    """Rapports élément par élément ; None (ou NaN dans un tableau) là où le dénominateur est nul"""
+    numerateur = np.asarray(numerateur, dtype=np.float64)
+    denominateur = np.asarray(denominateur, dtype=np.float64)
+    quotient = np.divide(numerateur, denominateur, out=np.full(numerateur.shape, np.nan), where=denominateur > 0)
+    if quotient.ndim == 0:
+        return None if np.isnan(quotient) else round(float(quotient), 3)
+    return np.round(quotient, 3)
+
+
+def carte(valeurs):
+    """168 créneaux → 7 lignes (jours) de 24 heures, valeurs simples pour un gabarit"""
+    return [[None if np.isnan(v) else float(v) for v in jour] for jour in np.asarray(valeurs).reshape(7, 24)]
+
+
+def analyser(annee, batiment=None, etage=None):
+    """
+    Occupation des salles sur l'année ISO `annee`, par salle et par
+    (bâtiment, étage) :
+    - utilisation : part des heures d'ouverture où la salle est occupée ;
+    - remplissage : élèves présents rapportés aux places, sur les heures
+      occupées (places-minutes occupées / minutes occupées × capacité) ;
+    - cartes : les mêmes rapports pour chacune des 168 heures de la semaine.
+    """
+    salles = Salle.objects.all()
+    if batiment is not None:
+        salles = salles.filter(batiment=batiment)
+    if etage is not None:
+        salles = salles.filter(etage=etage)
+    salles = list(salles.order_by('batiment', 'etage', 'nom'))
+    lundis = semaines_iso(annee)
+    donnees = occupations(salles, lundis)
+    minutes, places = donnees[:, :, 0, :], donnees[:, :, 1, :]
+    capacites = np.array([salle.capacite for salle in salles], dtype=np.int64)
+    ouverts = creneaux_ouverts()
+    minutes_ouvertes = int(ouverts.sum()) * 60
+
+    # Totaux par salle et par créneau de la semaine, cumulés sur l'année
+    minutes_salle = minutes.sum(axis=1, dtype=np.int64)
+    places_salle = places.sum(axis=1, dtype=np.int64)
+    utilisation_hebdo = ratio(minutes[:, :, ouverts].sum(axis=2), minutes_ouvertes)
+
+    resultat = {'annee': annee, 'semaines': lundis, 'salles': [], 'groupes': []}
+    for rang, salle in enumerate(salles):
+        occupees = minutes_salle[rang].sum()
+        resultat['salles'].append({
+            'salle': salle,
+            'heures': round(float(occupees) / 60, 1),
+            'utilisation': ratio(minutes_salle[rang][ouverts].sum(), minutes_ouvertes * len(lundis)),
+            'remplissage': ratio(places_salle[rang].sum(), occupees * salle.capacite),
+            'par_semaine': [None if np.isnan(v) else float(v) for v in utilisation_hebdo[rang]],
+        })
+
+    groupes = {}
+    for rang, salle in enumerate(salles):
+        groupes.setdefault((salle.batiment, salle.etage), []).append(rang)
+    for (nom_batiment, numero_etage), rangs in groupes.items():
+        minutes_groupe = minutes_salle[rangs].sum(axis=0)
+        places_offertes = (minutes_salle[rangs] * capacites[rangs, None]).sum(axis=0)
+        places_groupe = places_salle[rangs].sum(axis=0)
+        resultat['groupes'].append({
+            'batiment': nom_batiment,
+            'etage': numero_etage,
+            'nb_salles': len(rangs),
+            'utilisation': ratio(minutes_groupe[ouverts].sum(), minutes_ouvertes * len(lundis) * len(rangs)),
+            'remplissage': ratio(places_groupe.sum(), places_offertes.sum()),
+            'carte_utilisation': carte(ratio(minutes_groupe, 60 * len(lundis) * len(rangs))),
+            'carte_remplissage': carte(ratio(places_groupe, places_offertes)),
+        })
+    return resultat
@@ -0,0 +1,53 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from formateurs.models import Formateur
+from presence.models import Presence, presences_marquees
+from . import calendrier, occupation
+from .models import Cours, Salle
+
+
+@receiver(post_save, sender=Salle)
+@receiver(post_delete, sender=Salle)
+@receiver(post_save, sender=Formateur)
+@receiver(post_delete, sender=Formateur)
+def invalider_calendriers(sender, raw=False, **kwargs):
+    """Nom de salle ou de formateur : affiché dans les flux sans modifier les cours"""
+    if not raw:
+        calendrier.invalider()
+
+
+@receiver(pre_save, sender=Cours)
+def memoriser_creneau_cours(sender, instance, raw=False, **kwargs):
+    instance._creneau_enregistre = None
+    if instance.pk and not raw:
+        instance._creneau_enregistre = Cours.objects.filter(pk=instance.pk).values_list(
+            'salle_id', 'date'
+        ).first()
+
+
+@receiver(post_save, sender=Cours)
+@receiver(post_delete, sender=Cours)
+def invalider_occupation_cours(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    ancien = getattr(instance, '_creneau_enregistre', None)
+    occupation.invalider((instance.salle_id, instance.date), *([ancien] if ancien else []))
+
+
+@receiver(post_save, sender=Presence)
+@receiver(post_delete, sender=Presence)
+def invalider_occupation_presence(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    cours_ids = {instance.cours_id}
+    # État enregistré mémorisé par presence.signals : la présence a pu changer de cours
+    ancien = getattr(instance, '_etat_enregistre', None)
+    if ancien:
+        cours_ids.add(ancien[0])
+    occupation.invalider(*Cours.objects.filter(pk__in=cours_ids).values_list('salle_id', 'date'))
+
+
+@receiver(presences_marquees)
+def invalider_occupation_appel(sender, cours, **kwargs):
+    occupation.invalider((cours.salle_id, cours.date))
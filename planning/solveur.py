@@ -0,0 +1,377 @@
+"""
+Génération automatique d'un planning brouillon à partir des modules.
+
+Chaque module est découpé en séances d'au plus la durée d'un créneau,
+puis placé par un algorithme glouton (au plus tôt, dans l'ordre des
+modules) suivi d'une recherche locale : on retire quelques formations
+et on les replace dans un autre ordre, en gardant la meilleure solution.
+
+Les contraintes respectées sont :
+- les disponibilités des formateurs, selon la règle de
+  planning.disponibilites (fenêtres DISPONIBLE pour les jours où le
+  formateur en a déclaré, fenêtres INDISPONIBLE dans tous les cas) ;
+- la capacité des salles face à l'effectif inscrit (inscriptions validées) ;
+- l'ordre des modules d'une formation ;
+- les cours déjà planifiés, qui occupent salles et formateurs.
+
+Le problème est chargé une fois depuis la base (`charger_probleme`) puis
+résolu sans accès à la base, ce qui permet de lancer des redémarrages
+en parallèle dans des processus séparés (`resoudre_en_parallele`).
+"""
+import datetime
+import random
+import time
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from formateurs import tableau_de_bord
+from formateurs.models import Formateur, FormateurEleve
+from formations.models import Formation
+from . import occupation
+from .conflits import detecter_conflits
+from .disponibilites import Agenda, lire_fenetres
+from .models import Cours, Salle
+
+CRENEAUX_PAR_DEFAUT = (
+    (datetime.time(9, 0), datetime.time(12, 0)),
+    (datetime.time(13, 30), datetime.time(16, 30)),
+)
+
+# Une séance non planifiée pèse plus que n'importe quel étalement
+PENALITE_NON_PLANIFIEE = 1000
+
+Seance = namedtuple('Seance', ['module_id', 'titre', 'heures'])
+FormationAPlanifier = namedtuple(
+    'FormationAPlanifier', ['id', 'reference', 'effectif', 'duree_jours', 'seances', 'formateurs']
+)
+Affectation = namedtuple('Affectation', ['formation', 'seance', 'creneau', 'formateur', 'salle'])
+
+
+class Probleme:
+    """Données figées d'un planning à construire, sans référence à la base"""
+
+    def __init__(self, creneaux, formations, salles, disponibilites, occupes):
+        # creneaux : liste triée de (date, heure_debut, heure_fin)
+        self.creneaux = creneaux
+        self.formations = formations
+        # salles : liste de (id, capacite) triée par capacité croissante
+        self.salles = salles
+        self._capacites = [capacite for _, capacite in salles]
+        # disponibilites : {formateur_id: frozenset des créneaux autorisés}, absent = libre
+        self.disponibilites = disponibilites
+        # occupes : ensemble de ('formateur' | 'salle', id, creneau) déjà pris
+        self.occupes = frozenset(occupes)
+
+    def salles_possibles(self, effectif):
+        """Salles assez grandes pour l'effectif, de la plus petite à la plus grande"""
+        return self.salles[bisect_left(self._capacites, effectif):]
+
+
+class Planning:
+    """État mutable d'une solution en cours de construction"""
+
+    def __init__(self, probleme):
+        self.probleme = probleme
+        self.occupes = set(probleme.occupes)
+        # {rang de formation: [Affectation, ...]} dans l'ordre des séances
+        self.affectations = {}
+
+    def inserer(self, rang):
+        """Place au plus tôt les séances d'une formation, dans l'ordre des modules"""
+        probleme = self.probleme
+        formation = probleme.formations[rang]
+        salles = probleme.salles_possibles(formation.effectif)
+        formateurs = list(formation.formateurs)
+        placees = []
+        premier_creneau = 0
+        for numero, seance in enumerate(formation.seances):
+            trouve = None
+            for creneau in range(premier_creneau, len(probleme.creneaux)):
+                formateur = next((
+                    f for f in formateurs
+                    if ('formateur', f, creneau) not in self.occupes
+                    and creneau in probleme.disponibilites.get(f, (creneau,))
+                ), None)
+                if formateur is None:
+                    continue
+                salle = next((
+                    s for s, _ in salles if ('salle', s, creneau) not in self.occupes
+                ), None)
+                if salle is None:
+                    continue
+                trouve = Affectation(rang, numero, creneau, formateur, salle)
+                break
+            if trouve is None:
+                # Les modules suivants ne peuvent pas passer avant celui-ci
+                break
+            self.occupes.add(('formateur', trouve.formateur, trouve.creneau))
+            self.occupes.add(('salle', trouve.salle, trouve.creneau))
+            placees.append(trouve)
+            premier_creneau = trouve.creneau + 1
+            # Continuité pédagogique : on garde le même formateur tant que possible
+            formateurs.remove(trouve.formateur)
+            formateurs.insert(0, trouve.formateur)
+        self.affectations[rang] = placees
+
+    def retirer(self, rang):
+        for affectation in self.affectations.pop(rang, []):
+            self.occupes.discard(('formateur', affectation.formateur, affectation.creneau))
+            self.occupes.discard(('salle', affectation.salle, affectation.creneau))
+
+    def cout_formation(self, rang):
+        formation = self.probleme.formations[rang]
+        placees = self.affectations.get(rang, [])
+        cout = PENALITE_NON_PLANIFIEE * (len(formation.seances) - len(placees))
+        if placees:
+            premier = self.probleme.creneaux[placees[0].creneau][0]
+            dernier = self.probleme.creneaux[placees[-1].creneau][0]
+            cout += max(0, (dernier - premier).days + 1 - formation.duree_jours)
+        return cout
+
+    def cout(self):
+        return sum(self.cout_formation(rang) for rang in range(len(self.probleme.formations)))
+
+    def copier_affectations(self):
+        return {rang: list(placees) for rang, placees in self.affectations.items()}
+
+
+class Solution:
+    def __init__(self, affectations, cout, graine):
+        self.affectations = affectations
+        self.cout = cout
+        self.graine = graine
+
+    def non_planifiees(self, probleme):
+        return sum(
+            len(formation.seances) - len(self.affectations.get(rang, []))
+            for rang, formation in enumerate(probleme.formations)
+        )
+
+
+def resoudre(probleme, graine=0, iterations=500, temps_max=None, taille_voisinage=4):
+    """
+    Construit un planning glouton puis l'améliore par recherche locale.
+    Les formations les plus contraintes (effectif, volume horaire) sont
+    placées en premier ; chaque redémarrage (graine) mélange les ex æquo.
+    """
+    aleatoire = random.Random(graine)
+    rangs = list(range(len(probleme.formations)))
+    aleatoire.shuffle(rangs)
+    rangs.sort(key=lambda rang: (
+        -probleme.formations[rang].effectif,
+        -len(probleme.formations[rang].seances),
+    ))
+
+    planning = Planning(probleme)
+    for rang in rangs:
+        planning.inserer(rang)
+    cout = planning.cout()
+    meilleur = Solution(planning.copier_affectations(), cout, graine)
+
+    limite = time.monotonic() + temps_max if temps_max else None
+    for _ in range(iterations):
+        if cout == 0 or (limite and time.monotonic() > limite):
+            break
+        # On cible de préférence une formation pénalisée
+        penalisees = [rang for rang in rangs if planning.cout_formation(rang) > 0]
+        cible = aleatoire.choice(penalisees or rangs)
+        voisinage = [cible] + aleatoire.sample(rangs, min(taille_voisinage, len(rangs)))
+        voisinage = list(dict.fromkeys(voisinage))
+
+        sauvegarde = {rang: planning.affectations.get(rang, []) for rang in voisinage}
+        for rang in voisinage:
+            planning.retirer(rang)
+        suivants = voisinage[1:]
+        aleatoire.shuffle(suivants)
+        voisinage = [cible] + suivants
+        for rang in voisinage:
+            planning.inserer(rang)
+
+        nouveau_cout = planning.cout()
+        if nouveau_cout <= cout:
+            cout = nouveau_cout
+            if cout < meilleur.cout:
+                meilleur = Solution(planning.copier_affectations(), cout, graine)
+        else:
+            # Mouvement refusé : on restaure les affectations précédentes
+            for rang in voisinage:
+                planning.retirer(rang)
+            for rang, placees in sauvegarde.items():
+                planning.affectations[rang] = placees
+                for affectation in placees:
+                    planning.occupes.add(('formateur', affectation.formateur, affectation.creneau))
+                    planning.occupes.add(('salle', affectation.salle, affectation.creneau))
+    return meilleur
+
+
+def _resoudre_graine(arguments):
+    probleme, graine, options = arguments
+    return resoudre(probleme, graine, **options)
+
+
+def resoudre_en_parallele(probleme, redemarrages=4, processus=None, **options):
+    """
+    Lance plusieurs redémarrages (graines différentes) et garde la meilleure solution.
+    Avec `processus` > 1, les redémarrages tournent dans un pool de processus.
+    """
+    taches = [(probleme, graine, options) for graine in range(redemarrages)]
+    if processus and processus > 1:
+        with ProcessPoolExecutor(max_workers=processus) as pool:
+            solutions = list(pool.map(_resoudre_graine, taches))
+    else:
+        solutions = [_resoudre_graine(tache) for tache in taches]
+    return min(solutions, key=lambda solution: (solution.cout, solution.graine))
+
+
+def _jours_ouvres(debut, fin):
+    jour = debut
+    while jour <= fin:
+        if jour.weekday() < 5:
+            yield jour
+        jour += datetime.timedelta(days=1)
+
+
+def _creneaux_couverts(instants, debut, fin, chevauchement=False):
+    """
+    Rangs des créneaux inclus dans [debut, fin], ou qui le chevauchent
+    si `chevauchement` est vrai. Débuts et fins des créneaux sont triés.
+    """
+    debuts, fins = instants
+    stop = bisect_left(debuts, fin)
+    if chevauchement:
+        return range(bisect_right(fins, debut), stop)
+    return [rang for rang in range(bisect_left(debuts, debut), stop) if fins[rang] <= fin]
+
+
+def charger_probleme(formations, debut, fin, creneaux=CRENEAUX_PAR_DEFAUT):
+    """
+    Lit en quelques requêtes tout ce qu'il faut pour planifier `formations`
+    entre les dates `debut` et `fin` (jours ouvrés, créneaux fixes).
+    """
+    creneaux_jour = sorted(creneaux)
+    duree_seance = min(
+        datetime.datetime.combine(debut, heure_fin) - datetime.datetime.combine(debut, heure_debut)
+        for heure_debut, heure_fin in creneaux_jour
+    ).total_seconds() / 3600
+    liste_creneaux = [
+        (jour, heure_debut, heure_fin)
+        for jour in _jours_ouvres(debut, fin)
+        for heure_debut, heure_fin in creneaux_jour
+    ]
+    fuseau = timezone.get_current_timezone()
+    instants = (
+        [timezone.make_aware(datetime.datetime.combine(jour, h), fuseau) for jour, h, _ in liste_creneaux],
+        [timezone.make_aware(datetime.datetime.combine(jour, h), fuseau) for jour, _, h in liste_creneaux],
+    )
+
+    formations = list(
+        Formation.objects.filter(pk__in=[f.pk for f in formations]).annotate(
+            effectif=Count('inscriptions', filter=Q(inscriptions__statut='valide'))
+        ).prefetch_related('modules').order_by('pk')
+    )
+
+    # Formateurs pressentis : ceux qui enseignent déjà la formation, sinon tous
+    tous_formateurs = tuple(Formateur.objects.order_by('pk').values_list('pk', flat=True))
+    pressentis = {}
+    for formation_id, formateur_id in Cours.objects.filter(
+        formation__in=formations
+    ).order_by('formateur_id').values_list('formation_id', 'formateur_id').distinct():
+        pressentis.setdefault(formation_id, []).append(formateur_id)
+
+    a_planifier = []
+    for formation in formations:
+        seances = []
+        for module in formation.modules.all():
+            restant = module.duree_heures
+            while restant > 0:
+                heures = min(restant, duree_seance)
+                seances.append(Seance(module.pk, module.titre, heures))
+                restant -= heures
+        a_planifier.append(FormationAPlanifier(
+            formation.pk, formation.reference, formation.effectif, formation.duree_jours,
+            tuple(seances), tuple(pressentis.get(formation.pk, tous_formateurs)),
+        ))
+
+    # Disponibilités : la règle de planning.disponibilites, par un Agenda sur la
+    # période ; seuls les formateurs ayant déclaré des fenêtres sont restreints
+    disponibilites = {}
+    if liste_creneaux:
+        periode = (instants[0][0], instants[1][-1])
+        fenetres = list(lire_fenetres(*periode))
+        agenda = Agenda(*periode, {fenetre[0] for fenetre in fenetres}, fenetres)
+        for formateur_id in {fenetre[0] for fenetre in fenetres}:
+            disponibilites[formateur_id] = frozenset(
+                rang for rang in range(len(liste_creneaux))
+                if agenda.est_libre(formateur_id, instants[0][rang], instants[1][rang])
+            )
+
+    # Cours déjà planifiés sur la période
+    occupes = set()
+    for date, heure_debut, heure_fin, formateur_id, salle_id in Cours.objects.filter(
+        date__range=(debut, fin)
+    ).order_by().values_list('date', 'heure_debut', 'heure_fin', 'formateur_id', 'salle_id'):
+        debut_cours = timezone.make_aware(datetime.datetime.combine(date, heure_debut), fuseau)
+        fin_cours = timezone.make_aware(datetime.datetime.combine(date, heure_fin), fuseau)
+        for rang in _creneaux_couverts(instants, debut_cours, fin_cours, chevauchement=True):
+            occupes.add(('formateur', formateur_id, rang))
+            if salle_id:
+                occupes.add(('salle', salle_id, rang))
+
+    salles = list(Salle.objects.order_by('capacite', 'pk').values_list('pk', 'capacite'))
+    return Probleme(liste_creneaux, a_planifier, salles, disponibilites, occupes)
+
+
+def construire_cours(probleme, solution):
+    """Transforme une solution en instances de Cours non enregistrées"""
+    cours = []
+    for rang, placees in sorted(solution.affectations.items()):
+        formation = probleme.formations[rang]
+        for affectation in placees:
+            seance = formation.seances[affectation.seance]
+            date, heure_debut, _ = probleme.creneaux[affectation.creneau]
+            heure_fin = (
+                datetime.datetime.combine(date, heure_debut) + datetime.timedelta(hours=seance.heures)
+            ).time()
+            cours.append(Cours(
+                formation_id=formation.id,
+                formateur_id=affectation.formateur,
+                salle_id=affectation.salle,
+                titre=seance.titre,
+                date=date,
+                heure_debut=heure_debut,
+                heure_fin=heure_fin,
+                notes="Généré automatiquement (planning brouillon)",
+            ))
+    return cours
+
+
+def enregistrer(cours):
+    """Vérifie l'absence de conflit puis enregistre les cours en une insertion groupée"""
+    conflits = detecter_conflits(cours)
+    if conflits:
+        raise ValueError(f"{len(conflits)} conflits détectés, planning non enregistré")
+    with transaction.atomic():
+        cours = Cours.objects.bulk_create(cours, batch_size=500)
+        # bulk_create n'émet pas post_save : on prévient le cache d'occupation des salles
+        # et celui des tableaux de bord, et on lie les formateurs à leurs nouveaux élèves
+        occupation.invalider(*((c.salle_id, c.date) for c in cours))
+        formateur_ids = {c.formateur_id for c in cours}
+        FormateurEleve.objects.synchroniser(formateur_ids=formateur_ids)
+        tableau_de_bord.invalider(*formateur_ids)
+        return cours
+
+
+def planifier(formations, debut, fin, creneaux=CRENEAUX_PAR_DEFAUT, redemarrages=4,
+              processus=None, sauvegarder=False, **options):
+    """Charge, résout et (optionnellement) enregistre le planning des formations"""
+    probleme = charger_probleme(formations, debut, fin, creneaux)
+    solution = resoudre_en_parallele(probleme, redemarrages, processus, **options)
+    cours = construire_cours(probleme, solution)
+    if sauvegarder:
+        enregistrer(cours)
+    return probleme, solution, cours
@@ -1,3 +1,449 @@
+import datetime
+from unittest import mock, skipUnless
+
+from django.core.cache import cache, caches
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from eleves.models import Eleve, Inscription
+from formateurs.models import Formateur
+from formations.models import Domaine, Formation, Module
+from planning import calendrier, disponibilites, occupation
+from planning.conflits import detecter_conflits
+from planning.forms import CoursForm
+from planning.models import Cours, Disponibilite, Salle
+from presence.models import Presence
+from planning.solveur import charger_probleme, planifier
+
+
+def h(heure, minute=0):
+    return datetime.time(heure, minute)
+
+
+class PlanningTestCase(TestCase):
+    """Deux formateurs, deux salles et une formation"""
+    jour = datetime.date(2025, 9, 1)
+
+    def setUp(self):
+        self.formateurs = [
+            Formateur.objects.create(
+                user=CustomUser.objects.create(username=f'f{i}', email=f'f{i}@example.com'),
+                specialite='Python', experience=1, bio='', matricule=f'F{i}'
+            )
+            for i in range(2)
+        ]
+        self.salles = [
+            Salle.objects.create(nom=f'B1{i}', capacite=20, batiment='B', etage=1)
+            for i in range(2)
+        ]
+        self.formation = Formation.objects.create(
+            domaine=Domaine.objects.create(nom='Informatique'), reference='PY', titre='Python',
+            description='', objectifs='', public_cible='', duree_jours=1, prix=0
+        )
+
+    def cours(self, debut, fin, formateur=0, salle=0, jour=None):
+        return Cours(
+            formation=self.formation, formateur=self.formateurs[formateur],
+            salle=self.salles[salle] if salle is not None else None, titre='Cours',
+            date=jour or self.jour, heure_debut=debut, heure_fin=fin
+        )
+
+
+
+class ChevauchementTests(PlanningTestCase):
+    def test_overlapping(self):
+        existant = self.cours(h(10), h(12, 30))
+        existant.save()
+
+        self.assertEqual(list(Cours.objects.overlapping(self.jour, h(12), h(14), salle=self.salles[0])), [existant])
+        self.assertEqual(list(Cours.objects.overlapping(self.jour, h(9), h(10, 1), formateur=self.formateurs[0])), [existant])
+        # Créneaux contigus ou autres ressources : pas de conflit
+        self.assertFalse(Cours.objects.overlapping(self.jour, h(12, 30), h(14), salle=self.salles[0]).exists())
+        self.assertFalse(Cours.objects.overlapping(
+            self.jour, h(11), h(12), salle=self.salles[1], formateur=self.formateurs[1]
+        ).exists())
+
+    def test_detecter_conflits(self):
+        existant = self.cours(h(8), h(9, 30), formateur=1, salle=1)
+        existant.save()
+        lot = [
+            self.cours(h(9), h(11)),
+            self.cours(h(9), h(10), formateur=1, salle=None),
+            self.cours(h(10, 30), h(12), formateur=1),
+            self.cours(h(11), h(12), salle=1),
+            self.cours(h(9), h(10), formateur=1, salle=1, jour=self.jour + datetime.timedelta(days=1)),
+        ]
+
+        conflits = {
+            (lot.index(a), 'existant' if b.pk == existant.pk else lot.index(b), ressource)
+            for a, b, ressource in detecter_conflits(lot)
+        }
+
+        self.assertEqual(conflits, {(1, 'existant', 'formateur'), (2, 0, 'salle')})
+
+    def test_detecter_conflits_lot_sans_conflit(self):
+        # Une semaine de 40 cours sans conflit : 2 formateurs x 4 créneaux x 5 jours (le volume
+        # d'un trimestre est chronométré par « bench_planning --scenario conflits »)
+        lot = [
+            self.cours(h(8 + 2 * creneau), h(9 + 2 * creneau), formateur=formateur, salle=None,
+                       jour=self.jour + datetime.timedelta(days=jour))
+            for jour in range(5)
+            for creneau in range(4)
+            for formateur in range(2)
+        ]
+        self.assertEqual(detecter_conflits(lot, avec_existants=False), [])
+        # Les cours existants de la période sont lus en une requête
+        with self.assertNumQueries(1):
+            self.assertEqual(detecter_conflits(lot), [])
+
+
+class SolveurTests(PlanningTestCase):
+    """Le planning généré respecte disponibilités, capacités et ordre des modules"""
+
+    def test_planifier(self):
+        self.salles[0].capacite = 2
+        self.salles[0].save()
+        for ordre, heures in ((1, 4), (2, 3)):
+            Module.objects.create(formation=self.formation, ordre=ordre, titre=f'M{ordre}',
+                                  description='', duree_heures=heures)
+        for i in range(3):
+            eleve = Eleve.objects.create(
+                user=CustomUser.objects.create(username=f'e{i}', email=f'e{i}@example.com'),
+                numero_etudiant=f'E{i}'
+            )
+            Inscription.objects.create(eleve=eleve, formation=self.formation, statut='valide')
+        # Le formateur déjà en charge de la formation n'est libre que les après-midis
+        self.cours(h(8), h(9), salle=None, jour=self.jour - datetime.timedelta(days=7)).save()
+        for jour in range(5):
+            date = self.jour + datetime.timedelta(days=jour)
+            Disponibilite.objects.create(
+                formateur=self.formateurs[0],
+                date_debut=timezone.make_aware(datetime.datetime.combine(date, h(13))),
+                date_fin=timezone.make_aware(datetime.datetime.combine(date, h(18))),
+            )
+
+        probleme, solution, cours = planifier(
+            [self.formation], self.jour, self.jour + datetime.timedelta(days=4), sauvegarder=True
+        )
+
+        self.assertEqual(solution.non_planifiees(probleme), 0)
+        self.assertEqual([c.titre for c in cours], ['M1', 'M1', 'M2'])
+        self.assertEqual(sum(c.duree for c in cours), 7)
+        for c in cours:
+            self.assertEqual(c.formateur_id, self.formateurs[0].pk)
+            self.assertEqual(c.salle_id, self.salles[1].pk)
+            self.assertEqual(c.heure_debut, h(13, 30))
+        self.assertEqual(len({c.date for c in cours}), 3)
+
+
+class PaginationCurseurTests(PlanningTestCase):
+    """CoursListView pagine par curseur, sans OFFSET ni COUNT"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.formateurs[0].user)
+        self.cours_list = [
+            self.cours(h(8 + jour % 3), h(9 + jour % 3), salle=None, jour=self.jour + datetime.timedelta(days=jour // 3))
+            for jour in range(25)
+        ]
+        Cours.objects.bulk_create(self.cours_list)
+
+    def page(self, **params):
+        return self.client.get(reverse('planning:cours_list'), {'periode': 'tous', **params}).context['page_obj']
+
+    def test_parcours_complet(self):
+        vus = []
+        page = self.page()
+        while True:
+            vus += [cours.pk for cours in page]
+            if not page.has_next():
+                break
+            page = self.page(apres=page.next_cursor)
+        attendus = list(Cours.objects.order_by('date', 'heure_debut', 'pk').values_list('pk', flat=True))
+        self.assertEqual(vus, attendus)
+
+        precedente = self.page(avant=page.previous_cursor)
+        self.assertEqual([cours.pk for cours in precedente], attendus[10:20])
+
+    def test_curseur_invalide(self):
+        response = self.client.get(reverse('planning:cours_list'), {'apres': 'falsifie'})
+        self.assertEqual(response.status_code, 404)
+
+
+class CalendrierTests(PlanningTestCase):
+    """Fenêtres bornées lues en une requête, flux JSON et iCalendar avec ETag"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_login(self.formateurs[0].user)
+        # Lundi 1er septembre 2025 : trois cours dans la semaine, un la semaine suivante
+        for jour in (0, 2, 4, 7):
+            self.cours(h(9), h(12), salle=jour % 2, jour=self.jour + datetime.timedelta(days=jour)).save()
+        self.cours(h(9), h(12), formateur=1, salle=None).save()
+
+    def test_fenetres(self):
+        mercredi = datetime.date(2025, 9, 3)
+        self.assertEqual(calendrier.fenetre('semaine', mercredi), (self.jour, datetime.date(2025, 9, 7)))
+        self.assertEqual(calendrier.fenetre('mois', mercredi), (self.jour, datetime.date(2025, 9, 30)))
+        self.assertEqual(calendrier.voisines('mois', *calendrier.fenetre('mois', mercredi)),
+                         (datetime.date(2025, 8, 1), datetime.date(2025, 10, 1)))
+
+    def test_calendrier_en_une_requete(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('planning:calendrier'), {'vue': 'semaine', 'date': '2025-09-03'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['cours']), 3)
+        self.assertEqual(len(response.context['jours']), 7)
+        lectures = [q['sql'] for q in ctx.captured_queries if 'FROM "planning_cours"' in q['sql']]
+        self.assertEqual(len(lectures), 1)
+        # Formation, formateur et salle viennent de la même requête (pas de N+1)
+        self.assertFalse([q for q in ctx.captured_queries
+                          if q['sql'].startswith(('SELECT "formations_formation"', 'SELECT "planning_salle"'))])
+
+        response = self.client.get(reverse('planning:calendrier'), {'vue': 'mois', 'date': '2025-09-03'})
+        self.assertEqual(len(response.context['cours']), 4)
+
+    def test_flux_json(self):
+        url = reverse('planning:calendrier_json')
+        response = self.client.get(url, {'date': '2025-09-01'})
+        self.assertEqual([e['start'] for e in response.json()['evenements']][:1], ['2025-09-01T09:00:00+00:00'])
+        response = self.client.get(url, {'date': '2025-09-01'}, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_flux_ics(self):
+        url = reverse('planning:calendrier_ics', args=[calendrier.jeton('salle', self.salles[0].pk)])
+        self.client.logout()
+        with self.settings(CALENDRIER={'ICS_PASSE': 100000, 'ICS_FUTUR': 1}):
+            response = self.client.get(url)
+            contenu = b''.join(response.streaming_content).decode()
+            self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+            self.assertEqual(contenu.count('BEGIN:VEVENT'), 3)
+            self.assertIn('DTSTART:20250901T090000Z\r\n', contenu)
+            self.assertTrue(all(len(ligne.encode()) <= 75 for ligne in contenu.split('\r\n')))
+
+            etag = response['ETag']
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.salles[0].nom = 'Amphi'
+            with self.captureOnCommitCallbacks(execute=True):
+                self.salles[0].save()
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+            # Le lendemain, la fenêtre a glissé : même nombre de cours, autre contenu
+            etag = self.client.get(url)['ETag']
+            demain = timezone.localdate() + datetime.timedelta(days=1)
+            with mock.patch('django.utils.timezone.localdate', return_value=demain):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.assertEqual(self.client.get(url[:-5] + 'x.ics').status_code, 404)
+
+    def test_plier(self):
+        ligne = 'SUMMARY:' + 'é' * 80
+        pliee = calendrier.plier(ligne)
+        self.assertTrue(all(len(morceau.encode()) <= 75 for morceau in pliee.split('\r\n')))
+        self.assertEqual(pliee.replace('\r\n ', '').rstrip('\r\n'), ligne)
+
+
+class OccupationSallesTests(PlanningTestCase):
+    """Occupation des salles par créneau horaire, en cache par (salle, semaine)"""
+
+    def setUp(self):
+        super().setUp()
+        occupation.cache_occupation().clear()
+        # Lundi 1er septembre 2025 (semaine 36), salle B10 de 9 h 30 à 11 h, 3 présents sur 20 places
+        self.cours_lundi = self.cours(h(9, 30), h(11))
+        self.cours_lundi.save()
+        for i in range(4):
+            eleve = Eleve.objects.create(
+                user=CustomUser.objects.create(username=f'e{i}', email=f'e{i}@example.com'),
+                numero_etudiant=f'E{i}'
+            )
+            Presence.objects.create(cours=self.cours_lundi, eleve=eleve, present=i < 3)
+        self.cours(h(14), h(15), salle=1, jour=self.jour + datetime.timedelta(days=2)).save()
+
+    @skipUnless(occupation.np, "NumPy n'est pas installé")
+    def test_creneaux_et_taux(self):
+        semaine = occupation.semaines_iso(2025).index(self.jour)
+        donnees = occupation.occupations(self.salles, occupation.semaines_iso(2025))
+        minutes, places = donnees[0, semaine, 0], donnees[0, semaine, 1]
+        self.assertEqual((minutes[9], minutes[10], minutes.sum()), (30, 60, 90))
+        self.assertEqual((places[9], places[10]), (90, 180))
+        self.assertEqual(donnees[1, semaine, 0, 2 * 24 + 14], 60)
+        self.assertEqual(donnees.sum(), 90 + 270 + 60)
+
+        resultat = occupation.analyser(2025)
+        salle = resultat['salles'][0]
+        self.assertEqual(salle['heures'], 1.5)
+        self.assertEqual(salle['remplissage'], 0.15)
+        groupe, = resultat['groupes']
+        self.assertEqual(groupe['nb_salles'], 2)
+        self.assertEqual(groupe['carte_utilisation'][2][14], round(1 / 2 / 52, 3))
+
+    @skipUnless(occupation.np, "NumPy n'est pas installé")
+    def test_cache_par_semaine(self):
+        lundis = occupation.semaines_iso(2025)
+        occupation.occupations(self.salles, lundis)
+        with self.assertNumQueries(0):
+            occupation.occupations(self.salles, lundis)
+        # Rangées dans leur propre cache, pas dans le cache par défaut
+        cle = occupation.cle_cache(self.salles[0].pk, self.jour)
+        self.assertIsNotNone(caches['occupation'].get(cle))
+        self.assertIsNone(cache.get(cle))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Presence.objects.filter(present=False).update(present=True)
+            Presence.objects.first().save()
+        with self.assertNumQueries(1):
+            donnees = occupation.occupations(self.salles, lundis)
+        self.assertEqual(donnees[0, lundis.index(self.jour), 1, 10], 240)
+
+    @skipUnless(occupation.np, "NumPy n'est pas installé")
+    def test_vue(self):
+        self.client.force_login(CustomUser.objects.create(username='admin', email='admin@example.com', is_staff=True))
+        response = self.client.get(reverse('planning:occupation_salles'), {'annee': 2025, 'batiment': 'B'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['salles']), 2)
+
+    @skipUnless(occupation.np, "NumPy n'est pas installé")
+    def test_une_annee_pour_plusieurs_salles(self):
+        # 6 salles, trois cours par jour ouvré pendant l'année ISO 2025 (le volume
+        # réel, 100 salles, est chronométré par « bench_planning --scenario occupation »)
+        salles = Salle.objects.bulk_create([
+            Salle(nom=f'S{i:03d}', capacite=30, batiment='S', etage=i // 5) for i in range(6)
+        ])
+        formateurs = Formateur.objects.bulk_create([
+            Formateur(user=user, specialite='', experience=1, bio='', matricule=f'P{user.pk}')
+            for user in CustomUser.objects.bulk_create([
+                CustomUser(username=f'p{i}', email=f'p{i}@example.com') for i in range(6)
+            ])
+        ])
+        Cours.objects.bulk_create([
+            Cours(formation=self.formation, formateur=formateur, salle=salle, titre='Cours',
+                  date=lundi + datetime.timedelta(days=jour),
+                  heure_debut=h(debut, 30 if rang else 0), heure_fin=h(debut + 2, 30 if rang else 0))
+            for lundi in occupation.semaines_iso(2025) for jour in range(5)
+            for salle, formateur in zip(salles, formateurs) for rang, debut in enumerate((8, 11, 15))
+        ])
+
+        resultat = occupation.analyser(2025)
+        salle = next(ligne for ligne in resultat['salles'] if ligne['salle'].pk == salles[0].pk)
+        self.assertEqual(salle['heures'], 52 * 5 * 6)
+        self.assertEqual(salle['utilisation'], 0.5)
+        self.assertEqual(len(resultat['groupes']), 3)
+        # Toutes les (salle, semaine) sont en cache : la seconde analyse ne relit que les salles
+        with self.assertNumQueries(1):
+            occupation.analyser(2025)
+
+    def test_acces_et_numpy_absent(self):
+        self.client.force_login(self.formateurs[0].user)
+        self.assertEqual(self.client.get(reverse('planning:occupation_salles')).status_code, 403)
+        self.client.force_login(CustomUser.objects.create(username='admin', email='admin@example.com', is_staff=True))
+        with mock.patch.object(occupation, 'np', None):
+            self.assertEqual(self.client.get(reverse('planning:occupation_salles')).status_code, 501)
+
+
+class DisponibilitesTests(PlanningTestCase):
+    """Formateurs libres et créneaux libres d'après Disponibilite et les cours"""
+
+    def moment(self, heure, minute=0, jours=0):
+        return timezone.make_aware(datetime.datetime.combine(self.jour + datetime.timedelta(days=jours), h(heure, minute)))
+
+    def setUp(self):
+        super().setUp()
+        # Formateur 0 : disponible de 13 h à 18 h ; formateur 1 : sans déclaration, un cours de 9 h à 12 h
+        Disponibilite.objects.create(formateur=self.formateurs[0], date_debut=self.moment(13), date_fin=self.moment(18))
+        self.cours(h(9), h(12), formateur=1, salle=None).save()
+
+    def test_intervalles(self):
+        self.assertEqual(disponibilites.fusionner([(5, 7), (1, 3), (2, 4), (4, 5), (9, 9)]), [(1, 7)])
+        self.assertEqual(disponibilites.soustraire([(0, 10), (12, 20)], [(2, 3), (5, 13), (19, 25)]),
+                         [(0, 2), (3, 5), (13, 19)])
+        self.assertEqual(disponibilites.intersecter([(0, 5), (8, 12)], [(3, 9), (11, 20)]),
+                         [(3, 5), (8, 9), (11, 12)])
+
+    def test_formateurs_libres(self):
+        libres = lambda debut, fin, **kw: disponibilites.formateurs_libres(self.moment(*debut), self.moment(*fin), **kw)
+        self.assertEqual(libres((9,), (10,)), [])
+        self.assertEqual(libres((12,), (13,)), [self.formateurs[1]])
+        self.assertEqual(libres((14,), (15,)), self.formateurs)
+        self.assertEqual(libres((14,), (15,), specialite='java'), [])
+
+        Disponibilite.objects.create(formateur=self.formateurs[1], type='INDISPONIBLE',
+                                     date_debut=self.moment(14, 30), date_fin=self.moment(16))
+        self.assertEqual(libres((14,), (15,)), [self.formateurs[0]])
+
+    def test_creneaux_libres(self):
+        creneaux = disponibilites.creneaux_libres(self.formateurs[1].pk, self.moment(0), self.moment(0, jours=1))
+        self.assertEqual(creneaux, [(self.moment(8), self.moment(9)), (self.moment(12), self.moment(20))])
+        creneaux = disponibilites.creneaux_libres(self.formateurs[1].pk, self.moment(0), self.moment(0, jours=1),
+                                                  duree_min=datetime.timedelta(hours=2))
+        self.assertEqual(creneaux, [(self.moment(12), self.moment(20))])
+
+    def test_cours_form(self):
+        donnees = {'formation': self.formation.pk, 'titre': 'Atelier', 'date': self.jour}
+        form = CoursForm({**donnees, 'heure_debut': '09:00', 'heure_fin': '10:00'},
+                         instance=Cours(formateur=self.formateurs[0]))
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['__all__'][0].code, 'indisponible')
+        form = CoursForm({**donnees, 'heure_debut': '14:00', 'heure_fin': '15:00'},
+                         instance=Cours(formateur=self.formateurs[0]))
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_meme_regle_que_le_solveur(self):
+        # Formateur 0 : déclaré le lundi seulement, donc libre tout le mardi
+        Disponibilite.objects.create(formateur=self.formateurs[0], type='INDISPONIBLE',
+                                     date_debut=self.moment(10, jours=2), date_fin=self.moment(11, jours=2))
+        probleme = charger_probleme([self.formation], self.jour, self.jour + datetime.timedelta(days=4))
+        agenda = disponibilites.Agenda.charger(self.moment(0), self.moment(0, jours=5), [self.formateurs[0].pk])
+        autorises = {
+            rang for rang, (date, debut, fin) in enumerate(probleme.creneaux)
+            if agenda.est_libre(self.formateurs[0].pk, *disponibilites.bornes_cours(date, debut, fin))
+        }
+        self.assertEqual(probleme.disponibilites[self.formateurs[0].pk], autorises)
+        self.assertEqual([probleme.creneaux[rang][:2] for rang in sorted(autorises)[:4]], [
+            (self.jour, h(13, 30)), (self.jour + datetime.timedelta(days=1), h(9)),
+            (self.jour + datetime.timedelta(days=1), h(13, 30)), (self.jour + datetime.timedelta(days=2), h(13, 30)),
+        ])
+
+    def test_points_d_entree_json(self):
+        self.client.force_login(self.formateurs[1].user)
+        url = reverse('planning:creneaux_libres', args=[self.formateurs[1].pk])
+        response = self.client.get(url, {'mois': '2025-09'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['creneaux'][0]['fin'], self.moment(9).isoformat())
+        self.assertEqual(self.client.get(url, {'mois': 'septembre'}).status_code, 400)
+        # Au bord des dates représentables : erreur 400, pas OverflowError
+        for parametres in ({'mois': '9999-12'}, {'debut': '9999-12-31T00:00', 'fin': '9999-12-31T12:00'},
+                           {'mois': '2025-09', 'duree': '99999999999999'}, {'mois': '2025-09', 'duree': '-5'}):
+            response = self.client.get(url, parametres)
+            self.assertEqual(response.status_code, 400, parametres)
+            self.assertIn('erreur', response.json())
+        self.assertEqual(self.client.get(
+            reverse('planning:creneaux_libres', args=[self.formateurs[0].pk])).status_code, 403)
+
+        response = self.client.get(reverse('planning:formateurs_libres'), {
+            'debut': '2025-09-01T14:00', 'fin': '2025-09-01T15:00', 'specialite': 'python',
+        })
+        self.assertEqual([f['id'] for f in response.json()['formateurs']], [f.pk for f in self.formateurs])
+
+    def test_recherche_sur_plusieurs_formateurs(self):
+        # Une semaine : 8 formateurs, une fenêtre DISPONIBLE par jour, une indisponibilité et 10 cours
+        # chacun (500 formateurs sont chronométrés par « bench_planning --scenario disponibilites »)
+        debut, fin = self.moment(0), self.moment(0, jours=7)
+        fenetres, occupes = [], []
+        for formateur_id in range(8):
+            for jour in range(5):
+                fenetres.append((formateur_id, self.moment(8, jours=jour), self.moment(18, jours=jour), 'DISPONIBLE'))
+                occupes.append((formateur_id, self.moment(9 + formateur_id % 4, jours=jour),
+                                self.moment(10 + formateur_id % 4, jours=jour)))
+                occupes.append((formateur_id, self.moment(14, jours=jour), self.moment(15, jours=jour)))
+            fenetres.append((formateur_id, self.moment(16, jours=2), self.moment(20, jours=2), 'INDISPONIBLE'))
 
-# Create your tests here.
+        agenda = disponibilites.Agenda(debut, fin, range(8), fenetres, occupes)
+        libres = [f for f in range(8) if agenda.est_libre(f, self.moment(10, jours=1), self.moment(11, jours=1))]
+        self.assertEqual(libres, [0, 2, 3, 4, 6, 7])
+        self.assertFalse(agenda.est_libre(0, self.moment(16, jours=2), self.moment(17, jours=2)))
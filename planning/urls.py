@@ -15,10 +15,15 @@ urlpatterns = [
     # Disponibilités
     path('disponibilites/', views.DisponibiliteListView.as_view(), name='disponibilite_list'),
     path('disponibilites/ajouter/', views.DisponibiliteCreateView.as_view(), name='disponibilite_create'),
+    path('disponibilites/formateurs-libres/', views.FormateursLibresView.as_view(), name='formateurs_libres'),
+    path('disponibilites/<int:pk>/creneaux-libres/', views.CreneauxLibresView.as_view(), name='creneaux_libres'),
     
     # Salles
     path('salles/', views.SalleListView.as_view(), name='salle_list'),
+    path('salles/occupation/', views.OccupationSallesView.as_view(), name='occupation_salles'),
     
     # Calendrier
     path('calendrier/', views.CalendrierView.as_view(), name='calendrier'),
+    path('calendrier/evenements/', views.CalendrierJSONView.as_view(), name='calendrier_json'),
+    path('calendrier/<str:jeton>.ics', views.CalendrierIcsView.as_view(), name='calendrier_ics'),
 ]
\ No newline at end of file
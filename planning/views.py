@@ -1,5 +1,5 @@
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from django.contrib import messages
@@ -8,11 +8,21 @@ from datetime import date
 
 from .models import Cours, Salle, Disponibilite
 from .forms import CoursForm, DisponibiliteForm
+from gestion_formation.pagination import KeysetPaginationMixin
 
 
+from django.core.exceptions import ObjectDoesNotExist
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header
+from django.views import View
 from django.views.generic import TemplateView
-from .models import Cours
-from datetime import date, timedelta
+
+from eleves.models import Eleve
+from formateurs.models import Formateur
+from . import calendrier, disponibilites, occupation
 
 
 class PlanningMixin(LoginRequiredMixin):
@@ -20,11 +30,11 @@ class PlanningMixin(LoginRequiredMixin):
     
     def get_queryset(self):
         qs = super().get_queryset()
-        if hasattr(self.request.user, 'formateur'):
-            return qs.filter(formateur=self.request.user.formateur)
+        if self.request.user.profil_formateur is not None:
+            return qs.filter(formateur=self.request.user.profil_formateur)
         return qs
 
-class CoursListView(PlanningMixin, ListView):
+class CoursListView(PlanningMixin, KeysetPaginationMixin, ListView):
     model = Cours
     template_name = 'planning/cours_list.html'
     context_object_name = 'cours_list'
@@ -63,13 +73,13 @@ class CoursCreateView(PlanningMixin, CreateView):
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        if hasattr(self.request.user, 'formateur'):
-            kwargs['formateur'] = self.request.user.formateur
+        if self.request.user.profil_formateur is not None:
+            kwargs['formateur'] = self.request.user.profil_formateur
         return kwargs
 
     def form_valid(self, form):
-        if hasattr(self.request.user, 'formateur'):
-            form.instance.formateur = self.request.user.formateur
+        if self.request.user.profil_formateur is not None:
+            form.instance.formateur = self.request.user.profil_formateur
         messages.success(self.request, _("Le cours a été créé avec succès."))
         return super().form_valid(form)
 
@@ -97,7 +107,7 @@ class DisponibiliteListView(PlanningMixin, ListView):
 
     def get_queryset(self):
         return super().get_queryset().filter(
-            formateur=self.request.user.formateur,
+            formateur=self.request.user.profil_formateur,
             date_fin__gte=date.today()
         ).order_by('date_debut')
 
@@ -108,7 +118,7 @@ class DisponibiliteCreateView(PlanningMixin, CreateView):
     success_url = reverse_lazy('planning:disponibilite_list')
 
     def form_valid(self, form):
-        form.instance.formateur = self.request.user.formateur
+        form.instance.formateur = self.request.user.profil_formateur
         messages.success(self.request, _("Disponibilité enregistrée avec succès."))
         return super().form_valid(form)
     
@@ -117,28 +127,199 @@ class DisponibiliteDeleteView(PlanningMixin, DeleteView):
     template_name = 'planning/disponibilite_confirm_delete.html'
     success_url = reverse_lazy('planning:disponibilite_list')
 
+class FormateursLibresView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Formateurs libres sur tout un créneau (`?debut=&fin=&specialite=`), en JSON"""
+
+    def test_func(self):
+        return self.request.user.is_staff or self.request.user.profil_formateur is not None
+
+    def get(self, request, *args, **kwargs):
+        try:
+            debut, fin = disponibilites.lire_periode(request.GET)
+        except ValueError as e:
+            return JsonResponse({'erreur': str(e)}, status=400)
+        formateurs = disponibilites.formateurs_libres(debut, fin, request.GET.get('specialite'))
+        return JsonResponse({
+            'debut': debut.isoformat(),
+            'fin': fin.isoformat(),
+            'formateurs': [
+                {
+                    'id': formateur.pk,
+                    'nom': formateur.user.get_full_name() or formateur.user.username,
+                    'specialite': formateur.specialite,
+                    'matricule': formateur.matricule,
+                }
+                for formateur in formateurs
+            ],
+        })
+
+
+class CreneauxLibresView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Créneaux libres d'un formateur en heures ouvrées (`?mois=AAAA-MM`, ou
+    `?debut=&fin=`, et `?duree=` en minutes), en JSON. Le formateur lui-même
+    ou l'administration.
+    """
+
+    def test_func(self):
+        formateur = self.request.user.profil_formateur
+        return self.request.user.is_staff or (formateur is not None and formateur.pk == self.kwargs['pk'])
+
+    def get(self, request, pk):
+        try:
+            debut, fin = disponibilites.lire_periode(request.GET)
+            duree = disponibilites.lire_duree(request.GET)
+        except ValueError as e:
+            return JsonResponse({'erreur': str(e)}, status=400)
+        creneaux = disponibilites.creneaux_libres(pk, debut, fin, duree_min=duree)
+        return JsonResponse({
+            'formateur': pk,
+            'debut': debut.isoformat(),
+            'fin': fin.isoformat(),
+            'creneaux': [{'debut': d.isoformat(), 'fin': f.isoformat()} for d, f in creneaux],
+        })
+
+
 class SalleListView(ListView):
     model = Salle
     template_name = 'planning/salle_list.html'
     context_object_name = 'salles'
-    
-    
 
 
-class CalendrierView(PlanningMixin, TemplateView):
-    template_name = 'planning/calendrier.html'
+class OccupationSallesView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+    """
+    Occupation des salles sur une année ISO (`?annee=`), par bâtiment et
+    étage (`?batiment=`, `?etage=`) : taux d'utilisation et de remplissage,
+    cartes par heure de la semaine. Réservé à l'administration.
+    """
+    template_name = 'planning/occupation_salles.html'
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        try:
+            return super().get(request, *args, **kwargs)
+        except occupation.AnalyseIndisponible as e:
+            return HttpResponse(str(e), status=501)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        today = date.today()
-        end_date = today + timedelta(days=30)  # Affiche les cours des 30 prochains jours
+        parametres = self.request.GET
+        annee = parametres.get('annee', '')
+        annee = int(annee) if annee.isdigit() and 1 <= int(annee) <= 9999 else timezone.localdate().isocalendar()[0]
+        etage = parametres.get('etage', '')
+        context.update(occupation.analyser(
+            annee,
+            batiment=parametres.get('batiment') or None,
+            etage=int(etage) if etage.lstrip('-').isdigit() else None,
+        ))
+        context['batiments'] = Salle.objects.order_by('batiment').values_list('batiment', flat=True).distinct()
+        return context
+
 
-        cours = Cours.objects.filter(
-            date__range=(today, end_date)
-        ).order_by('date', 'heure_debut')
 
-        context['cours'] = cours
-        context['start_date'] = today
-        context['end_date'] = end_date
+
+class CalendrierView(PlanningMixin, ListView):
+    """
+    Cours d'une semaine ou d'un mois (`?vue=semaine|mois&date=AAAA-MM-JJ`) :
+    ceux du formateur connecté, ou de l'élève connecté ; `?salle=` restreint
+    à une salle.
+    """
+    model = Cours
+    template_name = 'planning/calendrier.html'
+    context_object_name = 'cours'
+
+    def get_queryset(self):
+        self.vue, self.debut, self.fin = calendrier.lire_fenetre(self.request.GET)
+        queryset = super().get_queryset()
+        eleve = self.request.user.profil_eleve
+        if self.request.user.profil_formateur is None and eleve is not None:
+            queryset = queryset.filter(pk__in=calendrier.SOURCES['eleve'](eleve.pk).values('pk'))
+        self.salle_id = self.request.GET.get('salle', '')
+        if self.salle_id.isdigit():
+            queryset = queryset.filter(salle_id=self.salle_id)
+        return calendrier.cours_de(queryset, self.debut, self.fin)
+
+    def liens_ics(self):
+        """Flux iCalendar proposés à l'utilisateur : le sien, et celui de la salle affichée"""
+        user = self.request.user
+        sources = []
+        if user.profil_formateur is not None:
+            sources.append((_('Mes cours'), 'formateur', user.profil_formateur.pk))
+        elif user.profil_eleve is not None:
+            sources.append((_('Mes cours'), 'eleve', user.profil_eleve.pk))
+        if self.salle_id.isdigit() and (user.profil_formateur is not None or user.is_staff):
+            sources.append((_('Cette salle'), 'salle', int(self.salle_id)))
+        return [
+            (libelle, self.request.build_absolute_uri(
+                reverse('planning:calendrier_ics', args=[calendrier.jeton(source, pk)])))
+            for libelle, source, pk in sources
+        ]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        precedente, suivante = calendrier.voisines(self.vue, self.debut, self.fin)
+        context.update({
+            'vue': self.vue,
+            'start_date': self.debut,
+            'end_date': self.fin,
+            'precedente': precedente,
+            'suivante': suivante,
+            'jours': calendrier.par_jour(context['cours'], self.debut, self.fin),
+            'liens_ics': self.liens_ics(),
+        })
         return context
 
+
+class CalendrierJSONView(CalendrierView):
+    """Même fenêtre que le calendrier, en JSON pour un calendrier côté client"""
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        etag = calendrier.etiquette(queryset, self.debut, self.fin)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = JsonResponse({
+                'debut': self.debut.isoformat(),
+                'fin': self.fin.isoformat(),
+                'evenements': [calendrier.evenement(cours) for cours in queryset],
+            })
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class CalendrierIcsView(View):
+    """
+    Flux iCalendar d'un formateur, d'une salle ou d'un élève. L'URL est signée
+    (elle tient lieu d'identifiant pour les clients de calendrier, qui n'ont
+    pas de session) ; 304 tant que les cours du flux n'ont pas changé.
+    """
+    NOMS = {
+        'formateur': lambda pk: Formateur.objects.select_related('user').get(pk=pk).user.get_full_name(),
+        'salle': lambda pk: Salle.objects.get(pk=pk).nom,
+        'eleve': lambda pk: Eleve.objects.select_related('user').get(pk=pk).nom_complet,
+    }
+
+    def get(self, request, jeton):
+        source = calendrier.lire_jeton(jeton)
+        if source is None:
+            raise Http404
+        debut, fin = calendrier.fenetre_du_flux()
+        queryset = calendrier.cours_du_flux(*source, debut, fin)
+        etag = calendrier.etiquette(queryset, debut, fin)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            try:
+                nom = self.NOMS[source[0]](source[1])
+            except ObjectDoesNotExist:
+                raise Http404
+            response = StreamingHttpResponse(
+                calendrier.flux_ics(queryset, f"{_('Planning')} — {nom}", request.get_host().split(':')[0]),
+                content_type='text/calendar; charset=utf-8',
+            )
+            response['Content-Disposition'] = content_disposition_header(False, f'{source[0]}-{source[1]}.ics')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
@@ -0,0 +1,176 @@
+"""
+Export des feuilles d'émargement (présences) en CSV ou XLSX.
+
+Les présences sont lues par lots (`.iterator(chunk_size=...)`, curseur côté
+serveur sur PostgreSQL) et écrites au fil de l'eau : la mémoire consommée
+ne dépend pas du nombre de lignes exportées. Le CSV est envoyé directement
+dans une StreamingHttpResponse ; le XLSX, qui est une archive zip, est
+écrit en mode « constant_memory » de XlsxWriter dans un fichier temporaire
+puis envoyé par morceaux ; au-delà de la limite d'Excel (1 048 576 lignes
+par feuille), les lignes se poursuivent sur une nouvelle feuille.
+
+Les textes saisis (titres, remarques…) ne sont jamais interprétés comme des
+formules : chaînes seulement dans le XLSX, et dans le CSV une apostrophe
+devant toute cellule commençant par = + - ou @.
+
+XlsxWriter est une dépendance facultative, nécessaire au seul format XLSX.
+"""
+import csv
+import tempfile
+
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+from .models import Presence
+
+try:
+    import xlsxwriter
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    xlsxwriter = None
+
+TAILLE_LOT = 2000
+FORMATS = ('csv', 'xlsx')
+TYPE_XLSX = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+# Lignes de données par feuille XLSX : la limite d'Excel, moins la ligne d'en-têtes
+LIGNES_PAR_FEUILLE = 1048576 - 1
+DEBUTS_DE_FORMULE = ('=', '+', '-', '@')
+
+
+class FormatIndisponible(Exception):
+    """Le format demandé exige une bibliothèque absente"""
+
+
+def entetes():
+    return [
+        _('Date'), _('Début'), _('Fin'), _('Référence formation'), _('Formation'), _('Cours'),
+        _('Formateur'), _('Numéro étudiant'), _('Nom'), _('Prénom'), _('Présent'), _('Remarque'),
+        _('Vérifié le'),
+    ]
+
+
+def presences_a_exporter(formation=None, formateur=None, cours=None, debut=None, fin=None):
+    """Présences filtrées, dans l'ordre d'une feuille d'émargement (cours par cours)"""
+    queryset = Presence.objects.select_related(
+        'eleve__user', 'cours__formation', 'cours__formateur__user'
+    ).only(
+        'present', 'remarque', 'date_verification',
+        'eleve__numero_etudiant', 'eleve__user__first_name', 'eleve__user__last_name',
+        'cours__titre', 'cours__date', 'cours__heure_debut', 'cours__heure_fin',
+        'cours__formation__reference', 'cours__formation__titre',
+        'cours__formateur__user__first_name', 'cours__formateur__user__last_name',
+    )
+    if formation is not None:
+        queryset = queryset.filter(cours__formation=formation)
+    if formateur is not None:
+        queryset = queryset.filter(cours__formateur=formateur)
+    if cours is not None:
+        queryset = queryset.filter(cours=cours)
+    if debut is not None:
+        queryset = queryset.filter(cours__date__gte=debut)
+    if fin is not None:
+        queryset = queryset.filter(cours__date__lte=fin)
+    return queryset.order_by('cours__date', 'cours__heure_debut', 'cours_id',
+                             'eleve__user__last_name', 'eleve__user__first_name', 'eleve_id')
+
+
+def lignes(queryset, chunk_size=TAILLE_LOT):
+    """Une ligne (tuple de valeurs simples) par présence, lue par lots"""
+    oui, non = _('Oui'), _('Non')
+    for presence in queryset.iterator(chunk_size=chunk_size):
+        cours = presence.cours
+        eleve = presence.eleve
+        formateur = cours.formateur.user
+        yield (
+            cours.date, cours.heure_debut, cours.heure_fin,
+            cours.formation.reference, cours.formation.titre, cours.titre,
+            f'{formateur.first_name} {formateur.last_name}'.strip(),
+            eleve.numero_etudiant, eleve.user.last_name, eleve.user.first_name,
+            oui if presence.present else non, presence.remarque,
+            timezone.localtime(presence.date_verification).replace(tzinfo=None),
+        )
+
+
+class Echo:
+    """Pseudo-fichier dont write() renvoie la valeur écrite, pour csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def neutraliser(valeur):
+    """Texte qu'un tableur lirait comme une formule, précédé d'une apostrophe"""
+    if isinstance(valeur, str) and valeur.startswith(DEBUTS_DE_FORMULE):
+        return "'" + valeur
+    return valeur
+
+
+def flux_csv(queryset, chunk_size=TAILLE_LOT):
+    """Génère le CSV ligne à ligne (séparateur ';' et BOM, pour Excel en français)"""
+    writer = csv.writer(Echo(), delimiter=';')
+    yield '\ufeff' + writer.writerow(entetes())
+    for ligne in lignes(queryset, chunk_size):
+        yield writer.writerow([neutraliser(valeur) for valeur in ligne])
+
+
+def ecrire_xlsx(queryset, fichier, chunk_size=TAILLE_LOT):
+    """
+    Écrit le classeur dans `fichier` (chemin ou fichier binaire) en mémoire
+    constante, sur autant de feuilles que nécessaire.
+    """
+    if xlsxwriter is None:
+        raise FormatIndisponible(_("L'export XLSX nécessite la bibliothèque XlsxWriter."))
+    classeur = xlsxwriter.Workbook(fichier, {
+        'constant_memory': True, 'tmpdir': tempfile.gettempdir(), 'strings_to_formulas': False,
+    })
+    gras = classeur.add_format({'bold': True})
+    formats = [
+        classeur.add_format({'num_format': 'dd/mm/yyyy'}),
+        classeur.add_format({'num_format': 'hh:mm'}),
+        classeur.add_format({'num_format': 'hh:mm'}),
+    ] + [None] * 9 + [classeur.add_format({'num_format': 'dd/mm/yyyy hh:mm'})]
+
+    def nouvelle_feuille(numero):
+        nom = _('Émargement') if numero == 1 else f"{_('Émargement')} ({numero})"
+        feuille = classeur.add_worksheet(nom)
+        # En mode constant_memory, les lignes doivent être écrites dans l'ordre
+        feuille.write_row(0, 0, entetes(), gras)
+        feuille.freeze_panes(1, 0)
+        return feuille
+
+    numero, feuille, rang = 1, nouvelle_feuille(1), 0
+    for ligne in lignes(queryset, chunk_size):
+        if rang == LIGNES_PAR_FEUILLE:
+            numero += 1
+            feuille, rang = nouvelle_feuille(numero), 0
+        rang += 1
+        for colonne, (valeur, format_) in enumerate(zip(ligne, formats)):
+            if format_ is not None:
+                feuille.write_datetime(rang, colonne, valeur, format_)
+            elif isinstance(valeur, str):
+                feuille.write_string(rang, colonne, valeur)
+            else:
+                feuille.write(rang, colonne, valeur)
+    classeur.close()
+
+
+def nom_fichier(extension):
+    return f"emargement-{timezone.localdate():%Y%m%d}.{extension}"
+
+
+def reponse_export(queryset, format_='csv'):
+    """StreamingHttpResponse (CSV) ou FileResponse sur un fichier temporaire (XLSX)"""
+    if format_ == 'xlsx':
+        fichier = tempfile.TemporaryFile()
+        try:
+            ecrire_xlsx(queryset, fichier)
+        except BaseException:
+            fichier.close()
+            raise
+        fichier.seek(0)
+        # FileResponse lit le fichier par blocs et le ferme (ce qui le supprime) à la fin de l'envoi
+        return FileResponse(fichier, as_attachment=True, filename=nom_fichier('xlsx'), content_type=TYPE_XLSX)
+
+    response = StreamingHttpResponse(flux_csv(queryset), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nom_fichier("csv")}"'
+    return response
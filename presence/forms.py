@@ -1,6 +1,9 @@
 from django import forms
 from django.utils.translation import gettext_lazy as _
 from eleves.models import Eleve
+from formateurs.models import Formateur
+from formations.models import Formation
+from planning.models import Cours
 from presence.models import Presence
 
 class PresenceForm(forms.ModelForm):
@@ -19,16 +22,60 @@ class BulkPresenceForm(forms.Form):
     def __init__(self, *args, **kwargs):
         eleves = kwargs.pop('eleves', [])
         cours = kwargs.pop('cours', None)
+        # {eleve_id: present} déjà enregistrés, lus en une seule requête
+        etats = kwargs.pop('etats', None)
         super().__init__(*args, **kwargs)
 
+        if etats is None:
+            etats = Presence.objects.etats_pour_cours(cours) if cours else {}
+
         for eleve in eleves:
             field_name = f'presence_{eleve.eleve.id}'
-            initial = Presence.objects.filter(
-                cours=cours,
-                eleve=eleve.eleve
-            ).first()
             self.fields[field_name] = forms.BooleanField(
                 label=f"{eleve.eleve.user.get_full_name()}",
                 required=False,
-                initial=initial.present if initial else False
-            )
\ No newline at end of file
+                initial=etats.get(eleve.eleve.id, False)
+            )
+
+    def get_etats(self):
+        """Renvoie {eleve_id: present} à partir des données validées"""
+        return {
+            int(name[len('presence_'):]): value
+            for name, value in self.cleaned_data.items()
+            if name.startswith('presence_')
+        }
+
+class ExportPresenceForm(forms.Form):
+    """Filtres de l'export des feuilles d'émargement"""
+    formation = forms.ModelChoiceField(Formation.objects.all(), required=False, label=_('Formation'))
+    formateur = forms.ModelChoiceField(Formateur.objects.all(), required=False, label=_('Formateur'))
+    cours = forms.ModelChoiceField(Cours.objects.all(), required=False, label=_('Cours'))
+    debut = forms.DateField(required=False, label=_('Du'))
+    fin = forms.DateField(required=False, label=_('Au'))
+    format = forms.ChoiceField(choices=[('csv', 'CSV'), ('xlsx', 'XLSX')], required=False, initial='csv',
+                               label=_('Format'))
+
+    def __init__(self, *args, formateur=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Un formateur n'exporte que ses propres cours
+        self.formateur_impose = formateur
+        if formateur is not None:
+            del self.fields['formateur']
+            self.fields['cours'].queryset = Cours.objects.filter(formateur=formateur)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        debut, fin = cleaned_data.get('debut'), cleaned_data.get('fin')
+        if debut and fin and fin < debut:
+            raise forms.ValidationError(_("La date de fin doit être postérieure à la date de début."))
+        return cleaned_data
+
+    def get_filtres(self):
+        """Arguments de presence.export.presences_a_exporter"""
+        return {
+            'formation': self.cleaned_data.get('formation'),
+            'formateur': self.formateur_impose or self.cleaned_data.get('formateur'),
+            'cours': self.cleaned_data.get('cours'),
+            'debut': self.cleaned_data.get('debut'),
+            'fin': self.cleaned_data.get('fin'),
+        }
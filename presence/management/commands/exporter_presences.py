@@ -0,0 +1,56 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from formateurs.models import Formateur
+from formations.models import Formation
+from presence.export import FORMATS, FormatIndisponible, ecrire_xlsx, flux_csv, presences_a_exporter
+
+
+def date_iso(valeur):
+    try:
+        return datetime.date.fromisoformat(valeur)
+    except ValueError:
+        raise CommandError(f"Date invalide : {valeur} (format attendu AAAA-MM-JJ)")
+
+
+class Command(BaseCommand):
+    help = ("Exporte les feuilles d'émargement (présences) en CSV ou XLSX, en lisant les "
+            "présences par lots pour garder une mémoire constante.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formation', help="Référence de la formation")
+        parser.add_argument('--formateur', help="Matricule du formateur")
+        parser.add_argument('--debut', type=date_iso, help="Premier jour (AAAA-MM-JJ)")
+        parser.add_argument('--fin', type=date_iso, help="Dernier jour (AAAA-MM-JJ)")
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--sortie', help="Fichier de sortie (par défaut : sortie standard, CSV seulement)")
+        parser.add_argument('--lot', type=int, default=2000, help="Lignes lues par requête")
+
+    def handle(self, *args, **options):
+        filtres = {'debut': options['debut'], 'fin': options['fin']}
+        try:
+            if options['formation']:
+                filtres['formation'] = Formation.objects.get(reference=options['formation'])
+            if options['formateur']:
+                filtres['formateur'] = Formateur.objects.get(matricule=options['formateur'])
+        except (Formation.DoesNotExist, Formateur.DoesNotExist) as e:
+            raise CommandError(str(e))
+        queryset = presences_a_exporter(**filtres)
+
+        if options['format'] == 'xlsx':
+            if not options['sortie']:
+                raise CommandError("L'export XLSX exige --sortie.")
+            try:
+                ecrire_xlsx(queryset, options['sortie'], options['lot'])
+            except FormatIndisponible as e:
+                raise CommandError(str(e))
+        else:
+            if options['sortie']:
+                with open(options['sortie'], 'w', encoding='utf-8', newline='') as fichier:
+                    fichier.writelines(flux_csv(queryset, options['lot']))
+            else:
+                for morceau in flux_csv(queryset, options['lot']):
+                    self.stdout.write(morceau, ending='')
+        if options['sortie']:
+            self.stderr.write(self.style.SUCCESS(f"Export écrit dans {options['sortie']}"))
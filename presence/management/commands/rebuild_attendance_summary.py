@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from presence.models import AttendanceSummary
+
+
+class Command(BaseCommand):
+    help = "Recalcule entièrement les bilans de présence (AttendanceSummary) à partir des présences"
+
+    def handle(self, *args, **options):
+        nombre = AttendanceSummary.objects.reconstruire()
+        self.stdout.write(self.style.SUCCESS(f"{nombre} bilans de présence recalculés."))
@@ -0,0 +1,57 @@
+# Generated by Django 5.2 on 2026-10-18 18:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def calculer_bilans(apps, schema_editor):
+    Presence = apps.get_model('presence', 'Presence')
+    AttendanceSummary = apps.get_model('presence', 'AttendanceSummary')
+    for nature, champ in (('eleve', 'eleve'), ('formateur', 'cours__formateur')):
+        lignes = Presence.objects.order_by().values(champ, 'cours__formation').annotate(
+            nb_total=Count('id'),
+            nb_presents=Count('id', filter=Q(present=True)),
+        )
+        AttendanceSummary.objects.bulk_create(
+            [
+                AttendanceSummary(
+                    formation_id=ligne['cours__formation'],
+                    total=ligne['nb_total'],
+                    presents=ligne['nb_presents'],
+                    **{f'{nature}_id': ligne[champ]}
+                )
+                for ligne in lignes
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eleves', '0001_initial'),
+        ('formateurs', '0001_initial'),
+        ('formations', '0001_initial'),
+        ('presence', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='Cours pointés')),
+                ('presents', models.PositiveIntegerField(default=0, verbose_name='Présences')),
+                ('eleve', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bilans_presence', to='eleves.eleve', verbose_name='Élève')),
+                ('formateur', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bilans_presence', to='formateurs.formateur', verbose_name='Formateur')),
+                ('formation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bilans_presence', to='formations.formation', verbose_name='Formation')),
+            ],
+            options={
+                'verbose_name': 'Bilan de présence',
+                'verbose_name_plural': 'Bilans de présence',
+                'constraints': [models.UniqueConstraint(fields=('eleve', 'formation'), name='unique_bilan_eleve'), models.UniqueConstraint(fields=('formateur', 'formation'), name='unique_bilan_formateur'), models.CheckConstraint(condition=models.Q(('eleve__isnull', True), ('formateur__isnull', True), _connector='XOR'), name='bilan_eleve_ou_formateur')],
+            },
+        ),
+        migrations.RunPython(calculer_bilans, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 18:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eleves', '0002_inscription_indexes'),
+        ('planning', '0004_disponibilite_dispo_formateur_fin_idx'),
+        ('presence', '0002_attendancesummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='presence',
+            index=models.Index(fields=['eleve', 'present'], name='presence_eleve_present_idx'),
+        ),
+    ]
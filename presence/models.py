@@ -1,7 +1,57 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Q, Sum
+from django.dispatch import Signal
 from django.utils.translation import gettext_lazy as _
 from planning.models import Cours
 from eleves.models import Eleve
+from formateurs.models import Formateur
+from formations.models import Formation
+
+# Émis par PresenceQuerySet.marquer(), dont l'écriture groupée ne déclenche pas post_save
+presences_marquees = Signal()
+
+
+class PresenceQuerySet(models.QuerySet):
+    """Requêtes groupées sur les présences"""
+
+    def etats_pour_cours(self, cours):
+        """Renvoie {eleve_id: present} pour toutes les présences d'un cours, en une requête"""
+        return dict(self.filter(cours=cours).order_by().values_list('eleve_id', 'present'))
+
+    def marquer(self, cours, etats):
+        """
+        Enregistre l'appel d'un cours en une seule écriture.
+        `etats` associe l'id de chaque élève à son statut (présent ou non).
+        Les présences existantes sont lues une fois, puis seules les lignes
+        nouvelles ou modifiées sont écrites par un unique INSERT ... ON CONFLICT
+        sur la clé (cours, eleve). Renvoie le nombre de lignes écrites.
+        """
+        with transaction.atomic():
+            existants = self.etats_pour_cours(cours)
+            a_ecrire = [
+                self.model(cours=cours, eleve_id=eleve_id, present=present)
+                for eleve_id, present in etats.items()
+                if existants.get(eleve_id) != present
+            ]
+            if a_ecrire:
+                self.bulk_create(
+                    a_ecrire,
+                    update_conflicts=True,
+                    unique_fields=['cours', 'eleve'],
+                    update_fields=['present', 'date_verification'],
+                )
+                # bulk_create n'émet pas de signaux : on répercute les écarts sur les bilans
+                AttendanceSummary.objects.appliquer(cours.formation_id, cours.formateur_id, {
+                    p.eleve_id: (
+                        0 if p.eleve_id in existants else 1,
+                        int(p.present) - int(bool(existants.get(p.eleve_id))),
+                    )
+                    for p in a_ecrire
+                })
+                presences_marquees.send(sender=self.model, cours=cours,
+                                        eleve_ids=[p.eleve_id for p in a_ecrire])
+        return len(a_ecrire)
+
 
 class Presence(models.Model):
     """Modèle pour enregistrer les présences aux cours"""
@@ -11,11 +61,17 @@ class Presence(models.Model):
     date_verification = models.DateTimeField( _('Date de vérification'), auto_now=True)
     remarque = models.TextField( _('Remarque'), blank=True, help_text=_("Remarque éventuelle sur la présence/absence"))
 
+    objects = PresenceQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('Présence')
         verbose_name_plural = _('Présences')
         unique_together = ('cours', 'eleve')
         ordering = ['cours__date', 'cours__heure_debut', 'eleve__user__last_name']
+        indexes = [
+            # Couvre les comptages de présences par élève (count / filter present)
+            models.Index(fields=['eleve', 'present'], name='presence_eleve_present_idx'),
+        ]
 
     def __str__(self):
         return f"{self.eleve} - {self.cours} ({'Présent' if self.present else 'Absent'})"
@@ -32,4 +88,133 @@ class StatutPresence(models.Model):
         verbose_name_plural = _('Statuts de présence')
 
     def __str__(self):
-        return self.nom
\ No newline at end of file
+        return self.nom
+
+
+class AttendanceSummaryQuerySet(models.QuerySet):
+    """Maintenance et lecture des bilans de présence"""
+
+    def appliquer(self, formation_id, formateur_id, deltas):
+        """
+        Répercute des écarts de présences sur les bilans d'une formation.
+        `deltas` associe l'id de chaque élève à (écart du total, écart des présents) ;
+        le bilan du formateur reçoit la somme des écarts. Trois requêtes quel que
+        soit le nombre d'élèves : les bilans manquants sont insérés à zéro, puis
+        tous sont lus verrouillés et mis à jour.
+        """
+        deltas = {eleve_id: d for eleve_id, d in deltas.items() if d != (0, 0)}
+        if not deltas:
+            return
+        cle_formateur = ('formateur', formateur_id)
+        deltas_par_cle = {('eleve', eleve_id): d for eleve_id, d in deltas.items()}
+        deltas_par_cle[cle_formateur] = (
+            sum(d[0] for d in deltas.values()),
+            sum(d[1] for d in deltas.values()),
+        )
+
+        with transaction.atomic():
+            # Insérer avant de verrouiller : un bilan créé au même moment par un appel
+            # concurrent est alors verrouillé lui aussi, et les écarts s'ajoutent à sa
+            # valeur enregistrée au lieu de la remplacer (ignore_conflicts : sans effet
+            # sur les bilans existants)
+            self.bulk_create([
+                self.model(formation_id=formation_id, **{f'{nature}_id': pk})
+                for (nature, pk), (delta_total, _) in deltas_par_cle.items() if delta_total > 0
+            ], ignore_conflicts=True)
+            existants = {}
+            for bilan in self.select_for_update().filter(
+                Q(eleve_id__in=deltas) | Q(formateur_id=formateur_id),
+                formation_id=formation_id,
+            ):
+                existants[('eleve', bilan.eleve_id) if bilan.eleve_id else ('formateur', bilan.formateur_id)] = bilan
+
+            a_modifier, vides = [], []
+            for cle, (delta_total, delta_presents) in deltas_par_cle.items():
+                bilan = existants.get(cle)
+                if bilan is None:
+                    # Rien à retirer d'un bilan inexistant (ex. suppression en cascade)
+                    continue
+                bilan.total += delta_total
+                bilan.presents += delta_presents
+                (vides if bilan.total <= 0 else a_modifier).append(bilan)
+
+            if vides:
+                self.filter(pk__in=[bilan.pk for bilan in vides]).delete()
+            if a_modifier:
+                self.bulk_update(a_modifier, ['total', 'presents'])
+
+    def totaux(self):
+        """Renvoie (total, presents) cumulés sur les bilans sélectionnés"""
+        totaux = self.aggregate(total=Sum('total'), presents=Sum('presents'))
+        return totaux['total'] or 0, totaux['presents'] or 0
+
+    def taux(self):
+        """Taux de présence cumulé, en pourcentage arrondi à une décimale"""
+        return calculer_taux(*self.totaux())
+
+    def reconstruire(self):
+        """Recalcule tous les bilans à partir de la table des présences"""
+        with transaction.atomic():
+            self.all().delete()
+            for nature, champ in (('eleve', 'eleve'), ('formateur', 'cours__formateur')):
+                lignes = Presence.objects.order_by().values(champ, 'cours__formation').annotate(
+                    nb_total=Count('id'),
+                    nb_presents=Count('id', filter=Q(present=True)),
+                )
+                self.bulk_create(
+                    (
+                        self.model(
+                            formation_id=ligne['cours__formation'],
+                            total=ligne['nb_total'],
+                            presents=ligne['nb_presents'],
+                            **{f'{nature}_id': ligne[champ]}
+                        )
+                        for ligne in lignes.iterator()
+                    ),
+                    batch_size=1000,
+                )
+        return self.count()
+
+
+def calculer_taux(total, presents):
+    """Taux de présence en pourcentage arrondi à une décimale (0 si aucun cours)"""
+    return round(presents / total * 100, 1) if total > 0 else 0
+
+
+class AttendanceSummary(models.Model):
+    """
+    Bilan de présences précalculé, soit par (élève, formation),
+    soit par (formateur, formation). Tenu à jour à chaque écriture
+    de Presence (voir presence.signals) et reconstructible par la
+    commande `rebuild_attendance_summary`.
+    """
+    eleve = models.ForeignKey(Eleve, on_delete=models.CASCADE, null=True, blank=True, related_name='bilans_presence', verbose_name=_('Élève'))
+    formateur = models.ForeignKey(Formateur, on_delete=models.CASCADE, null=True, blank=True, related_name='bilans_presence', verbose_name=_('Formateur'))
+    formation = models.ForeignKey(Formation, on_delete=models.CASCADE, related_name='bilans_presence', verbose_name=_('Formation'))
+    total = models.PositiveIntegerField(_('Cours pointés'), default=0)
+    presents = models.PositiveIntegerField(_('Présences'), default=0)
+
+    objects = AttendanceSummaryQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('Bilan de présence')
+        verbose_name_plural = _('Bilans de présence')
+        constraints = [
+            models.UniqueConstraint(fields=['eleve', 'formation'], name='unique_bilan_eleve'),
+            models.UniqueConstraint(fields=['formateur', 'formation'], name='unique_bilan_formateur'),
+            models.CheckConstraint(
+                condition=Q(eleve__isnull=True) ^ Q(formateur__isnull=True),
+                name='bilan_eleve_ou_formateur'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.eleve or self.formateur} - {self.formation} ({self.presents}/{self.total})"
+
+    @property
+    def absents(self):
+        return self.total - self.presents
+
+    @property
+    def taux(self):
+        return calculer_taux(self.total, self.presents)
@@ -0,0 +1,74 @@
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from planning.models import Cours
+from .models import AttendanceSummary, Presence
+
+
+def _repercuter(cours_id, eleve_id, present, signe):
+    """Ajoute (signe=1) ou retire (signe=-1) une présence des bilans"""
+    cours = Cours.objects.filter(pk=cours_id).values('formation_id', 'formateur_id').first()
+    if cours is None:
+        return
+    AttendanceSummary.objects.appliquer(
+        cours['formation_id'], cours['formateur_id'],
+        {eleve_id: (signe, signe * int(present))}
+    )
+
+
+@receiver(pre_save, sender=Presence)
+def memoriser_presence(sender, instance, raw=False, **kwargs):
+    """Garde l'état enregistré de la présence pour calculer l'écart après sauvegarde"""
+    instance._etat_enregistre = None
+    if instance.pk and not raw:
+        instance._etat_enregistre = Presence.objects.filter(pk=instance.pk).values_list(
+            'cours_id', 'eleve_id', 'present'
+        ).first()
+
+
+@receiver(post_save, sender=Presence)
+def mettre_a_jour_bilans(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    ancien = getattr(instance, '_etat_enregistre', None)
+    nouveau = (instance.cours_id, instance.eleve_id, instance.present)
+    if ancien == nouveau:
+        return
+    if ancien is not None:
+        _repercuter(*ancien, signe=-1)
+    _repercuter(*nouveau, signe=1)
+
+
+@receiver(post_delete, sender=Presence)
+def retirer_des_bilans(sender, instance, **kwargs):
+    _repercuter(instance.cours_id, instance.eleve_id, instance.present, signe=-1)
+
+
+@receiver(pre_save, sender=Cours)
+def memoriser_affectation_cours(sender, instance, raw=False, **kwargs):
+    instance._affectation_enregistree = None
+    if instance.pk and not raw:
+        instance._affectation_enregistree = Cours.objects.filter(pk=instance.pk).values_list(
+            'formation_id', 'formateur_id'
+        ).first()
+
+
+@receiver(post_save, sender=Cours)
+def deplacer_bilans_cours(sender, instance, created=False, raw=False, **kwargs):
+    """Un cours qui change de formation ou de formateur emporte ses présences"""
+    ancienne = getattr(instance, '_affectation_enregistree', None)
+    if raw or created or ancienne is None:
+        return
+    nouvelle = (instance.formation_id, instance.formateur_id)
+    if ancienne == nouvelle:
+        return
+    lignes = Presence.objects.filter(cours=instance).order_by().values('eleve_id').annotate(
+        nb_total=Count('id'),
+        nb_presents=Count('id', filter=Q(present=True)),
+    )
+    deltas = {ligne['eleve_id']: (ligne['nb_total'], ligne['nb_presents']) for ligne in lignes}
+    AttendanceSummary.objects.appliquer(*ancienne, {
+        eleve_id: (-total, -presents) for eleve_id, (total, presents) in deltas.items()
+    })
+    AttendanceSummary.objects.appliquer(*nouvelle, deltas)
@@ -1,3 +1,209 @@
+import datetime
+import io
+import zipfile
+from unittest import mock, skipUnless
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from eleves.models import Eleve, Inscription, inscriptions_importees
+from formateurs.models import Formateur
+from formations.models import Domaine, Formation
+from planning.models import Cours
+from presence import export
+from presence.export import xlsxwriter
+from presence.models import AttendanceSummary, AttendanceSummaryQuerySet, Presence
+
+
+class PresenceTestCase(TestCase):
+    """Un formateur connecté et de quoi créer des cours avec leurs élèves inscrits"""
+
+    def setUp(self):
+        user = CustomUser.objects.create(
+            username='formateur', email='formateur@example.com', is_formateur=True
+        )
+        self.formateur = Formateur.objects.create(
+            user=user, specialite='Python', experience=5, bio='', matricule='F001'
+        )
+        Domaine.objects.create(nom='Informatique')
+        self.client.force_login(user)
+
+    def creer_cours(self, reference, nb_eleves, jour=1):
+        formation = Formation.objects.create(
+            domaine=Domaine.objects.get(), reference=reference, titre=reference,
+            description='', objectifs='', public_cible='', duree_jours=1, prix=0
+        )
+        cours = Cours.objects.create(
+            formation=formation, formateur=self.formateur, titre=reference,
+            date=datetime.date(2025, 9, jour),
+            heure_debut=datetime.time(9), heure_fin=datetime.time(12)
+        )
+        users = CustomUser.objects.bulk_create([
+            CustomUser(username=f'{reference}-{i}', email=f'{reference}-{i}@example.com', is_eleve=True)
+            for i in range(nb_eleves)
+        ])
+        eleves = Eleve.objects.bulk_create([
+            Eleve(user=user, numero_etudiant=f'{reference}-{i}')
+            for i, user in enumerate(users)
+        ])
+        Inscription.objects.bulk_create([
+            Inscription(eleve=eleve, formation=formation, statut='valide')
+            for eleve in eleves
+        ])
+        # Comme l'import en masse : bulk_create n'émet pas post_save
+        inscriptions_importees.send(sender=Inscription, formation_ids=[formation.pk])
+        return cours, eleves
+
+
+class MarquerPresenceTests(PresenceTestCase):
+    """Le nombre de requêtes de l'appel ne dépend pas du nombre d'élèves"""
+
+    def poster_appel(self, cours, eleves):
+        data = {f'presence_{eleve.id}': 'on' for eleve in eleves[::2]}
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse('presence:marquer', args=[cours.pk]), data)
+        self.assertEqual(response.status_code, 302)
+        return len(ctx.captured_queries)
+
+    def test_nombre_de_requetes_constant(self):
+        petit, petits_eleves = self.creer_cours('PETIT', 5)
+        grand, grands_eleves = self.creer_cours('GRAND', 500, jour=2)
+
+        # Django plafonne SQLite à 999 paramètres par requête (limite historique),
+        # ce qui découperait l'INSERT ; SQLite >= 3.32 en accepte 32766.
+        with mock.patch.object(connection.features, 'max_query_params', 32766):
+            self.assertEqual(
+                self.poster_appel(petit, petits_eleves),
+                self.poster_appel(grand, grands_eleves),
+            )
+        self.assertEqual(Presence.objects.filter(cours=grand).count(), 500)
+        self.assertEqual(Presence.objects.filter(cours=grand, present=True).count(), 250)
+
+    def test_mise_a_jour_des_presences_existantes(self):
+        cours, eleves = self.creer_cours('MAJ', 4)
+        self.poster_appel(cours, eleves)
+
+        ecrites = Presence.objects.marquer(cours, {eleve.id: True for eleve in eleves})
+
+        self.assertEqual(ecrites, 2)
+        self.assertEqual(Presence.objects.filter(cours=cours).count(), 4)
+        self.assertFalse(Presence.objects.filter(cours=cours, present=False).exists())
+
+
+class AttendanceSummaryTests(PresenceTestCase):
+    """Les bilans suivent les écritures de présences et la reconstruction"""
+
+    def bilans(self):
+        return sorted(AttendanceSummary.objects.values_list(
+            'eleve_id', 'formateur_id', 'formation_id', 'total', 'presents'
+        ), key=str)
+
+    def test_bilans_incrementaux(self):
+        cours, eleves = self.creer_cours('BILAN', 4)
+        Presence.objects.marquer(cours, {eleve.id: eleve is eleves[0] for eleve in eleves})
+
+        bilan = AttendanceSummary.objects.get(formateur=self.formateur)
+        self.assertEqual((bilan.total, bilan.presents), (4, 1))
+
+        presence = Presence.objects.get(cours=cours, eleve=eleves[1])
+        presence.present = True
+        presence.save()
+        Presence.objects.get(cours=cours, eleve=eleves[2]).delete()
+
+        self.assertEqual(AttendanceSummary.objects.filter(eleve=eleves[1]).taux(), 100.0)
+        self.assertEqual(AttendanceSummary.objects.filter(formateur=self.formateur).totaux(), (3, 2))
+
+        incrementaux = self.bilans()
+        AttendanceSummary.objects.reconstruire()
+        self.assertEqual(self.bilans(), incrementaux)
+
+    def test_premier_bilan_cree_par_un_appel_concurrent(self):
+        cours, eleves = self.creer_cours('CONCURRENT', 2)
+        creer = AttendanceSummaryQuerySet.bulk_create
+
+        def apres_un_appel_concurrent(queryset, bilans, *args, **kwargs):
+            # Un autre appel a créé et validé le bilan du formateur entre lecture et insertion
+            AttendanceSummary.objects.get_or_create(
+                formation=cours.formation, formateur=self.formateur, defaults={'total': 3, 'presents': 3},
+            )
+            return creer(queryset, bilans, *args, **kwargs)
+
+        with mock.patch.object(AttendanceSummaryQuerySet, 'bulk_create', apres_un_appel_concurrent):
+            Presence.objects.marquer(cours, {eleve.id: True for eleve in eleves})
+        self.assertEqual(AttendanceSummary.objects.filter(formateur=self.formateur).totaux(), (5, 5))
+
+
+class ExportPresenceTests(PresenceTestCase):
+    """Feuilles d'émargement en flux, limitées aux cours du formateur connecté"""
+
+    def setUp(self):
+        super().setUp()
+        self.cours, self.eleves = self.creer_cours('EXPORT', 3)
+        Presence.objects.marquer(self.cours, {eleve.id: eleve is not self.eleves[0] for eleve in self.eleves})
+
+        # Présence d'un autre formateur, qui ne doit pas apparaître dans l'export
+        user = CustomUser.objects.create(username='autre', email='autre@example.com', is_formateur=True)
+        autre = Formateur.objects.create(user=user, specialite='', experience=1, bio='', matricule='F002')
+        cours = Cours.objects.create(
+            formation=self.cours.formation, formateur=autre, titre='Autre',
+            date=datetime.date(2025, 9, 2), heure_debut=datetime.time(9), heure_fin=datetime.time(12)
+        )
+        Presence.objects.marquer(cours, {self.eleves[0].id: True})
+
+    def lire_csv(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        contenu = b''.join(response.streaming_content).decode('utf-8-sig')
+        return [ligne.split(';') for ligne in contenu.splitlines()]
+
+    def test_export_csv_du_formateur(self):
+        lignes = self.lire_csv(self.client.get(reverse('presence:export')))
+        self.assertEqual(lignes[0][:3], ['Date', 'Début', 'Fin'])
+        self.assertEqual(len(lignes), 4)
+        self.assertEqual({ligne[5] for ligne in lignes[1:]}, {'EXPORT'})
+        self.assertEqual(sorted(ligne[10] for ligne in lignes[1:]), ['Non', 'Oui', 'Oui'])
+
+    def test_filtre_par_dates(self):
+        url = reverse('presence:export')
+        self.assertEqual(len(self.lire_csv(self.client.get(url, {'debut': '2025-09-02'}))), 1)
+        self.assertEqual(self.client.get(url, {'debut': '2025-09-02', 'fin': '2025-09-01'}).status_code, 400)
+
+    def test_eleve_refuse(self):
+        self.client.force_login(self.eleves[0].user)
+        self.assertEqual(self.client.get(reverse('presence:export')).status_code, 403)
+
+    @skipUnless(xlsxwriter, "XlsxWriter n'est pas installé")
+    def test_export_xlsx(self):
+        response = self.client.get(reverse('presence:export'), {'format': 'xlsx'})
+        self.assertEqual(response.status_code, 200)
+        contenu = b''.join(response.streaming_content)
+        with zipfile.ZipFile(io.BytesIO(contenu)) as archive:
+            feuille = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(feuille.count('<row '), 4)
+
+    def test_formules_neutralisees(self):
+        Presence.objects.filter(cours=self.cours).update(remarque='=1+1')
+        lignes = self.lire_csv(self.client.get(reverse('presence:export')))
+        self.assertTrue(all(ligne[11] == "'=1+1" for ligne in lignes[1:]))
+
+    @skipUnless(xlsxwriter, "XlsxWriter n'est pas installé")
+    def test_xlsx_sur_plusieurs_feuilles(self):
+        Presence.objects.filter(cours=self.cours).update(remarque='=1+1')
+        fichier = io.BytesIO()
+        with mock.patch('presence.export.LIGNES_PAR_FEUILLE', 2):
+            export.ecrire_xlsx(export.presences_a_exporter(formateur=self.formateur), fichier)
+        with zipfile.ZipFile(fichier) as archive:
+            feuilles = [archive.read(f'xl/worksheets/sheet{n}.xml').decode() for n in (1, 2)]
+        self.assertEqual([feuille.count('<row ') for feuille in feuilles], [3, 2])
+        self.assertNotIn('<f>', ''.join(feuilles))
 
-# Create your tests here.
+    def test_commande(self):
+        sortie = io.StringIO()
+        call_command('exporter_presences', formateur='F002', stdout=sortie)
+        lignes = sortie.getvalue().lstrip('\ufeff').splitlines()
+        self.assertEqual(len(lignes), 2)
+        self.assertIn('Autre', lignes[1])
@@ -9,5 +9,6 @@ urlpatterns = [
     path('mes-presences/', views.PresenceListView.as_view(), name='mes_presences'),
     path('formateur/', views.PresenceFormateurListView.as_view(),
          name='formateur_list'),
+    path('export/', views.ExportPresenceView.as_view(), name='export'),
     #    path('statistiques/', views.StatistiquesPresenceView.as_view(), name='statistiques'),
 ]
@@ -1,14 +1,16 @@
+from django.views import View
 from django.views.generic import ListView, CreateView, UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse
 from django.shortcuts import get_object_or_404
 from django.utils.translation import gettext_lazy as _
 from django.contrib import messages
-from django.http import HttpResponseForbidden
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, HttpResponseRedirect
 
 from planning.models import Cours
-from .models import Presence
-from .forms import PresenceForm, BulkPresenceForm
+from .models import AttendanceSummary, Presence
+from .forms import PresenceForm, BulkPresenceForm, ExportPresenceForm
+from .export import FormatIndisponible, presences_a_exporter, reponse_export
 
 class MarquerPresenceView(LoginRequiredMixin, UpdateView):
     """Vue pour marquer les présences d'un cours"""
@@ -19,31 +21,50 @@ class MarquerPresenceView(LoginRequiredMixin, UpdateView):
 
     def get_queryset(self):
         qs = super().get_queryset()
-        if hasattr(self.request.user, 'formateur'):
-            return qs.filter(formateur=self.request.user.formateur)
+        if self.request.user.profil_formateur is not None:
+            return qs.filter(formateur=self.request.user.profil_formateur)
         return qs.none()
 
+    def get_inscriptions(self):
+        """Inscriptions validées à la formation du cours (chargées une seule fois)"""
+        if not hasattr(self, '_inscriptions'):
+            self._inscriptions = list(self.object.formation.inscriptions.filter(
+                statut='valide'
+            ).select_related('eleve__user'))
+        return self._inscriptions
+
+    def get_etats(self):
+        """Présences déjà enregistrées pour ce cours, {eleve_id: present}"""
+        if not hasattr(self, '_etats'):
+            self._etats = Presence.objects.etats_pour_cours(self.object)
+        return self._etats
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs.pop('instance', None)
+        kwargs['eleves'] = self.get_inscriptions()
+        kwargs['cours'] = self.object
+        if self.request.method == 'GET':
+            kwargs['etats'] = self.get_etats()
+        else:
+            # L'état initial est inutile en écriture : Presence.objects.marquer relit les lignes
+            kwargs['etats'] = {}
+        return kwargs
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['eleves'] = self.object.formation.inscription_set.filter(
-            statut='valide'
-        ).select_related('eleve__user')
+        etats = self.get_etats()
+        for inscription in self.get_inscriptions():
+            inscription.present = etats.get(inscription.eleve_id, False)
+        context['eleves'] = self.get_inscriptions()
         return context
 
     def form_valid(self, form):
-        # Enregistrement des présences
-        for eleve in self.get_context_data()['eleves']:
-            presence, created = Presence.objects.get_or_create(
-                cours=self.object,
-                eleve=eleve.eleve,
-                defaults={'present': form.cleaned_data[f'presence_{eleve.eleve.id}']}
-            )
-            if not created:
-                presence.present = form.cleaned_data[f'presence_{eleve.eleve.id}']
-                presence.save()
+        # Enregistrement des présences en une seule écriture
+        Presence.objects.marquer(self.object, form.get_etats())
 
         messages.success(self.request, _("Les présences ont été enregistrées avec succès."))
-        return super().form_valid(form)
+        return HttpResponseRedirect(self.get_success_url())
 
     def get_success_url(self):
         return reverse('planning:cours_detail', kwargs={'pk': self.object.pk})
@@ -55,25 +76,21 @@ class PresenceListView(LoginRequiredMixin, ListView):
     context_object_name = 'presences'
 
     def get_queryset(self):
-        if hasattr(self.request.user, 'eleve'):
+        if self.request.user.profil_eleve is not None:
             return super().get_queryset().filter(
-                eleve=self.request.user.eleve
+                eleve=self.request.user.profil_eleve
             ).select_related('cours__formation', 'cours__formateur')
         return super().get_queryset().none()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        if hasattr(self.request.user, 'eleve'):
-            context['eleve'] = self.request.user.eleve
+        if self.request.user.profil_eleve is not None:
+            context['eleve'] = self.request.user.profil_eleve
             context['taux_presence'] = self.calculate_attendance_rate()
         return context
 
     def calculate_attendance_rate(self):
-        total = self.get_queryset().count()
-        if total == 0:
-            return 0
-        present = self.get_queryset().filter(present=True).count()
-        return round((present / total) * 100, 1)
+        return AttendanceSummary.objects.filter(eleve=self.request.user.profil_eleve).taux()
 
 class PresenceFormateurListView(LoginRequiredMixin, ListView):
     """Vue pour lister les présences par cours (formateur)"""
@@ -81,9 +98,9 @@ class PresenceFormateurListView(LoginRequiredMixin, ListView):
     template_name = 'presence/presence_formateur_list.html'
 
     def get_queryset(self):
-        if hasattr(self.request.user, 'formateur'):
+        if self.request.user.profil_formateur is not None:
             return Presence.objects.filter(
-                cours__formateur=self.request.user.formateur
+                cours__formateur=self.request.user.profil_formateur
             ).select_related(
                 'cours', 'eleve__user', 'cours__formation'
             ).order_by('-cours__date', 'eleve__user__last_name')
@@ -91,8 +108,28 @@ class PresenceFormateurListView(LoginRequiredMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        if hasattr(self.request.user, 'formateur'):
+        if self.request.user.profil_formateur is not None:
             context['cours_list'] = Cours.objects.filter(
-                formateur=self.request.user.formateur
+                formateur=self.request.user.profil_formateur
             ).distinct()
-        return context
\ No newline at end of file
+        return context
+
+
+class ExportPresenceView(LoginRequiredMixin, View):
+    """Feuilles d'émargement en CSV ou XLSX, envoyées au fil de l'eau"""
+
+    def get(self, request, *args, **kwargs):
+        if request.user.is_staff:
+            formateur = None
+        elif request.user.profil_formateur is not None:
+            formateur = request.user.profil_formateur
+        else:
+            return HttpResponseForbidden(_("Export réservé aux formateurs et à l'administration."))
+
+        form = ExportPresenceForm(request.GET, formateur=formateur)
+        if not form.is_valid():
+            return HttpResponseBadRequest(form.errors.as_text())
+        try:
+            return reponse_export(presences_a_exporter(**form.get_filtres()), form.cleaned_data['format'] or 'csv')
+        except FormatIndisponible as e:
+            return HttpResponse(str(e), status=501)